@@ -1,10 +1,22 @@
 import os
+import time
+import importlib
 from flask import Flask, jsonify
 from flask_cors import CORS
 
 from app.config import config_by_name
 from app.extensions import db, jwt, migrate
 from app.middleware.tenant_middleware import TenantMiddleware
+from app.middleware.deferred_setup import DeferredSetupMiddleware
+
+
+# 主要蓝图: (模块路径, 蓝图变量名, URL前缀)，各蓝图内部自己处理子蓝图
+BLUEPRINTS = [
+    ('app.api.auth', 'auth_bp', '/api/auth'),
+    ('app.api.admin', 'admin_bp', '/api/admin'),
+    ('app.api.tenant', 'tenant_bp', '/api/tenant'),
+    ('app.api.system', 'system_bp', '/api/system'),
+]
 
 
 def create_app(config_name="development"):
@@ -19,14 +31,29 @@ def create_app(config_name="development"):
     app_config = config_by_name[config_name]
     app.config.from_object(app_config)
     
+    # 配置日志（异步写出、结构化、采样）
+    from app.utils.structured_logging import init_logging
+    init_logging(app)
+    
+    # 响应JSON序列化（orjson）
+    from app.utils.json_provider import init_json_provider
+    init_json_provider(app)
+    
     # 初始化扩展
     initialize_extensions(app)
     
     # 注册中间件
     register_middleware(app)
     
-    # 注册蓝图
-    register_blueprints(app)
+    # 注册蓝图（LAZY_BLUEPRINTS开启时推迟到处理第一个请求前）
+    if app.config.get('LAZY_BLUEPRINTS'):
+        app.wsgi_app = DeferredSetupMiddleware(app.wsgi_app, lambda: register_blueprints(app))
+    else:
+        register_blueprints(app)
+    
+    # 注册命令行命令
+    from app.cli import register_commands
+    register_commands(app)
     
     # 注册错误处理器
     register_error_handlers(app)
@@ -56,6 +83,24 @@ def initialize_extensions(app):
     db.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    
+    # 安装租户schema路由和数据库分片注册表
+    from app.utils.tenant_context import install_schema_routing
+    from app.utils.shard_registry import init_shard_registry
+    with app.app_context():
+        install_schema_routing(db.engine, app.config.get('TENANT_ROUTING_MODE', 'session'))
+        init_shard_registry(app, db.engine)
+        if app.config.get('METRICS_ENABLED', True):
+            from app.utils.metrics import instrument_engine
+            instrument_engine(db.engine, 'primary')
+    
+    # 参考数据缓存
+    from app.utils.cache import init_cache
+    init_cache(app)
+    
+    # 仓库库存汇总的会话钩子
+    from app.utils.inventory_stats import init_inventory_stats
+    init_inventory_stats(app)
 
 
 def register_middleware(app):
@@ -64,25 +109,29 @@ def register_middleware(app):
     :param app: Flask实例
     """
     app.wsgi_app = TenantMiddleware(app.wsgi_app, app)
+    
+    # 请求级SQL统计（语句数、数据库耗时、N+1检测）
+    from app.utils.query_stats import init_query_stats
+    init_query_stats(app)
+    
+    # Prometheus指标（请求耗时、连接池、缓存、库存过账）
+    from app.utils.metrics import init_metrics
+    init_metrics(app)
 
 
 def register_blueprints(app):
     """
-    注册蓝图
+    注册蓝图，并记录每个蓝图的导入和注册耗时
     :param app: Flask实例
     """
-    from app.api.auth import auth_bp
-    from app.api.admin import admin_bp
-    from app.api.tenant import tenant_bp
-    from app.api.system import system_bp
+    timings = app.extensions.setdefault('startup_timings', {})
     
-    # 简化注册，让各个蓝图内部自己处理子蓝图
     try:
-        # 只注册主要蓝图
-        app.register_blueprint(auth_bp, url_prefix='/api/auth')
-        app.register_blueprint(admin_bp, url_prefix='/api/admin')
-        app.register_blueprint(tenant_bp, url_prefix='/api/tenant')
-        app.register_blueprint(system_bp, url_prefix='/api/system')
+        for module_path, attr, url_prefix in BLUEPRINTS:
+            started = time.perf_counter()
+            module = importlib.import_module(module_path)
+            app.register_blueprint(getattr(module, attr), url_prefix=url_prefix)
+            timings[module_path] = time.perf_counter() - started
         
         print("✅ 主要蓝图注册成功")
         
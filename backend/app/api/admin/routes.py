@@ -6,6 +6,7 @@ from app.models.user import User, Role, Permission
 from app.extensions import db
 from app.schemas.tenant import TenantSchema, TenantCreateSchema, TenantUpdateSchema
 from app.utils.tenant_context import TenantContext
+from app.utils.tenant_cache import invalidate_tenant, tenant_schema_cache
 from app.constants.error_messages import get_error_message, AUTH_ERRORS, TENANT_ERRORS, USER_ERRORS, ROLE_ERRORS, PERMISSION_ERRORS
 from slugify import slugify
 import re
@@ -194,6 +195,9 @@ def create_tenant():
     db.session.add(new_tenant)
     db.session.commit()
     
+    # 清除该slug可能存在的负缓存
+    invalidate_tenant(new_tenant.slug)
+    
     # 如果指定了初始管理员，创建管理员账户
     admin_data = data.get('admin')
     if admin_data and admin_data.get('email') and admin_data.get('password'):
@@ -229,6 +233,7 @@ def update_tenant(tenant_id):
     更新租户信息
     """
     tenant = Tenant.query.get_or_404(tenant_id)
+    old_slug = tenant.slug
     
     # 验证请求数据
     schema = TenantUpdateSchema()
@@ -259,6 +264,9 @@ def update_tenant(tenant_id):
     # 保存更新
     db.session.commit()
     
+    # 使租户解析缓存失效（slug可能已变更）
+    invalidate_tenant(old_slug, tenant.slug)
+    
     # 序列化返回数据
     schema = TenantSchema()
     tenant_data = schema.dump(tenant)
@@ -278,9 +286,31 @@ def delete_tenant(tenant_id):
     tenant.is_active = False
     db.session.commit()
     
+    # 使租户解析缓存失效
+    invalidate_tenant(tenant.slug)
+    
     return jsonify({"message": "Tenant deactivated successfully"}), 200
 
 
+@admin_bp.route('/tenant-cache/stats', methods=['GET'])
+@superadmin_required
+def get_tenant_cache_stats():
+    """
+    获取当前worker进程的租户解析缓存统计
+    """
+    return jsonify({"stats": tenant_schema_cache.stats()}), 200
+
+
+@admin_bp.route('/tenant-cache', methods=['DELETE'])
+@superadmin_required
+def clear_tenant_cache():
+    """
+    清空当前worker进程的租户解析缓存
+    """
+    invalidate_tenant()
+    return jsonify({"message": "Tenant cache cleared"}), 200
+
+
 @admin_bp.route('/stats', methods=['GET'])
 @admin_required
 def get_admin_stats():
@@ -9,22 +9,27 @@ def system_health():
     return {
         'status': 'ok',
         'message': '系统API模块运行正常',
-        'modules': ['column_configuration', 'dynamic_fields']
+        'modules': ['column_configuration', 'dynamic_fields', 'bulk_import', 'export_jobs']
     }
 
 # 注册子蓝图
 try:
     from .column_configuration import column_config_bp
     from .dynamic_fields import dynamic_fields_bp
+    from .bulk_import import bulk_import_bp
+    from .export_jobs import export_jobs_bp
     
     # 注册子蓝图
     system_bp.register_blueprint(column_config_bp, url_prefix='/column-config')
     system_bp.register_blueprint(dynamic_fields_bp, url_prefix='/dynamic-fields')
+    system_bp.register_blueprint(bulk_import_bp, url_prefix='/bulk-imports')
+    system_bp.register_blueprint(export_jobs_bp, url_prefix='/exports')
     
     print("✅ 系统子蓝图注册成功")
     
 except Exception as e:
     print(f"❌ 系统子蓝图注册失败: {e}")
+    raise
 
 # 为统一导入方式提供别名
 bp = system_bp 
\ No newline at end of file
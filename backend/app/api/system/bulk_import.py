@@ -0,0 +1,162 @@
+import io
+import csv
+from flask import Blueprint, request, jsonify, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.system.bulk_import_service import get_bulk_import_service, IMPORT_ENTITIES
+
+# 创建蓝图
+bulk_import_bp = Blueprint('bulk_import', __name__)
+
+
+def _csv_response(rows, filename):
+    """生成带BOM的CSV下载响应（Excel按UTF-8识别中文）"""
+    buffer = io.StringIO()
+    buffer.write('\ufeff')
+    csv.writer(buffer).writerows(rows)
+    return Response(
+        buffer.getvalue(),
+        mimetype='text/csv; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+@bulk_import_bp.route('/entities', methods=['GET'])
+@jwt_required()
+def get_import_entities():
+    """获取可导入的主数据及字段"""
+    try:
+        service = get_bulk_import_service()
+        return jsonify({
+            'success': True,
+            'data': service.get_entities()
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@bulk_import_bp.route('/templates/<entity_type>', methods=['GET'])
+@jwt_required()
+def download_import_template(entity_type):
+    """下载导入模板（CSV表头）"""
+    entity = IMPORT_ENTITIES.get(entity_type)
+    if not entity:
+        return jsonify({
+            'success': False,
+            'message': f'不支持的导入对象: {entity_type}'
+        }), 400
+
+    header_map = entity.header_map()
+    # 标签重复的字段只能用字段名作为表头
+    header = [field['label'] if header_map.get(field['label']) == field['field'] else field['field']
+              for field in entity.fields()]
+    return _csv_response([header], f'{entity_type}_import_template.csv')
+
+
+@bulk_import_bp.route('/jobs', methods=['POST'])
+@jwt_required()
+def create_import_job():
+    """上传文件并创建导入任务，任务在后台执行"""
+    try:
+        file = request.files.get('file')
+        entity_type = request.form.get('entity_type')
+        validate_only = request.form.get('validate_only', 'false').lower() == 'true'
+
+        if not file or not entity_type:
+            return jsonify({
+                'success': False,
+                'message': '导入文件和导入对象不能为空'
+            }), 400
+
+        service = get_bulk_import_service()
+        job = service.create_job(entity_type, file, get_jwt_identity(), validate_only=validate_only)
+
+        return jsonify({
+            'success': True,
+            'data': job,
+            'message': '导入任务已创建'
+        }), 202
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@bulk_import_bp.route('/jobs', methods=['GET'])
+@jwt_required()
+def get_import_jobs():
+    """获取导入任务列表"""
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+        entity_type = request.args.get('entity_type')
+
+        service = get_bulk_import_service()
+        result = service.get_jobs(page=page, per_page=per_page, entity_type=entity_type)
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@bulk_import_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_import_job(job_id):
+    """获取导入任务进度，include_errors=true 时返回逐行错误报告"""
+    try:
+        include_errors = request.args.get('include_errors', 'false').lower() == 'true'
+
+        service = get_bulk_import_service()
+        job = service.get_job(job_id, include_errors=include_errors)
+
+        return jsonify({
+            'success': True,
+            'data': job
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@bulk_import_bp.route('/jobs/<job_id>/errors', methods=['GET'])
+@jwt_required()
+def download_import_errors(job_id):
+    """下载逐行错误报告（CSV）"""
+    try:
+        service = get_bulk_import_service()
+        job = service.get_job(job_id, include_errors=True)
+
+        rows = [['行号', '错误']]
+        rows.extend([item['row'], '；'.join(item['errors'])] for item in job['error_report'])
+        return _csv_response(rows, f'import_errors_{job_id}.csv')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
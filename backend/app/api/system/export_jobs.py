@@ -0,0 +1,73 @@
+from flask import Blueprint, request, jsonify, send_file
+from flask_jwt_extended import jwt_required
+from app.services.system.export_job_service import get_export_job_service
+from app.utils.xlsx_export import XLSX_MIMETYPE
+
+# 创建蓝图
+export_jobs_bp = Blueprint('export_jobs', __name__)
+
+
+@export_jobs_bp.route('/jobs', methods=['GET'])
+@jwt_required()
+def get_export_jobs():
+    """获取当前用户的导出任务列表"""
+    try:
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 20, type=int)
+
+        service = get_export_job_service()
+        result = service.get_jobs(page=page, per_page=per_page)
+
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@export_jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_export_job(job_id):
+    """获取导出任务进度"""
+    try:
+        service = get_export_job_service()
+        job = service.get_job(job_id)
+
+        return jsonify({
+            'success': True,
+            'data': job
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+
+@export_jobs_bp.route('/jobs/<job_id>/download', methods=['GET'])
+@jwt_required()
+def download_export_file(job_id):
+    """下载已完成导出任务的结果文件"""
+    try:
+        service = get_export_job_service()
+        path, file_name = service.get_file(job_id)
+        return send_file(path, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=file_name)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
@@ -24,12 +24,14 @@ try:
     from .business import business_bp
     from .routes import production_bp
     from .modules import bp as modules_bp
+    from .bootstrap import bp as bootstrap_bp
     
     # 注册子蓝图
     tenant_bp.register_blueprint(base_archive_bp, url_prefix='/base-archive')
     tenant_bp.register_blueprint(business_bp, url_prefix='/business')
     tenant_bp.register_blueprint(production_bp, url_prefix='/production')
     tenant_bp.register_blueprint(modules_bp, url_prefix='/modules')
+    tenant_bp.register_blueprint(bootstrap_bp, url_prefix='/bootstrap')
     
     # 兼容路径 - 为前端错误的API路径创建别名
     from .base_archive.base_data import base_data_bp
@@ -39,6 +41,7 @@ try:
     
 except Exception as e:
     print(f"❌ 租户子蓝图注册失败: {e}")
+    raise
 
 # 为统一导入方式提供别名
 bp = tenant_bp
@@ -10,6 +10,9 @@ import uuid
 
 from app.utils.decorators import tenant_required
 from app.utils.tenant_context import tenant_context_required
+from app.utils.pagination import cursor_args, InvalidCursorError
+from app.utils.projection import fields_arg, InvalidFieldsError
+from app.utils.http_cache import etag_json_response
 from app.services.base_archive.base_data.customer_service import CustomerService
 
 customer_bp = Blueprint('customer', __name__)
@@ -30,6 +33,7 @@ def get_customers():
         search = request.args.get('search')
         category_id = request.args.get('category_id')
         status = request.args.get('status')
+        cursor, with_total = cursor_args(request.args)
         
         # 获取客户列表
         result = customer_service.get_customers(
@@ -37,7 +41,10 @@ def get_customers():
             per_page=per_page,
             search=search,
             category_id=category_id,
-            status=status
+            status=status,
+            cursor=cursor,
+            with_total=with_total,
+            fields=fields_arg(request.args)
         )
         
         return jsonify({
@@ -45,6 +52,8 @@ def get_customers():
             'data': result
         })
         
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -182,15 +191,13 @@ def delete_customer(customer_id):
 @jwt_required()
 @tenant_required
 def get_customer_form_options():
-    """获取客户表单选项"""
+    """获取客户表单选项（支持 If-None-Match）"""
     try:
         customer_service = CustomerService()
-        options = customer_service.get_form_options()
-        
-        return jsonify({
-            'success': True,
-            'data': options
-        }), 200
+        return etag_json_response(
+            lambda: {'success': True, 'data': customer_service.get_form_options()},
+            *CustomerService.FORM_OPTION_TABLES
+        )
         
     except Exception as e:
         return jsonify({
@@ -6,6 +6,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services.base_archive.base_data.material_management_service import MaterialService
+from app.utils.projection import fields_arg, InvalidFieldsError
+from app.utils.http_cache import etag_json_response
 
 bp = Blueprint('material_management', __name__)
 
@@ -29,7 +31,8 @@ def get_materials():
             page_size=per_page,
             search=search,
             material_category_id=category_id,
-            inspection_type=material_type
+            inspection_type=material_type,
+            fields=fields_arg(request.args)
         )
         
         return jsonify({
@@ -37,6 +40,8 @@ def get_materials():
             'data': result
         })
         
+    except InvalidFieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -138,15 +143,13 @@ def delete_material(material_id):
 @bp.route('/form-options', methods=['GET'])
 @jwt_required()
 def get_material_form_options():
-    """获取材料表单选项数据"""
+    """获取材料表单选项数据（支持 If-None-Match）"""
     try:
         material_service = MaterialService()
-        options = material_service.get_form_options()
-        
-        return jsonify({
-            'success': True,
-            'data': options
-        })
+        return etag_json_response(
+            lambda: {'success': True, 'data': material_service.get_form_options()},
+            *MaterialService.FORM_OPTION_TABLES
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500 
@@ -9,7 +9,9 @@ from werkzeug.utils import secure_filename
 from datetime import datetime
 
 from app.api.tenant.routes import tenant_required
-from app.services.base_archive.base_data.product_management_service import get_product_management_service
+from app.services.base_archive.base_data.product_management_service import get_product_management_service, ProductManagementService
+from app.utils.http_cache import etag_json_response
+from app.utils.projection import fields_arg, InvalidFieldsError
 
 # 创建蓝图
 product_management_bp = Blueprint('product_management', __name__)
@@ -191,7 +193,8 @@ def get_products():
             search=search,
             customer_id=customer_id,
             bag_type_id=bag_type_id,
-            status=status
+            status=status,
+            fields=fields_arg(request.args)
         )
         
         return jsonify({
@@ -199,6 +202,11 @@ def get_products():
             'data': result
         })
         
+    except InvalidFieldsError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -325,15 +333,13 @@ def delete_product(product_id):
 @jwt_required()
 @tenant_required
 def get_product_form_options():
-    """获取产品表单选项"""
+    """获取产品表单选项（支持 If-None-Match）"""
     try:
         service = get_product_management_service()
-        options = service.get_form_options()
-        
-        return jsonify({
-            'success': True,
-            'data': options
-        })
+        return etag_json_response(
+            lambda: {'success': True, 'data': service.get_form_options()},
+            *ProductManagementService.FORM_OPTION_TABLES
+        )
         
     except Exception as e:
         return jsonify({
@@ -6,6 +6,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
+from app.utils.http_cache import etag_json_response
 from app.services.base_archive.base_data.team_group_service import TeamGroupService
 from app.models.user import User
 from app.extensions import db
@@ -196,7 +197,7 @@ def delete_team_group(team_group_id):
 @jwt_required()
 @tenant_required
 def get_form_options():
-    """获取表单选项数据"""
+    """获取表单选项数据（支持 If-None-Match）"""
     try:
         # 获取当前用户信息
         current_user_id = get_jwt_identity()
@@ -209,12 +210,10 @@ def get_form_options():
         service = TeamGroupService()
         
         # 获取表单选项
-        options = service.get_form_options()
-        
-        return jsonify({
-            'success': True,
-            'data': options
-        })
+        return etag_json_response(
+            lambda: {'success': True, 'data': service.get_form_options()},
+            *TeamGroupService.FORM_OPTION_TABLES
+        )
         
     except Exception as e:
         return jsonify({
@@ -7,6 +7,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.services.base_archive.production_archive.bag_type_service import BagTypeService
 from app.api.tenant.routes import tenant_required
+from app.utils.http_cache import etag_json_response
 
 bp = Blueprint('bag_type', __name__)
 
@@ -185,15 +186,13 @@ def get_bag_type_options():
 @jwt_required()
 @tenant_required
 def get_bag_type_form_options():
-    """获取袋型表单选项数据"""
+    """获取袋型表单选项数据（支持 If-None-Match）"""
     try:
         bag_type_service = BagTypeService()
-        options = bag_type_service.get_form_options()
-        
-        return jsonify({
-            'success': True,
-            'data': options
-        })
+        return etag_json_response(
+            lambda: {'success': True, 'data': bag_type_service.get_form_options()},
+            *BagTypeService.FORM_OPTION_TABLES
+        )
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
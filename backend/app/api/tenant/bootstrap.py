@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+租户启动数据API
+前端登录后一次获取参考数据和配置，之后通过版本检查接口判断是否需要重新获取
+"""
+
+from flask import Blueprint, jsonify
+from flask_jwt_extended import get_jwt
+from app.api.tenant.routes import tenant_required
+from app.services.system.bootstrap_service import get_tenant_bootstrap_service, bootstrap_tables
+from app.utils.http_cache import etag_json_response
+
+bp = Blueprint('tenant_bootstrap', __name__)
+
+
+@bp.route('/', methods=['GET'])
+@tenant_required
+def get_bootstrap():
+    """获取租户启动数据（支持 If-None-Match）"""
+    try:
+        tenant_id = get_jwt().get('tenant_id')
+        service = get_tenant_bootstrap_service()
+        return etag_json_response(
+            lambda: {'success': True, 'data': service.get_bootstrap(tenant_id)},
+            *bootstrap_tables()
+        )
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取启动数据失败: {str(e)}'
+        }), 500
+
+
+@bp.route('/version', methods=['GET'])
+@tenant_required
+def get_bootstrap_version():
+    """获取启动数据版本号，与本地缓存的版本号不同时重新获取启动数据"""
+    try:
+        tenant_id = get_jwt().get('tenant_id')
+        service = get_tenant_bootstrap_service()
+        return jsonify({
+            'success': True,
+            'data': {'version': service.get_version(tenant_id)}
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'获取启动数据版本失败: {str(e)}'
+        }), 500
@@ -56,6 +56,7 @@ try:
     
 except ImportError as e:
     print(f"Warning: Could not import inventory modules: {e}")
+    raise
 
 # 导入销售模块的所有蓝图
 try:
@@ -68,6 +69,7 @@ try:
     
 except ImportError as e:
     print(f"Warning: Could not import sales modules: {e}")
+    raise
 
 @business_bp.route('/health', methods=['GET'])  
 def health_check():
@@ -10,13 +10,42 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
-from app.services import InventoryService
+from app.services import InventoryService, InventorySnapshotService
+from app.utils.pagination import cursor_args, InvalidCursorError
+from app.utils.projection import fields_arg, InvalidFieldsError
+from app.utils.streaming_export import stream_export, export_format_arg, InvalidExportFormatError, FORMAT_XLSX
+from app.services.system.column_configuration_service import ColumnConfigurationService
 from decimal import Decimal
 from datetime import datetime
 
 bp = Blueprint('inventory_query', __name__)
 
 
+def _inventory_filters():
+    """库存列表和导出共用的查询参数"""
+    return {
+        'warehouse_id': request.args.get('warehouse_id'),
+        'inventory_status': request.args.get('inventory_status'),
+        'quality_status': request.args.get('quality_status'),
+        'below_safety_stock': request.args.get('below_safety_stock', 'false').lower() == 'true',
+        'expired_only': request.args.get('expired_only', 'false').lower() == 'true',
+    }
+
+
+def _transaction_filters():
+    """库存流水列表和导出共用的查询参数"""
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    return {
+        'inventory_id': request.args.get('inventory_id'),
+        'warehouse_id': request.args.get('warehouse_id'),
+        'transaction_type': request.args.get('transaction_type'),
+        # 日期转换
+        'start_date': datetime.fromisoformat(start_date.replace('Z', '+00:00')) if start_date else None,
+        'end_date': datetime.fromisoformat(end_date.replace('Z', '+00:00')) if end_date else None,
+    }
+
+
 @bp.route('/inventories', methods=['GET'])
 @jwt_required()
 @tenant_required
@@ -24,30 +53,61 @@ def get_inventories():
     """获取库存列表"""
     try:
         # 获取查询参数
-        warehouse_id = request.args.get('warehouse_id')
-        inventory_status = request.args.get('inventory_status')
-        quality_status = request.args.get('quality_status')
-        below_safety_stock = request.args.get('below_safety_stock', 'false').lower() == 'true'
-        expired_only = request.args.get('expired_only', 'false').lower() == 'true'
         page = int(request.args.get('page', 1))
         page_size = min(int(request.args.get('page_size', 20)), 100)
+        cursor, with_total = cursor_args(request.args)
 
         # 创建服务实例
         service = InventoryService()
         result = service.get_inventory_list(
-            warehouse_id=warehouse_id,
-            inventory_status=inventory_status,
-            quality_status=quality_status,
-            below_safety_stock=below_safety_stock,
-            expired_only=expired_only,
+            **_inventory_filters(),
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            with_total=with_total,
+            fields=fields_arg(request.args)
         )
         return jsonify({
             'success': True,
             'data': result
         })
         
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/inventories/as-of', methods=['GET'])
+@jwt_required()
+@tenant_required
+def get_inventory_as_of():
+    """获取某天结束时的库存（基于库存期末快照）"""
+    try:
+        as_of_date = request.args.get('date')
+        if not as_of_date:
+            return jsonify({'error': '请指定查询日期'}), 400
+        try:
+            as_of_date = datetime.strptime(as_of_date[:10], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': '日期格式应为YYYY-MM-DD'}), 400
+
+        service = InventorySnapshotService()
+        result = service.get_inventory_as_of(
+            as_of_date,
+            warehouse_id=request.args.get('warehouse_id'),
+            product_id=request.args.get('product_id'),
+            material_id=request.args.get('material_id'),
+            period_type=request.args.get('period_type'),
+            include_zero=request.args.get('include_zero', 'false').lower() == 'true'
+        )
+        return jsonify({
+            'success': True,
+            'data': result
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -148,29 +208,17 @@ def get_inventory_transactions():
     """获取库存流水列表"""
     try:
         # 获取查询参数
-        inventory_id = request.args.get('inventory_id')
-        warehouse_id = request.args.get('warehouse_id')
-        transaction_type = request.args.get('transaction_type')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
         page = int(request.args.get('page', 1))
         page_size = min(int(request.args.get('page_size', 20)), 100)
-        
-        # 日期转换
-        if start_date:
-            start_date = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        if end_date:
-            end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
+        cursor, with_total = cursor_args(request.args)
         
         service = InventoryService()
         result = service.get_inventory_transactions(
-            inventory_id=inventory_id,
-            warehouse_id=warehouse_id,
-            transaction_type=transaction_type,
-            start_date=start_date,
-            end_date=end_date,
+            **_transaction_filters(),
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            with_total=with_total
         )
         
         return jsonify({
@@ -178,6 +226,40 @@ def get_inventory_transactions():
             'data': result
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/inventories/export', methods=['GET'])
+@jwt_required()
+@tenant_required
+def export_inventories():
+    """流式导出库存（format=ndjson|csv|xlsx，xlsx按页面列配置选择列），过滤条件同库存列表"""
+    try:
+        export_format = export_format_arg(request.args)
+        query = InventoryService().export_inventories(**_inventory_filters())
+        columns = ColumnConfigurationService().get_export_columns('inventory') if export_format == FORMAT_XLSX else None
+        return stream_export(query, export_format, f"inventories_{datetime.now():%Y%m%d%H%M%S}", columns=columns)
+    except InvalidExportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/inventory-transactions/export', methods=['GET'])
+@jwt_required()
+@tenant_required
+def export_inventory_transactions():
+    """流式导出库存流水（format=ndjson|csv|xlsx，xlsx按页面列配置选择列），过滤条件同库存流水列表"""
+    try:
+        export_format = export_format_arg(request.args)
+        query = InventoryService().export_inventory_transactions(**_transaction_filters())
+        columns = ColumnConfigurationService().get_export_columns('inventoryTransaction') if export_format == FORMAT_XLSX else None
+        return stream_export(query, export_format, f"inventory_transactions_{datetime.now():%Y%m%d%H%M%S}", columns=columns)
+    except InvalidExportFormatError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
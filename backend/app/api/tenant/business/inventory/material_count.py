@@ -15,6 +15,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.api.tenant.routes import tenant_required
+from app.utils.projection import view_arg
 import logging
 
 # 设置蓝图
@@ -50,7 +51,8 @@ def get_material_count_orders():
             end_date=end_date,
             search=count_number,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            view=view_arg(request.args)
         )
         
         return jsonify({
@@ -11,6 +11,7 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
 from app.services.business.inventory.material_inbound_service import MaterialInboundService
+from app.utils.projection import view_arg
 from decimal import Decimal
 from datetime import datetime
 
@@ -50,7 +51,8 @@ def get_material_inbound_orders():
             end_date=end_date,
             search=search,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            view=view_arg(request.args)
         )
         return jsonify({
             'success': True,
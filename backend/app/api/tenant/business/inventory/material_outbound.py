@@ -16,8 +16,9 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
 from app.services.business.inventory.material_outbound_service import MaterialOutboundService
+from app.utils.projection import view_arg
 from app.models.business.inventory import (
-    MaterialOutboundOrder, MaterialOutboundOrderDetail, Inventory, InventoryTransaction
+    MaterialOutboundOrder, MaterialOutboundOrderDetail
 )
 from app.models.basic_data import Unit
 from datetime import datetime
@@ -66,7 +67,8 @@ def get_material_outbound_orders():
             end_date=end_date_obj,
             search=search,
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            view=view_arg(request.args)
         )
 
         return jsonify({
@@ -401,114 +403,22 @@ def execute_material_outbound_order(order_id):
     """执行材料出库单"""
     try:
         current_user = get_jwt_identity()
-        
-        order = MaterialOutboundOrder.query.get(order_id)
-        if not order:
-            return jsonify({'code': 404, 'message': '出库单不存在'}), 404
-
-        if order.status != 'approved':
-            return jsonify({'code': 400, 'message': '只能执行已审核通过的出库单'}), 400
-        
-        # 获取出库单明细
-        details = MaterialOutboundOrderDetail.query.filter_by(
-            material_outbound_order_id=order_id
-        ).all()
-        
-        if not details:
-            return jsonify({'code': 400, 'message': '出库单没有明细数据'}), 400
-        
-        # 处理每个明细的库存更新
-        for detail in details:
-            if not detail.material_id:
-                continue
-                
-            # 查找对应的库存记录
-            inventory = Inventory.query.filter_by(
-                warehouse_id=order.warehouse_id,
-                material_id=detail.material_id,
-                batch_number=detail.batch_number,
-                is_active=True
-            ).first()
-
-            if not inventory:
-                # 如果没有找到精确匹配的库存（包括批次），尝试找不指定批次的库存
-                inventory = Inventory.query.filter_by(
-                    warehouse_id=order.warehouse_id,
-                    material_id=detail.material_id,
-                    is_active=True
-                ).first()
-            
-            if not inventory:
-                return jsonify({
-                    'code': 400, 
-                    'message': f'材料 {detail.material_name} 在仓库中没有库存记录'
-                }), 400
-            
-            outbound_qty = Decimal(str(detail.outbound_quantity))
-            
-            # 检查库存是否足够
-            if inventory.available_quantity < outbound_qty:
-                return jsonify({
-                    'code': 400,
-                    'message': f'材料 {detail.material_name} 库存不足，可用数量: {inventory.available_quantity}，需要出库: {outbound_qty}'
-                }), 400
-            
-            # 记录出库前数量
-            quantity_before = inventory.current_quantity
-            
-            # 更新库存数量
-            inventory.current_quantity -= outbound_qty
-            inventory.available_quantity -= outbound_qty
-            inventory.updated_by = current_user
-            inventory.updated_at = datetime.now()
-            
-            # 重新计算总成本
-            inventory.calculate_total_cost()
-            
-            # 生成库存流水记录
-            transaction = InventoryTransaction(
-                inventory_id=inventory.id,
-                warehouse_id=inventory.warehouse_id,
-                material_id=inventory.material_id,
-                transaction_type='out',
-                quantity_change=-outbound_qty,
-                quantity_before=quantity_before,
-                quantity_after=inventory.current_quantity,
-                unit_id=detail.unit_id,
-                created_by=current_user,
-                unit_price=detail.unit_price,
-                total_amount=detail.total_amount,
-                source_document_type='material_outbound_order',
-                source_document_id=order.id,
-                source_document_number=order.order_number,
-                batch_number=detail.batch_number,
-                from_location=detail.location_code,
-                reason=f'材料出库单 {order.order_number} 执行',
-                approval_status='approved',
-                approved_by=current_user,
-                approved_at=datetime.now()
-            )
-            
-            # 计算流水总金额
-            transaction.calculate_total_amount()
-            
-            db.session.add(transaction)
-
-        # 更新出库单状态
-        order.status = 'executed'
-        order.executed_by = current_user
-        order.executed_at = datetime.now()
 
-        db.session.commit()
+        service = MaterialOutboundService()
+        transactions = service.execute_material_outbound_order(order_id, current_user)
 
         return jsonify({
             'code': 200,
             'message': '执行成功，库存已更新',
-            'data': order.to_dict()
+            'data': {
+                'transaction_count': len(transactions),
+                'transactions': [t.to_dict() for t in transactions]
+            }
         })
 
+    except ValueError as e:
+        return jsonify({'code': 400, 'message': str(e)}), 400
     except Exception as e:
-        db.session.rollback()
         logger.error(f"执行材料出库单失败: {str(e)}")
         return jsonify({'code': 500, 'message': f'执行失败: {str(e)}'}), 500
 
@@ -527,7 +437,7 @@ def cancel_material_outbound_order(order_id):
         if not order:
             return jsonify({'code': 404, 'message': '出库单不存在'}), 404
 
-        if order.status in ['executed', 'cancelled']:
+        if order.status in ['executed', 'completed', 'cancelled']:
             return jsonify({'code': 400, 'message': '该订单不能取消'}), 400
 
         order.status = 'cancelled'
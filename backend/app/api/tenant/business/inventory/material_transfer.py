@@ -16,6 +16,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
+from app.utils.projection import view_arg, VIEW_SUMMARY, summary_page
 from app.services.business.inventory.material_transfer_service import MaterialTransferService
 from app.models.business.inventory import (
     MaterialTransferOrder, MaterialTransferOrderDetail, Inventory
@@ -67,6 +68,22 @@ def get_material_transfer_orders():
         if end_date:
             query = query.filter(MaterialTransferOrder.transfer_date <= end_date)
         
+        # 摘要视图：只查询列表列和人员、部门名称
+        if view_arg(request.args) == VIEW_SUMMARY:
+            total = query.order_by(None).count()
+            return jsonify({
+                'success': True,
+                'data': {
+                    'orders': summary_page(query, MaterialTransferOrder, MaterialTransferOrder.created_at.desc(), page, per_page),
+                    'pagination': {
+                        'page': page,
+                        'pages': (total + per_page - 1) // per_page,
+                        'per_page': per_page,
+                        'total': total
+                    }
+                }
+            })
+        
         # 分页查询
         pagination = query.order_by(MaterialTransferOrder.created_at.desc()).paginate(
             page=page, per_page=per_page, error_out=False
@@ -14,6 +14,7 @@ from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
 from app.services.business.inventory.product_count_service import ProductCountService
+from app.utils.projection import view_arg
 import logging
 
 # 设置蓝图
@@ -48,7 +49,7 @@ def get_product_count_plans():
             filters['search'] = request.args.get('search')
         
         productcount_service = ProductCountService()
-        result = productcount_service.get_count_plans(page, page_size, **filters)
+        result = productcount_service.get_count_plans(page, page_size, view=view_arg(request.args), **filters)
         return jsonify({
             'success': True,
             'data': result
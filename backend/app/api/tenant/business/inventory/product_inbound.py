@@ -14,6 +14,11 @@ from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.api.tenant.routes import tenant_required
 from app.services.business.inventory.product_inbound_service import ProductInboundService
 import logging
+from app.utils.pagination import cursor_args, InvalidCursorError
+from app.utils.projection import view_arg
+from app.utils.streaming_export import stream_export, export_format_arg, InvalidExportFormatError, FORMAT_XLSX
+from app.services.system.column_configuration_service import ColumnConfigurationService
+from datetime import datetime
 
 # 设置蓝图
 bp = Blueprint('product_inbound', __name__)
@@ -21,6 +26,20 @@ logger = logging.getLogger(__name__)
 
 # ==================== 产品入库管理 ====================
 
+def _inbound_order_filters():
+    """产品入库单列表和导出共用的过滤条件"""
+    return {
+        'search': request.args.get('search'),  # 修复：使用search参数而不是order_number
+        'warehouse_id': request.args.get('warehouse_id'),
+        'status': request.args.get('status'),
+        'approval_status': request.args.get('approval_status'),
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date'),
+        'inbound_person_id': request.args.get('inbound_person_id'),  # 添加入库人参数
+        'department_id': request.args.get('department_id'),  # 添加部门参数
+    }
+
+
 @bp.route('/product-inbound-orders', methods=['GET'])
 @jwt_required()
 @tenant_required
@@ -30,29 +49,17 @@ def get_product_inbound_orders():
         # 获取查询参数
         page = int(request.args.get('page', 1))
         page_size = min(int(request.args.get('page_size', 20)), 100)
-        search = request.args.get('search')  # 修复：使用search参数而不是order_number
-        warehouse_id = request.args.get('warehouse_id')
-        supplier_id = request.args.get('supplier_id')
-        status = request.args.get('status')
-        approval_status = request.args.get('approval_status')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        inbound_person_id = request.args.get('inbound_person_id')  # 添加入库人参数
-        department_id = request.args.get('department_id')  # 添加部门参数
+        cursor, with_total = cursor_args(request.args)
         
         # 获取产品入库单列表
         service = ProductInboundService()
         result = service.get_product_inbound_order_list(
-            warehouse_id=warehouse_id,
-            status=status,
-            approval_status=approval_status,
-            start_date=start_date,
-            end_date=end_date,
-            search=search,  # 修复：传递正确的search参数
-            inbound_person_id=inbound_person_id,
-            department_id=department_id,
+            **_inbound_order_filters(),
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            cursor=cursor,
+            with_total=with_total,
+            view=view_arg(request.args)
         )
         
         return jsonify({
@@ -60,11 +67,30 @@ def get_product_inbound_orders():
             'data': result
         })
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"获取产品入库单列表失败: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/product-inbound-orders/export', methods=['GET'])
+@jwt_required()
+@tenant_required
+def export_product_inbound_orders():
+    """流式导出产品入库单（format=ndjson|csv|xlsx，xlsx按页面列配置选择列），过滤条件同产品入库单列表"""
+    try:
+        export_format = export_format_arg(request.args)
+        query = ProductInboundService().export_product_inbound_orders(**_inbound_order_filters())
+        columns = ColumnConfigurationService().get_export_columns('productInbound') if export_format == FORMAT_XLSX else None
+        return stream_export(query, export_format, f"product_inbound_orders_{datetime.now():%Y%m%d%H%M%S}", columns=columns)
+    except InvalidExportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"导出产品入库单失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 # 获取产品入库单详情
 @bp.route('/product-inbound-orders/<order_id>', methods=['GET'])
 @jwt_required()
@@ -16,6 +16,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from app.api.tenant.routes import tenant_required
+from app.utils.projection import view_arg
+from app.utils.streaming_export import stream_export, export_format_arg, InvalidExportFormatError, FORMAT_XLSX
+from app.services.system.column_configuration_service import ColumnConfigurationService
+from datetime import datetime
 import logging
 
 # 设置蓝图
@@ -24,6 +28,18 @@ logger = logging.getLogger(__name__)
 
 # ==================== 产品出库管理 ====================
 
+def _outbound_order_filters():
+    """产品出库单列表和导出共用的过滤条件"""
+    return {
+        'search': request.args.get('order_number'),
+        'warehouse_id': request.args.get('warehouse_id'),
+        'status': request.args.get('status'),
+        'approval_status': request.args.get('approval_status'),
+        'start_date': request.args.get('start_date'),
+        'end_date': request.args.get('end_date'),
+    }
+
+
 @bp.route('/product-outbound-orders', methods=['GET'])
 @jwt_required()
 @tenant_required
@@ -33,13 +49,6 @@ def get_outbound_orders():
         # 获取查询参数
         page = int(request.args.get('page', 1))
         page_size = min(int(request.args.get('page_size', 20)), 100)
-        order_number = request.args.get('order_number')
-        warehouse_id = request.args.get('warehouse_id')
-        customer_id = request.args.get('customer_id')
-        status = request.args.get('status')
-        approval_status = request.args.get('approval_status')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
         
         # 获取当前用户和租户信息
         current_user_id = get_jwt_identity()
@@ -53,14 +62,10 @@ def get_outbound_orders():
         from app.services.business.inventory.product_outbound_service import ProductOutboundService
         service = ProductOutboundService()
         result = service.get_outbound_order_list(
-            warehouse_id=warehouse_id,
-            status=status,
-            approval_status=approval_status,
-            start_date=start_date,
-            end_date=end_date,
-            search=order_number,
+            **_outbound_order_filters(),
             page=page,
-            page_size=page_size
+            page_size=page_size,
+            view=view_arg(request.args)
         )
         
         return jsonify({
@@ -73,6 +78,24 @@ def get_outbound_orders():
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/product-outbound-orders/export', methods=['GET'])
+@jwt_required()
+@tenant_required
+def export_outbound_orders():
+    """流式导出产品出库单（format=ndjson|csv|xlsx，xlsx按页面列配置选择列），过滤条件同产品出库单列表"""
+    try:
+        export_format = export_format_arg(request.args)
+        from app.services.business.inventory.product_outbound_service import ProductOutboundService
+        query = ProductOutboundService().export_outbound_orders(**_outbound_order_filters())
+        columns = ColumnConfigurationService().get_export_columns('productOutbound') if export_format == FORMAT_XLSX else None
+        return stream_export(query, export_format, f"product_outbound_orders_{datetime.now():%Y%m%d%H%M%S}", columns=columns)
+    except InvalidExportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"导出产品出库单失败: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
 @bp.route('/product-outbound-orders/<order_id>', methods=['GET'])
 @jwt_required()
 @tenant_required
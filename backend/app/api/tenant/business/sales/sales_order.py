@@ -7,6 +7,10 @@ from flask import Blueprint, request, jsonify
 from datetime import datetime
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.api.tenant.routes import tenant_required
+from app.utils.pagination import cursor_args, InvalidCursorError
+from app.utils.projection import fields_arg, InvalidFieldsError
+from app.utils.streaming_export import stream_export, export_format_arg, InvalidExportFormatError, FORMAT_XLSX
+from app.services.system.column_configuration_service import ColumnConfigurationService
 from app.services import (
     CustomerService,
     SalesOrderService
@@ -18,6 +22,24 @@ from app.services.base_archive.base_data.product_management_service import Produ
 bp = Blueprint('sales_order', __name__)
 
 
+def _sales_order_filters():
+    """销售订单列表和导出共用的过滤条件"""
+    filters = {}
+    if request.args.get('order_number'):
+        filters['order_number'] = request.args.get('order_number')
+    if request.args.get('customer_id'):
+        filters['customer_id'] = request.args.get('customer_id')
+    if request.args.get('status'):
+        filters['status'] = request.args.get('status')
+    if request.args.get('salesperson_id'):
+        filters['salesperson_id'] = request.args.get('salesperson_id')
+    if request.args.get('start_date'):
+        filters['start_date'] = datetime.fromisoformat(request.args.get('start_date'))
+    if request.args.get('end_date'):
+        filters['end_date'] = datetime.fromisoformat(request.args.get('end_date'))
+    return filters
+
+
 @bp.route('/sales-orders', methods=['GET'])
 @jwt_required()
 @tenant_required
@@ -31,30 +53,15 @@ def get_sales_orders():
         # 获取查询参数
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 20))
-        
-        # 构建过滤条件
-        filters = {}
-        if request.args.get('order_number'):
-            filters['order_number'] = request.args.get('order_number')
-        if request.args.get('customer_id'):
-            filters['customer_id'] = request.args.get('customer_id')
-        if request.args.get('status'):
-            filters['status'] = request.args.get('status')
-        if request.args.get('salesperson_id'):
-            filters['salesperson_id'] = request.args.get('salesperson_id')
-        if request.args.get('start_date'):
-            start_date = request.args.get('start_date')
-            if start_date:
-                filters['start_date'] = datetime.fromisoformat(start_date)
-        if request.args.get('end_date'):
-            end_date = request.args.get('end_date')
-            if end_date:
-                filters['end_date'] = datetime.fromisoformat(end_date)
+        cursor, with_total = cursor_args(request.args)
         
         result = sales_order_service.get_sales_order_list(
             page=page,
             page_size=page_size,
-            filters=filters
+            filters=_sales_order_filters(),
+            cursor=cursor,
+            with_total=with_total,
+            fields=fields_arg(request.args)
         )
         
         return jsonify({
@@ -62,6 +69,24 @@ def get_sales_orders():
             'data': result
         })
         
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/sales-orders/export', methods=['GET'])
+@jwt_required()
+@tenant_required
+def export_sales_orders():
+    """流式导出销售订单（format=ndjson|csv|xlsx，xlsx按页面列配置选择列），过滤条件同销售订单列表"""
+    try:
+        export_format = export_format_arg(request.args)
+        query = SalesOrderService().export_sales_orders(_sales_order_filters())
+        columns = ColumnConfigurationService().get_export_columns('salesOrder') if export_format == FORMAT_XLSX else None
+        return stream_export(query, export_format, f"sales_orders_{datetime.now():%Y%m%d%H%M%S}", columns=columns)
+    except InvalidExportFormatError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -120,13 +145,19 @@ def get_sales_order_detail(order_id):
         # 创建服务实例
         sales_order_service = SalesOrderService()
         
-        result = sales_order_service.get_sales_order_detail(order_id=order_id)
+        result = sales_order_service.get_sales_order_detail(
+            order_id=order_id,
+            fields=fields_arg(request.args),
+            detail_fields=fields_arg(request.args, 'detail_fields')
+        )
         
         return jsonify({
             'success': True,
             'data': result
         })
         
+    except InvalidFieldsError as e:
+        return jsonify({'error': str(e)}), 400
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
     except Exception as e:
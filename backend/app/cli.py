@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+命令行命令
+"""
+
+import os
+import re
+import sys
+import json
+import subprocess
+from datetime import datetime
+from contextlib import contextmanager
+from collections import defaultdict
+
+import click
+
+
+# 启动耗时报告中子进程输出蓝图耗时的标记行前缀
+_TIMINGS_MARKER = '__STARTUP_TIMINGS__'
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(output):
+    """
+    解析 python -X importtime 的输出
+    :param output: stderr文本
+    :return: [(模块名, 自身耗时us, 累计耗时us, 嵌套层级)]
+    """
+    records = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def summarize_importtime(records, depth=3):
+    """
+    按包前缀汇总自身耗时
+    :param records: parse_importtime 的结果
+    :param depth: 包名保留的层级数
+    :return: [(包前缀, 自身耗时us, 模块数)]，按耗时降序
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for module, self_us, _, _ in records:
+        prefix = '.'.join(module.split('.')[:depth])
+        totals[prefix][0] += self_us
+        totals[prefix][1] += 1
+    return sorted(((prefix, us, count) for prefix, (us, count) in totals.items()), key=lambda item: -item[1])
+
+
+def tenant_routes(schema_name=None):
+    """
+    查询启用的租户
+    :param schema_name: 只返回该schema的租户，为空时返回全部
+    :return: [(租户slug, schema名称, 分片名称)]
+    """
+    from flask import current_app
+    from sqlalchemy import text
+    from app.extensions import db
+
+    sql = f"SELECT slug, schema_name, shard_name FROM {current_app.config['SYSTEM_SCHEMA']}.tenants WHERE is_active = TRUE"
+    params = {}
+    if schema_name:
+        sql += " AND schema_name = :schema_name"
+        params['schema_name'] = schema_name
+    return [tuple(row) for row in db.session.execute(text(sql + " ORDER BY schema_name"), params)]
+
+
+@contextmanager
+def tenant_scope(tenant_id, schema_name, shard_name):
+    """在应用上下文内切换到租户的schema和分片，退出时释放会话"""
+    from flask import g
+    from app.extensions import db
+    from app.utils.tenant_context import TenantContext
+
+    db.session.remove()
+    g.tenant_id = tenant_id
+    g.schema_name = schema_name
+    g.shard_name = shard_name
+    tenant_context = TenantContext()
+    tenant_context.set_schema(schema_name)
+    tenant_context.set_shard(shard_name)
+    try:
+        yield
+    finally:
+        db.session.remove()
+
+
+def _parse_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+
+def register_commands(app):
+    """
+    注册命令行命令
+    :param app: Flask实例
+    """
+
+    @app.cli.command('startup-report')
+    @click.option('--config', 'config_name', default=None, help='应用配置名称，默认使用FLASK_ENV')
+    @click.option('--top', default=25, show_default=True, help='显示耗时最多的条目数')
+    @click.option('--depth', default=3, show_default=True, help='按包汇总时保留的包名层级')
+    def startup_report(config_name, top, depth):
+        """分析应用冷启动耗时（基于 python -X importtime）"""
+        config_name = config_name or os.environ.get('FLASK_ENV', 'development')
+        code = (
+            "import json, time\n"
+            "started = time.perf_counter()\n"
+            "from app import create_app\n"
+            f"app = create_app({config_name!r})\n"
+            "timings = dict(app.extensions.get('startup_timings', {}))\n"
+            "timings['create_app'] = time.perf_counter() - started\n"
+            f"print({_TIMINGS_MARKER!r} + json.dumps(timings))\n"
+        )
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=backend_dir, capture_output=True, text=True,
+            env=dict(os.environ, LAZY_BLUEPRINTS='false')
+        )
+        if result.returncode != 0:
+            click.echo(result.stderr[-2000:], err=True)
+            raise click.ClickException('应用启动失败')
+
+        records = parse_importtime(result.stderr)
+        timings = {}
+        for line in result.stdout.splitlines():
+            if line.startswith(_TIMINGS_MARKER):
+                timings = json.loads(line[len(_TIMINGS_MARKER):])
+
+        total_us = sum(record[1] for record in records)
+        click.echo(f"\n启动总耗时: {timings.get('create_app', 0) * 1000:.0f} ms，"
+                   f"模块导入: {total_us / 1000:.0f} ms（{len(records)} 个模块）")
+
+        click.echo(f"\n蓝图导入与注册耗时:")
+        for module_path, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            if module_path != 'create_app':
+                click.echo(f"  {module_path:<40}{seconds * 1000:>10.1f} ms")
+
+        click.echo(f"\n按包汇总（自身耗时，前{top}）:")
+        for prefix, us, count in summarize_importtime(records, depth)[:top]:
+            click.echo(f"  {prefix:<50}{us / 1000:>10.1f} ms {count:>6} 个模块")
+
+        click.echo(f"\n累计耗时最多的模块（前{top}）:")
+        for module, _, cumulative_us, _ in sorted(records, key=lambda record: -record[2])[:top]:
+            click.echo(f"  {module:<60}{cumulative_us / 1000:>10.1f} ms")
+
+    @app.cli.command('inventory-snapshot')
+    @click.option('--schema', 'schema_name', default=None, help='只处理该租户schema，默认处理全部启用的租户')
+    @click.option('--period', 'period_type', type=click.Choice(['daily', 'monthly']), default=None,
+                  help='快照周期，默认使用INVENTORY_SNAPSHOT_PERIOD')
+    @click.option('--up-to', default=None, help='最多生成到该日期所在的周期（YYYY-MM-DD）')
+    @click.option('--since', default=None, help='从该日期所在的周期开始重新生成（YYYY-MM-DD）')
+    def inventory_snapshot(schema_name, period_type, up_to, since):
+        """生成库存期末快照（适合每天定时执行）"""
+        from app.services.business.inventory.inventory_snapshot_service import InventorySnapshotService
+
+        routes = tenant_routes(schema_name)
+        if not routes:
+            raise click.ClickException('没有找到启用的租户')
+
+        failed = 0
+        for tenant_id, schema, shard_name in routes:
+            with tenant_scope(tenant_id, schema, shard_name):
+                try:
+                    results = InventorySnapshotService(tenant_id, schema).create_snapshots(
+                        period_type=period_type, up_to=_parse_date(up_to), since=_parse_date(since)
+                    )
+                except Exception as e:
+                    failed += 1
+                    click.echo(f"{schema}: 生成失败: {e}", err=True)
+                    continue
+            if results:
+                for result in results:
+                    click.echo(f"{schema}: {result['period_end']} 写入 {result['rows']} 行")
+            else:
+                click.echo(f"{schema}: 快照已是最新")
+
+        if failed:
+            raise click.ClickException(f'{failed} 个租户生成失败')
+
+    @app.cli.command('inventory-stats-rebuild')
+    @click.option('--schema', 'schema_name', default=None, help='只处理该租户schema，默认处理全部启用的租户')
+    def inventory_stats_rebuild(schema_name):
+        """按库存表和流水表重新计算仓库库存汇总"""
+        from app.extensions import db
+        from app.utils.inventory_stats import rebuild_inventory_stats
+
+        routes = tenant_routes(schema_name)
+        if not routes:
+            raise click.ClickException('没有找到启用的租户')
+
+        failed = 0
+        for tenant_id, schema, shard_name in routes:
+            with tenant_scope(tenant_id, schema, shard_name):
+                try:
+                    levels, movements = rebuild_inventory_stats(db.session)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    failed += 1
+                    click.echo(f"{schema}: 重新计算失败: {e}", err=True)
+                    continue
+            click.echo(f"{schema}: 仓库汇总 {levels} 行，每日出入库统计 {movements} 行")
+
+        if failed:
+            raise click.ClickException(f'{failed} 个租户重新计算失败')
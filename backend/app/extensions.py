@@ -3,9 +3,12 @@ from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
 from datetime import timedelta
 import logging
+from app.utils.shard_registry import TenantShardSession
 
-# 初始化SQLAlchemy
-db = SQLAlchemy()
+logger = logging.getLogger('app.auth')
+
+# 初始化SQLAlchemy（会话按租户分片选择引擎）
+db = SQLAlchemy(session_options={'class_': TenantShardSession})
 
 # 初始化JWTManager
 jwt = JWTManager()
@@ -16,25 +19,25 @@ migrate = Migrate()
 # 添加JWT自定义错误处理
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    print(f"DEBUG - Expired token: {jwt_payload}")
+    logger.debug("Expired token for subject %s", jwt_payload.get('sub'))
     return {"message": "Token has expired"}, 401
 
 @jwt.invalid_token_loader
 def invalid_token_callback(error_string):
-    print(f"DEBUG - Invalid token: {error_string}")
+    logger.debug("Invalid token: %s", error_string)
     return {"message": f"Invalid token: {error_string}"}, 401
 
 @jwt.unauthorized_loader
 def missing_token_callback(error_string):
-    print(f"DEBUG - Missing token: {error_string}")
+    logger.debug("Missing token: %s", error_string)
     return {"message": f"Missing JWT token: {error_string}"}, 401
 
 @jwt.needs_fresh_token_loader
 def token_not_fresh_callback(jwt_header, jwt_payload):
-    print(f"DEBUG - Token not fresh: {jwt_payload}")
+    logger.debug("Token not fresh for subject %s", jwt_payload.get('sub'))
     return {"message": "Fresh token required"}, 401
 
 @jwt.revoked_token_loader
 def revoked_token_callback(jwt_header, jwt_payload):
-    print(f"DEBUG - Revoked token: {jwt_payload}")
+    logger.debug("Revoked token for subject %s", jwt_payload.get('sub'))
     return {"message": "Token has been revoked"}, 401 
\ No newline at end of file
@@ -0,0 +1,24 @@
+import threading
+
+
+class DeferredSetupMiddleware:
+    """
+    延迟初始化中间件，在处理第一个请求前执行一次初始化（如注册蓝图）
+    
+    Flask要求路由在处理第一个请求前注册完毕，本中间件位于最外层，
+    在请求进入Flask分发流程前完成初始化，从而缩短worker启动时间。
+    """
+    
+    def __init__(self, wsgi_app, setup):
+        self.wsgi_app = wsgi_app
+        self.setup = setup
+        self._done = False
+        self._lock = threading.Lock()
+    
+    def __call__(self, environ, start_response):
+        if not self._done:
+            with self._lock:
+                if not self._done:
+                    self.setup()
+                    self._done = True
+        return self.wsgi_app(environ, start_response)
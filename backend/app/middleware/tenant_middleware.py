@@ -1,7 +1,11 @@
 from werkzeug.wsgi import ClosingIterator
 from flask import request, g, current_app
 import re
+import logging
 from app.utils.tenant_context import TenantContext
+from app.utils.tenant_cache import tenant_schema_cache
+
+logger = logging.getLogger(__name__)
 
 
 class TenantMiddleware:
@@ -13,90 +17,95 @@ class TenantMiddleware:
         self.wsgi_app = wsgi_app
         self.app = app
         self.tenant_context = TenantContext()
+        self.schema_cache = tenant_schema_cache
+        self.schema_cache.configure(
+            ttl=app.config.get('TENANT_CACHE_TTL'),
+            negative_ttl=app.config.get('TENANT_CACHE_NEGATIVE_TTL'),
+            max_size=app.config.get('TENANT_CACHE_MAX_SIZE')
+        )
     
     def __call__(self, environ, start_response):
         # 获取请求对象
         with self.app.request_context(environ):
-            # 设置默认schema
+            # 设置默认schema和分片
             g.tenant_id = None
             g.schema_name = current_app.config['DEFAULT_SCHEMA']
+            g.shard_name = None
+            self.tenant_context.set_shard(None)
             
             # 解析请求头中的租户ID
             tenant_id = request.headers.get(current_app.config['TENANT_HEADER'])
-            current_app.logger.info(f"Request to {request.path}, X-Tenant-ID: {tenant_id}")
             
             if tenant_id:
                 g.tenant_id = tenant_id
                 # 查询数据库获取租户schema（这里tenant_id实际上是slug）
-                schema_name = self._get_schema_for_tenant_slug(tenant_id)
-                if schema_name:
-                    g.schema_name = schema_name
-                    current_app.logger.info(f"Set schema to: {schema_name} for tenant slug: {tenant_id}")
+                tenant_route = self._get_route_for_tenant_slug(tenant_id)
+                if tenant_route:
+                    g.schema_name, g.shard_name = tenant_route
             
             # 如果没有租户ID，尝试从域名解析
             elif not tenant_id and request.host:
-                schema_name = self._get_schema_from_domain(request.host)
-                if schema_name:
-                    g.schema_name = schema_name
-                    current_app.logger.info(f"Set schema to: {schema_name} from domain: {request.host}")
+                tenant_route = self._get_route_from_domain(request.host)
+                if tenant_route:
+                    g.schema_name, g.shard_name = tenant_route
             
             # 设置租户上下文
             self.tenant_context.set_schema(g.schema_name)
-            current_app.logger.info(f"Final schema set in context: {g.schema_name}")
+            self.tenant_context.set_shard(g.shard_name)
+            logger.debug("Tenant %s resolved to schema %s, shard %s", tenant_id, g.schema_name, g.shard_name)
             
             return self.wsgi_app(environ, start_response)
     
-    def _get_schema_for_tenant_slug(self, tenant_slug):
+    def _get_route_for_tenant_slug(self, tenant_slug):
         """
-        根据租户slug获取schema名称
+        根据租户slug获取schema名称和数据库分片，优先读取进程内缓存
         :param tenant_slug: 租户slug
-        :return: schema名称
+        :return: (schema名称, 分片名称)，租户不存在时返回None
+        """
+        cached, tenant_route = self.schema_cache.get(tenant_slug)
+        if cached:
+            return tenant_route
+        
+        found, tenant_route = self._query_route_for_slug(tenant_slug)
+        if found:
+            self.schema_cache.set(tenant_slug, tenant_route)
+        return tenant_route
+    
+    def _query_route_for_slug(self, tenant_slug):
+        """
+        从system.tenants查询租户schema和分片
+        :param tenant_slug: 租户slug
+        :return: (查询是否成功, (schema名称, 分片名称))；查询出错时不写入缓存
         """
         with self.app.app_context():
             from app.extensions import db
             from sqlalchemy import text
             
             try:
-                schema_name = None
-                sql = text(f"SELECT schema_name FROM {current_app.config['SYSTEM_SCHEMA']}.tenants WHERE slug = :tenant_slug AND is_active = TRUE")
+                tenant_route = None
+                sql = text(f"SELECT schema_name, shard_name FROM {current_app.config['SYSTEM_SCHEMA']}.tenants WHERE slug = :tenant_slug AND is_active = TRUE")
                 result = db.session.execute(sql, {"tenant_slug": tenant_slug})
                 record = result.first()
                 
                 if record:
-                    schema_name = record[0]
+                    tenant_route = (record[0], record[1])
                 
-                return schema_name
+                return True, tenant_route
             except Exception as e:
                 current_app.logger.error(f"Error fetching schema for tenant slug {tenant_slug}: {str(e)}")
-                return None
+                return False, None
     
-    def _get_schema_from_domain(self, domain):
+    def _get_route_from_domain(self, domain):
         """
-        从域名解析租户schema
+        从域名解析租户schema和分片
         :param domain: 请求域名
-        :return: schema名称
+        :return: (schema名称, 分片名称)
         """
         # 检查域名是否符合租户子域名格式
         domain_suffix = current_app.config['TENANT_DOMAIN_SUFFIX']
         if domain.endswith(domain_suffix):
             subdomain = domain[:-len(domain_suffix)]
-            # 查询数据库获取租户schema
-            with self.app.app_context():
-                from app.extensions import db
-                from sqlalchemy import text
-                
-                try:
-                    schema_name = None
-                    sql = text(f"SELECT schema_name FROM {current_app.config['SYSTEM_SCHEMA']}.tenants WHERE slug = :slug AND is_active = TRUE")
-                    result = db.session.execute(sql, {"slug": subdomain})
-                    record = result.first()
-                    
-                    if record:
-                        schema_name = record[0]
-                    
-                    return schema_name
-                except Exception as e:
-                    current_app.logger.error(f"Error fetching schema for domain {domain}: {str(e)}")
-                    return None
+            # 子域名即租户slug，与请求头解析共用缓存
+            return self._get_route_for_tenant_slug(subdomain)
         
-        return None 
\ No newline at end of file
+        return None
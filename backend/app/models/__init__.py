@@ -27,6 +27,9 @@ from app.models.basic_data import (
 )
 from app.models.column_configuration import ColumnConfiguration
 from app.models.dynamic_field import DynamicField, DynamicFieldValue
+from app.models.import_job import ImportJob
+from app.models.export_job import ExportJob
+from app.models.document_sequence import DocumentSequence
 
 # 添加其他可能的模型导入
 
@@ -58,5 +61,8 @@ __all__ = [
     'LossType',
     'ColumnConfiguration',
     'DynamicField',
-    'DynamicFieldValue'
+    'DynamicFieldValue',
+    'ImportJob',
+    'ExportJob',
+    'DocumentSequence'
 ] 
\ No newline at end of file
@@ -201,10 +201,10 @@ class ColorCard(TenantModel):
         """生成色卡编号 SK + 8位自增数字"""
         # 设置schema路径
         from flask import g, current_app
-        from sqlalchemy import text
+        from app.utils.tenant_context import set_search_path
         schema_name = getattr(g, 'schema_name', current_app.config.get('DEFAULT_SCHEMA', 'public'))
         if schema_name != 'public':
-            db.session.execute(text(f'SET search_path TO {schema_name}, public'))
+            set_search_path(db.session.connection(), schema_name)
         
         # 获取当前最大编号
         latest = cls.query.filter(
@@ -1256,13 +1256,14 @@ class Machine(TenantModel):
     @classmethod
     def generate_machine_code(cls):
         """生成机台编号"""
-        from sqlalchemy import func, text
+        from sqlalchemy import func
         from flask import g, current_app
+        from app.utils.tenant_context import set_search_path
         
         # 设置schema路径
         schema_name = getattr(g, 'schema_name', current_app.config.get('DEFAULT_SCHEMA', 'public'))
         if schema_name != 'public':
-            db.session.execute(text(f'SET search_path TO {schema_name}, public'))
+            set_search_path(db.session.connection(), schema_name)
         
         # 获取当前最大编号
         max_code = db.session.query(func.max(cls.machine_code)).scalar()
@@ -4201,37 +4202,10 @@ class Material(TenantModel):
     @classmethod
     def generate_material_code(cls):
         """生成材料编号"""
-        # 设置schema路径
-        from flask import g, current_app
-        from sqlalchemy import text
-        schema_name = getattr(g, 'schema_name', current_app.config.get('DEFAULT_SCHEMA', 'public'))
-        if schema_name != 'public':
-            db.session.execute(text(f'SET search_path TO {schema_name}, public'))
+        from flask import g
+        from app.utils.numbering import next_number
         
-        # 查询所有以MT开头的编号
-        results = db.session.query(cls.material_code).filter(
-            cls.material_code.like('MT%')
-        ).all()
-        
-        max_number = 0
-        if results:
-            # 遍历所有编号，找到最大的数字
-            for result in results:
-                code = result[0]
-                try:
-                    # 提取数字部分
-                    number_str = code[2:]  # 去掉MT前缀
-                    number = int(number_str)
-                    if number > max_number:
-                        max_number = number
-                except (ValueError, TypeError):
-                    continue
-        
-        # 新编号 = 最大编号 + 1
-        new_number = max_number + 1
-        
-        # 格式化为8位数字
-        return f"MT{new_number:08d}"
+        return next_number('material', schema_name=getattr(g, 'schema_name', None))
     
     @classmethod
     def get_inspection_type_options(cls):
@@ -1,12 +1,15 @@
 from app.models.business.equipment import Equipment
 from app.models.business.production import ProductionPlan, ProductionRecord
 from app.models.business.quality import QualityInspection 
-from app.models.business.inventory import Inventory, InventoryTransaction, InventoryCountPlan, InventoryCountRecord, InboundOrder, InboundOrderDetail
+from app.models.business.inventory import Inventory, InventoryTransaction, InventorySnapshot, WarehouseInventoryStats, WarehouseInventoryDailyStats, InventoryCountPlan, InventoryCountRecord, InboundOrder, InboundOrderDetail
 from app.models.business.sales import SalesOrder, SalesOrderDetail, SalesOrderOtherFee, SalesOrderMaterial
 
 __all__ = [
     'Inventory',
     'InventoryTransaction', 
+    'InventorySnapshot',
+    'WarehouseInventoryStats',
+    'WarehouseInventoryDailyStats',
     'InventoryCountPlan',
     'InventoryCountRecord',
     'InboundOrder',
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, Numeric, Boolean, Integer, ForeignKey, func, Index
+from sqlalchemy import Column, String, DateTime, Date, Text, Numeric, Boolean, Integer, ForeignKey, func, Index, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.models.base import TenantModel, BaseModel
@@ -90,6 +90,9 @@ class Inventory(TenantModel):
     # 关联关系
     unit = relationship("Unit", foreign_keys=[unit_id], lazy='select')
     
+    # 导出时附加的关联名称，见 app.utils.projection.export_query
+    SUMMARY_RELATED = {'unit_name': ('unit', 'unit_name')}
+    
     # 索引
     __table_args__ = (
         Index('ix_inventory_warehouse_product', 'warehouse_id', 'product_id'),
@@ -324,11 +327,15 @@ class InventoryTransaction(TenantModel):
     # 关联关系
     unit = relationship("Unit", foreign_keys=[unit_id], lazy='select')
     
+    # 导出时附加的关联名称，见 app.utils.projection.export_query
+    SUMMARY_RELATED = {'unit_name': ('unit', 'unit_name')}
+    
     # 索引
     __table_args__ = (
         Index('ix_inventory_transaction_inventory', 'inventory_id'),
         Index('ix_inventory_transaction_warehouse', 'warehouse_id'),
         Index('ix_inventory_transaction_type_date', 'transaction_type', 'transaction_date'),
+        Index('ix_inventory_transaction_date', 'transaction_date'),
         Index('ix_inventory_transaction_source', 'source_document_type', 'source_document_id'),
         Index('ix_inventory_transaction_number', 'transaction_number'),
         Index('ix_inventory_transaction_batch', 'batch_number'),
@@ -364,39 +371,9 @@ class InventoryTransaction(TenantModel):
         """
         生成流水号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(InventoryTransaction.transaction_number, -4), func.Integer)
-            )).filter(
-                InventoryTransaction.created_at >= today_start,
-                InventoryTransaction.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(InventoryTransaction).filter(
-                InventoryTransaction.created_at >= today_start,
-                InventoryTransaction.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
+        from app.utils.numbering import next_number
         
-        return f"TXN{timestamp}{sequence_str}"
+        return next_number('inventory_transaction')
     
     def approve(self, approved_by):
         """
@@ -481,6 +458,131 @@ class InventoryTransaction(TenantModel):
         return f'<InventoryTransaction {self.transaction_number} {self.transaction_type} {self.quantity_change}>'
 
 
+class InventorySnapshot(TenantModel):
+    """
+    库存期末快照表 - 每个库存行在每个周期（日/月）结束时的结存数量
+    由 app.services.business.inventory.inventory_snapshot_service 按上期快照 + 本期流水增量生成
+    """
+
+    __tablename__ = 'inventory_snapshots'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # 关联字段（冗余库存行的维度，按仓库/产品/材料查询时不需要关联库存表）
+    inventory_id = Column(UUID(as_uuid=True), nullable=False, comment='库存ID')
+    warehouse_id = Column(UUID(as_uuid=True), nullable=False, comment='仓库ID')
+    product_id = Column(UUID(as_uuid=True), comment='产品ID')
+    material_id = Column(UUID(as_uuid=True), comment='材料ID')
+
+    # 周期信息
+    period_type = Column(String(20), nullable=False, comment='周期类型')  # daily/monthly
+    period_end = Column(Date, nullable=False, comment='周期最后一天，数量为当天结束时的结存')
+
+    # 结存信息
+    quantity = Column(Numeric(15, 3), nullable=False, comment='期末数量')
+    transaction_count = Column(Integer, default=0, nullable=False, comment='本期流水条数')
+
+    # 周期类型常量
+    PERIOD_TYPE_CHOICES = [
+        ('daily', '日'),
+        ('monthly', '月')
+    ]
+
+    # 索引
+    __table_args__ = (
+        UniqueConstraint('inventory_id', 'period_type', 'period_end', name='uq_inventory_snapshots_period'),
+        Index('ix_inventory_snapshot_period_warehouse', 'period_type', 'period_end', 'warehouse_id'),
+    )
+
+    def to_dict(self):
+        """
+        转换为字典
+        """
+        return {
+            'id': str(self.id),
+            'inventory_id': str(self.inventory_id),
+            'warehouse_id': str(self.warehouse_id),
+            'product_id': str(self.product_id) if self.product_id else None,
+            'material_id': str(self.material_id) if self.material_id else None,
+            'period_type': self.period_type,
+            'period_end': self.period_end.isoformat() if self.period_end else None,
+            'quantity': float(self.quantity),
+            'transaction_count': self.transaction_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<InventorySnapshot {self.inventory_id} {self.period_type} {self.period_end} {self.quantity}>'
+
+
+class WarehouseInventoryStats(TenantModel):
+    """
+    仓库库存汇总表 - 每个仓库一行，汇总启用库存的条目数、数量、金额和低于安全库存的条目数
+    由 app.utils.inventory_stats 在库存变动的同一事务中增量维护
+    """
+
+    __tablename__ = 'warehouse_inventory_stats'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    warehouse_id = Column(UUID(as_uuid=True), nullable=False, unique=True, comment='仓库ID')
+
+    total_items = Column(Integer, default=0, nullable=False, comment='库存条目数')
+    total_quantity = Column(Numeric(18, 3), default=0, nullable=False, comment='库存总数量')
+    total_value = Column(Numeric(18, 4), default=0, nullable=False, comment='库存总金额')
+    below_safety_stock_items = Column(Integer, default=0, nullable=False, comment='低于安全库存的条目数')
+
+    def to_dict(self):
+        """
+        转换为字典
+        """
+        return {
+            'warehouse_id': str(self.warehouse_id),
+            'total_items': self.total_items,
+            'total_quantity': float(self.total_quantity),
+            'total_value': float(self.total_value),
+            'below_safety_stock_items': self.below_safety_stock_items,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<WarehouseInventoryStats {self.warehouse_id} {self.total_items} {self.total_quantity}>'
+
+
+class WarehouseInventoryDailyStats(TenantModel):
+    """
+    仓库每日出入库统计表 - 每个仓库每天一行，记录入库、出库流水条数
+    由 app.utils.inventory_stats 在写入流水的同一事务中增量维护
+    """
+
+    __tablename__ = 'warehouse_inventory_daily_stats'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    warehouse_id = Column(UUID(as_uuid=True), nullable=False, comment='仓库ID')
+    stat_date = Column(Date, nullable=False, comment='统计日期')
+
+    in_transactions = Column(Integer, default=0, nullable=False, comment='入库流水条数')
+    out_transactions = Column(Integer, default=0, nullable=False, comment='出库流水条数')
+
+    __table_args__ = (
+        UniqueConstraint('warehouse_id', 'stat_date', name='uq_warehouse_inventory_daily_stats_date'),
+        Index('ix_warehouse_inventory_daily_stats_date', 'stat_date'),
+    )
+
+    def to_dict(self):
+        """
+        转换为字典
+        """
+        return {
+            'warehouse_id': str(self.warehouse_id),
+            'stat_date': self.stat_date.isoformat() if self.stat_date else None,
+            'in_transactions': self.in_transactions,
+            'out_transactions': self.out_transactions
+        }
+
+    def __repr__(self):
+        return f'<WarehouseInventoryDailyStats {self.warehouse_id} {self.stat_date} {self.in_transactions}/{self.out_transactions}>'
+
+
 class InventoryCountPlan(TenantModel):
     """
     盘点计划表
@@ -565,39 +667,9 @@ class InventoryCountPlan(TenantModel):
         """
         生成盘点计划号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
-        
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(InventoryCountPlan.plan_number, -3), func.Integer)
-            )).filter(
-                InventoryCountPlan.created_at >= today_start,
-                InventoryCountPlan.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(InventoryCountPlan).filter(
-                InventoryCountPlan.created_at >= today_start,
-                InventoryCountPlan.created_at <= today_end
-            ).count()
-            max_order = count
+        from app.utils.numbering import next_number
         
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为3位数字，不足补0
-        sequence_str = f"{next_sequence:03d}"
-        
-        return f"CNT{timestamp}{sequence_str}"
+        return next_number('inventory_count_plan')
     
     def to_dict(self):
         """
@@ -811,6 +883,12 @@ class InboundOrder(TenantModel):
     inbound_person = relationship("Employee", foreign_keys=[inbound_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'order_number', 'order_date', 'order_type', 'warehouse_id', 'warehouse_name',
+                       'inbound_person_id', 'department_id', 'pallet_count', 'status', 'is_outbound',
+                       'approval_status', 'source_document_number', 'notes', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {'inbound_person': ('inbound_person', 'employee_name'), 'department': ('department', 'dept_name')}
+    
     # 入库类型常量
     ORDER_TYPES = [
         ('finished_goods', '成品入库'),
@@ -864,11 +942,7 @@ class InboundOrder(TenantModel):
         """
         生成入库单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
+        from app.utils.numbering import next_number
         
         prefix_map = {
             'finished_goods': 'FIN',
@@ -876,38 +950,7 @@ class InboundOrder(TenantModel):
             'semi_finished': 'SEM',
             'other': 'OTH'
         }
-        prefix = prefix_map.get(order_type, 'INB')
-        
-        # 查询当天该类型的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天该类型的最大序号
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(InboundOrder.order_number, -4), func.Integer)
-            )).filter(
-                InboundOrder.order_type == order_type,
-                InboundOrder.created_at >= today_start,
-                InboundOrder.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(InboundOrder).filter(
-                InboundOrder.order_type == order_type,
-                InboundOrder.created_at >= today_start,
-                InboundOrder.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
-        
-        return f"{prefix}{timestamp}{sequence_str}"
+        return next_number('inbound_order', prefix=prefix_map.get(order_type))
     
     def calculate_totals(self):
         """
@@ -1173,6 +1216,13 @@ class OutboundOrder(TenantModel):
     outbound_person = relationship("Employee", foreign_keys=[outbound_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'order_number', 'order_date', 'order_type', 'warehouse_id', 'warehouse_name',
+                       'outbound_person_id', 'department_id', 'pallet_count', 'status', 'approval_status',
+                       'source_document_number', 'customer_id', 'customer_name', 'expected_delivery_date',
+                       'remark', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {'outbound_person': ('outbound_person', 'employee_name'), 'department': ('department', 'dept_name')}
+    
     # 出库类型常量
     ORDER_TYPES = [
         ('finished_goods', '成品出库'),
@@ -1227,11 +1277,7 @@ class OutboundOrder(TenantModel):
         """
         生成出库单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
+        from app.utils.numbering import next_number
         
         prefix_map = {
             'finished_goods': 'OUT',
@@ -1239,38 +1285,7 @@ class OutboundOrder(TenantModel):
             'semi_finished': 'OSM',
             'other': 'OOT'
         }
-        prefix = prefix_map.get(order_type, 'OUT')
-        
-        # 查询当天该类型的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天该类型的最大序号
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(OutboundOrder.order_number, -4), func.Integer)
-            )).filter(
-                OutboundOrder.order_type == order_type,
-                OutboundOrder.created_at >= today_start,
-                OutboundOrder.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(OutboundOrder).filter(
-                OutboundOrder.order_type == order_type,
-                OutboundOrder.created_at >= today_start,
-                OutboundOrder.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
-        
-        return f"{prefix}{timestamp}{sequence_str}"
+        return next_number('outbound_order', prefix=prefix_map.get(order_type))
     
     def calculate_totals(self):
         """
@@ -1542,6 +1557,13 @@ class MaterialInboundOrder(TenantModel):
     inbound_person = relationship("Employee", foreign_keys=[inbound_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'order_number', 'order_date', 'order_type', 'warehouse_id', 'warehouse_name',
+                       'inbound_person_id', 'department_id', 'pallet_count', 'status', 'is_outbound',
+                       'approval_status', 'source_document_number', 'supplier_id', 'supplier_name', 'notes',
+                       'created_at', 'updated_at')
+    SUMMARY_RELATED = {'inbound_person': ('inbound_person', 'employee_name'), 'department': ('department', 'dept_name')}
+    
     # 入库类型常量
     ORDER_TYPES = [
         ('purchase', '采购入库'),
@@ -1595,37 +1617,7 @@ class MaterialInboundOrder(TenantModel):
         """
         生成材料入库单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
-        
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(MaterialInboundOrder.order_number, -4), func.Integer)
-            )).filter(
-                MaterialInboundOrder.created_at >= today_start,
-                MaterialInboundOrder.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(MaterialInboundOrder).filter(
-                MaterialInboundOrder.created_at >= today_start,
-                MaterialInboundOrder.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
+        from app.utils.numbering import next_number
         
         prefix_map = {
             'material': 'MIN',
@@ -1633,9 +1625,7 @@ class MaterialInboundOrder(TenantModel):
             'packaging': 'PIN',
             'other': 'OIN'
         }
-        prefix = prefix_map.get(order_type, 'MIN')
-        
-        return f"{prefix}{timestamp}{sequence_str}"
+        return next_number('material_inbound_order', prefix=prefix_map.get(order_type))
     
     def calculate_totals(self):
         """
@@ -1899,6 +1889,18 @@ class MaterialOutboundOrder(TenantModel):
     requisition_department = relationship("Department", foreign_keys=[requisition_department_id], lazy='select')
     requisition_person = relationship("Employee", foreign_keys=[requisition_person_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'order_number', 'order_date', 'order_type', 'warehouse_id', 'warehouse_name',
+                       'outbound_person_id', 'department_id', 'requisition_department_id', 'requisition_person_id',
+                       'pallet_count', 'status', 'approval_status', 'source_document_number', 'requisition_purpose',
+                       'remark', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {
+        'outbound_person': ('outbound_person', 'employee_name'),
+        'department': ('department', 'dept_name'),
+        'requisition_department': ('requisition_department', 'dept_name'),
+        'requisition_person': ('requisition_person', 'employee_name'),
+    }
+    
     # 出库类型常量
     ORDER_TYPES = [
         ('material', '材料出库'),
@@ -1954,37 +1956,7 @@ class MaterialOutboundOrder(TenantModel):
         """
         生成材料出库单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
-        
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(MaterialOutboundOrder.order_number, -4), func.Integer)
-            )).filter(
-                MaterialOutboundOrder.created_at >= today_start,
-                MaterialOutboundOrder.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(MaterialOutboundOrder).filter(
-                MaterialOutboundOrder.created_at >= today_start,
-                MaterialOutboundOrder.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
+        from app.utils.numbering import next_number
         
         prefix_map = {
             'material': 'MOUT',
@@ -1992,9 +1964,7 @@ class MaterialOutboundOrder(TenantModel):
             'packaging': 'POUT',
             'other': 'OOUT'
         }
-        prefix = prefix_map.get(order_type, 'MOUT')
-        
-        return f"{prefix}{timestamp}{sequence_str}"
+        return next_number('material_outbound_order', prefix=prefix_map.get(order_type))
     
     def calculate_totals(self):
         """
@@ -2236,6 +2206,11 @@ class MaterialCountPlan(TenantModel):
     count_person = relationship("Employee", foreign_keys=[count_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'count_number', 'warehouse_id', 'warehouse_name', 'warehouse_code',
+                       'count_person_id', 'department_id', 'count_date', 'status', 'notes', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {'count_person': ('count_person', 'employee_name'), 'department': ('department', 'dept_name')}
+    
     # 状态常量
     STATUS_CHOICES = [
         ('draft', '草稿'),
@@ -2278,40 +2253,9 @@ class MaterialCountPlan(TenantModel):
         """
         生成盘点单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
-        
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(MaterialCountPlan.count_number, -4), func.Integer)
-            )).filter(
-                MaterialCountPlan.created_at >= today_start,
-                MaterialCountPlan.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(MaterialCountPlan).filter(
-                MaterialCountPlan.created_at >= today_start,
-                MaterialCountPlan.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
+        from app.utils.numbering import next_number
         
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
-        
-        return f"PD{timestamp}{sequence_str}"
+        return next_number('material_count_plan')
     
     def to_dict(self):
         """
@@ -2530,6 +2474,13 @@ class MaterialTransferOrder(TenantModel):
     transfer_person = relationship("Employee", foreign_keys=[transfer_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'transfer_number', 'transfer_date', 'transfer_type',
+                       'from_warehouse_id', 'from_warehouse_name', 'to_warehouse_id', 'to_warehouse_name',
+                       'transfer_person_id', 'department_id', 'status', 'approval_status', 'total_items',
+                       'total_quantity', 'total_amount', 'notes', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {'transfer_person': ('transfer_person', 'employee_name'), 'department': ('department', 'dept_name')}
+    
     # 调拨类型常量
     TRANSFER_TYPES = [
         ('warehouse', '仓库调拨'),
@@ -2594,40 +2545,9 @@ class MaterialTransferOrder(TenantModel):
         """
         生成调拨单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
+        from app.utils.numbering import next_number
         
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(MaterialTransferOrder.transfer_number, -4), func.Integer)
-            )).filter(
-                MaterialTransferOrder.created_at >= today_start,
-                MaterialTransferOrder.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(MaterialTransferOrder).filter(
-                MaterialTransferOrder.created_at >= today_start,
-                MaterialTransferOrder.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
-        
-        return f"DB{timestamp}{sequence_str}"
+        return next_number('material_transfer_order')
     
     def calculate_totals(self):
         """
@@ -2874,6 +2794,11 @@ class ProductCountPlan(TenantModel):
     count_person = relationship("Employee", foreign_keys=[count_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'count_number', 'warehouse_id', 'warehouse_name', 'warehouse_code',
+                       'count_person_id', 'department_id', 'count_date', 'status', 'notes', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {'count_person_name': ('count_person', 'employee_name'), 'department_name': ('department', 'dept_name')}
+    
     # 状态常量
     STATUS_CHOICES = [
         ('draft', '草稿'),
@@ -2908,20 +2833,9 @@ class ProductCountPlan(TenantModel):
     @staticmethod
     def generate_count_number():
         """生成盘点单号 格式：PD + YYYYMMDD + 3位序号"""
-        from datetime import datetime
-        from app.extensions import db
-        from sqlalchemy import func
+        from app.utils.numbering import next_number
         
-        today = datetime.now()
-        date_str = today.strftime('%Y%m%d')
-        
-        # 查询当天已有的盘点单数量
-        count = db.session.query(func.count(ProductCountPlan.id)).filter(
-            func.date(ProductCountPlan.created_at) == today.date()
-        ).scalar() or 0
-        
-        sequence = str(count + 1).zfill(3)
-        return f'PD{date_str}{sequence}'
+        return next_number('product_count_plan')
     
     def to_dict(self):
         """转换为字典"""
@@ -3162,6 +3076,13 @@ class ProductTransferOrder(TenantModel):
     transfer_person = relationship("Employee", foreign_keys=[transfer_person_id], lazy='select')
     department = relationship("Department", foreign_keys=[department_id], lazy='select')
     
+    # 列表摘要视图（view=summary）查询的列和关联名称，见 app.utils.projection
+    SUMMARY_COLUMNS = ('id', 'transfer_number', 'transfer_date', 'transfer_type',
+                       'from_warehouse_id', 'from_warehouse_name', 'to_warehouse_id', 'to_warehouse_name',
+                       'transfer_person_id', 'department_id', 'status', 'approval_status', 'total_items',
+                       'total_quantity', 'total_amount', 'notes', 'created_at', 'updated_at')
+    SUMMARY_RELATED = {'transfer_person': ('transfer_person', 'employee_name'), 'department': ('department', 'dept_name')}
+    
     # 调拨类型常量
     TRANSFER_TYPES = [
         ('warehouse', '仓库调拨'),
@@ -3226,40 +3147,9 @@ class ProductTransferOrder(TenantModel):
         """
         生成调拨单号 - 按顺序生成
         """
-        from datetime import datetime
-        from sqlalchemy import func, text
-        from app.extensions import db
-        
-        timestamp = datetime.now().strftime('%Y%m%d')
-        
-        # 查询当天的最大序号
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_end = datetime.now().replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # 获取当天的最大序号
-        # 获取当天的最大序号 - 修复查询语法
-        try:
-            max_order = db.session.query(func.max(
-                func.cast(func.substring(ProductTransferOrder.transfer_number, -4), func.Integer)
-            )).filter(
-                ProductTransferOrder.created_at >= today_start,
-                ProductTransferOrder.created_at <= today_end
-            ).scalar()
-        except Exception as e:
-            # 如果查询失败，使用简单的计数方法
-            count = db.session.query(ProductTransferOrder).filter(
-                ProductTransferOrder.created_at >= today_start,
-                ProductTransferOrder.created_at <= today_end
-            ).count()
-            max_order = count
-        
-        # 序号从1开始，如果没有记录则为0，所以下一个序号为max_order + 1
-        next_sequence = (max_order or 0) + 1
-        
-        # 格式化为4位数字，不足补0
-        sequence_str = f"{next_sequence:04d}"
+        from app.utils.numbering import next_number
         
-        return f"PT{timestamp}{sequence_str}"
+        return next_number('product_transfer_order')
     
     def calculate_totals(self):
         """
@@ -63,6 +63,9 @@ class SalesOrder(TenantModel):
     delivery_notices = relationship("DeliveryNotice", back_populates="sales_order")
     tax_rate = relationship("TaxRate", foreign_keys=[tax_rate_id])
 
+    # 导出时附加的关联名称，见 app.utils.projection.export_query
+    SUMMARY_RELATED = {'customer_name': ('customer', 'customer_name'), 'tax_name': ('tax_rate', 'tax_name')}
+
     def to_dict(self):
         """转换为字典"""
         result = {
@@ -156,30 +159,9 @@ class SalesOrder(TenantModel):
     @classmethod
     def generate_order_number(cls):
         """生成唯一销售单号（格式：SOYYMMDDXXXX，如SO2507030001表示2025年7月3日第1个订单）"""
-        # 获取当前日期
-        now = datetime.now()
-        date_part = now.strftime('%y%m%d')  # 如250703表示2025年7月3日
-        
-        # 查询当天最大单号
-        max_order = db.session.query(cls.order_number).filter(
-            cls.order_number.like(f'SO{date_part}%')
-        ).order_by(cls.order_number.desc()).first()
-        
-        # 计算新单号
-        if max_order and max_order[0]:
-            try:
-                # 提取序号部分并加1
-                current_sequence = int(max_order[0][8:])  # 从第9位开始的数字部分
-                new_sequence = current_sequence + 1
-            except (ValueError, IndexError):
-                # 处理异常情况，默认从1开始
-                new_sequence = 1
-        else:
-            # 当天无记录，从0001开始
-            new_sequence = 1
+        from app.utils.numbering import next_number
         
-        # 格式化新单号（如SO2507030001）
-        return f"SO{date_part}{new_sequence:04d}"
+        return next_number('sales_order')
 
 
 class SalesOrderDetail(TenantModel):
@@ -0,0 +1,31 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import func
+from app.extensions import db
+from app.models.base import TenantModel
+
+
+class DocumentSequence(TenantModel):
+    """单据编号计数器 - 每个编号规则和前缀在每个周期（日/月/年）一行，由 app.utils.numbering 分配"""
+    __tablename__ = 'document_sequences'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    sequence_key = db.Column(db.String(100), nullable=False, comment='编号规则:前缀')
+    period = db.Column(db.String(20), nullable=False, default='', comment='周期（如20261017），不按周期重置时为空')
+    next_value = db.Column(db.BigInteger, nullable=False, comment='下一个可分配的序号')
+
+    created_at = db.Column(db.DateTime, default=func.now())
+    updated_at = db.Column(db.DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        db.UniqueConstraint('sequence_key', 'period', name='uq_document_sequences_key_period'),
+    )
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'sequence_key': self.sequence_key,
+            'period': self.period,
+            'next_value': self.next_value,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
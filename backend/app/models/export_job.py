@@ -0,0 +1,68 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import func
+from app.extensions import db
+from app.models.base import TenantModel
+
+
+class ExportJob(TenantModel):
+    """导出任务模型 - 记录后台生成的大数据量XLSX导出的进度和结果文件"""
+    __tablename__ = 'export_jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # 任务信息
+    file_name = db.Column(db.String(255), nullable=False, comment='下载文件名')
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING, comment='状态')
+
+    # 进度
+    total_rows = db.Column(db.Integer, comment='导出行数（开始执行后统计）')
+    processed_rows = db.Column(db.Integer, default=0, comment='已写入行数')
+
+    # 结果
+    file_path = db.Column(db.String(500), comment='结果文件路径（过期清理后为空）')
+    file_size = db.Column(db.BigInteger, comment='结果文件大小（字节）')
+    message = db.Column(db.Text, comment='任务说明（失败原因）')
+    started_at = db.Column(db.DateTime, comment='开始时间')
+    finished_at = db.Column(db.DateTime, comment='结束时间')
+
+    # 审计字段
+    created_by = db.Column(UUID(as_uuid=True), nullable=False, comment='创建人')
+    created_at = db.Column(db.DateTime, default=func.now())
+    updated_at = db.Column(db.DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        db.Index('idx_export_jobs_created_by', 'created_by', 'created_at'),
+    )
+
+    @property
+    def progress(self):
+        """进度百分比：按已写入行数计，写完后保存工作簿计为最后1%"""
+        if self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED):
+            return 100
+        if self.total_rows:
+            return min(int(99 * (self.processed_rows or 0) / self.total_rows), 99)
+        return 0
+
+    def to_dict(self):
+        """转换为字典"""
+        return {
+            'id': str(self.id),
+            'file_name': self.file_name,
+            'status': self.status,
+            'progress': self.progress,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'file_size': self.file_size,
+            'downloadable': self.status == self.STATUS_COMPLETED and bool(self.file_path),
+            'message': self.message,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_by': str(self.created_by) if self.created_by else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,87 @@
+import uuid
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import func
+from app.extensions import db
+from app.models.base import TenantModel
+
+
+class ImportJob(TenantModel):
+    """批量导入任务模型 - 记录主数据批量导入的进度和逐行错误报告"""
+    __tablename__ = 'import_jobs'
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+
+    # 运行阶段: 读取文件写入暂存表 / 暂存表校验 / 写入目标表
+    PHASE_STAGING = 'staging'
+    PHASE_VALIDATING = 'validating'
+    PHASE_LOADING = 'loading'
+
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # 任务信息
+    entity_type = db.Column(db.String(50), nullable=False, comment='导入对象(customer/supplier/material/product)')
+    file_name = db.Column(db.String(255), comment='上传文件名')
+    validate_only = db.Column(db.Boolean, default=False, comment='仅校验不写入')
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING, comment='状态')
+    phase = db.Column(db.String(20), comment='运行阶段')
+
+    # 进度
+    total_rows = db.Column(db.Integer, default=0, comment='文件数据行数（暂存完成前可能为空或为估算值）')
+    processed_rows = db.Column(db.Integer, default=0, comment='已写入暂存表行数')
+    imported_rows = db.Column(db.Integer, default=0, comment='成功导入行数')
+    error_rows = db.Column(db.Integer, default=0, comment='错误行数')
+
+    # 结果
+    error_report = db.Column(JSONB, comment='逐行错误报告[{row, errors}]')
+    message = db.Column(db.Text, comment='任务说明（失败原因、忽略的列）')
+    started_at = db.Column(db.DateTime, comment='开始时间')
+    finished_at = db.Column(db.DateTime, comment='结束时间')
+
+    # 审计字段
+    created_by = db.Column(UUID(as_uuid=True), nullable=False, comment='创建人')
+    created_at = db.Column(db.DateTime, default=func.now())
+    updated_at = db.Column(db.DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        db.Index('idx_import_jobs_created_at', 'created_at'),
+    )
+
+    @property
+    def progress(self):
+        """进度百分比：暂存阶段按已读取行数计，校验和写入阶段为集合操作，按阶段计"""
+        if self.status in (self.STATUS_COMPLETED, self.STATUS_FAILED):
+            return 100
+        if self.phase == self.PHASE_STAGING and self.total_rows:
+            return min(int(80 * (self.processed_rows or 0) / self.total_rows), 80)
+        if self.phase == self.PHASE_VALIDATING:
+            return 85
+        if self.phase == self.PHASE_LOADING:
+            return 95
+        return 0
+
+    def to_dict(self, include_errors=False):
+        """转换为字典"""
+        result = {
+            'id': str(self.id),
+            'entity_type': self.entity_type,
+            'file_name': self.file_name,
+            'validate_only': self.validate_only,
+            'status': self.status,
+            'phase': self.phase,
+            'progress': self.progress,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'imported_rows': self.imported_rows,
+            'error_rows': self.error_rows,
+            'message': self.message,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_by': str(self.created_by) if self.created_by else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
+        if include_errors:
+            result['error_report'] = self.error_report or []
+        return result
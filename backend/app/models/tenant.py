@@ -27,6 +27,9 @@ class Tenant(SystemModel):
     contact_email = Column(String(255), nullable=False)
     contact_phone = Column(String(50))
     
+    # 所在数据库分片，为空表示主库
+    shard_name = Column(String(50))
+    
     # 是否激活
     is_active = Column(Boolean, default=True, nullable=False)
     
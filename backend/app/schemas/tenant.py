@@ -10,6 +10,7 @@ class TenantSchema(Schema):
     name = fields.String(dump_only=True)
     slug = fields.String(dump_only=True)
     schema_name = fields.String(dump_only=True)
+    shard_name = fields.String(dump_only=True)
     domain = fields.String(dump_only=True)
     contact_email = fields.Email(dump_only=True)
     contact_phone = fields.String(dump_only=True)
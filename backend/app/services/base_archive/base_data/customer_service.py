@@ -4,6 +4,11 @@ Customer 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
+from app.utils.read_replica import read_only
+from app.utils.numbering import next_number
+from app.utils.pagination import keyset_paginate, InvalidCursorError
+from app.utils.projection import InvalidFieldsError, field_columns, summary_rows
 from app.models.basic_data import CustomerManagement
 from sqlalchemy import func, and_, or_, inspect
 from sqlalchemy.sql import true
@@ -18,40 +23,30 @@ from typing import Optional
 class CustomerService(TenantAwareService):
     """客户档案服务"""
     
+    # 表单选项依赖的表，写入提交后选项缓存和ETag失效
+    FORM_OPTION_TABLES = (
+        'customer_category_management', 'tax_rates', 'payment_methods', 'currencies',
+        'employees', 'customer_management', 'package_methods'
+    )
+    
     def __init__(self, tenant_id=None, schema_name=None):
         super().__init__(tenant_id=tenant_id, schema_name=schema_name)
         self.logger = logging.getLogger(__name__)  # 添加logger初始化
     
     def generate_code(self, entity_type):
         """生成编码"""
-        prefixes = {
-            'customer': 'C',
-            'supplier': 'S', 
-            'product': 'P'
-        }
-        
-        prefix = prefixes.get(entity_type, 'X')
-        
-        # 获取当前最大编号
-        if entity_type == 'customer':
-            max_code = self.session.query(func.max(CustomerManagement.customer_code)).scalar()
-        else:
+        if entity_type != 'customer':
             raise ValueError(f"不支持的实体类型: {entity_type}")
-        
-        if max_code:
-            # 提取数字部分并加1
-            try:
-                number = int(max_code[1:]) + 1
-            except (ValueError, IndexError):
-                number = 1
-        else:
-            number = 1
-        
-        return f"{prefix}{number:06d}"
+        return next_number('customer', schema_name=self.schema_name)
     
+    @read_only
     def get_customers(self, page=1, per_page=20, search=None, category_id=None, status=None, 
-                     tenant_config=None):
-        """获取客户列表"""
+                     tenant_config=None, cursor=None, with_total=False, fields=None):
+        """
+        获取客户列表
+        cursor 不为None时使用游标分页（按创建时间倒序），with_total 控制是否统计总数
+        fields 指定时只查询并返回这些列（主键和客户分类名称总是包含）
+        """
         try:
             from app.models.basic_data import CustomerCategoryManagement
             
@@ -87,6 +82,28 @@ class CustomerService(TenantAwareService):
             if status is not None:
                 query = query.filter(CustomerManagement.is_enabled == (status == 'active'))
             
+            if fields:
+                # 游标分页需要从结果中读取排序键
+                fields = [field for field in fields if field != 'customer_category_name']
+                columns = field_columns(CustomerManagement, fields + ['created_at'] if cursor is not None else fields)
+                query = query.with_entities(
+                    *columns, CustomerCategoryManagement.category_name.label('customer_category_name')
+                )
+            
+            if cursor is not None:
+                page_result = keyset_paginate(
+                    query, (CustomerManagement.created_at, CustomerManagement.id),
+                    cursor=cursor, page_size=per_page, with_total=with_total
+                )
+                if fields:
+                    return dict(page_result, customers=summary_rows(page_result.pop('items')), per_page=per_page)
+                customers = []
+                for customer, category_name in page_result.pop('items'):
+                    customer_dict = customer.to_dict()
+                    customer_dict['customer_category_name'] = category_name
+                    customers.append(customer_dict)
+                return dict(page_result, customers=customers, per_page=per_page)
+            
             # 总数查询（只查询CustomerManagement表）
             total_query = self.session.query(CustomerManagement)
             if search:
@@ -114,12 +131,15 @@ class CustomerService(TenantAwareService):
             results = query.offset((page - 1) * per_page).limit(per_page).all()
             
             # 转换结果
-            customers = []
-            for customer, category_name in results:
-                customer_dict = customer.to_dict()
-                # 添加客户分类名称
-                customer_dict['customer_category_name'] = category_name
-                customers.append(customer_dict)
+            if fields:
+                customers = summary_rows(results)
+            else:
+                customers = []
+                for customer, category_name in results:
+                    customer_dict = customer.to_dict()
+                    # 添加客户分类名称
+                    customer_dict['customer_category_name'] = category_name
+                    customers.append(customer_dict)
             
             return {
                 'customers': customers,
@@ -128,6 +148,8 @@ class CustomerService(TenantAwareService):
                 'per_page': per_page
             }
             
+        except (InvalidCursorError, InvalidFieldsError):
+            raise
         except Exception as e:
             print(f"获取客户列表失败: {e}")
             return {
@@ -375,6 +397,7 @@ class CustomerService(TenantAwareService):
             'pending_orders': 0
         }
     
+    @cached(*FORM_OPTION_TABLES)
     def get_form_options(self):
         """获取客户表单选项数据"""
         try:
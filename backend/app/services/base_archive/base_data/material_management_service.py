@@ -7,17 +7,22 @@ from typing import Dict, List, Optional, Any
 from sqlalchemy import func, and_, or_
 from sqlalchemy.orm import joinedload
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.models.basic_data import (
     Material, MaterialProperty, MaterialSupplier,
     MaterialCategory, Unit, CalculationScheme
 )
 from app.utils.database import get_current_user_id
+from app.utils.projection import fields_query, summary_rows
 import uuid
 
 
 class MaterialService(TenantAwareService):
     """材料服务类"""
     
+    # 表单选项依赖的表，写入提交后选项缓存和ETag失效
+    FORM_OPTION_TABLES = ('material_categories', 'units', 'calculation_schemes')
+    
     def get_materials(
         self,
         page: int = 1,
@@ -27,9 +32,13 @@ class MaterialService(TenantAwareService):
         inspection_type: Optional[str] = None,
         is_enabled: Optional[bool] = None,
         sort_by: str = 'material_code',
-        sort_order: str = 'asc'
+        sort_order: str = 'asc',
+        fields: Optional[List[str]] = None
     ) -> Dict[str, Any]:
-        """获取材料列表"""
+        """
+        获取材料列表
+        fields 指定时只查询并返回这些列（主键总是包含），不附加单位和用户名称
+        """
         query = self.session.query(Material)
         
         # 搜索条件
@@ -59,6 +68,15 @@ class MaterialService(TenantAwareService):
         
         # 分页
         total = query.count()
+        if fields:
+            rows = fields_query(query, Material, fields).offset((page - 1) * page_size).limit(page_size).all()
+            return {
+                'items': summary_rows(rows),
+                'total': total,
+                'page': page,
+                'page_size': page_size,
+                'total_pages': (total + page_size - 1) // page_size
+            }
         materials = query.offset((page - 1) * page_size).limit(page_size).all()
         
         # 构建材料数据，包含用户信息和单位信息
@@ -304,73 +322,46 @@ class MaterialService(TenantAwareService):
                 'message': f'材料删除失败: {str(e)}'
             }
     
+    @cached(*FORM_OPTION_TABLES)
     def get_form_options(self) -> Dict[str, Any]:
         """获取表单选项数据"""
-        try:
-            # 材料分类选项
-            material_categories = []
-            try:
-                categories = MaterialCategory.get_enabled_list()
-                material_categories = [{'id': str(cat.id), 'material_name': cat.material_name} for cat in categories]
-            except Exception as e:
-                print(f"获取材料分类失败: {str(e)}")
-            
-            # 单位选项
-            units = []
-            try:
-                unit_list = Unit.get_enabled_list()
-                units = [{'id': str(unit.id), 'unit_name': unit.unit_name} for unit in unit_list]
-            except Exception as e:
-                print(f"获取单位列表失败: {str(e)}")
-            
-            # 检验类型选项
-            inspection_types = Material.get_inspection_type_options()
-            
-            # 计算方案选项（所有类型）
-            calculation_schemes = []
-            try:
-                schemes = CalculationScheme.query.filter_by(is_enabled=True).all()
-                calculation_schemes = [{'id': str(scheme.id), 'scheme_name': scheme.scheme_name, 'scheme_category': scheme.scheme_category} for scheme in schemes]
-            except Exception as e:
-                print(f"获取计算方案失败: {str(e)}")
-            
-            # 科目选项（示例）
-            subjects = [
-                {'id': 'raw_materials', 'name': '原材料'},
-                {'id': 'auxiliary_materials', 'name': '辅助材料'},
-                {'id': 'packaging_materials', 'name': '包装材料'},
-            ]
-            
-            # 保密编码选项（示例）
-            security_codes = [
-                {'id': 'public', 'name': '公开'},
-                {'id': 'internal', 'name': '内部'},
-                {'id': 'confidential', 'name': '机密'},
-            ]
-            
-            return {
-                'material_categories': material_categories,
-                'units': units,
-                'inspection_types': inspection_types,
-                'calculation_schemes': calculation_schemes,
-                'subjects': subjects,
-                'security_codes': security_codes
-            }
-            
-        except Exception as e:
-            print(f"获取表单选项失败: {str(e)}")
-            return {
-                'material_categories': [],
-                'units': [],
-                'inspection_types': [
-                    {'value': 'exempt', 'label': '免检'},
-                    {'value': 'spot_check', 'label': '抽检'},
-                    {'value': 'full_check', 'label': '全检'}
-                ],
-                'calculation_schemes': [],
-                'subjects': [],
-                'security_codes': []
-            }
+        # 材料分类选项
+        categories = MaterialCategory.get_enabled_list()
+        material_categories = [{'id': str(cat.id), 'material_name': cat.material_name} for cat in categories]
+        
+        # 单位选项
+        unit_list = Unit.get_enabled_list()
+        units = [{'id': str(unit.id), 'unit_name': unit.unit_name} for unit in unit_list]
+        
+        # 检验类型选项
+        inspection_types = Material.get_inspection_type_options()
+        
+        # 计算方案选项（所有类型）
+        schemes = CalculationScheme.query.filter_by(is_enabled=True).all()
+        calculation_schemes = [{'id': str(scheme.id), 'scheme_name': scheme.scheme_name, 'scheme_category': scheme.scheme_category} for scheme in schemes]
+        
+        # 科目选项（示例）
+        subjects = [
+            {'id': 'raw_materials', 'name': '原材料'},
+            {'id': 'auxiliary_materials', 'name': '辅助材料'},
+            {'id': 'packaging_materials', 'name': '包装材料'},
+        ]
+        
+        # 保密编码选项（示例）
+        security_codes = [
+            {'id': 'public', 'name': '公开'},
+            {'id': 'internal', 'name': '内部'},
+            {'id': 'confidential', 'name': '机密'},
+        ]
+        
+        return {
+            'material_categories': material_categories,
+            'units': units,
+            'inspection_types': inspection_types,
+            'calculation_schemes': calculation_schemes,
+            'subjects': subjects,
+            'security_codes': security_codes
+        }
     
     def get_material_category_details(self, category_id: str) -> Dict[str, Any]:
         """获取材料分类详情，用于自动填充"""
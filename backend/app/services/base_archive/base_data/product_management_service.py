@@ -1,4 +1,6 @@
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
+from app.utils.numbering import next_number
 from sqlalchemy import and_, or_, func, desc
 from sqlalchemy.exc import IntegrityError
 from app.models.basic_data import (
@@ -6,6 +8,7 @@ from app.models.basic_data import (
     CustomerManagement, BagType, Process, Material, ProductCategory, Currency
 )
 from app.models.user import User
+from app.utils.projection import InvalidFieldsError, fields_query, summary_rows
 from datetime import datetime
 import uuid
 import logging
@@ -14,12 +17,23 @@ import logging
 class ProductManagementService(TenantAwareService):
     """产品管理服务类"""
     
+    # 表单选项依赖的表，写入提交后选项缓存和ETag失效
+    FORM_OPTION_TABLES = (
+        'product_categories', 'customer_management', 'employees', 'currencies', 'materials',
+        'material_categories', 'bag_types', 'processes', 'process_categories', 'units',
+        'supplier_management'
+    )
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.logger = logging.getLogger(__name__)
 
-    def get_products(self, page=1, per_page=20, search=None, customer_id=None, bag_type_id=None, status=None):
-        """获取产品列表"""
+    def get_products(self, page=1, per_page=20, search=None, customer_id=None, bag_type_id=None, status=None,
+                     fields=None):
+        """
+        获取产品列表
+        fields 指定时只查询并返回这些列（主键总是包含），不附加用户和业务员名称
+        """
         try:
             query = self.session.query(Product)
             
@@ -51,6 +65,15 @@ class ProductManagementService(TenantAwareService):
             
             # 分页
             total = query.count()
+            if fields:
+                rows = fields_query(query, Product, fields).offset((page - 1) * per_page).limit(per_page).all()
+                return {
+                    'products': summary_rows(rows),
+                    'total': total,
+                    'page': page,
+                    'per_page': per_page,
+                    'pages': (total + per_page - 1) // per_page
+                }
             products = query.offset((page - 1) * per_page).limit(per_page).all()
             
             # 获取用户信息
@@ -93,6 +116,8 @@ class ProductManagementService(TenantAwareService):
                 'pages': (total + per_page - 1) // per_page
             }
             
+        except InvalidFieldsError:
+            raise
         except Exception as e:
             raise ValueError(f"获取产品列表失败: {str(e)}")
 
@@ -544,24 +569,7 @@ class ProductManagementService(TenantAwareService):
 
     def _generate_product_code(self):
         """生成产品编码"""
-        # 查找当前租户schema中最新的产品编码
-        last_product = self.session.query(Product).filter(
-            Product.product_code.like('P%')
-        ).order_by(desc(Product.product_code)).first()
-        
-        if last_product:
-            try:
-                # 提取数字部分并转换为整数
-                last_num = int(last_product.product_code[1:])
-                new_num = last_num + 1
-            except (ValueError, IndexError):
-                # 如果解析失败，从1开始
-                new_num = 1
-        else:
-            new_num = 1
-        
-        # 生成8位数字的产品编码
-        return f'P{new_num:08d}'
+        return next_number('product', schema_name=self.schema_name)
 
     def _create_product_structure_from_bag_type(self, product_id, bag_type_id):
         """根据袋型自动创建产品结构"""
@@ -731,6 +739,7 @@ class ProductManagementService(TenantAwareService):
         except Exception as e:
             raise ValueError(f"保存产品图片失败: {str(e)}")
 
+    @cached(*FORM_OPTION_TABLES)
     def get_form_options(self):
         """获取产品管理表单的选项数据"""
         try:
@@ -740,93 +749,53 @@ class ProductManagementService(TenantAwareService):
             )
             
             # 获取产品分类
-            try:
-                product_categories = self.session.query(ProductCategory).filter(
-                    ProductCategory.is_enabled == True
-                ).order_by(ProductCategory.sort_order, ProductCategory.category_name).all()
-            except Exception as e:
-                self.logger.error(f"获取产品分类失败: {str(e)}")
-                product_categories = []
+            product_categories = self.session.query(ProductCategory).filter(
+                ProductCategory.is_enabled == True
+            ).order_by(ProductCategory.sort_order, ProductCategory.category_name).all()
             
             # 获取客户
-            try:
-                customers = self.session.query(CustomerManagement).filter(
-                    CustomerManagement.is_enabled == True
-                ).order_by(CustomerManagement.customer_name).all()
-            except Exception as e:
-                self.logger.error(f"获取客户失败: {str(e)}")
-                customers = []
+            customers = self.session.query(CustomerManagement).filter(
+                CustomerManagement.is_enabled == True
+            ).order_by(CustomerManagement.customer_name).all()
             
             # 获取员工（业务员）
-            try:
-                employees = self.session.query(Employee).filter(
-                    Employee.is_enabled == True
-                ).order_by(Employee.employee_name).all()
-            except Exception as e:
-                self.logger.error(f"获取员工失败: {str(e)}")
-                employees = []
+            employees = self.session.query(Employee).filter(
+                Employee.is_enabled == True
+            ).order_by(Employee.employee_name).all()
             
             # 获取币种
-            try:
-                currencies = self.session.query(Currency).filter(
-                    Currency.is_enabled == True
-                ).order_by(Currency.currency_name).all()
-            except Exception as e:
-                self.logger.error(f"获取币种失败: {str(e)}")
-                currencies = []
+            currencies = self.session.query(Currency).filter(
+                Currency.is_enabled == True
+            ).order_by(Currency.currency_name).all()
             
             # 获取材料
-            try:
-                materials = self.session.query(Material).filter(
-                    Material.is_enabled == True
-                ).order_by(Material.material_name).all()
-            except Exception as e:
-                self.logger.error(f"获取材料失败: {str(e)}")
-                materials = []
-            
-            # 尝试获取袋型（如果模型存在的话）
-            bag_types = []
-            try:
-                from app.models.basic_data import BagType
-                bag_types = self.session.query(BagType).filter(
-                    BagType.is_enabled == True
-                ).order_by(BagType.bag_type_name).all()
-            except Exception as e:
-                self.logger.error(f"获取袋型失败: {str(e)}")
-                bag_types = []
-            
-            # 尝试获取工序（如果模型存在的话）
-            processes = []
-            try:
-                from app.models.basic_data import Process
-                processes = self.session.query(Process).filter(
-                    Process.is_enabled == True
-                ).order_by(Process.process_name).all()
-            except Exception as e:
-                self.logger.error(f"获取工序失败: {str(e)}")
-                processes = []
+            materials = self.session.query(Material).filter(
+                Material.is_enabled == True
+            ).order_by(Material.material_name).all()
+            
+            # 获取袋型
+            from app.models.basic_data import BagType
+            bag_types = self.session.query(BagType).filter(
+                BagType.is_enabled == True
+            ).order_by(BagType.bag_type_name).all()
+            
+            # 获取工序
+            from app.models.basic_data import Process
+            processes = self.session.query(Process).filter(
+                Process.is_enabled == True
+            ).order_by(Process.process_name).all()
 
             # 获取单位
-            units = []
-            try:
-                from app.models.basic_data import Unit
-                units = self.session.query(Unit).filter(
-                    Unit.is_enabled == True
-                ).order_by(Unit.unit_name).all()
-            except Exception as e:
-                self.logger.error(f"获取单位失败: {str(e)}")
-                units = []
+            from app.models.basic_data import Unit
+            units = self.session.query(Unit).filter(
+                Unit.is_enabled == True
+            ).order_by(Unit.unit_name).all()
             
             # 获取供应商
-            suppliers = []
-            try:
-                from app.models.basic_data import SupplierManagement
-                suppliers = self.session.query(SupplierManagement).filter(
-                    SupplierManagement.is_enabled == True
-                ).order_by(SupplierManagement.supplier_name).all()
-            except Exception as e:
-                self.logger.error(f"获取供应商失败: {str(e)}")
-                suppliers = []
+            from app.models.basic_data import SupplierManagement
+            suppliers = self.session.query(SupplierManagement).filter(
+                SupplierManagement.is_enabled == True
+            ).order_by(SupplierManagement.supplier_name).all()
             
             SCHEDULING_METHODS = [
                 ('investment_m', '投产m'),
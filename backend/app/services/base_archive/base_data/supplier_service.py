@@ -4,6 +4,7 @@ Supplier 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.numbering import next_number
 from app.models.basic_data import SupplierManagement, SupplierCategoryManagement
 from sqlalchemy import func, and_, or_
 from sqlalchemy.exc import IntegrityError
@@ -21,31 +22,9 @@ class SupplierService(TenantAwareService):
     
     def generate_code(self, entity_type):
         """生成编码"""
-        prefixes = {
-            'customer': 'C',
-            'supplier': 'S', 
-            'product': 'P',
-            'material': 'M'
-        }
-        
-        prefix = prefixes.get(entity_type, 'X')
-        
-        # 获取当前最大编号
-        if entity_type == 'supplier':
-            max_code = self.session.query(func.max(SupplierManagement.supplier_code)).scalar()
-        else:
+        if entity_type != 'supplier':
             raise ValueError(f"不支持的实体类型: {entity_type}")
-        
-        if max_code:
-            # 提取数字部分并加1
-            try:
-                number = int(max_code[1:]) + 1
-            except (ValueError, IndexError):
-                number = 1
-        else:
-            number = 1
-        
-        return f"{prefix}{number:06d}"
+        return next_number('supplier', schema_name=self.schema_name)
     
     def get_suppliers(self, page=1, per_page=20, search=None, category_id=None, status=None):
         """获取供应商列表"""
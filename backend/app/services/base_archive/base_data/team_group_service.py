@@ -4,6 +4,7 @@ TeamGroup 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.models.basic_data import TeamGroup, TeamGroupMember, TeamGroupMachine, TeamGroupProcess, Employee, Machine, ProcessCategory
 from sqlalchemy import func, and_, or_
 from sqlalchemy.exc import IntegrityError
@@ -16,6 +17,9 @@ import re
 class TeamGroupService(TenantAwareService):
     """班组管理服务"""
     
+    # 表单选项依赖的表，写入提交后选项缓存和ETag失效
+    FORM_OPTION_TABLES = ('employees', 'positions', 'machines', 'process_categories')
+    
     def get_team_groups(self, page=1, per_page=20, search=None, is_enabled=None):
         """获取班组列表"""
         try:
@@ -518,6 +522,7 @@ class TeamGroupService(TenantAwareService):
             self.rollback()
             raise e
     
+    @cached(*FORM_OPTION_TABLES)
     def get_form_options(self):
         """获取表单选项数据"""
         try:
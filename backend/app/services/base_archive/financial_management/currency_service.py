@@ -7,6 +7,7 @@ from sqlalchemy.exc import SQLAlchemyError
 import uuid
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.models.basic_data import Currency
 from app.models.user import User
 
@@ -284,6 +285,7 @@ class CurrencyService(TenantAwareService):
         
         return results
 
+    @cached('currencies')
     def get_enabled_currencies(self):
         """获取启用的币别列表（用于下拉选择）"""
         try:
@@ -7,6 +7,7 @@ from sqlalchemy.exc import SQLAlchemyError
 import uuid
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.models.basic_data import PaymentMethod
 from app.models.user import User
 
@@ -207,6 +208,7 @@ class PaymentMethodService(TenantAwareService):
             self.rollback()
             raise ValueError(f'删除付款方式失败: {str(e)}')
 
+    @cached('payment_methods')
     def get_enabled_payment_methods(self):
         """获取启用的付款方式列表（用于下拉选择）"""
         try:
@@ -7,6 +7,7 @@ from sqlalchemy.exc import SQLAlchemyError
 import uuid
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.models.basic_data import TaxRate
 from app.models.user import User
 
@@ -321,6 +322,7 @@ class TaxRateService(TenantAwareService):
         
         return results
 
+    @cached('tax_rates')
     def get_enabled_tax_rates(self):
         """获取启用的税率列表（用于下拉选择）"""
         tax_rates = self.session.query(TaxRate).filter_by(
@@ -329,6 +331,7 @@ class TaxRateService(TenantAwareService):
         
         return [tax_rate.to_dict() for tax_rate in tax_rates]
 
+    @cached('tax_rates')
     def get_tax_rate_options(self):
         """获取税率选项（用于下拉框）"""
         tax_rates = self.session.query(TaxRate).filter_by(
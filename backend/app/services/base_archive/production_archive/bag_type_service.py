@@ -4,6 +4,7 @@ BagType 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.extensions import db
 from sqlalchemy import func, text, and_, or_
 from sqlalchemy.exc import IntegrityError
@@ -14,6 +15,9 @@ import re
 class BagTypeService(TenantAwareService):
     """袋型管理服务"""
     
+    # 表单选项依赖的表，写入提交后选项缓存和ETag失效
+    FORM_OPTION_TABLES = ('units', 'calculation_schemes')
+    
     def get_bag_types(self, page=1, per_page=20, search=None, is_enabled=None):
         """获取袋型列表"""
         try:
@@ -303,6 +307,7 @@ class BagTypeService(TenantAwareService):
         except Exception as e:
             raise ValueError(f"获取袋型选项失败: {str(e)}")
     
+    @cached(*FORM_OPTION_TABLES)
     def get_form_options(self):
         """获取袋型表单选项数据"""
         try:
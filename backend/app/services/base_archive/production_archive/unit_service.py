@@ -7,6 +7,7 @@ from sqlalchemy.exc import SQLAlchemyError
 import uuid
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.models.basic_data import Unit
 from app.models.user import User
 
@@ -186,6 +187,7 @@ class UnitService(TenantAwareService):
             self.rollback()
             raise ValueError(f'删除单位失败: {str(e)}')
 
+    @cached('units')
     def get_enabled_units(self) -> List[Dict[str, Any]]:
         """获取启用的单位列表"""
         try:
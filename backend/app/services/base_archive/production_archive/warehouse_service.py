@@ -4,6 +4,7 @@ Warehouse 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.extensions import db
 from sqlalchemy import func, text, and_, or_
 from sqlalchemy.exc import IntegrityError
@@ -254,6 +255,7 @@ class WarehouseService(TenantAwareService):
             self.rollback()
             raise ValueError(f"批量更新仓库失败: {str(e)}")
     
+    @cached('warehouses')
     def get_warehouse_options(self, warehouse_type=None):
         """获取仓库选项数据"""
         try:
@@ -278,6 +280,7 @@ class WarehouseService(TenantAwareService):
         except Exception as e:
             raise ValueError(f"获取仓库选项失败: {str(e)}")
     
+    @cached('warehouses')
     def get_warehouse_tree(self):
         """获取仓库树形结构"""
         try:
@@ -4,6 +4,7 @@ CalculationParameter 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached
 from app.extensions import db
 from sqlalchemy import func, text, and_, or_
 from sqlalchemy.exc import IntegrityError
@@ -182,6 +183,7 @@ class CalculationParameterService(TenantAwareService):
             self.rollback()
             raise ValueError(f"批量更新计算参数失败: {str(e)}")
     
+    @cached('calculation_parameters')
     def get_calculation_parameter_options(self):
         """获取计算参数选项数据"""
         from app.models.basic_data import CalculationParameter
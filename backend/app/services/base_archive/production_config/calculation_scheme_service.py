@@ -4,6 +4,7 @@ CalculationScheme 服务
 """
 
 from app.services.base_service import TenantAwareService
+from app.utils.cache import cached, reference_cache
 from app.extensions import db
 from app.models.basic_data import CalculationScheme
 from sqlalchemy import func, text, and_, or_
@@ -15,38 +16,25 @@ import re
 class CalculationSchemeService(TenantAwareService):
     """计算方案服务"""
     
-    # 类级别的参数缓存，避免频繁查询数据库
-    _parameter_cache = None
-    _cache_timestamp = None
-    _cache_timeout = 300  # 5分钟缓存时间
-
     def _get_cached_parameters(self):
-        """获取缓存的参数列表"""
-        import time
-        current_time = time.time()
-        
-        # 检查缓存是否过期
-        if (self._parameter_cache is None or 
-            self._cache_timestamp is None or 
-            current_time - self._cache_timestamp > self._cache_timeout):
-            
-            try:
-                from app.models.basic_data import CalculationParameter
-                existing_params = self.session.query(CalculationParameter.parameter_name).filter(
-                    CalculationParameter.is_enabled == True
-                ).all()
-                self._parameter_cache = [p[0] for p in existing_params]
-                self._cache_timestamp = current_time
-            except Exception:
-                # 如果查询失败，返回空列表，但不更新缓存时间，下次会重试
-                return []
-        
-        return self._parameter_cache or []
+        """获取缓存的参数列表（按租户缓存，计算参数写入提交后失效）"""
+        try:
+            return self._get_enabled_parameter_names()
+        except Exception:
+            # 查询失败时返回空列表，不写入缓存，下次会重试
+            return []
+
+    @cached('calculation_parameters')
+    def _get_enabled_parameter_names(self):
+        from app.models.basic_data import CalculationParameter
+        existing_params = self.session.query(CalculationParameter.parameter_name).filter(
+            CalculationParameter.is_enabled == True
+        ).all()
+        return [p[0] for p in existing_params]
     
     def _clear_parameter_cache(self):
-        """清除参数缓存（在参数更新时调用）"""
-        self._parameter_cache = None
-        self._cache_timestamp = None
+        """清除参数缓存（原生SQL修改计算参数后调用）"""
+        reference_cache.invalidate('calculation_parameters', schema_name=self.schema_name)
 
     def get_calculation_schemes(self, page=1, per_page=20, search=None, category=None):
         """获取计算方案列表"""
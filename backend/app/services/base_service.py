@@ -3,9 +3,9 @@
 """
 from typing import Optional, Any, Dict
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from flask import g, current_app
 from app.extensions import db
+from app.utils.tenant_context import TenantContext, uses_session_routing, set_search_path
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,6 +29,7 @@ class BaseService:
         """
         self.tenant_id = tenant_id or getattr(g, 'tenant_id', None)
         self.schema_name = schema_name or getattr(g, 'schema_name', current_app.config.get('DEFAULT_SCHEMA', 'public'))
+        self.shard_name = getattr(g, 'shard_name', None)
         self.db = db
         
         # 添加session属性，直接引用db.session
@@ -37,22 +38,28 @@ class BaseService:
         # 设置schema搜索路径
         self._set_schema()
         
-        logger.info(f"Initialized {self.__class__.__name__} for tenant: {self.tenant_id}, schema: {self.schema_name}")
+        logger.debug("Initialized %s for tenant: %s, schema: %s", self.__class__.__name__, self.tenant_id, self.schema_name)
     
     def _set_schema(self) -> None:
         """设置当前租户的schema搜索路径"""
-        if self.schema_name and self.schema_name != 'public':
-            try:
-                self.db.session.execute(text(f'SET search_path TO {self.schema_name}, public'))
-                logger.debug(f"Set search_path to {self.schema_name} in {self.__class__.__name__}")
-            except Exception as e:
-                logger.error(f"Failed to set search_path to {self.schema_name}: {e}")
-                raise
+        if not self.schema_name or self.schema_name == 'public':
+            return
+        # connection模式下连接检出时已按当前租户设置search_path，只有显式指定了其他schema时才需要切换
+        if not uses_session_routing() and self.schema_name == TenantContext().get_schema():
+            return
+        try:
+            set_search_path(self.db.session.connection(), self.schema_name)
+            logger.debug(f"Set search_path to {self.schema_name} in {self.__class__.__name__}")
+        except Exception as e:
+            logger.error(f"Failed to set search_path to {self.schema_name}: {e}")
+            raise
     
     def get_session(self) -> Session:
         """
         获取数据库会话
         
+        会话按当前租户分片选择引擎，租户表访问所在分片，system表访问主库
+        
         Returns:
             SQLAlchemy Session对象
         """
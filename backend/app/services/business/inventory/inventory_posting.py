@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+"""
+库存过账引擎
+
+入库、出库、调拨、盘点等单据执行时都通过这里修改库存，保证并发过账不丢失更新、不死锁：
+1. 每个过账行按行键定位库存：库存ID，或 仓库 + 产品/材料 [+ 批次] [+ 库位]（只匹配启用的库存）
+2. 本次过账涉及的库存行用一条 SELECT ... FOR UPDATE ORDER BY id 锁定，所有过账按相同顺序加锁，不会互相等待成环
+3. 需要新建库存的行键先按键排序获取事务级 advisory lock，锁内查询仍不存在时才新建，并发过账不会重复建行
+4. 在锁定后的库存值上检查可用库存、应用数量和成本变动，写入库存流水（变动前后数量取自锁定后的值）
+5. 不提交事务，由调用方与单据状态一起提交，锁在提交或回滚时释放
+
+单据本身用 lock_document 加行锁后再检查状态，同一单据并发执行时后执行的一方会看到已完成的状态。
+
+过账按集合执行，语句数与明细行数无关：行键展开为 unnest(数组) 后一次查询，新建库存一条多行 INSERT，
+库存更新一条 UPDATE ... FROM unnest(...)，流水一次批量 INSERT（insertmanyvalues）。
+数组参数每列一个，语句编译结果可以缓存；VALUES 列表每个值一个参数，千行单据的编译开销超过执行本身。
+返回的流水是已持久化的模型对象，未写入的列（创建时间等）访问时从数据库加载。
+"""
+
+import uuid
+from decimal import Decimal
+
+import sqlalchemy as sa
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+from app.models.business.inventory import Inventory, InventoryTransaction
+from app.utils.numbering import reserve_numbers
+from app.utils.inventory_stats import TRACKED_COLUMNS, record_inventory_changes
+from app.utils.tenant_context import TenantContext
+
+# 行键可使用的库存列
+KEY_COLUMNS = ('warehouse_id', 'product_id', 'material_id', 'batch_number', 'location_code')
+_UUID_COLUMNS = ('warehouse_id', 'product_id', 'material_id')
+# 由过账计算、不能通过 transaction 参数覆盖的流水字段
+_TRANSACTION_COLUMNS = (
+    'inventory_id', 'warehouse_id', 'product_id', 'material_id', 'transaction_type',
+    'quantity_change', 'quantity_before', 'quantity_after', 'created_by', 'transaction_number'
+)
+# 锁定查询读取的库存列
+_STATE_COLUMNS = KEY_COLUMNS + (
+    'id', 'is_active', 'unit_id', 'current_quantity', 'available_quantity', 'reserved_quantity',
+    'unit_cost', 'total_cost', 'safety_stock'
+)
+# 过账写回的库存列
+_POSTED_COLUMNS = ('current_quantity', 'available_quantity', 'reserved_quantity', 'unit_cost', 'total_cost', 'updated_by')
+
+
+def _to_uuid(value):
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _unnest(name, columns, rows):
+    """
+    行列表展开为 unnest(数组, ...) AS name(列, ...)
+    每列一个数组参数，语句结构与行数无关，编译结果可以缓存
+    :param columns: [(列名, 类型)]
+    :param rows: 与 columns 对应的元组列表
+    """
+    arrays = [
+        sa.cast(sa.literal([row[index] for row in rows], ARRAY(type_)), ARRAY(type_))
+        for index, (_, type_) in enumerate(columns)
+    ]
+    return func.unnest(*arrays).table_valued(
+        *(sa.column(column, type_) for column, type_ in columns)
+    ).render_derived(name=name)
+
+
+def _group_rows(rows):
+    """按列集合分组，同一批量语句的参数需要相同的列"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+    return groups.values()
+
+
+class PostingLine:
+    """
+    过账行
+    """
+
+    def __init__(self, quantity, transaction_type, inventory_id=None, label=None,
+                 create=None, required=True, check_available=None, release_reserved=False,
+                 unit_cost=None, updates=None, transaction=None, quantity_after=None, **key):
+        """
+        :param quantity: 数量变动，入库为正、出库为负
+        :param transaction_type: 库存流水类型
+        :param inventory_id: 库存ID，指定时按ID定位，忽略行键
+        :param label: 错误信息中的物品名称
+        :param create: 库存不存在时新建库存的属性（unit_id等），为空时不新建
+        :param required: 库存不存在且不新建时是否报错，为False时跳过该行
+        :param check_available: 是否检查可用库存，默认出库行检查
+        :param release_reserved: 出库时先释放等量预留（预留不足时按普通出库处理）
+        :param unit_cost: 入库单价，入库时按加权平均更新库存单价
+        :param updates: 过账时同时设置的库存属性
+        :param transaction: 库存流水的其他字段（来源单据、批次、库位、原因等）
+        :param quantity_after: 过账后的库存数量（盘点实盘数），指定时数量变动按锁定后的库存数量计算，
+                               quantity 只用于判断是否过账；变动为0时不写流水
+        :param key: 行键，warehouse_id/product_id/material_id/batch_number/location_code
+        """
+        unknown = set(key) - set(KEY_COLUMNS)
+        if unknown:
+            raise ValueError(f"不支持的库存行键: {', '.join(sorted(unknown))}")
+        if inventory_id is None and not (
+            key.get('warehouse_id') and (key.get('product_id') or key.get('material_id'))
+        ):
+            raise ValueError("过账行需要库存ID或 仓库+产品/材料")
+
+        self.quantity = _to_decimal(quantity)
+        self.quantity_after = _to_decimal(quantity_after)
+        self.transaction_type = transaction_type
+        self.inventory_id = _to_uuid(inventory_id)
+        self.key = tuple(sorted(
+            (column, _to_uuid(value) if column in _UUID_COLUMNS else value)
+            for column, value in key.items()
+            if column not in ('product_id', 'material_id') or value is not None
+        ))
+        self.label = label or '物品'
+        self.create = create
+        self.required = required
+        self.check_available = self.quantity < 0 if check_available is None else check_available
+        self.release_reserved = release_reserved
+        self.unit_cost = _to_decimal(unit_cost)
+        self.updates = updates or {}
+        self.transaction = transaction or {}
+
+    @property
+    def signature(self):
+        """行键使用的列"""
+        return tuple(column for column, _ in self.key)
+
+
+class PostingReport:
+    """
+    过账报告
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.transactions = []
+        self.created_inventories = []
+        self.skipped = []
+        self.locked_count = 0
+
+    def to_dict(self):
+        return {
+            'lines': [{
+                **line,
+                'inventory_id': str(line['inventory_id']),
+                'quantity_change': float(line['quantity_change']),
+                'quantity_before': float(line['quantity_before']),
+                'quantity_after': float(line['quantity_after']),
+            } for line in self.lines],
+            'transactions_count': len(self.transactions),
+            'created_inventories_count': len(self.created_inventories),
+            'skipped_count': len(self.skipped),
+            'locked_count': self.locked_count,
+        }
+
+
+class InventoryPostingEngine:
+    """
+    库存过账引擎
+    """
+
+    def __init__(self, session, schema_name=None):
+        self.session = session
+        self.schema_name = schema_name or TenantContext().get_schema()
+
+    def lock_document(self, model, document_id):
+        """
+        锁定单据行并重新读取
+        :param model: 单据模型
+        :param document_id: 单据ID
+        :return: 单据，不存在时为None
+        """
+        return self.session.query(model).filter(
+            model.id == _to_uuid(document_id)
+        ).with_for_update(of=model).populate_existing().first()
+
+    def post(self, lines, posted_by):
+        """
+        过账
+        :param lines: PostingLine 列表，按顺序应用，同一库存的多行依次累计
+        :param posted_by: 操作人ID
+        :return: PostingReport
+        """
+        report = PostingReport()
+        lines = [line for line in lines if line.quantity]
+        if not lines:
+            return report
+        posted_by = _to_uuid(posted_by)
+
+        keys_to_create = {line.key for line in lines if line.inventory_id is None and line.create}
+        if keys_to_create:
+            _, existing = self._index(self._select(lines, lock=False), lines)
+            self._lock_keys(sorted(self._lock_name(key) for key in keys_to_create if key not in existing))
+
+        states = self._select(lines, lock=True)
+        report.locked_count = len(states)
+        by_id, by_key = self._index(states, lines)
+
+        resolved, created = [], []
+        for line in lines:
+            if line.inventory_id is not None:
+                state = by_id.get(line.inventory_id)
+            else:
+                state = by_key.get(line.key)
+                if state is None and line.create:
+                    state = by_key[line.key] = self._new_state(line, posted_by)
+                    created.append(state)
+            if state is None:
+                if line.required:
+                    raise ValueError(f"{line.label} 在仓库中没有库存")
+                report.skipped.append(line)
+            resolved.append(state)
+
+        if created:
+            self._insert(Inventory.__table__, [state.pop('_row') for state in created])
+            report.created_inventories = created
+
+        created_ids = {state['id'] for state in created}
+        numbers = iter(reserve_numbers(
+            'inventory_transaction', sum(1 for state in resolved if state is not None),
+            schema_name=self.schema_name
+        ))
+        changed, baselines = {}, {}
+        for line, state in zip(lines, resolved):
+            if state is None:
+                continue
+            if state['id'] not in baselines:
+                baselines[state['id']] = None if state['id'] in created_ids else {
+                    column: state[column] for column in TRACKED_COLUMNS
+                }
+            quantity_before = state['current_quantity']
+            if line.quantity_after is not None:
+                line.quantity = line.quantity_after - quantity_before
+                if not line.quantity:
+                    continue
+            self._apply(line, state, posted_by)
+            changed[state['id']] = state
+            report.transactions.append(self._transaction(line, state, quantity_before, posted_by, next(numbers)))
+            report.lines.append({
+                'inventory_id': state['id'],
+                'transaction_type': line.transaction_type,
+                'quantity_change': line.quantity,
+                'quantity_before': quantity_before,
+                'quantity_after': state['current_quantity'],
+                'created': state['id'] in created_ids,
+            })
+
+        self._update(changed.values())
+        self._insert_transactions(report.transactions)
+        # 集合写入不经过flush，仓库库存汇总的增量在这里提交
+        record_inventory_changes(self.session, [
+            (baselines[inventory_id], {column: state[column] for column in TRACKED_COLUMNS})
+            for inventory_id, state in changed.items()
+        ])
+        return report
+
+    def _lock_name(self, key):
+        return f"{self.schema_name}:inventory:" + '|'.join(f'{column}={value}' for column, value in key)
+
+    def _lock_keys(self, names):
+        """按名称顺序获取行键的事务级 advisory lock"""
+        if not names:
+            return
+        keys = func.unnest(sa.cast(sa.literal(names, ARRAY(sa.Text)), ARRAY(sa.Text))) \
+            .table_valued('name', with_ordinality='ordinal').render_derived()
+        self.session.execute(
+            select(func.pg_advisory_xact_lock(func.hashtext(keys.c.name))).order_by(keys.c.ordinal)
+        )
+
+    def _select(self, lines, lock):
+        """
+        查询过账行对应的库存
+        :return: 库存状态字典列表，按ID排序
+        """
+        table = Inventory.__table__
+        conditions = []
+
+        inventory_ids = sorted({line.inventory_id for line in lines if line.inventory_id is not None})
+        if inventory_ids:
+            conditions.append(table.c.id.in_(inventory_ids))
+
+        # 每种行键列组合展开为一个键列表，按等值条件半连接
+        signatures = {}
+        for line in lines:
+            if line.inventory_id is None:
+                signatures.setdefault(line.signature, set()).add(line.key)
+        for signature, keys in signatures.items():
+            key_values = _unnest(
+                f'posting_keys_{len(conditions)}',
+                [(column, table.c[column].type) for column in signature],
+                [tuple(value for _, value in key) for key in sorted(keys, key=str)]
+            )
+            conditions.append(and_(table.c.is_active == True, sa.exists(
+                select(sa.literal(1)).select_from(key_values).where(*(
+                    table.c[column].is_not_distinct_from(key_values.c[column])
+                    if column in ('batch_number', 'location_code') else table.c[column] == key_values.c[column]
+                    for column in signature
+                ))
+            )))
+
+        query = select(*(table.c[column] for column in _STATE_COLUMNS)).where(or_(*conditions)).order_by(table.c.id)
+        if lock:
+            query = query.with_for_update(of=table)
+        return [dict(row._mapping) for row in self.session.execute(query)]
+
+    def _index(self, states, lines):
+        """
+        :return: ({库存ID: 状态}, {行键: 状态})，同一行键有多条库存时取ID最小的
+        """
+        signatures = {line.signature for line in lines if line.inventory_id is None}
+        by_id, by_key = {}, {}
+        for state in states:
+            by_id[state['id']] = state
+            if not state['is_active']:
+                continue
+            for signature in signatures:
+                by_key.setdefault(tuple((column, state[column]) for column in signature), state)
+        return by_id, by_key
+
+    def _new_state(self, line, posted_by):
+        table = Inventory.__table__
+        row = {
+            'current_quantity': Decimal('0'),
+            'available_quantity': Decimal('0'),
+            'reserved_quantity': Decimal('0'),
+            'total_cost': Decimal('0'),
+            'safety_stock': Decimal('0'),
+            'created_by': posted_by,
+            **dict(line.key),
+            **{column: value for column, value in line.create.items() if column in table.c},
+            'id': uuid.uuid4(),
+            'is_active': True,
+        }
+        state = {column: row.get(column) for column in _STATE_COLUMNS}
+        state['_row'] = row
+        return state
+
+    def _apply(self, line, state, posted_by):
+        quantity = line.quantity
+        reserved = state['reserved_quantity'] or Decimal('0')
+
+        if quantity < 0 and line.release_reserved and reserved >= -quantity:
+            state['reserved_quantity'] = reserved + quantity
+        else:
+            if line.check_available and state['available_quantity'] < -quantity:
+                raise ValueError(
+                    f"{line.label} 可用库存不足: 需要 {-quantity}, 可用 {state['available_quantity']}"
+                )
+            state['available_quantity'] += quantity
+        state['current_quantity'] += quantity
+
+        # 入库带单价时按加权平均更新库存单价
+        if quantity > 0 and line.unit_cost:
+            state['total_cost'] = (state['total_cost'] or Decimal('0')) + line.unit_cost * quantity
+            if state['current_quantity'] > 0:
+                state['unit_cost'] = state['total_cost'] / state['current_quantity']
+        if state['unit_cost']:
+            state['total_cost'] = state['current_quantity'] * _to_decimal(state['unit_cost'])
+
+        state.setdefault('_updates', {}).update(line.updates)
+        state['updated_by'] = posted_by
+
+    def _update(self, states):
+        """库存写回：每组更新列一条 UPDATE ... FROM unnest(...)"""
+        table = Inventory.__table__
+        rows = [{
+            'id': state['id'],
+            **{column: state[column] for column in _POSTED_COLUMNS},
+            **{column: value for column, value in state.pop('_updates', {}).items() if column in table.c}
+        } for state in states]
+
+        for group in _group_rows(rows):
+            columns = [column for column in sorted(group[0]) if column != 'id']
+            posted = _unnest(
+                'posted',
+                [(column, table.c[column].type) for column in ['id'] + columns],
+                [tuple(row[column] for column in ['id'] + columns) for row in group]
+            )
+            self.session.execute(
+                table.update().where(table.c.id == posted.c.id).values(
+                    updated_at=func.now(),
+                    **{column: posted.c[column] for column in columns}
+                )
+            )
+
+        # 会话中已加载的库存对象与数据库不一致，过期后重新加载
+        for row in rows:
+            instance = self.session.identity_map.get(identity_key(Inventory, row['id']))
+            if instance is not None:
+                self.session.expire(instance)
+
+    def _transaction(self, line, state, quantity_before, posted_by, transaction_number):
+        fields = {
+            'inventory_id': state['id'],
+            'warehouse_id': state['warehouse_id'],
+            'product_id': state['product_id'],
+            'material_id': state['material_id'],
+            'transaction_type': line.transaction_type,
+            'quantity_change': line.quantity,
+            'quantity_before': quantity_before,
+            'quantity_after': state['current_quantity'],
+            'unit_id': state['unit_id'],
+            'created_by': posted_by,
+            'transaction_number': transaction_number,
+        }
+        fields.update({
+            key: value for key, value in line.transaction.items()
+            if value is not None and key not in _TRANSACTION_COLUMNS
+        })
+        transaction = InventoryTransaction(**fields)
+        transaction.id = uuid.uuid4()
+        transaction.calculate_total_amount()
+        return transaction
+
+    def _insert_transactions(self, transactions):
+        """流水批量插入后作为已持久化对象加入会话"""
+        table = InventoryTransaction.__table__
+        self._insert(table, [{
+            column.key: transaction.__dict__[column.key]
+            for column in table.columns if column.key in transaction.__dict__
+        } for transaction in transactions])
+        for transaction in transactions:
+            make_transient_to_detached(transaction)
+            self.session.add(transaction)
+
+    def _insert(self, table, rows):
+        for group in _group_rows(rows):
+            self.session.execute(table.insert(), group)
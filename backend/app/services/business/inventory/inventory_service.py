@@ -7,7 +7,7 @@ from typing import Optional, List, Dict, Any
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_, func, text
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import uuid
 
 from app.models.business.inventory import (
@@ -16,10 +16,20 @@ from app.models.business.inventory import (
     InventoryCountPlan, 
     InventoryCountRecord,
     InboundOrder,
-    InboundOrderDetail
+    InboundOrderDetail,
+    WarehouseInventoryStats,
+    WarehouseInventoryDailyStats
 )
 from flask import g, current_app
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.read_replica import read_only
+from app.utils.pagination import keyset_paginate
+from app.utils.list_count import count_total
+from app.utils.projection import fields_query, summary_rows, export_query
+from app.utils.metrics import track_posting
+from app.utils.reference_resolver import fill_warehouse_names
+from app.utils.inventory_stats import stats_enabled, IN_TRANSACTION_TYPES, OUT_TRANSACTION_TYPES
 
 
 class InventoryService(TenantAwareService):
@@ -31,36 +41,6 @@ class InventoryService(TenantAwareService):
     def __init__(self, tenant_id: Optional[str] = None, schema_name: Optional[str] = None):
         super().__init__(tenant_id, schema_name, strict_tenant_check=True)
 
-    def _fill_warehouse_info(self, orders):
-        """批量填充订单的仓库名称信息"""
-        if not orders:
-            return
-        
-        # 获取所有唯一的仓库ID
-        warehouse_ids = list(set([order.warehouse_id for order in orders if order.warehouse_id]))
-        
-        if not warehouse_ids:
-            return
-        
-        try:
-            # 查询仓库信息
-            from app.models.basic_data import Warehouse
-            warehouses = self.get_session().query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
-            warehouse_dict = {str(w.id): w.warehouse_name for w in warehouses}
-            
-            # 填充仓库名称
-            for order in orders:
-                if order.warehouse_id and str(order.warehouse_id) in warehouse_dict:
-                    order.warehouse_name = warehouse_dict[str(order.warehouse_id)]
-                elif not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-        except Exception as e:
-            current_app.logger.warning(f"填充仓库信息失败: {e}")
-            # 失败时使用默认值
-            for order in orders:
-                if not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-    
     # ================ 库存查询方法 ================
     
     def get_inventory_by_id(self, inventory_id: str) -> Optional[Inventory]:
@@ -91,6 +71,7 @@ class InventoryService(TenantAwareService):
         
         return query.filter(Inventory.is_active == True).first()
     
+    @read_only
     def get_inventory_list(
         self,
         warehouse_id: str = None,
@@ -99,9 +80,59 @@ class InventoryService(TenantAwareService):
         below_safety_stock: bool = False,
         expired_only: bool = False,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        cursor: str = None,
+        with_total: bool = False,
+        fields: List[str] = None
     ) -> Dict[str, Any]:
-        """获取库存列表"""
+        """
+        获取库存列表
+        cursor 不为None时使用游标分页（按创建时间倒序），with_total 控制是否统计总数
+        fields 指定时只查询并返回这些列（主键总是包含）
+        """
+        query = self._inventory_list_query(
+            warehouse_id, inventory_status, quality_status, below_safety_stock, expired_only
+        )
+
+        if fields:
+            # 游标分页需要从结果中读取排序键
+            query = fields_query(query, Inventory, fields + ['created_at'] if cursor is not None else fields)
+            serialize = summary_rows
+        else:
+            serialize = lambda inventories: [inventory.to_dict() for inventory in inventories]
+
+        if cursor is not None:
+            result = keyset_paginate(
+                query, (Inventory.created_at, Inventory.id),
+                cursor=cursor, page_size=page_size, with_total=with_total,
+                count_name='inventories'
+            )
+            result['items'] = serialize(result['items'])
+            result['page_size'] = page_size
+            return result
+
+        total, total_estimated = count_total(query, 'inventories')
+        
+        inventories = query.offset((page - 1) * page_size).limit(page_size).all()
+        
+        return {
+            'items': serialize(inventories),
+            'total': total,
+            'total_estimated': total_estimated,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size
+        }
+    
+    def _inventory_list_query(
+        self,
+        warehouse_id: str = None,
+        inventory_status: str = None,
+        quality_status: str = None,
+        below_safety_stock: bool = False,
+        expired_only: bool = False
+    ):
+        """库存列表和导出共用的过滤条件"""
         query = self.get_session().query(Inventory).filter(Inventory.is_active == True)
         
         if warehouse_id:
@@ -123,32 +154,47 @@ class InventoryService(TenantAwareService):
                     Inventory.expiry_date <= datetime.now()
                 )
             )
+        return query
+    
+    def export_inventories(self, **filters):
+        """
+        库存导出查询（列投影，按创建时间倒序），过滤条件同 get_inventory_list
+        :return: 返回Row的查询，由调用方流式迭代
+        """
+        return export_query(self._inventory_list_query(**filters), Inventory).order_by(
+            Inventory.created_at.desc(), Inventory.id.desc()
+        )
+    
+    @read_only
+    def get_inventory_summary_by_warehouse(self, warehouse_id: str) -> Dict[str, Any]:
+        """获取仓库库存汇总（读取仓库库存汇总表，见 app.utils.inventory_stats）"""
+        if not stats_enabled():
+            return self._summarize_inventories(warehouse_id)
+
+        stats = self.get_session().query(WarehouseInventoryStats).filter(
+            WarehouseInventoryStats.warehouse_id == warehouse_id
+        ).first()
+        if not stats:
+            return {'total_items': 0, 'total_quantity': 0.0, 'total_value': 0.0, 'below_safety_stock_items': 0}
 
-        total = query.count()
-        
-        inventories = query.offset((page - 1) * page_size).limit(page_size).all()
-        
         return {
-            'items': [inventory.to_dict() for inventory in inventories],
-            'total': total,
-            'page': page,
-            'page_size': page_size,
-            'pages': (total + page_size - 1) // page_size
+            'total_items': stats.total_items,
+            'total_quantity': float(stats.total_quantity),
+            'total_value': float(stats.total_value),
+            'below_safety_stock_items': stats.below_safety_stock_items
         }
-    
-    def get_inventory_summary_by_warehouse(self, warehouse_id: str) -> Dict[str, Any]:
-        """获取仓库库存汇总"""
-        result = self.get_session().query(
+
+    def _summarize_inventories(self, warehouse_id: str = None) -> Dict[str, Any]:
+        """按库存表聚合仓库库存汇总（未维护汇总表时使用）"""
+        query = self.get_session().query(
             func.count(Inventory.id).label('total_items'),
             func.sum(Inventory.current_quantity).label('total_quantity'),
             func.sum(Inventory.total_cost).label('total_value'),
             func.count().filter(Inventory.current_quantity <= Inventory.safety_stock).label('below_safety_stock_items')
-        ).filter(
-            and_(
-                Inventory.warehouse_id == warehouse_id,
-                Inventory.is_active == True
-            )
-        ).first()
+        ).filter(Inventory.is_active == True)
+        if warehouse_id:
+            query = query.filter(Inventory.warehouse_id == warehouse_id)
+        result = query.first()
         
         return {
             'total_items': result.total_items or 0,
@@ -195,52 +241,36 @@ class InventoryService(TenantAwareService):
         notes: str = None,
         unit_price: Decimal = None,
         **kwargs
-    ) -> InventoryTransaction:
-        """更新库存数量并创建流水记录"""
-        
-        inventory = self.get_inventory_by_id(inventory_id)
-        if not inventory:
+    ) -> Optional[InventoryTransaction]:
+        """
+        更新库存数量并创建流水记录
+        数量变动为0时不过账、不产生流水，校验库存存在后返回None
+        """
+        if not quantity_change:
+            if not self.get_inventory_by_id(inventory_id):
+                raise ValueError(f"库存记录不存在: {inventory_id}")
+            return None
+        
+        report = InventoryPostingEngine(self.get_session(), self.schema_name).post([
+            PostingLine(
+                quantity_change, transaction_type,
+                inventory_id=inventory_id,
+                transaction={
+                    'unit_price': unit_price,
+                    'source_document_type': source_document_type,
+                    'source_document_id': source_document_id,
+                    'source_document_number': source_document_number,
+                    'reason': reason,
+                    'notes': notes,
+                    **kwargs
+                }
+            )
+        ], updated_by)
+        if not report.transactions:
             raise ValueError(f"库存记录不存在: {inventory_id}")
         
-        # 检查库存是否足够（出库操作）
-        if quantity_change < 0 and inventory.available_quantity < abs(quantity_change):
-            raise ValueError("可用库存不足")
-        
-        # 记录变动前数量
-        quantity_before = inventory.current_quantity
-        
-        # 更新库存数量
-        inventory.update_quantity(quantity_change, transaction_type, updated_by)
-        
-        # 重新计算总成本
-        inventory.calculate_total_cost()
-        
-        # 创建库存流水记录
-        transaction = InventoryTransaction(
-            inventory_id=inventory.id,
-            warehouse_id=inventory.warehouse_id,
-            product_id=inventory.product_id,
-            material_id=inventory.material_id,
-            transaction_type=transaction_type,
-            quantity_change=quantity_change,
-            quantity_before=quantity_before,
-            quantity_after=inventory.current_quantity,
-            unit_id=inventory.unit_id,
-            unit_price=unit_price,
-            source_document_type=source_document_type,
-            source_document_id=source_document_id,
-            source_document_number=source_document_number,
-            reason=reason,
-            notes=notes,
-            created_by=updated_by,
-            **kwargs
-        )
-        
-        # 计算总金额
-        transaction.calculate_total_amount()
-        
         self.commit()
-        return transaction
+        return report.transactions[0]
     
     def reserve_inventory(
         self,
@@ -327,64 +357,54 @@ class InventoryService(TenantAwareService):
         if not from_inventory:
             raise ValueError(f"源库存记录不存在: {from_inventory_id}")
         
-        if from_inventory.available_quantity < quantity:
-            raise ValueError("源库存数量不足")
-        
-        # 查找或创建目标库存记录
-        to_inventory = self.get_inventory_by_warehouse_and_item(
-            warehouse_id=to_warehouse_id,
-            product_id=from_inventory.product_id,
-            material_id=from_inventory.material_id,
-            batch_number=from_inventory.batch_number,
-            location_code=to_location_code
-        )
-        
-        if not to_inventory:
-            # 创建新的库存记录
-            to_inventory = self.create_inventory(
-                warehouse_id=to_warehouse_id,
-                product_id=from_inventory.product_id,
-                material_id=from_inventory.material_id,
-                unit_id=from_inventory.unit_id,
-                batch_number=from_inventory.batch_number,
-                location_code=to_location_code,
-                unit_cost=from_inventory.unit_cost,
-                inventory_status=from_inventory.inventory_status,
-                quality_status=from_inventory.quality_status,
-                created_by=transferred_by,
-                current_quantity=0,
-                available_quantity=0
-            )
+        # 目标库存按 仓库+物品 [+批次] [+库位] 定位，不存在时创建
+        to_key = {
+            'warehouse_id': to_warehouse_id,
+            'product_id': from_inventory.product_id,
+            'material_id': from_inventory.material_id,
+            'batch_number': from_inventory.batch_number,
+            'location_code': to_location_code
+        }
+        to_key = {column: value for column, value in to_key.items() if value}
         
         # 生成调拨单号
         transfer_number = f"TF{datetime.now().strftime('%Y%m%d%H%M%S')}"
         
-        # 创建出库流水
-        out_transaction = self.update_inventory_quantity(
-            inventory_id=from_inventory.id,
-            quantity_change=-quantity,
-            transaction_type='transfer_out',
-            updated_by=transferred_by,
-            source_document_type='transfer_order',
-            source_document_number=transfer_number,
-            reason=reason or '库存调拨出库',
-            notes=notes,
-            to_location=to_location_code
-        )
-        
-        # 创建入库流水
-        in_transaction = self.update_inventory_quantity(
-            inventory_id=to_inventory.id,
-            quantity_change=quantity,
-            transaction_type='transfer_in',
-            updated_by=transferred_by,
-            source_document_type='transfer_order',
-            source_document_number=transfer_number,
-            reason=reason or '库存调拨入库',
-            notes=notes,
-            from_location=from_inventory.location_code
-        )
+        # 出库、入库在同一次过账中锁定两端库存
+        report = InventoryPostingEngine(self.get_session(), self.schema_name).post([
+            PostingLine(
+                -quantity, 'transfer_out',
+                inventory_id=from_inventory.id,
+                label='源库存',
+                transaction={
+                    'source_document_type': 'transfer_order',
+                    'source_document_number': transfer_number,
+                    'reason': reason or '库存调拨出库',
+                    'notes': notes,
+                    'to_location': to_location_code
+                }
+            ),
+            PostingLine(
+                quantity, 'transfer_in',
+                create={
+                    'unit_id': from_inventory.unit_id,
+                    'unit_cost': from_inventory.unit_cost,
+                    'inventory_status': from_inventory.inventory_status,
+                    'quality_status': from_inventory.quality_status
+                },
+                transaction={
+                    'source_document_type': 'transfer_order',
+                    'source_document_number': transfer_number,
+                    'reason': reason or '库存调拨入库',
+                    'notes': notes,
+                    'from_location': from_inventory.location_code
+                },
+                **to_key
+            )
+        ], transferred_by)
+        self.commit()
         
+        out_transaction, in_transaction = report.transactions
         return out_transaction, in_transaction
     
     # ================ 盘点管理方法 ================
@@ -536,6 +556,7 @@ class InventoryService(TenantAwareService):
     
     # ================ 报表统计方法 ================
     
+    @read_only
     def get_inventory_aging_report(
         self,
         warehouse_id: str = None,
@@ -585,6 +606,7 @@ class InventoryService(TenantAwareService):
         
         return aging_data
     
+    @read_only
     def get_inventory_turnover_report(
         self,
         warehouse_id: str = None,
@@ -639,6 +661,7 @@ class InventoryService(TenantAwareService):
     
     # ================ 库存预警方法 ================
     
+    @read_only
     def get_low_stock_alerts(self, warehouse_id: str = None) -> List[Dict[str, Any]]:
         """获取低库存预警"""
         query = self.get_session().query(Inventory).filter(
@@ -669,6 +692,7 @@ class InventoryService(TenantAwareService):
         
         return alerts
     
+    @read_only
     def get_expiring_inventory_alerts(
         self, 
         warehouse_id: str = None, 
@@ -741,6 +765,7 @@ class InventoryService(TenantAwareService):
             'reserved_quantity': float(reserved_quantity)
         }
     
+    @read_only
     def get_inventory_transactions(
         self,
         inventory_id: str = None,
@@ -749,9 +774,48 @@ class InventoryService(TenantAwareService):
         start_date: datetime = None,
         end_date: datetime = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        cursor: str = None,
+        with_total: bool = False
     ) -> Dict[str, Any]:
-        """获取库存流水记录"""
+        """
+        获取库存流水记录
+        cursor 不为None时使用游标分页（按交易时间倒序），with_total 控制是否统计总数
+        """
+        query = self._inventory_transactions_query(inventory_id, warehouse_id, transaction_type, start_date, end_date)
+        
+        if cursor is not None:
+            result = keyset_paginate(
+                query, (InventoryTransaction.transaction_date, InventoryTransaction.id),
+                cursor=cursor, page_size=page_size, with_total=with_total,
+                count_name='inventory_transactions'
+            )
+            result['items'] = [t.to_dict() for t in result['items']]
+            result['page_size'] = page_size
+            return result
+        
+        total, total_estimated = count_total(query, 'inventory_transactions')
+        
+        transactions = query.order_by(InventoryTransaction.transaction_date.desc()).offset((page - 1) * page_size).limit(page_size).all()
+        
+        return {
+            'items': [t.to_dict() for t in transactions],
+            'total': total,
+            'total_estimated': total_estimated,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size
+        }
+
+    def _inventory_transactions_query(
+        self,
+        inventory_id: str = None,
+        warehouse_id: str = None,
+        transaction_type: str = None,
+        start_date: datetime = None,
+        end_date: datetime = None
+    ):
+        """库存流水列表和导出共用的过滤条件"""
         query = self.get_session().query(InventoryTransaction)
         
         if inventory_id:
@@ -768,18 +832,16 @@ class InventoryService(TenantAwareService):
         
         if end_date:
             query = query.filter(InventoryTransaction.transaction_date <= end_date)
-        
-        total = query.count()
-        
-        transactions = query.order_by(InventoryTransaction.transaction_date.desc()).offset((page - 1) * page_size).limit(page_size).all()
-        
-        return {
-            'items': [t.to_dict() for t in transactions],
-            'total': total,
-            'page': page,
-            'page_size': page_size,
-            'pages': (total + page_size - 1) // page_size
-        }
+        return query
+    
+    def export_inventory_transactions(self, **filters):
+        """
+        库存流水导出查询（列投影，按交易时间倒序），过滤条件同 get_inventory_transactions
+        :return: 返回Row的查询，由调用方流式迭代
+        """
+        return export_query(self._inventory_transactions_query(**filters), InventoryTransaction).order_by(
+            InventoryTransaction.transaction_date.desc(), InventoryTransaction.id.desc()
+        )
 
     def release_reserved_inventory(
         self,
@@ -820,51 +882,121 @@ class InventoryService(TenantAwareService):
         self.commit()
         return True
 
+    @read_only
     def get_inventory_statistics(
         self,
         warehouse_id: str = None,
         start_date: datetime = None,
         end_date: datetime = None
     ) -> Dict[str, Any]:
-        """获取库存统计信息"""
+        """
+        获取库存统计信息
+        读取仓库库存汇总表；出入库条数统计交易时间在起止时间之间的流水，
+        中间的整天读取每日出入库统计表，起止日期当天按流水表精确统计
+        """
         if not start_date:
             start_date = datetime.now() - timedelta(days=30)
         if not end_date:
             end_date = datetime.now()
         
-        # 基础库存统计
-        inventory_query = self.get_session().query(Inventory).filter(Inventory.is_active == True)
-        if warehouse_id:
-            inventory_query = inventory_query.filter(Inventory.warehouse_id == warehouse_id)
-        
-        total_items = inventory_query.count()
-        total_value = inventory_query.with_entities(func.sum(Inventory.total_cost)).scalar() or 0
+        if not stats_enabled():
+            return self._aggregate_inventory_statistics(warehouse_id, start_date, end_date)
         
-        # 库存流水统计
-        transaction_query = self.get_session().query(InventoryTransaction).filter(
-            InventoryTransaction.transaction_date.between(start_date, end_date)
+        # 库存汇总：指定仓库时为一行，否则按仓库行求和
+        stats_query = self.get_session().query(
+            func.sum(WarehouseInventoryStats.total_items),
+            func.sum(WarehouseInventoryStats.total_value),
+            func.sum(WarehouseInventoryStats.below_safety_stock_items)
         )
         if warehouse_id:
-            transaction_query = transaction_query.filter(InventoryTransaction.warehouse_id == warehouse_id)
-        
-        in_transactions = transaction_query.filter(InventoryTransaction.transaction_type.in_(['in', 'purchase_in', 'production_in'])).count()
-        out_transactions = transaction_query.filter(InventoryTransaction.transaction_type.in_(['out', 'sales_out', 'production_out'])).count()
+            stats_query = stats_query.filter(WarehouseInventoryStats.warehouse_id == warehouse_id)
+        total_items, total_value, low_stock_count = stats_query.one()
+        
+        start_day, end_day = start_date.date(), end_date.date()
+        if start_day >= end_day:
+            in_transactions, out_transactions = self._count_transactions(warehouse_id, start_date, end_date)
+        else:
+            counts = [
+                self._count_transactions(
+                    warehouse_id, start_date, datetime.combine(start_day + timedelta(days=1), time.min),
+                    include_end=False
+                ),
+                self._count_transactions(warehouse_id, datetime.combine(end_day, time.min), end_date)
+            ]
+            if (end_day - start_day).days > 1:
+                movements_query = self.get_session().query(
+                    func.sum(WarehouseInventoryDailyStats.in_transactions),
+                    func.sum(WarehouseInventoryDailyStats.out_transactions)
+                ).filter(
+                    WarehouseInventoryDailyStats.stat_date > start_day,
+                    WarehouseInventoryDailyStats.stat_date < end_day
+                )
+                if warehouse_id:
+                    movements_query = movements_query.filter(WarehouseInventoryDailyStats.warehouse_id == warehouse_id)
+                counts.append(movements_query.one())
+            in_transactions = sum(int(in_count or 0) for in_count, _ in counts)
+            out_transactions = sum(int(out_count or 0) for _, out_count in counts)
         
-        # 低库存预警数
-        low_stock_count = inventory_query.filter(Inventory.current_quantity <= Inventory.safety_stock).count()
+        return {
+            'total_items': int(total_items or 0),
+            'total_value': float(total_value or 0),
+            'in_transactions': in_transactions,
+            'out_transactions': out_transactions,
+            'low_stock_count': int(low_stock_count or 0),
+            'period_start': start_date.isoformat(),
+            'period_end': end_date.isoformat()
+        }
+
+    def _aggregate_inventory_statistics(
+        self,
+        warehouse_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, Any]:
+        """按库存表和流水表聚合库存统计（未维护汇总表时使用）"""
+        summary = self._summarize_inventories(warehouse_id)
+        in_transactions, out_transactions = self._count_transactions(warehouse_id, start_date, end_date)
         
         return {
-            'total_items': total_items,
-            'total_value': float(total_value),
+            'total_items': summary['total_items'],
+            'total_value': summary['total_value'],
             'in_transactions': in_transactions,
             'out_transactions': out_transactions,
-            'low_stock_count': low_stock_count,
+            'low_stock_count': summary['below_safety_stock_items'],
             'period_start': start_date.isoformat(),
             'period_end': end_date.isoformat()
         }
     
+    def _count_transactions(
+        self,
+        warehouse_id: str,
+        start_date: datetime,
+        end_date: datetime,
+        include_end: bool = True
+    ):
+        """
+        按流水表统计时间范围内的入库、出库流水条数
+        :param include_end: 是否包含结束时间
+        :return: (入库条数, 出库条数)
+        """
+        transaction_type = InventoryTransaction.transaction_type
+        transaction_date = InventoryTransaction.transaction_date
+        query = self.get_session().query(
+            func.count().filter(transaction_type.in_(IN_TRANSACTION_TYPES)),
+            func.count().filter(transaction_type.in_(OUT_TRANSACTION_TYPES))
+        ).filter(
+            transaction_date >= start_date,
+            transaction_date <= end_date if include_end else transaction_date < end_date,
+            transaction_type.in_(IN_TRANSACTION_TYPES + OUT_TRANSACTION_TYPES)
+        )
+        if warehouse_id:
+            query = query.filter(InventoryTransaction.warehouse_id == warehouse_id)
+        in_count, out_count = query.one()
+        return int(in_count or 0), int(out_count or 0)
+    
     # ================ 入库单管理方法 ================
     
+    @read_only
     def get_inbound_order_list(
         self,
         warehouse_id: str = None,
@@ -910,17 +1042,18 @@ class InventoryService(TenantAwareService):
                 )
             query = query.filter(search_filter)
         
-        total = query.count()
+        total, total_estimated = count_total(query, 'inbound_orders')
         orders = query.order_by(InboundOrder.created_at.desc()).offset(
             (page - 1) * page_size
         ).limit(page_size).all()
         
         # 批量获取仓库信息并填充仓库名称
-        self._fill_warehouse_info(orders)
+        fill_warehouse_names(orders)
         
         return {
             'items': [order.to_dict() for order in orders],
             'total': total,
+            'total_estimated': total_estimated,
             'page': page,
             'page_size': page_size,
             'pages': (total + page_size - 1) // page_size
@@ -935,7 +1068,7 @@ class InventoryService(TenantAwareService):
         ).filter(InboundOrder.id == order_id).first()
         if order:
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
         return order
     
     def get_inbound_order_details(self, order_id: str) -> List[Dict[str, Any]]:
@@ -974,7 +1107,7 @@ class InventoryService(TenantAwareService):
         self.commit()
         
         # 填充仓库信息
-        self._fill_warehouse_info([inbound_order])
+        fill_warehouse_names([inbound_order])
         
         return inbound_order
     
@@ -1120,6 +1253,7 @@ class InventoryService(TenantAwareService):
         self.commit()
         return inbound_order
     
+    @track_posting('inbound')
     def execute_inbound_order(
         self,
         order_id: str,
@@ -1127,7 +1261,8 @@ class InventoryService(TenantAwareService):
         auto_create_inventory: bool = True
     ) -> List[InventoryTransaction]:
         """执行入库单 - 创建库存流水并更新库存"""
-        inbound_order = self.get_inbound_order_by_id(order_id)
+        engine = InventoryPostingEngine(self.get_session(), self.schema_name)
+        inbound_order = engine.lock_document(InboundOrder, order_id)
         if not inbound_order:
             raise ValueError(f"入库单不存在: {order_id}")
         
@@ -1140,67 +1275,43 @@ class InventoryService(TenantAwareService):
         if not inbound_order.details:
             raise ValueError("入库单没有明细，无法执行")
         
-        transactions = []
-        
         try:
-            # 更新入库单状态
-            inbound_order.status = 'in_progress'
-            self.commit()
-            
-            for detail in inbound_order.details:
-                # 查找或创建库存记录
-                inventory = self.get_inventory_by_warehouse_and_item(
+            # 库存和入库单状态在同一事务中提交，失败时整体回滚
+            report = engine.post([
+                PostingLine(
+                    detail.inbound_quantity, 'in',
                     warehouse_id=inbound_order.warehouse_id,
                     product_id=detail.product_id,
                     batch_number=detail.batch_number,
-                    location_code=detail.actual_location_code or detail.location_code
+                    location_code=detail.actual_location_code or detail.location_code,
+                    label=f"产品{detail.product_name}",
+                    create={
+                        'unit_id': detail.unit_id,
+                        'unit_cost': detail.unit_cost
+                    } if auto_create_inventory else None,
+                    unit_cost=detail.unit_cost,
+                    transaction={
+                        'unit_price': detail.unit_cost,
+                        'source_document_type': 'inbound_order',
+                        'source_document_id': inbound_order.id,
+                        'source_document_number': inbound_order.order_number,
+                        'reason': f'入库单入库: {inbound_order.order_number}',
+                        'batch_number': detail.batch_number,
+                        'to_location': detail.actual_location_code or detail.location_code
+                    }
                 )
-                
-                if not inventory and auto_create_inventory:
-                    # 创建新的库存记录
-                    inventory = self.create_inventory(
-                        warehouse_id=inbound_order.warehouse_id,
-                        product_id=detail.product_id,
-                        unit_id=detail.unit_id,
-                        batch_number=detail.batch_number,
-                        location_code=detail.actual_location_code or detail.location_code,
-                        unit_cost=detail.unit_cost,
-                        created_by=executed_by,
-                        current_quantity=0,
-                        available_quantity=0
-                    )
-                
-                if not inventory:
-                    raise ValueError(f"找不到对应的库存记录: 产品{detail.product_name}")
-                
-                # 创建入库流水
-                transaction = self.update_inventory_quantity(
-                    inventory_id=inventory.id,
-                    quantity_change=detail.inbound_quantity,
-                    transaction_type='in',
-                    updated_by=executed_by,
-                    source_document_type='inbound_order',
-                    source_document_id=inbound_order.id,
-                    source_document_number=inbound_order.order_number,
-                    unit_price=detail.unit_cost,
-                    reason=f'入库单入库: {inbound_order.order_number}',
-                    batch_number=detail.batch_number,
-                    to_location=detail.actual_location_code or detail.location_code
-                )
-                
-                transactions.append(transaction)
+                for detail in inbound_order.details
+            ], executed_by)
             
             # 更新入库单状态为已完成
             inbound_order.status = 'completed'
             self.commit()
             
-            return transactions
+            return report.transactions
             
-        except Exception as e:
-            # 回滚状态
-            inbound_order.status = 'confirmed'
-            self.commit()
-            raise e
+        except Exception:
+            self.rollback()
+            raise
     
     def cancel_inbound_order(
         self,
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+库存期末快照
+
+查询历史某天的库存不再回放全部库存流水：
+- create_snapshots 按周期（日/月，配置 INVENTORY_SNAPSHOT_PERIOD）写入每个库存行的期末结存，
+  从最近一期快照开始逐期生成，每期一条 INSERT ... SELECT：上期快照 + 本期流水变动之和。
+  没有上期快照的库存行（首次生成、新建的库存）按 当前数量 - 期末之后的流水变动 倒推
+- get_inventory_as_of 以最近的快照（或当前库存）为基准，只累加两者之间的剩余流水。
+  基准日期之前、之后的快照都可以使用，取剩余流水时间跨度最小的一个
+
+期末数量为 0 且本期没有流水的库存行不写快照，查询时按 0 处理。
+预留/取消预留流水不改变库存数量，不参与计算；流水按交易时间归期，补录到已生成周期的流水
+需要用 since 参数重新生成该周期之后的快照。
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any
+
+from flask import current_app, has_app_context
+from sqlalchemy import and_, or_, func, select, case, literal
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.business.inventory import Inventory, InventoryTransaction, InventorySnapshot
+from app.services.base_service import TenantAwareService
+from app.utils.read_replica import read_only
+from app.utils.reference_resolver import fill_references, fill_warehouse_names
+
+# 支持的快照周期
+SNAPSHOT_PERIOD_TYPES = ('daily', 'monthly')
+# 不改变库存数量的流水类型
+NON_STOCK_TRANSACTION_TYPES = ('reserve', 'unreserve')
+
+
+def period_end_of(day: date, period_type: str) -> date:
+    """
+    日期所在周期的最后一天
+    :param day: 日期
+    :param period_type: daily/monthly
+    :return: 周期最后一天
+    """
+    if period_type == 'daily':
+        return day
+    return day.replace(day=calendar.monthrange(day.year, day.month)[1])
+
+
+def previous_period_end(period_end: date, period_type: str) -> date:
+    """上一周期的最后一天"""
+    if period_type == 'daily':
+        return period_end - timedelta(days=1)
+    return period_end.replace(day=1) - timedelta(days=1)
+
+
+def next_period_end(period_end: date, period_type: str) -> date:
+    """下一周期的最后一天"""
+    return period_end_of(period_end + timedelta(days=1), period_type)
+
+
+def last_closed_period_end(today: date, period_type: str) -> date:
+    """已结束的最近一个周期的最后一天（不含今天所在的周期）"""
+    return previous_period_end(period_end_of(today, period_type), period_type)
+
+
+def _day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+def _stock_changes(start: Optional[datetime], end: Optional[datetime], filters=()):
+    """时间区间 [start, end) 内每个库存行的数量变动之和与流水条数"""
+    transactions = InventoryTransaction.__table__
+    conditions = [transactions.c.transaction_type.not_in(NON_STOCK_TRANSACTION_TYPES), *filters]
+    if start is not None:
+        conditions.append(transactions.c.transaction_date >= start)
+    if end is not None:
+        conditions.append(transactions.c.transaction_date < end)
+    return select(
+        transactions.c.inventory_id,
+        func.sum(transactions.c.quantity_change).label('change'),
+        func.count().label('transaction_count')
+    ).where(*conditions).group_by(transactions.c.inventory_id)
+
+
+class InventorySnapshotService(TenantAwareService):
+    """
+    库存期末快照服务类
+    提供快照生成和历史库存查询
+    """
+
+    def __init__(self, tenant_id: Optional[str] = None, schema_name: Optional[str] = None):
+        super().__init__(tenant_id, schema_name, strict_tenant_check=True)
+
+    def _period_type(self, period_type: Optional[str]) -> str:
+        if not period_type:
+            period_type = current_app.config.get('INVENTORY_SNAPSHOT_PERIOD', 'monthly') if has_app_context() else 'monthly'
+        if period_type not in SNAPSHOT_PERIOD_TYPES:
+            raise ValueError(f"不支持的快照周期: {period_type}")
+        return period_type
+
+    def _latest_period_end(self, period_type: str, before: Optional[date] = None) -> Optional[date]:
+        query = self.get_session().query(func.max(InventorySnapshot.period_end)).filter(
+            InventorySnapshot.period_type == period_type
+        )
+        if before is not None:
+            query = query.filter(InventorySnapshot.period_end < before)
+        return query.scalar()
+
+    # ================ 快照生成 ================
+
+    def _write_period(self, period_type: str, period_end: date) -> int:
+        """
+        生成一个周期的快照
+        :return: 写入的快照行数
+        """
+        inventories = Inventory.__table__
+        snapshots = InventorySnapshot.__table__
+        transactions = InventoryTransaction.__table__
+
+        period_start = _day_start(previous_period_end(period_end, period_type) + timedelta(days=1))
+        period_close = _day_start(period_end + timedelta(days=1))
+
+        previous = snapshots.alias('previous')
+        changes = _stock_changes(period_start, period_close).subquery('changes')
+        # 没有上期快照时倒推：当前数量 - 期末之后的变动
+        later_changes = select(func.coalesce(func.sum(transactions.c.quantity_change), 0)).where(
+            transactions.c.inventory_id == inventories.c.id,
+            transactions.c.transaction_type.not_in(NON_STOCK_TRANSACTION_TYPES),
+            transactions.c.transaction_date >= period_close
+        ).scalar_subquery()
+
+        closing = select(
+            inventories.c.id.label('inventory_id'),
+            inventories.c.warehouse_id,
+            inventories.c.product_id,
+            inventories.c.material_id,
+            case(
+                (previous.c.id.is_not(None), previous.c.quantity + func.coalesce(changes.c.change, 0)),
+                else_=inventories.c.current_quantity - later_changes
+            ).label('quantity'),
+            func.coalesce(changes.c.transaction_count, 0).label('transaction_count')
+        ).select_from(
+            inventories.outerjoin(previous, and_(
+                previous.c.inventory_id == inventories.c.id,
+                previous.c.period_type == period_type,
+                previous.c.period_end == previous_period_end(period_end, period_type)
+            )).outerjoin(changes, changes.c.inventory_id == inventories.c.id)
+        ).where(inventories.c.created_at < period_close).subquery('closing')
+
+        statement = insert(snapshots).from_select(
+            ['id', 'inventory_id', 'warehouse_id', 'product_id', 'material_id', 'period_type', 'period_end',
+             'quantity', 'transaction_count', 'created_at', 'updated_at'],
+            select(
+                func.gen_random_uuid(), closing.c.inventory_id, closing.c.warehouse_id, closing.c.product_id,
+                closing.c.material_id, literal(period_type), literal(period_end), closing.c.quantity,
+                closing.c.transaction_count, func.now(), func.now()
+            ).where(or_(closing.c.quantity != 0, closing.c.transaction_count > 0))
+        )
+        statement = statement.on_conflict_do_update(
+            constraint='uq_inventory_snapshots_period',
+            set_={
+                'quantity': statement.excluded.quantity,
+                'transaction_count': statement.excluded.transaction_count,
+                'updated_at': func.now()
+            }
+        )
+        return self.get_session().execute(statement).rowcount
+
+    def create_snapshots(
+        self,
+        period_type: Optional[str] = None,
+        up_to: Optional[date] = None,
+        since: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        生成库存期末快照，从最近一期快照的下一周期生成到已结束的最近一个周期，每个周期单独提交
+        :param period_type: daily/monthly，为空时使用配置 INVENTORY_SNAPSHOT_PERIOD
+        :param up_to: 最多生成到该日期所在（已结束）的周期，为空时生成到上一个周期
+        :param since: 从该日期所在的周期开始重新生成（删除该周期及之后的快照），用于补录流水后修正
+        :return: [{'period_end': 周期最后一天, 'rows': 写入行数}]
+        """
+        period_type = self._period_type(period_type)
+        session = self.get_session()
+
+        last = last_closed_period_end(date.today(), period_type)
+        if up_to is not None:
+            up_to_end = period_end_of(up_to, period_type)
+            last = min(last, up_to_end if up_to_end <= up_to else previous_period_end(up_to_end, period_type))
+
+        if since is not None:
+            start = period_end_of(since, period_type)
+            session.query(InventorySnapshot).filter(
+                InventorySnapshot.period_type == period_type,
+                InventorySnapshot.period_end >= start
+            ).delete(synchronize_session=False)
+            latest = self._latest_period_end(period_type, before=start)
+        else:
+            start = last
+            latest = self._latest_period_end(period_type)
+
+        # 没有历史快照时只生成一期（倒推），更早的日期由该快照倒推查询
+        period_end = next_period_end(latest, period_type) if latest else min(start, last)
+
+        results = []
+        try:
+            while period_end <= last:
+                rows = self._write_period(period_type, period_end)
+                self.commit()
+                results.append({'period_end': period_end.isoformat(), 'rows': rows})
+                period_end = next_period_end(period_end, period_type)
+            self.commit()
+        except Exception:
+            self.rollback()
+            raise
+        return results
+
+    # ================ 历史库存查询 ================
+
+    def _choose_base(self, period_type: str, as_of_date: date):
+        """
+        选择剩余流水时间跨度最小的基准
+        :return: (基准快照的周期最后一天或None表示当前库存, 方向 1 向后累加 / -1 向前倒推)
+        """
+        session = self.get_session()
+        before = session.query(func.max(InventorySnapshot.period_end)).filter(
+            InventorySnapshot.period_type == period_type,
+            InventorySnapshot.period_end <= as_of_date
+        ).scalar()
+        after = session.query(func.min(InventorySnapshot.period_end)).filter(
+            InventorySnapshot.period_type == period_type,
+            InventorySnapshot.period_end > as_of_date
+        ).scalar()
+
+        candidates = [((date.today() - as_of_date).days, None, -1)]
+        if before is not None:
+            candidates.append(((as_of_date - before).days, before, 1))
+        if after is not None:
+            candidates.append(((after - as_of_date).days, after, -1))
+        _, base, direction = min(candidates, key=lambda candidate: candidate[0])
+        return base, direction
+
+    @read_only
+    def get_inventory_as_of(
+        self,
+        as_of_date: date,
+        warehouse_id: str = None,
+        product_id: str = None,
+        material_id: str = None,
+        period_type: Optional[str] = None,
+        include_zero: bool = False
+    ) -> Dict[str, Any]:
+        """
+        查询某天结束时的库存
+        :param as_of_date: 日期（datetime 取日期部分）
+        :param warehouse_id: 仓库ID
+        :param product_id: 产品ID
+        :param material_id: 材料ID
+        :param period_type: 使用的快照周期，为空时使用配置 INVENTORY_SNAPSHOT_PERIOD
+        :param include_zero: 是否包含数量为0的库存行
+        :return: {'as_of_date', 'base', 'items', 'total_items', 'total_quantity'}
+        """
+        if isinstance(as_of_date, datetime):
+            as_of_date = as_of_date.date()
+        period_type = self._period_type(period_type)
+        base, direction = self._choose_base(period_type, as_of_date)
+
+        inventories = Inventory.__table__
+        snapshots = InventorySnapshot.__table__
+        transactions = InventoryTransaction.__table__
+        as_of_close = _day_start(as_of_date + timedelta(days=1))
+
+        inventory_filters = [inventories.c.created_at < as_of_close]
+        transaction_filters = []
+        for column, value in (('warehouse_id', warehouse_id), ('product_id', product_id), ('material_id', material_id)):
+            if value:
+                inventory_filters.append(inventories.c[column] == value)
+                transaction_filters.append(transactions.c[column] == value)
+
+        if base is None:
+            residual = _stock_changes(as_of_close, None, transaction_filters).subquery('residual')
+            opening = inventories.c.current_quantity
+            source = inventories
+        else:
+            base_close = _day_start(base + timedelta(days=1))
+            if direction > 0:
+                residual = _stock_changes(base_close, as_of_close, transaction_filters)
+            else:
+                residual = _stock_changes(as_of_close, base_close, transaction_filters)
+            residual = residual.subquery('residual')
+            base_snapshot = snapshots.alias('base_snapshot')
+            opening = func.coalesce(base_snapshot.c.quantity, 0)
+            source = inventories.outerjoin(base_snapshot, and_(
+                base_snapshot.c.inventory_id == inventories.c.id,
+                base_snapshot.c.period_type == period_type,
+                base_snapshot.c.period_end == base
+            ))
+
+        quantity = (opening + direction * func.coalesce(residual.c.change, 0)).label('quantity')
+        statement = select(
+            inventories.c.id, inventories.c.warehouse_id, inventories.c.product_id, inventories.c.material_id,
+            inventories.c.batch_number, inventories.c.location_code, inventories.c.unit_id, quantity
+        ).select_from(
+            source.outerjoin(residual, residual.c.inventory_id == inventories.c.id)
+        ).where(*inventory_filters).order_by(inventories.c.warehouse_id, inventories.c.id)
+
+        items = []
+        for row in self.get_session().execute(statement):
+            if not include_zero and row.quantity == 0:
+                continue
+            items.append({
+                'inventory_id': str(row.id),
+                'warehouse_id': str(row.warehouse_id),
+                'warehouse_name': None,
+                'product_id': str(row.product_id) if row.product_id else None,
+                'material_id': str(row.material_id) if row.material_id else None,
+                'batch_number': row.batch_number,
+                'location_code': row.location_code,
+                'unit_id': str(row.unit_id) if row.unit_id else None,
+                'unit_name': None,
+                'quantity': float(row.quantity)
+            })
+        fill_warehouse_names(items, session=self.get_session())
+        fill_references(items, 'unit', 'unit_id', {'unit_name': 'unit_name'}, session=self.get_session())
+
+        return {
+            'as_of_date': as_of_date.isoformat(),
+            'base': {
+                'period_type': period_type,
+                'period_end': base.isoformat() if base else None,
+                'source': 'snapshot' if base else 'current'
+            },
+            'items': items,
+            'total_items': len(items),
+            'total_quantity': sum(item['quantity'] for item in items)
+        }
+
+
+# ================ 工厂函数 ================
+
+def get_inventory_snapshot_service(
+    tenant_id: Optional[str] = None,
+    schema_name: Optional[str] = None
+) -> InventorySnapshotService:
+    """获取库存快照服务实例"""
+    return InventorySnapshotService(tenant_id, schema_name)
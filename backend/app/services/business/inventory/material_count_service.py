@@ -12,8 +12,14 @@ from sqlalchemy import func, and_, or_, desc, text
 from decimal import Decimal
 from datetime import datetime, date
 from uuid import UUID
-from app.models.business.inventory import MaterialCountPlan, MaterialCountRecord, Inventory, InventoryTransaction
+from app.models.business.inventory import MaterialCountPlan, MaterialCountRecord, Inventory
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.read_replica import read_only
+from app.utils.list_count import count_total
+from app.utils.projection import VIEW_FULL, VIEW_SUMMARY, summary_page
+from app.utils.metrics import track_posting
+from app.utils.reference_resolver import fill_warehouse_names
 from flask import g, current_app
 import logging
 import uuid
@@ -57,38 +63,7 @@ class MaterialCountService(TenantAwareService):
         current_app.logger.warning(f"无法解析日期格式: {date_str}，使用当前时间")
         return datetime.now()
 
-    def _fill_warehouse_info(self, counts):
-        """批量填充盘点的仓库名称信息"""
-        if not counts:
-            return
-        
-        # 获取所有唯一的仓库ID
-        warehouse_ids = list(set([count.warehouse_id for count in counts if count.warehouse_id]))
-        
-        if not warehouse_ids:
-            return
-        
-        try:
-            # 查询仓库信息
-            from app.models.basic_data import Warehouse
-            warehouses = self.session.query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
-            warehouse_dict = {str(w.id): w.warehouse_name for w in warehouses}
-            warehouse_code_dict = {str(w.id): w.code for w in warehouses}
-            
-            # 填充仓库名称
-            for count in counts:
-                if count.warehouse_id and str(count.warehouse_id) in warehouse_dict:
-                    count.warehouse_name = warehouse_dict[str(count.warehouse_id)]
-                    count.warehouse_code = warehouse_code_dict[str(count.warehouse_id)]
-                elif not count.warehouse_name:
-                    count.warehouse_name = '未知仓库'
-        except Exception as e:
-            current_app.logger.warning(f"填充仓库信息失败: {e}")
-            # 失败时使用默认值
-            for count in counts:
-                if not count.warehouse_name:
-                    count.warehouse_name = '未知仓库'
-
+    @read_only
     def get_material_count_list(
         self,
         warehouse_id: str = None,
@@ -97,14 +72,15 @@ class MaterialCountService(TenantAwareService):
         end_date: str = None,
         search: str = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        view: str = VIEW_FULL
     ) -> Dict[str, Any]:
-        """获取材料盘点列表"""
+        """
+        获取材料盘点列表
+        view 为 summary 时只查询列表列和人员、部门名称
+        """
         from sqlalchemy.orm import joinedload
-        query = self.session.query(MaterialCountPlan).options(
-            joinedload(MaterialCountPlan.count_person),
-            joinedload(MaterialCountPlan.department)
-        )
+        query = self.session.query(MaterialCountPlan)
         
         if warehouse_id:
             query = query.filter(MaterialCountPlan.warehouse_id == warehouse_id)
@@ -135,17 +111,25 @@ class MaterialCountService(TenantAwareService):
             query = query.filter(search_filter)
         
         # 获取总数
-        total = query.count()
-        
-        # 分页查询
-        counts = query.order_by(MaterialCountPlan.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+        total, total_estimated = count_total(query, 'material_count_plans')
         
-        # 填充仓库信息
-        self._fill_warehouse_info(counts)
+        if view == VIEW_SUMMARY:
+            items = summary_page(query, MaterialCountPlan, MaterialCountPlan.created_at.desc(), page, page_size)
+        else:
+            # 分页查询
+            counts = query.options(
+                joinedload(MaterialCountPlan.count_person),
+                joinedload(MaterialCountPlan.department)
+            ).order_by(MaterialCountPlan.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+            
+            # 填充仓库信息
+            fill_warehouse_names(counts, with_code=True)
+            items = [count.to_dict() for count in counts]
         
         return {
-            'items': [count.to_dict() for count in counts],
+            'items': items,
             'total': total,
+            'total_estimated': total_estimated,
             'page': page,
             'page_size': page_size,
             'pages': (total + page_size - 1) // page_size
@@ -163,7 +147,7 @@ class MaterialCountService(TenantAwareService):
             return None
         
         # 填充仓库信息
-        self._fill_warehouse_info([count])
+        fill_warehouse_names([count], with_code=True)
         
         return count.to_dict()
 
@@ -236,7 +220,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -380,7 +364,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -451,7 +435,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -460,10 +444,12 @@ class MaterialCountService(TenantAwareService):
             current_app.logger.error(f"审核材料盘点失败: {str(e)}")
             raise ValueError(f"审核材料盘点失败: {str(e)}")
 
+    @track_posting('material_count')
     def execute_material_count(self, count_id: str, executed_by: str) -> Dict[str, Any]:
         """执行材料盘点（创建库存调整）"""
         try:
-            count = self.session.query(MaterialCountPlan).filter(MaterialCountPlan.id == count_id).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            count = engine.lock_document(MaterialCountPlan, count_id)
             
             if not count:
                 raise ValueError("盘点单不存在")
@@ -478,56 +464,44 @@ class MaterialCountService(TenantAwareService):
             except (TypeError):
                 executed_by_uuid = executed_by
             
-            # 获取盘点明细
-            details = self.session.query(MaterialCountRecord).filter(
+            # 获取有差异的盘点明细
+            details = [detail for detail in self.session.query(MaterialCountRecord).filter(
                 MaterialCountRecord.count_plan_id == count.id
-            ).all()
+            ).all() if detail.variance_quantity and detail.material_id]
+            
+            # 按差异调整库存，库存不存在的明细跳过
+            lines = [
+                PostingLine(
+                    detail.variance_quantity,
+                    'adjustment_in' if detail.variance_quantity > 0 else 'adjustment_out',
+                    warehouse_id=count.warehouse_id,
+                    material_id=detail.material_id,
+                    batch_number=detail.batch_number,
+                    required=False,
+                    check_available=False,
+                    updates={
+                        'last_count_date': datetime.now(),
+                        'last_count_quantity': detail.actual_quantity,
+                        'variance_quantity': detail.variance_quantity
+                    },
+                    transaction={
+                        'unit_id': detail.unit_id,
+                        'source_document_type': 'count_order',
+                        'source_document_id': count.id,
+                        'source_document_number': count.count_number,
+                        'reason': f'盘点调整 - {count.count_number}'
+                    }
+                )
+                for detail in details
+            ]
+            report = engine.post(lines, executed_by_uuid)
             
-            # 处理每个明细的库存调整
-            for detail in details:
-                if detail.variance_quantity and detail.variance_quantity != 0:
-                    # 查找对应的库存记录
-                    inventory = self.session.query(Inventory).filter(
-                        Inventory.warehouse_id == count.warehouse_id,
-                        Inventory.material_id == detail.material_id,
-                        Inventory.batch_number == detail.batch_number
-                    ).first()
-                    
-                    if inventory:
-                        # 更新库存数量
-                        old_quantity = inventory.current_quantity
-                        new_quantity = old_quantity + detail.variance_quantity
-                        
-                        inventory.current_quantity = new_quantity
-                        inventory.available_quantity = new_quantity
-                        inventory.last_count_date = datetime.now()
-                        inventory.last_count_quantity = detail.actual_quantity
-                        inventory.variance_quantity = detail.variance_quantity
-                        inventory.updated_by = executed_by_uuid
-                        
-                        # 创建库存流水记录
-                        transaction_data = {
-                            'inventory_id': inventory.id,
-                            'warehouse_id': count.warehouse_id,
-                            'material_id': detail.material_id,
-                            'transaction_type': 'adjustment_in' if detail.variance_quantity > 0 else 'adjustment_out',
-                            'quantity_change': detail.variance_quantity,
-                            'quantity_before': old_quantity,
-                            'quantity_after': new_quantity,
-                            'unit_id': detail.unit_id,
-                            'source_document_type': 'count_order',
-                            'source_document_id': count.id,
-                            'source_document_number': count.count_number,
-                            'reason': f'盘点调整 - {count.count_number}',
-                            'created_by': executed_by_uuid
-                        }
-                        
-                        self.create_with_tenant(InventoryTransaction, **transaction_data)
-                        
-                        # 更新明细状态
-                        detail.is_adjusted = True
-                        detail.status = 'adjusted'
-                        detail.updated_by = executed_by_uuid
+            # 更新明细状态
+            for detail, line in zip(details, lines):
+                if line not in report.skipped:
+                    detail.is_adjusted = True
+                    detail.status = 'adjusted'
+                    detail.updated_by = executed_by_uuid
             
             # 更新盘点单状态
             count.status = 'adjusted'
@@ -536,7 +510,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -574,7 +548,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -607,7 +581,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -640,7 +614,7 @@ class MaterialCountService(TenantAwareService):
             self.session.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([count])
+            fill_warehouse_names([count], with_code=True)
             
             return count.to_dict()
             
@@ -649,10 +623,12 @@ class MaterialCountService(TenantAwareService):
             current_app.logger.error(f"完成材料盘点失败: {str(e)}")
             raise ValueError(f"完成材料盘点失败: {str(e)}")
 
+    @track_posting('material_count')
     def adjust_material_count_inventory(self, plan_id: str, adjusted_by: str) -> Dict[str, Any]:
         """调整材料盘点库存"""
         try:
-            count = self.session.query(MaterialCountPlan).filter(MaterialCountPlan.id == plan_id).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            count = engine.lock_document(MaterialCountPlan, plan_id)
             
             if not count:
                 raise ValueError("材料盘点不存在")
@@ -666,65 +642,40 @@ class MaterialCountService(TenantAwareService):
             except (TypeError):
                 adjusted_by_uuid = adjusted_by
             
-            # 获取盘点记录
-            records = self.session.query(MaterialCountRecord).filter(MaterialCountRecord.count_plan_id == plan_id).all()
-            
-            transactions = []
-            adjusted_records = []
-            
-            for record in records:
-                if record.variance_quantity != 0 and record.material_id:
-                    # 查找库存记录
-                    inventory = self.session.query(Inventory).filter(
-                        and_(
-                            Inventory.warehouse_id == count.warehouse_id,
-                            Inventory.material_id == record.material_id,
-                            Inventory.batch_number == record.batch_number,
-                            Inventory.is_active == True
-                        )
-                    ).first()
-                    
-                    if inventory:
-                        # 记录变动前数量
-                        quantity_before = inventory.current_quantity
-                        
-                        # 调整库存
-                        inventory.current_quantity += record.variance_quantity
-                        inventory.available_quantity += record.variance_quantity
-                        
-                        # 确保库存不为负数
-                        if inventory.current_quantity < 0:
-                            inventory.current_quantity = 0
-                        if inventory.available_quantity < 0:
-                            inventory.available_quantity = 0
-                        
-                        inventory.updated_by = adjusted_by_uuid
-                        
-                        # 创建库存流水记录
-                        transaction_data = {
-                            'inventory_id': inventory.id,
-                            'warehouse_id': count.warehouse_id,
-                            'material_id': record.material_id,
-                            'transaction_type': 'adjustment',
-                            'quantity_change': record.variance_quantity,
-                            'quantity_before': quantity_before,
-                            'quantity_after': inventory.current_quantity,
-                            'unit_id': record.unit_id,
-                            'source_document_type': 'material_count_plan',
-                            'source_document_id': count.id,
-                            'source_document_number': count.count_number,
-                            'batch_number': record.batch_number,
-                            'reason': f'材料盘点调整 - {count.count_number}',
-                            'created_by': adjusted_by_uuid
-                        }
-                        
-                        transaction = self.create_with_tenant(InventoryTransaction, **transaction_data)
-                        transactions.append(transaction)
-                        
-                        # 标记盘点记录为已调整
-                        record.is_adjusted = True
-                        record.status = 'adjusted'
-                        record.updated_by = adjusted_by_uuid
+            # 获取有差异的盘点记录
+            records = [record for record in self.session.query(MaterialCountRecord).filter(
+                MaterialCountRecord.count_plan_id == count.id
+            ).all() if record.variance_quantity and record.material_id]
+            
+            # 按差异调整库存（锁定库存后累加），库存不存在的记录跳过
+            lines = [
+                PostingLine(
+                    record.variance_quantity, 'adjustment',
+                    warehouse_id=count.warehouse_id,
+                    material_id=record.material_id,
+                    batch_number=record.batch_number,
+                    required=False,
+                    check_available=False,
+                    transaction={
+                        'unit_id': record.unit_id,
+                        'source_document_type': 'material_count_plan',
+                        'source_document_id': count.id,
+                        'source_document_number': count.count_number,
+                        'batch_number': record.batch_number,
+                        'reason': f'材料盘点调整 - {count.count_number}'
+                    }
+                )
+                for record in records
+            ]
+            report = engine.post(lines, adjusted_by_uuid)
+            transactions = report.transactions
+            
+            # 标记盘点记录为已调整
+            for record, line in zip(records, lines):
+                if line not in report.skipped:
+                    record.is_adjusted = True
+                    record.status = 'adjusted'
+                    record.updated_by = adjusted_by_uuid
             
             # 更新盘点状态
             count.status = 'adjusted'
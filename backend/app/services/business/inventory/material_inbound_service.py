@@ -19,6 +19,12 @@ from flask import g, current_app
 import logging
 import uuid
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.read_replica import read_only
+from app.utils.list_count import count_total
+from app.utils.projection import VIEW_FULL, VIEW_SUMMARY, summary_page
+from app.utils.metrics import track_posting
+from app.utils.reference_resolver import fill_warehouse_names
 from app.models.basic_data import Unit
 
 logger = logging.getLogger(__name__)
@@ -33,36 +39,6 @@ class MaterialInboundService(TenantAwareService):
     def __init__(self, tenant_id: Optional[str] = None, schema_name: Optional[str] = None):
         super().__init__(tenant_id, schema_name, strict_tenant_check=True)
 
-    def _fill_warehouse_info(self, orders):
-        """批量填充订单的仓库名称信息"""
-        if not orders:
-            return
-        
-        # 获取所有唯一的仓库ID
-        warehouse_ids = list(set([order.warehouse_id for order in orders if order.warehouse_id]))
-        
-        if not warehouse_ids:
-            return
-        
-        try:
-            # 查询仓库信息
-            from app.models.basic_data import Warehouse
-            warehouses = self.get_session().query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
-            warehouse_dict = {str(w.id): w.warehouse_name for w in warehouses}
-            
-            # 填充仓库名称
-            for order in orders:
-                if order.warehouse_id and str(order.warehouse_id) in warehouse_dict:
-                    order.warehouse_name = warehouse_dict[str(order.warehouse_id)]
-                elif not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-        except Exception as e:
-            current_app.logger.warning(f"填充仓库信息失败: {e}")
-            # 失败时使用默认值
-            for order in orders:
-                if not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-
     def _fill_department_info(self, orders):
         """批量填充订单的部门名称信息"""
         if not orders:
@@ -102,6 +78,7 @@ class MaterialInboundService(TenantAwareService):
             # 失败时保持原值
             pass
 
+    @read_only
     def get_material_inbound_order_list(
         self,
         warehouse_id: Optional[str] = None,
@@ -112,15 +89,16 @@ class MaterialInboundService(TenantAwareService):
         end_date: Optional[datetime] = None,
         search: Optional[str] = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        view: str = VIEW_FULL
     ) -> Dict[str, Any]:
 
-        """获取材料入库单列表"""
+        """
+        获取材料入库单列表
+        view 为 summary 时只查询列表列和人员、部门名称，不含明细
+        """
         from sqlalchemy.orm import joinedload
-        query = self.get_session().query(MaterialInboundOrder).options(
-            joinedload(MaterialInboundOrder.inbound_person),
-            joinedload(MaterialInboundOrder.department)
-        )
+        query = self.get_session().query(MaterialInboundOrder)
         
         if warehouse_id:
             query = query.filter(MaterialInboundOrder.warehouse_id == warehouse_id)
@@ -148,19 +126,27 @@ class MaterialInboundService(TenantAwareService):
             )
             query = query.filter(search_filter)
         
-        total = query.count()
+        total, total_estimated = count_total(query, 'material_inbound_orders')
         
-        orders = query.order_by(MaterialInboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 填充仓库信息
-        self._fill_warehouse_info(orders)
-        
-        # 填充部门信息
-        self._fill_department_info(orders)
+        if view == VIEW_SUMMARY:
+            items = summary_page(query, MaterialInboundOrder, MaterialInboundOrder.created_at.desc(), page, page_size)
+        else:
+            orders = query.options(
+                joinedload(MaterialInboundOrder.inbound_person),
+                joinedload(MaterialInboundOrder.department)
+            ).order_by(MaterialInboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+            
+            # 填充仓库信息
+            fill_warehouse_names(orders)
+            
+            # 填充部门信息
+            self._fill_department_info(orders)
+            items = [order.to_dict() for order in orders]
         
         return {
-            'items': [order.to_dict() for order in orders],
+            'items': items,
             'total': total,
+            'total_estimated': total_estimated,
             'page': page,
             'page_size': page_size,
             'pages': (total + page_size - 1) // page_size
@@ -176,7 +162,7 @@ class MaterialInboundService(TenantAwareService):
         
         if order:
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             # 填充部门信息
             self._fill_department_info([order])
         
@@ -260,7 +246,7 @@ class MaterialInboundService(TenantAwareService):
         self.commit()
         
         # 填充仓库信息
-        self._fill_warehouse_info([order])
+        fill_warehouse_names([order])
         # 填充部门信息
         self._fill_department_info([order])
         
@@ -487,6 +473,7 @@ class MaterialInboundService(TenantAwareService):
         
         return order
 
+    @track_posting('material_inbound')
     def execute_material_inbound_order(
         self,
         order_id: str,
@@ -494,7 +481,8 @@ class MaterialInboundService(TenantAwareService):
         auto_create_inventory: bool = True
     ) -> List[InventoryTransaction]:
         """执行材料入库单"""
-        order = self.get_session().query(MaterialInboundOrder).filter(MaterialInboundOrder.id == order_id).first()
+        engine = InventoryPostingEngine(self.get_session(), self.schema_name)
+        order = engine.lock_document(MaterialInboundOrder, order_id)
         
         if not order:
             raise ValueError("材料入库单不存在")
@@ -505,81 +493,36 @@ class MaterialInboundService(TenantAwareService):
         if order.status == 'completed':
             raise ValueError("材料入库单已经执行")
         
-        transactions = []
-        
-        # 处理每个明细行
-        for detail in order.details:
-            if not detail.material_id:
-                continue
-            
-            # 查找或创建库存记录
-            # 首先尝试精确匹配
-            inventory = self.get_session().query(Inventory).filter(
-                and_(
-                    Inventory.warehouse_id == order.warehouse_id,
-                    Inventory.material_id == detail.material_id,
-                    Inventory.is_active == True
-                )
-            ).first()
-            
-
-            if not inventory and auto_create_inventory:
-                # 创建新的库存记录
-                inventory = Inventory(
-                    warehouse_id=order.warehouse_id,
-                    material_id=detail.material_id,
-                    unit_id=detail.unit_id,
-                    batch_number=detail.batch_number,
-                    production_date=detail.production_date,
-                    expiry_date=detail.expiry_date,
-                    location_code=detail.actual_location_code or detail.location_code,
-                    created_by=uuid.UUID(executed_by) if isinstance(executed_by, str) else executed_by
-                )
-                self.get_session().add(inventory)
-                self.get_session().flush()
-            
-            if inventory:
-                # 记录变动前数量
-                quantity_before = inventory.current_quantity
-                
-                # 更新库存数量
-                inventory.current_quantity += detail.inbound_quantity
-                inventory.available_quantity += detail.inbound_quantity
-                
-                # 更新成本信息
-                if detail.unit_price:
-                    total_cost = inventory.total_cost or Decimal('0')
-                    total_quantity = inventory.current_quantity
-                    new_cost = detail.inbound_quantity * detail.unit_price
-                    
-                    inventory.total_cost = total_cost + new_cost
-                    if total_quantity > 0:
-                        inventory.unit_cost = inventory.total_cost / total_quantity
-                
-                inventory.updated_by = uuid.UUID(executed_by) if isinstance(executed_by, str) else executed_by
-                
-                # 创建库存流水记录
-                transaction = InventoryTransaction(
-                    inventory_id=inventory.id,
-                    warehouse_id=order.warehouse_id,
-                    material_id=detail.material_id,
-                    transaction_type='in',
-                    quantity_change=detail.inbound_quantity,
-                    quantity_before=quantity_before,
-                    quantity_after=inventory.current_quantity,
-                    unit_id=detail.unit_id,
-                    unit_price=detail.unit_price,
-                    source_document_type='material_inbound_order',
-                    source_document_id=order.id,
-                    source_document_number=order.order_number,
-                    batch_number=detail.batch_number,
-                    to_location=detail.actual_location_code or detail.location_code,
-                    supplier_id=order.supplier_id,
-                    created_by=uuid.UUID(executed_by) if isinstance(executed_by, str) else executed_by
-                )
-                
-                self.get_session().add(transaction)
-                transactions.append(transaction)
+        # 处理每个明细行，库存不存在时按需创建
+        report = engine.post([
+            PostingLine(
+                detail.inbound_quantity, 'in',
+                warehouse_id=order.warehouse_id,
+                material_id=detail.material_id,
+                label=f"材料 {detail.material_name or detail.material_id}",
+                create={
+                    'unit_id': detail.unit_id,
+                    'batch_number': detail.batch_number,
+                    'production_date': detail.production_date,
+                    'expiry_date': detail.expiry_date,
+                    'location_code': detail.actual_location_code or detail.location_code
+                } if auto_create_inventory else None,
+                required=False,
+                unit_cost=detail.unit_price,
+                transaction={
+                    'unit_id': detail.unit_id,
+                    'unit_price': detail.unit_price,
+                    'source_document_type': 'material_inbound_order',
+                    'source_document_id': order.id,
+                    'source_document_number': order.order_number,
+                    'batch_number': detail.batch_number,
+                    'to_location': detail.actual_location_code or detail.location_code,
+                    'supplier_id': order.supplier_id
+                }
+            )
+            for detail in order.details if detail.material_id
+        ], executed_by)
+        transactions = report.transactions
         
         # 更新入库单状态
         order.status = 'completed'
@@ -16,6 +16,12 @@ from uuid import UUID
 from app.models.business.inventory import MaterialOutboundOrder, MaterialOutboundOrderDetail, Inventory, InventoryTransaction
 from app.models.basic_data import Unit
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.read_replica import read_only
+from app.utils.list_count import count_total
+from app.utils.projection import VIEW_FULL, VIEW_SUMMARY, summary_page
+from app.utils.metrics import track_posting
+from app.utils.reference_resolver import fill_warehouse_names
 from flask import g, current_app
 import logging
 import uuid
@@ -29,36 +35,7 @@ class MaterialOutboundService(TenantAwareService):
     提供材料出库单相关的业务逻辑操作
     """
     
-    def _fill_warehouse_info(self, orders: List[MaterialOutboundOrder]) -> None:
-        """批量填充订单的仓库名称信息"""
-        if not orders:
-            return
-        
-        # 获取所有唯一的仓库ID
-        warehouse_ids = list(set([order.warehouse_id for order in orders if order.warehouse_id]))
-        
-        if not warehouse_ids:
-            return
-        
-        try:
-            # 查询仓库信息
-            from app.models.basic_data import Warehouse
-            warehouses = self.session.query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
-            warehouse_dict = {str(w.id): w.warehouse_name for w in warehouses}
-            
-            # 填充仓库名称
-            for order in orders:
-                if order.warehouse_id and str(order.warehouse_id) in warehouse_dict:
-                    order.warehouse_name = warehouse_dict[str(order.warehouse_id)]
-                elif not hasattr(order, 'warehouse_name') or not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-        except Exception as e:
-            current_app.logger.warning(f"填充仓库信息失败: {e}")
-            # 失败时使用默认值
-            for order in orders:
-                if not hasattr(order, 'warehouse_name') or not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-
+    @read_only
     def get_material_outbound_order_list(
         self,
         warehouse_id: Optional[str] = None,
@@ -69,16 +46,15 @@ class MaterialOutboundService(TenantAwareService):
         end_date: Optional[datetime] = None,
         search: Optional[str] = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        view: str = VIEW_FULL
     ) -> Dict[str, Any]:
-        """获取材料出库单列表"""
+        """
+        获取材料出库单列表
+        view 为 summary 时只查询列表列和人员、部门名称，不含明细
+        """
         from sqlalchemy.orm import joinedload
-        query: Query = self.session.query(MaterialOutboundOrder).options(
-            joinedload(MaterialOutboundOrder.outbound_person),
-            joinedload(MaterialOutboundOrder.department),
-            joinedload(MaterialOutboundOrder.requisition_department),
-            joinedload(MaterialOutboundOrder.requisition_person)
-        )
+        query: Query = self.session.query(MaterialOutboundOrder)
         
         if warehouse_id:
             query = query.filter(MaterialOutboundOrder.warehouse_id == warehouse_id)
@@ -105,16 +81,26 @@ class MaterialOutboundService(TenantAwareService):
             )
             query = query.filter(search_filter)
         
-        total: int = query.count()
-        
-        orders: List[MaterialOutboundOrder] = query.order_by(MaterialOutboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 填充仓库信息
-        self._fill_warehouse_info(orders)
+        total, total_estimated = count_total(query, 'material_outbound_orders')
+        
+        if view == VIEW_SUMMARY:
+            items = summary_page(query, MaterialOutboundOrder, MaterialOutboundOrder.created_at.desc(), page, page_size)
+        else:
+            orders: List[MaterialOutboundOrder] = query.options(
+                joinedload(MaterialOutboundOrder.outbound_person),
+                joinedload(MaterialOutboundOrder.department),
+                joinedload(MaterialOutboundOrder.requisition_department),
+                joinedload(MaterialOutboundOrder.requisition_person)
+            ).order_by(MaterialOutboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+            
+            # 填充仓库信息
+            fill_warehouse_names(orders)
+            items = [order.to_dict() for order in orders]
         
         return {
-            'items': [order.to_dict() for order in orders],
+            'items': items,
             'total': total,
+            'total_estimated': total_estimated,
             'page': page,
             'page_size': page_size,
             'pages': (total + page_size - 1) // page_size
@@ -132,7 +118,7 @@ class MaterialOutboundService(TenantAwareService):
         
         if order:
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
         
         return order
 
@@ -392,13 +378,15 @@ class MaterialOutboundService(TenantAwareService):
         
         return order
 
+    @track_posting('material_outbound')
     def execute_material_outbound_order(
         self,
         order_id: str,
         executed_by: str
     ) -> List[InventoryTransaction]:
         """执行材料出库单"""
-        order = self.session.query(MaterialOutboundOrder).filter(MaterialOutboundOrder.id == order_id).first()
+        engine = InventoryPostingEngine(self.session, self.schema_name)
+        order = engine.lock_document(MaterialOutboundOrder, order_id)
         
         if not order:
             raise ValueError("材料出库单不存在")
@@ -406,69 +394,32 @@ class MaterialOutboundService(TenantAwareService):
         if order.approval_status != 'approved':
             raise ValueError("材料出库单未审核，不能执行")
         
-        if order.status == 'completed':
+        # executed 为旧版执行接口写入的状态
+        if order.status in ('completed', 'executed'):
             raise ValueError("材料出库单已经执行")
         
-        transactions = []
-        
-        # 处理每个明细行
-        for detail in order.details:
-            if not detail.material_id:
-                continue
-            
-            # 查找库存记录
-            inventory = self.session.query(Inventory).filter(
-                and_(
-                    Inventory.warehouse_id == order.warehouse_id,
-                    Inventory.material_id == detail.material_id,
-                    Inventory.batch_number == detail.batch_number,
-                    Inventory.is_active == True
-                )
-            ).first()
-            
-            if not inventory:
-                raise ValueError(f"材料 {detail.material_name or detail.material_id} 在仓库中没有库存")
-            
-            if inventory.available_quantity < detail.outbound_quantity:
-                raise ValueError(f"材料 {detail.material_name or detail.material_id} 可用库存不足")
-            
-            # 记录变动前数量
-            quantity_before = inventory.current_quantity
-            
-            # 更新库存数量
-            inventory.current_quantity -= detail.outbound_quantity
-            inventory.available_quantity -= detail.outbound_quantity
-            
-            # 更新成本信息
-            if inventory.unit_cost and detail.outbound_quantity > 0:
-                cost_reduction = detail.outbound_quantity * inventory.unit_cost
-                inventory.total_cost = (inventory.total_cost or Decimal('0')) - cost_reduction
-            
-            inventory.updated_by = executed_by
-            inventory.updated_at = datetime.now()
-            
-            # 创建库存流水记录
-            transaction = InventoryTransaction(
-                inventory_id=inventory.id,
+        # 处理每个明细行，按批次扣减（锁定库存后检查可用库存）
+        report = engine.post([
+            PostingLine(
+                -detail.outbound_quantity, 'out',
                 warehouse_id=order.warehouse_id,
                 material_id=detail.material_id,
-                transaction_type='out',
-                quantity_change=-detail.outbound_quantity,
-                quantity_before=quantity_before,
-                quantity_after=inventory.current_quantity,
-                unit_id=detail.unit_id,
-                unit_price=detail.unit_price,
-                source_document_type='material_outbound_order',
-                source_document_id=order.id,
-                source_document_number=order.order_number,
                 batch_number=detail.batch_number,
-                from_location=detail.location_code,
-                reason=f"材料出库单执行: {order.order_number}",
-                created_by=executed_by
+                label=f"材料 {detail.material_name or detail.material_id}",
+                transaction={
+                    'unit_id': detail.unit_id,
+                    'unit_price': detail.unit_price,
+                    'source_document_type': 'material_outbound_order',
+                    'source_document_id': order.id,
+                    'source_document_number': order.order_number,
+                    'batch_number': detail.batch_number,
+                    'from_location': detail.location_code,
+                    'reason': f"材料出库单执行: {order.order_number}"
+                }
             )
-            
-            self.session.add(transaction)
-            transactions.append(transaction)
+            for detail in order.details if detail.material_id
+        ], executed_by)
+        transactions = report.transactions
         
         # 更新出库单状态
         order.status = 'completed'
@@ -14,6 +14,8 @@ from sqlalchemy import and_, func
 from flask import current_app
 
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.metrics import track_posting
 from app.models.business.inventory import (
     MaterialTransferOrder, MaterialTransferOrderDetail, 
     Inventory, InventoryTransaction
@@ -209,6 +211,7 @@ class MaterialTransferService(TenantAwareService):
             current_app.logger.error(f"确认调拨单失败: {str(e)}")
             raise
     
+    @track_posting('material_transfer')
     def execute_transfer_order(self, transfer_order_id, executed_by):
         """
         执行调拨单（出库）
@@ -218,7 +221,8 @@ class MaterialTransferService(TenantAwareService):
             executed_by: 执行人ID
         """
         try:
-            transfer_order = self.session.query(MaterialTransferOrder).get(transfer_order_id)
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            transfer_order = engine.lock_document(MaterialTransferOrder, transfer_order_id)
             if not transfer_order:
                 raise ValueError("调拨单不存在")
             
@@ -227,31 +231,25 @@ class MaterialTransferService(TenantAwareService):
             
             executed_by_uuid = uuid.UUID(executed_by)
             
+            # 出库操作：先释放预留，锁定库存后检查可用库存
+            engine.post([
+                PostingLine(
+                    -detail.transfer_quantity, 'transfer_out',
+                    inventory_id=detail.from_inventory_id,
+                    label=f"材料 {detail.material_name}",
+                    required=False,
+                    release_reserved=True,
+                    transaction={
+                        'source_document_type': 'transfer_order',
+                        'source_document_id': transfer_order.id,
+                        'source_document_number': transfer_order.transfer_number,
+                        'reason': f'调拨出库到 {transfer_order.to_warehouse_name}'
+                    }
+                )
+                for detail in transfer_order.details if detail.from_inventory_id
+            ], executed_by_uuid)
+            
             for detail in transfer_order.details:
-                # 出库操作
-                inventory = self.session.query(Inventory).get(detail.from_inventory_id)
-                if inventory:
-                    # 取消预留并出库
-                    inventory.unreserve_quantity(detail.transfer_quantity, executed_by)
-                    inventory.update_quantity(-detail.transfer_quantity, 'transfer_out', executed_by)
-                    
-                    # 创建出库交易记录
-                    out_transaction = InventoryTransaction(
-                        inventory_id=inventory.id,
-                        warehouse_id=inventory.warehouse_id,
-                        material_id=inventory.material_id,
-                        transaction_type='transfer_out',
-                        quantity_change=-detail.transfer_quantity,
-                        quantity_before=inventory.current_quantity,
-                        quantity_after=inventory.current_quantity - detail.transfer_quantity,
-                        unit_id=inventory.unit_id,
-                        source_document_type='transfer_order',
-                        source_document_number=transfer_order.transfer_number,
-                        reason=f'调拨出库到 {transfer_order.to_warehouse_name}',
-                        created_by=executed_by_uuid
-                    )
-                    self.session.add(out_transaction)
-                
                 detail.detail_status = 'in_transit'
                 detail.actual_transfer_quantity = detail.transfer_quantity
             
@@ -276,7 +274,8 @@ class MaterialTransferService(TenantAwareService):
             received_by: 接收人ID
         """
         try:
-            transfer_order = self.session.query(MaterialTransferOrder).get(transfer_order_id)
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            transfer_order = engine.lock_document(MaterialTransferOrder, transfer_order_id)
             if not transfer_order:
                 raise ValueError("调拨单不存在")
             
@@ -285,49 +284,25 @@ class MaterialTransferService(TenantAwareService):
             
             received_by_uuid = uuid.UUID(received_by)
             
-            for detail in transfer_order.details:
-                # 检查调入仓库是否已有该材料库存
-                to_inventory = self.session.query(Inventory).filter(
-                    and_(
-                        Inventory.warehouse_id == transfer_order.to_warehouse_id,
-                        Inventory.material_id == detail.material_id
-                    )
-                ).first()
-                
-                if not to_inventory:
-                    # 创建新库存记录
-                    to_inventory = Inventory(
-                        warehouse_id=transfer_order.to_warehouse_id,
-                        material_id=detail.material_id,
-                        unit_id=detail.unit_id,
-                        created_by=received_by_uuid,
-                        current_quantity=0,
-                        available_quantity=0
-                    )
-                    self.session.add(to_inventory)
-                    self.session.flush()
-                
-                # 入库操作
-                old_quantity = to_inventory.current_quantity
-                to_inventory.update_quantity(detail.transfer_quantity, 'transfer_in', received_by)
-                
-                # 创建入库交易记录
-                in_transaction = InventoryTransaction(
-                    inventory_id=to_inventory.id,
-                    warehouse_id=to_inventory.warehouse_id,
-                    material_id=to_inventory.material_id,
-                    transaction_type='transfer_in',
-                    quantity_change=detail.transfer_quantity,
-                    quantity_before=old_quantity,
-                    quantity_after=to_inventory.current_quantity,
-                    unit_id=to_inventory.unit_id,
-                    source_document_type='transfer_order',
-                    source_document_number=transfer_order.transfer_number,
-                    reason=f'调拨入库来自 {transfer_order.from_warehouse_name}',
-                    created_by=received_by_uuid
+            # 入库操作，调入仓库没有该材料库存时创建
+            engine.post([
+                PostingLine(
+                    detail.transfer_quantity, 'transfer_in',
+                    warehouse_id=transfer_order.to_warehouse_id,
+                    material_id=detail.material_id,
+                    label=f"材料 {detail.material_name}",
+                    create={'unit_id': detail.unit_id},
+                    transaction={
+                        'source_document_type': 'transfer_order',
+                        'source_document_id': transfer_order.id,
+                        'source_document_number': transfer_order.transfer_number,
+                        'reason': f'调拨入库来自 {transfer_order.from_warehouse_name}'
+                    }
                 )
-                self.session.add(in_transaction)
-                
+                for detail in transfer_order.details
+            ], received_by_uuid)
+            
+            for detail in transfer_order.details:
                 detail.detail_status = 'received'
                 detail.received_quantity = detail.transfer_quantity
             
@@ -15,9 +15,14 @@ import uuid
 
 from sqlalchemy import and_, or_, func, text
 from sqlalchemy.orm import joinedload
-from app.models.business.inventory import ProductCountPlan, ProductCountRecord, Inventory, InventoryTransaction
+from app.models.business.inventory import ProductCountPlan, ProductCountRecord, Inventory
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
 from app.models.basic_data import Product, Warehouse, Employee, Department, Unit
 from app.services.base_service import TenantAwareService
+from app.utils.read_replica import read_only
+from app.utils.metrics import track_posting
+from app.utils.list_count import count_total
+from app.utils.projection import VIEW_FULL, VIEW_SUMMARY, summary_page
 
 
 class ProductCountService(TenantAwareService):
@@ -155,13 +160,15 @@ class ProductCountService(TenantAwareService):
             )
         return count_record
     
-    def get_count_plans(self, page: int = 1, page_size: int = 10, **filters) -> Dict[str, Any]:
+    @read_only
+    def get_count_plans(self, page: int = 1, page_size: int = 10, view: str = VIEW_FULL, **filters) -> Dict[str, Any]:
         """
         获取盘点计划列表
         
         Args:
             page: 页码
             page_size: 每页数量
+            view: summary 时只查询列表列和人员、部门名称
             **filters: 筛选条件
             
         Returns:
@@ -197,15 +204,20 @@ class ProductCountService(TenantAwareService):
                 )
             
             # 总数统计
-            total = query.count()
+            total, total_estimated = count_total(query, 'product_count_plans')
             
             # 排序和分页
-            query = query.order_by(ProductCountPlan.created_at.desc())
-            plans = query.offset((page - 1) * page_size).limit(page_size).all()
+            if view == VIEW_SUMMARY:
+                items = summary_page(query, ProductCountPlan, ProductCountPlan.created_at.desc(), page, page_size)
+            else:
+                query = query.order_by(ProductCountPlan.created_at.desc())
+                plans = query.offset((page - 1) * page_size).limit(page_size).all()
+                items = [plan.to_dict() for plan in plans]
             
             return {
-                'items': [plan.to_dict() for plan in plans],
+                'items': items,
                 'total': total,
+                'total_estimated': total_estimated,
                 'page': page,
                 'page_size': page_size,
                 'pages': (total + page_size - 1) // page_size
@@ -255,7 +267,7 @@ class ProductCountService(TenantAwareService):
                 ProductCountRecord.count_plan_id == uuid.UUID(plan_id)
             )
             
-            total = query.count()
+            total, total_estimated = count_total(query, 'product_count_records')
             
             records = query.order_by(ProductCountRecord.product_code, ProductCountRecord.product_name)\
                            .offset((page - 1) * page_size).limit(page_size).all()
@@ -263,6 +275,7 @@ class ProductCountService(TenantAwareService):
             return {
                 'items': [record.to_dict() for record in records],
                 'total': total,
+                'total_estimated': total_estimated,
                 'page': page,
                 'page_size': page_size,
                 'pages': (total + page_size - 1) // page_size
@@ -406,6 +419,7 @@ class ProductCountService(TenantAwareService):
             self.rollback()
             raise Exception(f"完成盘点计划失败: {str(e)}")
     
+    @track_posting('product_count')
     def adjust_inventory(self, plan_id: str, record_ids: List[str], updated_by: str) -> Dict[str, Any]:
         """
         根据盘点结果调整库存
@@ -419,7 +433,8 @@ class ProductCountService(TenantAwareService):
             调整结果
         """
         try:
-            plan = self.session.query(ProductCountPlan).filter(ProductCountPlan.id == uuid.UUID(plan_id)).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            plan = engine.lock_document(ProductCountPlan, plan_id)
             
             if not plan:
                 raise ValueError("盘点计划不存在")
@@ -427,71 +442,47 @@ class ProductCountService(TenantAwareService):
             if plan.status != 'completed':
                 raise ValueError("只有已完成的盘点计划才能调整库存")
             
-            adjustment_count = 0
-            
             # 如果没有指定record_ids，则处理所有有差异且未调整的记录
-            if not record_ids:
-                records_to_adjust = self.session.query(ProductCountRecord).filter(
-                    and_(
-                        ProductCountRecord.count_plan_id == uuid.UUID(plan_id),
-                        ProductCountRecord.variance_quantity != 0,
-                        ProductCountRecord.variance_quantity.isnot(None),
-                        ProductCountRecord.is_adjusted == False
-                    )
-                ).all()
-                record_ids = [str(record.id) for record in records_to_adjust]
-            
-            for record_id in record_ids:
-                record = self.session.query(ProductCountRecord).filter(
-                    and_(
-                        ProductCountRecord.id == uuid.UUID(record_id),
-                        ProductCountRecord.count_plan_id == uuid.UUID(plan_id)
-                    )
-                ).first()
-                
-                if not record or record.is_adjusted:
-                    continue
-                
-                if record.variance_quantity is None or record.variance_quantity == 0:
-                    continue
-                
-                # 获取库存记录
-                inventory = self.session.query(Inventory).filter(Inventory.id == record.inventory_id).first()
-                
-                if not inventory:
-                    continue
-                
-                # 调整库存
-                old_quantity = inventory.current_quantity
-                inventory.current_quantity = record.actual_quantity
-                inventory.available_quantity = record.actual_quantity - inventory.reserved_quantity
-                inventory.updated_by = uuid.UUID(updated_by)
-                
-                # 创建库存流水记录
-                transaction_type = 'adjustment_in' if record.variance_quantity > 0 else 'adjustment_out'
-                transaction = InventoryTransaction(
-                    inventory_id=inventory.id,
-                    warehouse_id=inventory.warehouse_id,
-                    product_id=inventory.product_id,
-                    transaction_type=transaction_type,
-                    quantity_change=record.variance_quantity,
-                    quantity_before=old_quantity,
+            query = self.session.query(ProductCountRecord).filter(
+                and_(
+                    ProductCountRecord.count_plan_id == plan.id,
+                    ProductCountRecord.variance_quantity != 0,
+                    ProductCountRecord.variance_quantity.isnot(None),
+                    ProductCountRecord.is_adjusted == False
+                )
+            )
+            if record_ids:
+                query = query.filter(ProductCountRecord.id.in_([uuid.UUID(record_id) for record_id in record_ids]))
+            records = [record for record in query.all() if record.inventory_id]
+            
+            # 库存数量设置为实盘数量（按锁定后的库存计算变动），库存不存在的记录跳过
+            lines = [
+                PostingLine(
+                    record.variance_quantity,
+                    'adjustment_in' if record.variance_quantity > 0 else 'adjustment_out',
+                    inventory_id=record.inventory_id,
                     quantity_after=record.actual_quantity,
-                    unit_id=inventory.unit_id,
-                    source_document_type='count_order',
-                    source_document_id=plan.id,
-                    source_document_number=plan.count_number,
-                    reason=f"成品盘点调整: {record.variance_reason or '盘点差异'}",
-                    created_by=uuid.UUID(updated_by)
+                    required=False,
+                    check_available=False,
+                    transaction={
+                        'source_document_type': 'count_order',
+                        'source_document_id': plan.id,
+                        'source_document_number': plan.count_number,
+                        'reason': f"成品盘点调整: {record.variance_reason or '盘点差异'}"
+                    }
                 )
-                
-                self.session.add(transaction)
-                
-                # 标记记录为已调整
+                for record in records
+            ]
+            report = engine.post(lines, updated_by)
+            
+            # 标记记录为已调整
+            adjustment_count = 0
+            for record, line in zip(records, lines):
+                if line in report.skipped:
+                    continue
                 record.is_adjusted = True
                 record.status = 'adjusted'
                 record.updated_by = uuid.UUID(updated_by)
-                
                 adjustment_count += 1
             
             # 更新盘点计划状态
@@ -14,6 +14,13 @@ from datetime import datetime, date
 from uuid import UUID
 from app.models.business.inventory import InboundOrder, InboundOrderDetail, Inventory, InventoryTransaction
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.read_replica import read_only
+from app.utils.pagination import keyset_paginate
+from app.utils.list_count import count_total
+from app.utils.projection import VIEW_FULL, VIEW_SUMMARY, summary_query, summary_rows, summary_page, export_query
+from app.utils.metrics import track_posting
+from app.utils.reference_resolver import fill_warehouse_names
 from flask import g, current_app
 import logging
 import uuid
@@ -27,36 +34,7 @@ class ProductInboundService(TenantAwareService):
     提供产品入库相关的业务逻辑操作
     """
     
-    def _fill_warehouse_info(self, orders):
-        """批量填充订单的仓库名称信息"""
-        if not orders:
-            return
-        
-        # 获取所有唯一的仓库ID
-        warehouse_ids = list(set([order.warehouse_id for order in orders if order.warehouse_id]))
-        
-        if not warehouse_ids:
-            return
-        
-        try:
-            # 查询仓库信息
-            from app.models.basic_data import Warehouse
-            warehouses = self.session.query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
-            warehouse_dict = {str(w.id): w.warehouse_name for w in warehouses}
-            
-            # 填充仓库名称
-            for order in orders:
-                if order.warehouse_id and str(order.warehouse_id) in warehouse_dict:
-                    order.warehouse_name = warehouse_dict[str(order.warehouse_id)]
-                elif not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-        except Exception as e:
-            current_app.logger.warning(f"填充仓库信息失败: {e}")
-            # 失败时使用默认值
-            for order in orders:
-                if not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-
+    @read_only
     def get_product_inbound_order_list(
         self,
         warehouse_id: Optional[str] = None,
@@ -68,15 +46,82 @@ class ProductInboundService(TenantAwareService):
         inbound_person_id: Optional[str] = None,
         department_id: Optional[str] = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = False,
+        view: str = VIEW_FULL
     ) -> Dict[str, Any]:
-        """获取产品入库单列表"""
+        """
+        获取产品入库单列表
+        cursor 不为None时使用游标分页（按创建时间倒序），with_total 控制是否统计总数
+        view 为 summary 时只查询列表列和人员、部门名称，不含明细
+        """
         from sqlalchemy.orm import joinedload
+        query = self._inbound_order_query(
+            warehouse_id, status, approval_status, start_date, end_date, search, inbound_person_id, department_id
+        )
+        
+        if view == VIEW_SUMMARY:
+            if cursor is not None:
+                result = keyset_paginate(
+                    summary_query(query, InboundOrder), (InboundOrder.created_at, InboundOrder.id),
+                    cursor=cursor, page_size=page_size, with_total=with_total,
+                    count_name='product_inbound_orders'
+                )
+                result['items'] = summary_rows(result['items'], InboundOrder)
+                result['page_size'] = page_size
+                return result
+            total, total_estimated = count_total(query, 'product_inbound_orders')
+            items = summary_page(query, InboundOrder, InboundOrder.created_at.desc(), page, page_size)
+        else:
+            query = query.options(
+                joinedload(InboundOrder.inbound_person),
+                joinedload(InboundOrder.department)
+            )
+            if cursor is not None:
+                result = keyset_paginate(
+                    query, (InboundOrder.created_at, InboundOrder.id),
+                    cursor=cursor, page_size=page_size, with_total=with_total,
+                    count_name='product_inbound_orders'
+                )
+                fill_warehouse_names(result['items'])
+                result['items'] = [order.to_dict() for order in result['items']]
+                result['page_size'] = page_size
+                return result
+            
+            # 获取总数
+            total, total_estimated = count_total(query, 'product_inbound_orders')
+            
+            # 分页查询
+            orders = query.order_by(InboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+            
+            # 填充仓库信息
+            fill_warehouse_names(orders)
+            items = [order.to_dict() for order in orders]
+        
+        return {
+            'items': items,
+            'total': total,
+            'total_estimated': total_estimated,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size
+        }
+
+    def _inbound_order_query(
+        self,
+        warehouse_id: Optional[str] = None,
+        status: Optional[str] = None,
+        approval_status: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        search: Optional[str] = None,
+        inbound_person_id: Optional[str] = None,
+        department_id: Optional[str] = None
+    ):
+        """产品入库单列表和导出共用的过滤条件"""
         query = self.session.query(InboundOrder).filter(
             InboundOrder.order_type == 'finished_goods'
-        ).options(
-            joinedload(InboundOrder.inbound_person),
-            joinedload(InboundOrder.department)
         )
         
         if warehouse_id:
@@ -115,23 +160,16 @@ class ProductInboundService(TenantAwareService):
         
         if department_id:
             query = query.filter(InboundOrder.department_id == department_id)
-        
-        # 获取总数
-        total = query.count()
-        
-        # 分页查询
-        orders = query.order_by(InboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 填充仓库信息
-        self._fill_warehouse_info(orders)
-        
-        return {
-            'items': [order.to_dict() for order in orders],
-            'total': total,
-            'page': page,
-            'page_size': page_size,
-            'pages': (total + page_size - 1) // page_size
-        }
+        return query
+
+    def export_product_inbound_orders(self, **filters):
+        """
+        产品入库单导出查询（列投影，按创建时间倒序），过滤条件同 get_product_inbound_order_list
+        :return: 返回Row的查询，由调用方流式迭代
+        """
+        return export_query(self._inbound_order_query(**filters), InboundOrder).order_by(
+            InboundOrder.created_at.desc(), InboundOrder.id.desc()
+        )
 
     def get_product_inbound_order_by_id(self, order_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取产品入库单详情"""
@@ -148,7 +186,7 @@ class ProductInboundService(TenantAwareService):
             return None
         
         # 填充仓库信息
-        self._fill_warehouse_info([order])
+        fill_warehouse_names([order])
         
         return order.to_dict()
 
@@ -271,7 +309,7 @@ class ProductInboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -411,7 +449,7 @@ class ProductInboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -483,7 +521,7 @@ class ProductInboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -492,15 +530,14 @@ class ProductInboundService(TenantAwareService):
             current_app.logger.error(f"审核产品入库单失败: {str(e)}")
             raise ValueError(f"审核产品入库单失败: {str(e)}")
 
+    @track_posting('product_inbound')
     def execute_product_inbound_order(self, order_id: str, executed_by: str) -> Dict[str, Any]:
         """执行产品入库单（增加库存）"""
         try:
-            order = self.session.query(InboundOrder).filter(
-                InboundOrder.id == order_id,
-                InboundOrder.order_type == 'finished_goods'
-            ).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            order = engine.lock_document(InboundOrder, order_id)
             
-            if not order:
+            if not order or order.order_type != 'finished_goods':
                 raise ValueError(f"产品入库单不存在: {order_id}")
             
             # 检查状态
@@ -516,88 +553,32 @@ class ProductInboundService(TenantAwareService):
                 raise ValueError("产品入库单没有明细，无法执行")
             
             executed_by_uuid = uuid.UUID(executed_by)
-            transactions = []
             
             # 执行库存增加
-            for detail in details:
-                if not detail.product_id:
-                    continue
-                    
-                # 查找对应的库存记录
-                inventory = self.session.query(Inventory).filter(
-                    Inventory.warehouse_id == order.warehouse_id,
-                    Inventory.product_id == detail.product_id,
-                    Inventory.is_active == True
-                ).first()
-                
-                # 如果库存记录不存在，创建新的
-                if not inventory:
-                    inventory = Inventory(
-                        warehouse_id=order.warehouse_id,
-                        product_id=detail.product_id,
-                        current_quantity=Decimal('0'),
-                        available_quantity=Decimal('0'),
-                        reserved_quantity=Decimal('0'),
-                        unit_id=detail.unit_id,
-                        unit_cost=detail.unit_cost or Decimal('0'),
-                        total_cost=Decimal('0'),
-                        last_inbound_date=datetime.now(),
-                        created_by=executed_by_uuid,
-                        is_active=True
-                    )
-                    self.session.add(inventory)
-                    self.session.flush()  # 获取inventory.id
-                
-                inbound_quantity = detail.inbound_quantity
-                quantity_before = inventory.current_quantity
-                
-                # 增加库存
-                inventory.current_quantity += inbound_quantity
-                inventory.available_quantity += inbound_quantity
-                inventory.last_inbound_date = datetime.now()
-                inventory.updated_by = executed_by_uuid
-                inventory.updated_at = func.now()
-                
-                # 如果提供了单价，更新加权平均成本
-                if detail.unit_cost:
-                    total_cost_before = inventory.total_cost or Decimal('0')
-                    new_cost = detail.unit_cost * inbound_quantity
-                    inventory.total_cost = total_cost_before + new_cost
-                    
-                    # 计算新的加权平均单价
-                    if inventory.current_quantity > 0:
-                        inventory.unit_cost = inventory.total_cost / inventory.current_quantity
-                
-                # 重新计算总成本
-                inventory.calculate_total_cost()
-                
-                # 创建库存流水记录
-                transaction = InventoryTransaction(
-                    inventory_id=inventory.id,
+            report = engine.post([
+                PostingLine(
+                    detail.inbound_quantity, 'production_in',
                     warehouse_id=order.warehouse_id,
                     product_id=detail.product_id,
-                    transaction_type='production_in',
-                    quantity_change=inbound_quantity,
-                    quantity_before=quantity_before,
-                    quantity_after=inventory.current_quantity,
-                    unit_id=detail.unit_id,
-                    unit_price=detail.unit_cost or Decimal('0'),
-                    source_document_type='inbound_order',
-                    source_document_id=order.id,
-                    source_document_number=order.order_number,
-                    batch_number=detail.batch_number,
-                    to_location=detail.location_code,
-                    supplier_id=order.supplier_id,
-                    reason=f"产品入库单 {order.order_number} 执行入库",
-                    created_by=executed_by_uuid,
-                    approval_status='approved'
+                    label=f"产品 {detail.product_name}",
+                    create={'unit_id': detail.unit_id, 'unit_cost': detail.unit_cost or Decimal('0')},
+                    unit_cost=detail.unit_cost,
+                    transaction={
+                        'unit_id': detail.unit_id,
+                        'unit_price': detail.unit_cost or Decimal('0'),
+                        'source_document_type': 'inbound_order',
+                        'source_document_id': order.id,
+                        'source_document_number': order.order_number,
+                        'batch_number': detail.batch_number,
+                        'to_location': detail.location_code,
+                        'supplier_id': order.supplier_id,
+                        'reason': f"产品入库单 {order.order_number} 执行入库",
+                        'approval_status': 'approved'
+                    }
                 )
-                
-                # 计算总金额
-                transaction.calculate_total_amount()
-                
-                self.session.add(transaction)
-                transactions.append(transaction)
+                for detail in details if detail.product_id
+            ], executed_by_uuid)
+            transactions = report.transactions
             
             # 更新入库单状态
             order.status = 'completed'
@@ -607,7 +588,7 @@ class ProductInboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             current_app.logger.info(f"产品入库单 {order.order_number} 执行成功，创建了 {len(transactions)} 条库存流水")
             
@@ -644,7 +625,7 @@ class ProductInboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -15,6 +15,12 @@ from uuid import UUID
 from app.models.business.inventory import OutboundOrder, OutboundOrderDetail, Inventory, InventoryTransaction
 from app.models.basic_data import Unit
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.read_replica import read_only
+from app.utils.list_count import count_total
+from app.utils.projection import VIEW_FULL, VIEW_SUMMARY, summary_page, export_query
+from app.utils.metrics import track_posting
+from app.utils.reference_resolver import fill_warehouse_names
 from flask import g, current_app
 import logging
 import uuid
@@ -28,36 +34,7 @@ class ProductOutboundService(TenantAwareService):
     提供产品出库相关的业务逻辑操作
     """
     
-    def _fill_warehouse_info(self, orders):
-        """批量填充订单的仓库名称信息"""
-        if not orders:
-            return
-        
-        # 获取所有唯一的仓库ID
-        warehouse_ids = list(set([order.warehouse_id for order in orders if order.warehouse_id]))
-        
-        if not warehouse_ids:
-            return
-        
-        try:
-            # 查询仓库信息
-            from app.models.basic_data import Warehouse
-            warehouses = self.session.query(Warehouse).filter(Warehouse.id.in_(warehouse_ids)).all()
-            warehouse_dict = {str(w.id): w.warehouse_name for w in warehouses}
-            
-            # 填充仓库名称
-            for order in orders:
-                if order.warehouse_id and str(order.warehouse_id) in warehouse_dict:
-                    order.warehouse_name = warehouse_dict[str(order.warehouse_id)]
-                elif not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-        except Exception as e:
-            current_app.logger.warning(f"填充仓库信息失败: {e}")
-            # 失败时使用默认值
-            for order in orders:
-                if not order.warehouse_name:
-                    order.warehouse_name = '未知仓库'
-
+    @read_only
     def get_outbound_order_list(
         self,
         warehouse_id: str = None,
@@ -67,14 +44,52 @@ class ProductOutboundService(TenantAwareService):
         end_date: str = None,
         search: str = None,
         page: int = 1,
-        page_size: int = 10
+        page_size: int = 10,
+        view: str = VIEW_FULL
     ) -> Dict[str, Any]:
-        """获取出库单列表"""
+        """
+        获取出库单列表
+        view 为 summary 时只查询列表列和人员、部门名称，不含明细
+        """
         from sqlalchemy.orm import joinedload
-        query = self.session.query(OutboundOrder).options(
-            joinedload(OutboundOrder.outbound_person),
-            joinedload(OutboundOrder.department)
-        )
+        query = self._outbound_order_query(warehouse_id, status, approval_status, start_date, end_date, search)
+        
+        # 获取总数
+        total, total_estimated = count_total(query, 'outbound_orders')
+        
+        if view == VIEW_SUMMARY:
+            items = summary_page(query, OutboundOrder, OutboundOrder.created_at.desc(), page, page_size)
+        else:
+            # 分页查询
+            orders = query.options(
+                joinedload(OutboundOrder.outbound_person),
+                joinedload(OutboundOrder.department)
+            ).order_by(OutboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
+            
+            # 填充仓库信息
+            fill_warehouse_names(orders)
+            items = [order.to_dict() for order in orders]
+        
+        return {
+            'items': items,
+            'total': total,
+            'total_estimated': total_estimated,
+            'page': page,
+            'page_size': page_size,
+            'pages': (total + page_size - 1) // page_size
+        }
+
+    def _outbound_order_query(
+        self,
+        warehouse_id: str = None,
+        status: str = None,
+        approval_status: str = None,
+        start_date: str = None,
+        end_date: str = None,
+        search: str = None
+    ):
+        """出库单列表和导出共用的过滤条件"""
+        query = self.session.query(OutboundOrder)
         
         if warehouse_id:
             query = query.filter(OutboundOrder.warehouse_id == warehouse_id)
@@ -107,23 +122,16 @@ class ProductOutboundService(TenantAwareService):
                 OutboundOrder.remark.ilike(f'%{search}%')
             )
             query = query.filter(search_filter)
-        
-        # 获取总数
-        total = query.count()
-        
-        # 分页查询
-        orders = query.order_by(OutboundOrder.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 填充仓库信息
-        self._fill_warehouse_info(orders)
-        
-        return {
-            'items': [order.to_dict() for order in orders],
-            'total': total,
-            'page': page,
-            'page_size': page_size,
-            'pages': (total + page_size - 1) // page_size
-        }
+        return query
+
+    def export_outbound_orders(self, **filters):
+        """
+        出库单导出查询（列投影，按创建时间倒序），过滤条件同 get_outbound_order_list
+        :return: 返回Row的查询，由调用方流式迭代
+        """
+        return export_query(self._outbound_order_query(**filters), OutboundOrder).order_by(
+            OutboundOrder.created_at.desc(), OutboundOrder.id.desc()
+        )
 
     def get_outbound_order_by_id(self, order_id: str) -> Optional[Dict[str, Any]]:
         """根据ID获取出库单详情"""
@@ -137,7 +145,7 @@ class ProductOutboundService(TenantAwareService):
             return None
         
         # 填充仓库信息
-        self._fill_warehouse_info([order])
+        fill_warehouse_names([order])
         
         return order.to_dict()
 
@@ -197,7 +205,7 @@ class ProductOutboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -309,7 +317,7 @@ class ProductOutboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -380,7 +388,7 @@ class ProductOutboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -389,10 +397,12 @@ class ProductOutboundService(TenantAwareService):
             current_app.logger.error(f"审核出库单失败: {str(e)}")
             raise ValueError(f"审核出库单失败: {str(e)}")
 
+    @track_posting('product_outbound')
     def execute_outbound_order(self, order_id: str, executed_by: str) -> Dict[str, Any]:
         """执行出库单（扣减库存）"""
         try:
-            order = self.session.query(OutboundOrder).filter(OutboundOrder.id == order_id).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            order = engine.lock_document(OutboundOrder, order_id)
             
             if not order:
                 raise ValueError(f"出库单不存在: {order_id}")
@@ -410,70 +420,30 @@ class ProductOutboundService(TenantAwareService):
                 raise ValueError("出库单没有明细，无法执行")
             
             executed_by_uuid = uuid.UUID(executed_by)
-            transactions = []
             
-            # 执行库存扣减
-            for detail in details:
-                if not detail.product_id:
-                    continue
-                    
-                # 查找对应的库存记录
-                inventory = self.session.query(Inventory).filter(
-                    Inventory.warehouse_id == order.warehouse_id,
-                    Inventory.product_id == detail.product_id,
-                    Inventory.is_active == True
-                ).first()
-                
-                if not inventory:
-                    raise ValueError(f"产品 {detail.product_name} 在仓库中没有库存记录")
-                
-                outbound_quantity = detail.outbound_quantity
-                
-                # 检查可用库存是否充足
-                if inventory.available_quantity < outbound_quantity:
-                    raise ValueError(
-                        f"产品 {detail.product_name} 可用库存不足: "
-                        f"需要 {outbound_quantity} {detail.unit}, "
-                        f"可用 {inventory.available_quantity} {detail.unit}"
-                    )
-                
-                # 扣减库存
-                quantity_before = inventory.current_quantity
-                inventory.current_quantity -= outbound_quantity
-                inventory.available_quantity -= outbound_quantity
-                inventory.updated_by = executed_by_uuid
-                inventory.updated_at = func.now()
-                
-                # 重新计算总成本
-                inventory.calculate_total_cost()
-                
-                # 创建库存流水记录
-                transaction = InventoryTransaction(
-                    inventory_id=inventory.id,
+            # 执行库存扣减（锁定库存后检查可用库存）
+            report = engine.post([
+                PostingLine(
+                    -detail.outbound_quantity, 'sales_out',
                     warehouse_id=order.warehouse_id,
                     product_id=detail.product_id,
-                    transaction_type='sales_out',
-                    quantity_change=-outbound_quantity,
-                    quantity_before=quantity_before,
-                    quantity_after=inventory.current_quantity,
-                    unit_id=detail.unit_id,
-                    unit_price=detail.unit_cost or Decimal('0'),
-                    source_document_type='outbound_order',
-                    source_document_id=order.id,
-                    source_document_number=order.order_number,
-                    batch_number=detail.batch_number,
-                    from_location=detail.location_code,
-                    customer_id=order.customer_id,
-                    reason=f"出库单 {order.order_number} 执行出库",
-                    created_by=executed_by_uuid,
-                    approval_status='approved'
+                    label=f"产品 {detail.product_name}",
+                    transaction={
+                        'unit_id': detail.unit_id,
+                        'unit_price': detail.unit_cost or Decimal('0'),
+                        'source_document_type': 'outbound_order',
+                        'source_document_id': order.id,
+                        'source_document_number': order.order_number,
+                        'batch_number': detail.batch_number,
+                        'from_location': detail.location_code,
+                        'customer_id': order.customer_id,
+                        'reason': f"出库单 {order.order_number} 执行出库",
+                        'approval_status': 'approved'
+                    }
                 )
-                
-                # 计算总金额
-                transaction.calculate_total_amount()
-                
-                self.session.add(transaction)
-                transactions.append(transaction)
+                for detail in details if detail.product_id
+            ], executed_by_uuid)
+            transactions = report.transactions
             
             # 更新出库单状态
             order.status = 'completed'
@@ -483,7 +453,7 @@ class ProductOutboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             current_app.logger.info(f"出库单 {order.order_number} 执行成功，创建了 {len(transactions)} 条库存流水")
             
@@ -520,7 +490,7 @@ class ProductOutboundService(TenantAwareService):
             self.commit()
             
             # 填充仓库信息
-            self._fill_warehouse_info([order])
+            fill_warehouse_names([order])
             
             return order.to_dict()
             
@@ -13,6 +13,8 @@ from datetime import datetime
 import uuid
 
 from app.services.base_service import TenantAwareService
+from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+from app.utils.metrics import track_posting
 from app.models.business.inventory import (
     ProductTransferOrder, 
     ProductTransferOrderDetail,
@@ -264,12 +266,12 @@ class ProductTransferService(TenantAwareService):
             current_app.logger.error(f"确认调拨单失败: {str(e)}")
             return {'success': False, 'message': f'确认失败: {str(e)}'}
     
+    @track_posting('product_transfer')
     def execute_transfer_order(self, transfer_order_id, executed_by):
         """执行调拨单"""
         try:
-            transfer_order = self.session.query(ProductTransferOrder).filter_by(
-                id=transfer_order_id
-            ).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            transfer_order = engine.lock_document(ProductTransferOrder, transfer_order_id)
             
             if not transfer_order:
                 return {'success': False, 'message': '调拨单不存在'}
@@ -277,82 +279,45 @@ class ProductTransferService(TenantAwareService):
             if transfer_order.status != 'confirmed':
                 return {'success': False, 'message': '只能执行已确认的调拨单'}
             
-            # 执行库存调拨
+            # 执行库存调拨：调出仓库减库存（检查可用库存），调入仓库加库存（没有库存时创建）
+            lines = []
             for detail in transfer_order.details:
-                # 从调出仓库减库存
-                from_inventory = self.session.query(Inventory).filter_by(
+                label = f"产品 {detail.product_name or detail.product_id}"
+                lines.append(PostingLine(
+                    -detail.transfer_quantity, 'transfer_out',
                     warehouse_id=transfer_order.from_warehouse_id,
-                    product_id=detail.product_id
-                ).first()
-                
-                if from_inventory:
-                    from_inventory.current_quantity -= detail.transfer_quantity
-                    from_inventory.available_quantity -= detail.transfer_quantity
-                    from_inventory.updated_by = executed_by
-                    
-                    # 创建出库交易记录
-                    out_transaction = InventoryTransaction(
-                        inventory_id=from_inventory.id,
-                        warehouse_id=from_inventory.warehouse_id,
-                        product_id=from_inventory.product_id,
-                        transaction_type='transfer_out',
-                        quantity_change=-detail.transfer_quantity,
-                        quantity_before=from_inventory.current_quantity,
-                        quantity_after=from_inventory.current_quantity - detail.transfer_quantity,
-                        unit_id=from_inventory.unit_id,
-                        source_document_type='transfer_order',
-                        source_document_number=transfer_order.transfer_number,
-                        reason=f'成品调拨出库到 {transfer_order.to_warehouse_name}',
-                        created_by=executed_by
-                    )
-                    self.session.add(out_transaction)
-                
-                # 向调入仓库加库存
-                to_inventory = self.session.query(Inventory).filter_by(
-                    warehouse_id=transfer_order.to_warehouse_id,
-                    product_id=detail.product_id
-                ).first()
-                
-                if to_inventory:
-                    to_inventory.current_quantity += detail.transfer_quantity
-                    to_inventory.available_quantity += detail.transfer_quantity
-                    to_inventory.updated_by = executed_by
-                else:
-                    # 创建新库存记录
-                    to_inventory = Inventory(
-                        warehouse_id=transfer_order.to_warehouse_id,
-                        product_id=detail.product_id,
-                        current_quantity=detail.transfer_quantity,
-                        available_quantity=detail.transfer_quantity,
-                        unit_id=detail.unit_id,
-                        unit_cost=detail.unit_cost,
-                        batch_number=detail.batch_number,
-                        location_code=detail.to_location_code,
-                        created_by=executed_by
-                    )
-                    self.session.add(to_inventory)
-                    self.session.flush()
-                
-                # 创建调入流水
-                in_transaction = InventoryTransaction(
-                    inventory_id=to_inventory.id,
+                    product_id=detail.product_id,
+                    label=label,
+                    transaction={
+                        'source_document_type': 'transfer_order',
+                        'source_document_id': transfer_order.id,
+                        'source_document_number': transfer_order.transfer_number,
+                        'reason': f'成品调拨出库到 {transfer_order.to_warehouse_name}'
+                    }
+                ))
+                lines.append(PostingLine(
+                    detail.transfer_quantity, 'transfer_in',
                     warehouse_id=transfer_order.to_warehouse_id,
                     product_id=detail.product_id,
-                    transaction_type='transfer_in',
-                    quantity_change=detail.transfer_quantity,
-                    quantity_before=to_inventory.current_quantity - detail.transfer_quantity,
-                    quantity_after=to_inventory.current_quantity,
-                    unit_id=to_inventory.unit_id,
-                    source_document_type='transfer_order',
-                    source_document_id=transfer_order_id,
-                    source_document_number=transfer_order.transfer_number,
-                    batch_number=detail.batch_number,
-                    to_location=detail.to_location_code,
-                    reason=f'成品调拨入库: {transfer_order.transfer_number}',
-                    created_by=executed_by
-                )
-                self.session.add(in_transaction)
-                
+                    label=label,
+                    create={
+                        'unit_id': detail.unit_id,
+                        'unit_cost': detail.unit_cost,
+                        'batch_number': detail.batch_number,
+                        'location_code': detail.to_location_code
+                    },
+                    transaction={
+                        'source_document_type': 'transfer_order',
+                        'source_document_id': transfer_order.id,
+                        'source_document_number': transfer_order.transfer_number,
+                        'batch_number': detail.batch_number,
+                        'to_location': detail.to_location_code,
+                        'reason': f'成品调拨入库: {transfer_order.transfer_number}'
+                    }
+                ))
+            engine.post(lines, executed_by)
+            
+            for detail in transfer_order.details:
                 # 更新明细状态
                 detail.actual_transfer_quantity = detail.transfer_quantity
                 detail.detail_status = 'in_transit'
@@ -417,9 +382,8 @@ class ProductTransferService(TenantAwareService):
     def cancel_transfer_order(self, transfer_order_id, cancelled_by, reason=None):
         """取消调拨单"""
         try:
-            transfer_order = self.session.query(ProductTransferOrder).filter_by(
-                id=transfer_order_id
-            ).first()
+            engine = InventoryPostingEngine(self.session, self.schema_name)
+            transfer_order = engine.lock_document(ProductTransferOrder, transfer_order_id)
             
             if not transfer_order:
                 return {'success': False, 'message': '调拨单不存在'}
@@ -427,35 +391,35 @@ class ProductTransferService(TenantAwareService):
             if transfer_order.status in ['completed', 'cancelled']:
                 return {'success': False, 'message': '该状态下不能取消调拨单'}
             
-            # 如果已执行，需要回滚库存
+            # 如果已执行，需要回滚库存：调出仓库加回，调入仓库扣减（库存不存在时跳过）
             if transfer_order.status == 'in_transit':
+                lines = []
                 for detail in transfer_order.details:
-                    # 回滚调出仓库库存
-                    from_inventory = self.session.query(Inventory).filter_by(
+                    quantity = detail.actual_transfer_quantity or detail.transfer_quantity
+                    transaction = {
+                        'source_document_type': 'transfer_order',
+                        'source_document_id': transfer_order.id,
+                        'source_document_number': transfer_order.transfer_number,
+                        'reason': f"成品调拨取消: {reason or '用户取消'}"
+                    }
+                    lines.append(PostingLine(
+                        quantity, 'transfer_in',
                         warehouse_id=transfer_order.from_warehouse_id,
-                        product_id=detail.product_id
-                    ).first()
-                    
-                    if from_inventory:
-                        from_inventory.current_quantity += detail.actual_transfer_quantity or detail.transfer_quantity
-                        from_inventory.available_quantity += detail.actual_transfer_quantity or detail.transfer_quantity
-                        from_inventory.updated_by = cancelled_by
-                    
-                    # 回滚调入仓库库存
-                    to_inventory = self.session.query(Inventory).filter_by(
+                        product_id=detail.product_id,
+                        required=False,
+                        transaction=transaction
+                    ))
+                    lines.append(PostingLine(
+                        -quantity, 'transfer_out',
                         warehouse_id=transfer_order.to_warehouse_id,
-                        product_id=detail.product_id
-                    ).first()
-                    
-                    if to_inventory:
-                        to_inventory.current_quantity -= detail.actual_transfer_quantity or detail.transfer_quantity
-                        to_inventory.available_quantity -= detail.actual_transfer_quantity or detail.transfer_quantity
-                        to_inventory.updated_by = cancelled_by
-                        
-                        # 如果库存为0，删除记录
-                        if to_inventory.current_quantity <= 0:
-                            self.session.delete(to_inventory)
-                    
+                        product_id=detail.product_id,
+                        required=False,
+                        check_available=False,
+                        transaction=transaction
+                    ))
+                engine.post(lines, cancelled_by)
+                
+                for detail in transfer_order.details:
                     # 更新明细状态
                     detail.detail_status = 'cancelled'
                     detail.updated_by = cancelled_by
@@ -12,6 +12,8 @@ from flask import current_app
 from decimal import Decimal
 
 from app.services.base_service import TenantAwareService
+from app.utils.read_replica import read_only
+from app.utils.numbering import next_number
 from app.models.business.sales import DeliveryNotice, DeliveryNoticeDetail, SalesOrder, SalesOrderDetail
 from app.models.basic_data import CustomerManagement
 
@@ -39,22 +41,7 @@ class DeliveryNoticeService(TenantAwareService):
 
     def _generate_notice_number(self) -> str:
         """生成送货通知单号 (DN前缀)"""
-        today = datetime.now()
-        date_str = today.strftime('%Y%m%d')
-        
-        # 查询当天最大通知单号
-        session = self.get_session()
-        max_notice = session.query(DeliveryNotice).filter(
-            DeliveryNotice.notice_number.like(f'DN{date_str}%')
-        ).order_by(desc(DeliveryNotice.notice_number)).first()
-        
-        if max_notice:
-            last_seq = int(max_notice.notice_number[-4:])
-            new_seq = last_seq + 1
-        else:
-            new_seq = 1
-            
-        return f'DN{date_str}{new_seq:04d}'
+        return next_number('delivery_notice', schema_name=self.schema_name)
 
     def create_delivery_notice(self, notice_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """
@@ -432,6 +419,7 @@ class DeliveryNoticeService(TenantAwareService):
         self.commit()
         return self.get_delivery_notice_by_id(notice_id) 
 
+    @read_only
     def get_delivery_notice_list(self, page: int, per_page: int, filters: Optional[Dict] = None) -> Dict[str, Any]:
         """
         获取送货通知单列表（别名方法，兼容前端调用）
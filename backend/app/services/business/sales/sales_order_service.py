@@ -9,8 +9,13 @@ from sqlalchemy import desc
 from uuid import UUID
 
 from app.services.base_service import TenantAwareService
+from app.utils.read_replica import read_only
+from app.utils.pagination import keyset_paginate
+from app.utils.list_count import count_total
+from app.utils.projection import fields_query, summary_rows, export_query
+from app.utils.reference_resolver import resolve_references
 from app.models.business.sales import SalesOrder, SalesOrderDetail, SalesOrderOtherFee, SalesOrderMaterial
-from app.models.basic_data import CustomerManagement, CustomerContact, Employee, TaxRate
+from app.models.basic_data import CustomerManagement
 from app.models.business.inventory import Inventory
 from flask import current_app
 
@@ -266,32 +271,98 @@ class SalesOrderService(TenantAwareService):
             self.rollback()
             raise Exception(f"更新销售订单失败: {str(e)}")
     
-    def get_sales_order_detail(self, order_id: str) -> Dict[str, Any]:
-        """获取销售订单详情"""
-        from sqlalchemy.orm import joinedload
+    def get_sales_order_detail(self, order_id: str, fields: List[str] = None,
+                               detail_fields: List[str] = None) -> Dict[str, Any]:
+        """
+        获取销售订单详情
+        fields 指定时订单只查询并返回这些列（不含明细、费用等子表）；
+        detail_fields 指定时订单明细只查询并返回这些列
+        """
+        from sqlalchemy.orm import joinedload, noload
         
-        sales_order = self.get_session().query(SalesOrder).options(
-            joinedload(SalesOrder.customer),
-            joinedload(SalesOrder.order_details),
-            joinedload(SalesOrder.other_fees),
-            joinedload(SalesOrder.material_details)
-        ).filter_by(id=order_id).first()
+        detail_query = None
+        if detail_fields:
+            detail_query = fields_query(
+                self.get_session().query(SalesOrderDetail), SalesOrderDetail, detail_fields
+            ).filter(SalesOrderDetail.sales_order_id == order_id)
         
-        if not sales_order:
-            raise ValueError("销售订单不存在")
+        if fields:
+            row = fields_query(self.get_session().query(SalesOrder), SalesOrder, fields).filter(
+                SalesOrder.id == order_id
+            ).first()
+            if not row:
+                raise ValueError("销售订单不存在")
+            result = summary_rows([row])[0]
+        else:
+            sales_order = self.get_session().query(SalesOrder).options(
+                joinedload(SalesOrder.customer),
+                noload(SalesOrder.order_details) if detail_query is not None else joinedload(SalesOrder.order_details),
+                joinedload(SalesOrder.other_fees),
+                joinedload(SalesOrder.material_details)
+            ).filter_by(id=order_id).first()
+            
+            if not sales_order:
+                raise ValueError("销售订单不存在")
+            result = sales_order.to_dict()
+        
+        if detail_query is not None:
+            result['order_details'] = summary_rows(detail_query.all())
         
-        return sales_order.to_dict()
+        return result
     
+    @read_only
     def get_sales_order_list(self, page: int = 1, page_size: int = 10,
-                           filters: Dict[str, Any] = None) -> Dict[str, Any]:
-        """获取销售订单列表"""
+                           filters: Dict[str, Any] = None, cursor: str = None,
+                           with_total: bool = False, fields: List[str] = None) -> Dict[str, Any]:
+        """
+        获取销售订单列表
+        cursor 不为None时使用游标分页（按创建时间倒序），with_total 控制是否统计总数
+        fields 指定时只查询并返回这些列（主键总是包含），不附加客户、联系人等关联信息
+        """
+        query = self._sales_order_query(filters)
         
-        # 使用更复杂的查询，包含更多关联信息
-        from app.models.basic_data import CustomerContact, Employee
+        if fields:
+            # 游标分页需要从结果中读取排序键
+            query = fields_query(query, SalesOrder, fields + ['created_at'] if cursor is not None else fields)
+        else:
+            query = query.options(joinedload(SalesOrder.customer))
         
-        query = self.get_session().query(SalesOrder).options(
-            joinedload(SalesOrder.customer)
-        )
+        if cursor is not None:
+            page_result = keyset_paginate(
+                query, (SalesOrder.created_at, SalesOrder.id),
+                cursor=cursor, page_size=page_size, with_total=with_total,
+                count_name='sales_orders'
+            )
+            orders = page_result['items']
+        else:
+            # 排序
+            query = query.order_by(desc(SalesOrder.created_at))
+            
+            # 分页
+            total, total_estimated = count_total(query, 'sales_orders')
+            orders = query.offset((page - 1) * page_size).limit(page_size).all()
+        
+        if fields:
+            order_list = summary_rows(orders)
+        else:
+            order_list = self._build_order_list(orders)
+        
+        if cursor is not None:
+            page_result.pop('items')
+            return dict(page_result, orders=order_list, page_size=page_size)
+        
+        return {
+            'orders': order_list,
+            'total': total,
+            'total_estimated': total_estimated,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total + page_size - 1) // page_size
+        }
+    
+    def _sales_order_query(self, filters: Dict[str, Any] = None):
+        """销售订单列表和导出共用的过滤条件"""
+        query = self.get_session().query(SalesOrder)
         
         # 应用过滤条件
         if filters:
@@ -307,18 +378,38 @@ class SalesOrderService(TenantAwareService):
                 query = query.filter(SalesOrder.delivery_date >= filters['start_date'])
             if filters.get('end_date'):
                 query = query.filter(SalesOrder.delivery_date <= filters['end_date'])
+        return query
+    
+    def export_sales_orders(self, filters: Dict[str, Any] = None):
+        """
+        销售订单导出查询（列投影，按创建时间倒序），过滤条件同 get_sales_order_list
+        :return: 返回Row的查询，由调用方流式迭代
+        """
+        return export_query(self._sales_order_query(filters), SalesOrder).order_by(
+            desc(SalesOrder.created_at), desc(SalesOrder.id)
+        )
+    
+    def _build_order_list(self, orders: List[SalesOrder]) -> List[Dict[str, Any]]:
+        """手动构建列表数据，联系人、业务员、跟单员、税率按整页批量解析"""
+        session = self.get_session()
+        contacts = resolve_references('customer_contact', (order.contact_person_id for order in orders), session=session)
+        # tracking_number字段实际存的是跟单员ID
+        employees = resolve_references(
+            'employee',
+            [order.salesperson_id for order in orders] + [order.tracking_number for order in orders],
+            session=session
+        )
+        tax_rates = resolve_references('tax_rate', (order.tax_rate_id for order in orders), session=session)
         
-        # 排序
-        query = query.order_by(desc(SalesOrder.created_at))
-        
-        # 分页
-        total = query.count()
-        orders = query.offset((page - 1) * page_size).limit(page_size).all()
-        
-        # 手动构建列表数据，确保包含所有需要的信息
         order_list = []
         for order in orders:
-            order_data = {
+            contact = contacts.get(str(order.contact_person_id)) or {}
+            mobile = contact.get('mobile') or ''
+            salesperson = employees.get(str(order.salesperson_id)) or {}
+            merchandiser = employees.get(str(order.tracking_number)) or {}
+            tax_rate = tax_rates.get(str(order.tax_rate_id)) or {}
+            
+            order_list.append({
                 'id': str(order.id),
                 'order_number': order.order_number,
                 'order_type': order.order_type,
@@ -334,90 +425,17 @@ class SalesOrderService(TenantAwareService):
                 'status': order.status,
                 'created_at': order.created_at.isoformat() if order.created_at else None,
                 'updated_at': order.updated_at.isoformat() if order.updated_at else None,
-            }
-            
-            # 获取联系人信息（手机号）
-            if order.contact_person_id:
-                try:
-                    current_app.logger.info(f"查询联系人信息，contact_person_id: {order.contact_person_id}")
-                    contact = self.get_session().query(CustomerContact).filter_by(id=order.contact_person_id).first()
-                    if contact:
-                        contact_name = getattr(contact, 'contact_name', '') or ''
-                        order_data['contact_person'] = contact_name
-                        mobile_val = getattr(contact, 'mobile', '') or ''
-                        order_data['mobile'] = mobile_val
-                        order_data['phone'] = mobile_val
-                        current_app.logger.info(f"联系人信息查询成功：{contact_name}")
-                    else:
-                        current_app.logger.warning(f"未找到联系人信息，contact_person_id: {order.contact_person_id}")
-                        order_data['contact_person'] = ''
-                        order_data['mobile'] = ''
-                        order_data['phone'] = ''
-                except Exception as e:
-                    current_app.logger.error(f"查询联系人信息失败: {str(e)}")
-                    order_data['contact_person'] = ''
-                    order_data['mobile'] = ''
-                    order_data['phone'] = ''
-            else:
-                order_data['contact_person'] = ''
-                order_data['mobile'] = ''
-                order_data['phone'] = ''
-            
-            # 获取业务员信息
-            if order.salesperson_id:
-                try:
-                    salesperson = self.get_session().query(Employee).filter_by(id=order.salesperson_id).first()
-                    if salesperson:
-                        order_data['salesperson_name'] = salesperson.employee_name
-                    else:
-                        order_data['salesperson_name'] = ''
-                except Exception:
-                    order_data['salesperson_name'] = ''
-            else:
-                order_data['salesperson_name'] = ''
-            
-            # 获取跟单员信息（tracking_number字段实际存的是跟单员ID）
-            if order.tracking_number:
-                try:
-                    merchandiser = self.get_session().query(Employee).filter_by(id=order.tracking_number).first()
-                    if merchandiser:
-                        order_data['merchandiser_name'] = merchandiser.employee_name
-                    else:
-                        order_data['merchandiser_name'] = ''
-                except Exception:
-                    order_data['merchandiser_name'] = ''
-            else:
-                order_data['merchandiser_name'] = ''
-            
-            # 添加送货方式信息
-            order_data['delivery_method'] = ''  # 需要从客户信息中获取，暂时留空
-            
-            # 获取税收信息
-            if order.tax_rate_id:
-                try:
-                    tax_rate = self.get_session().query(TaxRate).filter_by(id=order.tax_rate_id).first()
-                    if tax_rate:
-                        order_data['tax_name'] = tax_rate.tax_name
-                        order_data['tax_rate'] = float(tax_rate.tax_rate) if tax_rate.tax_rate else 0
-                    else:
-                        order_data['tax_name'] = ''
-                        order_data['tax_rate'] = 0
-                except Exception:
-                    order_data['tax_name'] = ''
-                    order_data['tax_rate'] = 0
-            else:
-                order_data['tax_name'] = ''
-                order_data['tax_rate'] = 0
-            
-            order_list.append(order_data)
+                'contact_person': contact.get('contact_name') or '',
+                'mobile': mobile,
+                'phone': mobile,
+                'salesperson_name': salesperson.get('employee_name') or '',
+                'merchandiser_name': merchandiser.get('employee_name') or '',
+                'delivery_method': '',  # 需要从客户信息中获取，暂时留空
+                'tax_name': tax_rate.get('tax_name') or '',
+                'tax_rate': float(tax_rate['tax_rate']) if tax_rate.get('tax_rate') else 0,
+            })
         
-        return {
-            'orders': order_list,
-            'total': total,
-            'page': page,
-            'page_size': page_size,
-            'total_pages': (total + page_size - 1) // page_size
-        }
+        return order_list
     
     def approve_sales_order(self, order_id: str, user_id: str) -> Dict[str, Any]:
         """审批销售订单"""
@@ -519,6 +537,7 @@ class SalesOrderService(TenantAwareService):
             'total_amount': total_amount
         }
     
+    @read_only
     def get_order_statistics(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
         """获取订单统计"""
         
@@ -593,6 +612,7 @@ class SalesOrderService(TenantAwareService):
 
 
 
+    @read_only
     def get_sales_order_report(self, filters: Dict[str, Any] = None) -> Dict[str, Any]:
         """获取销售订单报表"""
         try:
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+租户启动数据服务
+
+前端登录后需要的参考数据（单位、仓库、币别、税率、付款方式）和配置（列配置、动态字段、模块）
+合并为一个文档，按租户缓存。文档版本由各依赖表的版本号组成，任何一张表写入提交后版本变化，
+前端通过版本检查接口判断是否需要重新获取。
+"""
+
+import json
+import hashlib
+from flask import current_app
+
+from app.services.base_service import TenantAwareService
+from app.services.module_service import ModuleService
+from app.services.base_archive.production_archive.unit_service import UnitService
+from app.services.base_archive.production_archive.warehouse_service import WarehouseService
+from app.services.base_archive.financial_management.currency_service import CurrencyService
+from app.services.base_archive.financial_management.tax_rate_service import TaxRateService
+from app.services.base_archive.financial_management.payment_method_service import PaymentMethodService
+from app.models.column_configuration import ColumnConfiguration
+from app.models.dynamic_field import DynamicField
+from app.utils.cache import reference_cache
+
+# 租户schema中的依赖表
+BOOTSTRAP_TENANT_TABLES = (
+    'units', 'warehouses', 'currencies', 'tax_rates', 'payment_methods',
+    'column_configurations', 'dynamic_fields'
+)
+# system schema中的依赖表
+BOOTSTRAP_SYSTEM_TABLES = ('system_modules', 'tenant_modules')
+
+reference_cache.watch(*BOOTSTRAP_TENANT_TABLES, *BOOTSTRAP_SYSTEM_TABLES)
+
+
+def bootstrap_tables():
+    """
+    启动数据依赖的表
+    :return: 表名元组，system schema中的表带schema前缀
+    """
+    system_schema = current_app.config['SYSTEM_SCHEMA']
+    return BOOTSTRAP_TENANT_TABLES + tuple(f'{system_schema}.{table}' for table in BOOTSTRAP_SYSTEM_TABLES)
+
+
+def _digest(raw):
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class TenantBootstrapService(TenantAwareService):
+    """租户启动数据服务"""
+
+    def get_version(self, tenant_id):
+        """
+        获取启动数据版本号
+        :param tenant_id: 租户ID（UUID）
+        :return: 依赖表版本号的摘要；缓存未启用时为文档内容摘要
+        """
+        version = reference_cache.version(*bootstrap_tables(), schema_name=self.schema_name)
+        if version is None:
+            return _digest(json.dumps(self._build_document(tenant_id), sort_keys=True, default=str))
+        return _digest(version)
+
+    def get_bootstrap(self, tenant_id):
+        """
+        获取启动数据文档
+        :param tenant_id: 租户ID（UUID）
+        :return: {'version': 版本号, 参考数据..., 配置...}
+        """
+        # 先取版本号再取文档，并发写入时文档不会旧于版本号，前端下次检查时重新获取
+        version = reference_cache.version(*bootstrap_tables(), schema_name=self.schema_name)
+        document = reference_cache.get_or_set(
+            f'bootstrap:{tenant_id}',
+            lambda: self._build_document(tenant_id),
+            tables=bootstrap_tables(),
+            schema_name=self.schema_name
+        )
+        if version is None:
+            return {'version': _digest(json.dumps(document, sort_keys=True, default=str)), **document}
+        return {'version': _digest(version), **document}
+
+    def _build_document(self, tenant_id):
+        service_args = {'tenant_id': self.tenant_id, 'schema_name': self.schema_name}
+        return {
+            'units': UnitService(**service_args).get_enabled_units(),
+            'warehouses': WarehouseService(**service_args).get_warehouse_options(),
+            'currencies': CurrencyService(**service_args).get_enabled_currencies(),
+            'tax_rates': TaxRateService(**service_args).get_enabled_tax_rates(),
+            'payment_methods': PaymentMethodService(**service_args).get_enabled_payment_methods(),
+            'column_configs': self._get_column_configs(),
+            'dynamic_fields': self._get_dynamic_fields(),
+            'modules': ModuleService.get_available_modules(tenant_id=tenant_id) if tenant_id else [],
+        }
+
+    def _get_column_configs(self):
+        """
+        :return: {页面名称: {配置类型: 配置数据}}
+        """
+        configs = self.session.query(
+            ColumnConfiguration.page_name, ColumnConfiguration.config_type, ColumnConfiguration.config_data
+        ).filter(ColumnConfiguration.is_enabled == True).all()
+
+        result = {}
+        for page_name, config_type, config_data in configs:
+            result.setdefault(page_name, {})[config_type] = config_data
+        return result
+
+    def _get_dynamic_fields(self):
+        """
+        :return: {模型名称: {页面名称: [字段定义]}}
+        """
+        fields = self.session.query(DynamicField).order_by(
+            DynamicField.model_name, DynamicField.page_name, DynamicField.display_order
+        ).all()
+
+        result = {}
+        for field in fields:
+            result.setdefault(field.model_name, {}).setdefault(field.page_name, []).append(field.to_dict())
+        return result
+
+
+def get_tenant_bootstrap_service(tenant_id: str = None, schema_name: str = None) -> TenantBootstrapService:
+    """获取租户启动数据服务实例"""
+    return TenantBootstrapService(tenant_id=tenant_id, schema_name=schema_name)
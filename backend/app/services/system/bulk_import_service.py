@@ -0,0 +1,545 @@
+# -*- coding: utf-8 -*-
+"""
+主数据批量导入服务
+
+导入按任务异步执行（进程内线程池，租约见 app.utils.background_jobs），进度和逐行错误报告保存在 import_jobs 表：
+1. 暂存：逐行读取上传的CSV/XLSX，做行内校验（类型、长度、必填），通过 COPY 写入
+   临时暂存表（ON COMMIT DROP），错误写入该行的 errors 列
+2. 校验：在暂存表上用集合SQL按名称/编码解析外键（分类、单位、税率），检查编号在文件内
+   和已有数据中是否重复
+3. 写入：为未填编号的行按编号规则批量预留编号（app.utils.numbering），INSERT ... SELECT 一次写入全部有效行
+
+暂存、校验和写入在同一个事务中，任务失败时目标表不会写入部分数据。
+"""
+
+import os
+import uuid
+import logging
+import tempfile
+from decimal import Decimal, InvalidOperation
+from datetime import date, datetime
+
+import sqlalchemy as sa
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import UUID, ARRAY
+from flask import current_app
+
+from app.extensions import db
+from app.services.base_service import TenantAwareService
+from app.models.import_job import ImportJob
+from app.models.basic_data import (
+    CustomerManagement, CustomerCategoryManagement, SupplierManagement, SupplierCategoryManagement,
+    Material, MaterialCategory, Product, ProductCategory, Unit, TaxRate
+)
+from app.utils.cache import reference_cache
+from app.utils.background_jobs import submit_job, fail_stale_jobs
+from app.utils.bulk_copy import import_format, read_rows, count_rows, copy_rows
+from app.utils.numbering import reserve_numbers
+from app.utils.tenant_context import set_search_path
+
+logger = logging.getLogger(__name__)
+
+_STAGING_TABLE = 'import_staging'
+
+# 不从文件导入的列：由导入过程填写
+_SYSTEM_COLUMNS = {'id', 'created_by', 'updated_by', 'created_at', 'updated_at', 'tenant_id'}
+
+# 可从文件导入的列类型，UUID（外键）、JSON等列不导入
+_IMPORT_TYPES = (sa.String, sa.Numeric, sa.Integer, sa.Boolean, sa.Date, sa.DateTime)
+
+_TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', '是', '√'}
+_FALSE_VALUES = {'0', 'false', 'f', 'no', 'n', '否'}
+
+class Lookup:
+    """外键列按关联表的编码/名称解析"""
+
+    def __init__(self, column, model, keys, label=None, copy=None):
+        """
+        :param column: 目标表外键列名，如 unit_id
+        :param model: 关联模型
+        :param keys: 依次匹配的关联表列，如 ('category_code', 'category_name')
+        :param label: 表头名称，默认取外键列注释去掉末尾的ID
+        :param copy: 解析后一并填入的列 {目标表列: 关联表列}
+        """
+        self.column = column
+        self.model = model
+        self.keys = keys
+        self.label = label
+        self.copy = copy or {}
+
+    @property
+    def field(self):
+        """文件中的字段名，如 unit_id -> unit_name"""
+        return self.column[:-3] + '_name'
+
+
+class ImportEntity:
+    """可批量导入的主数据"""
+
+    def __init__(self, model, label, code_column, code_rule, lookups=()):
+        self.model = model
+        self.label = label
+        self.code_column = code_column
+        self.code_rule = code_rule
+        self.lookups = lookups
+
+    @property
+    def table(self):
+        return self.model.__table__
+
+    def columns(self):
+        """从文件导入的本表列"""
+        excluded = set(_SYSTEM_COLUMNS)
+        for lookup in self.lookups:
+            excluded.add(lookup.column)
+            excluded.update(lookup.copy)
+        return [
+            column for column in self.table.columns
+            if column.name not in excluded and isinstance(column.type, _IMPORT_TYPES)
+        ]
+
+    def fields(self):
+        """
+        文件字段定义
+        :return: [{'field', 'label', 'required'}]
+        """
+        result = []
+        for column in self.columns():
+            result.append({
+                'field': column.name,
+                'label': column.comment or column.name,
+                'required': self.is_required(column),
+            })
+        for lookup in self.lookups:
+            result.append({'field': lookup.field, 'label': self.lookup_label(lookup), 'required': False})
+        return result
+
+    def header_map(self):
+        """表头 -> 字段名，表头可以是字段名或字段标签；重复的标签只能使用字段名"""
+        fields = self.fields()
+        labels = {}
+        for field in fields:
+            labels.setdefault(field['label'], []).append(field['field'])
+        mapping = {label: names[0] for label, names in labels.items() if len(names) == 1}
+        mapping.update({field['field']: field['field'] for field in fields})
+        return mapping
+
+    def is_required(self, column):
+        return not column.nullable and column.default is None and column.name != self.code_column
+
+    def lookup_label(self, lookup):
+        if lookup.label:
+            return lookup.label
+        comment = self.table.c[lookup.column].comment or lookup.field
+        return comment[:-2] if comment.endswith('ID') else comment
+
+
+def _unit_lookup(column):
+    return Lookup(column, Unit, ('unit_name',))
+
+
+IMPORT_ENTITIES = {
+    'customer': ImportEntity(
+        CustomerManagement, '客户', 'customer_code', 'customer',
+        lookups=(
+            Lookup('customer_category_id', CustomerCategoryManagement, ('category_code', 'category_name')),
+            Lookup('tax_rate_id', TaxRate, ('tax_name',), label='税收', copy={'tax_rate': 'tax_rate'}),
+        )
+    ),
+    'supplier': ImportEntity(
+        SupplierManagement, '供应商', 'supplier_code', 'supplier',
+        lookups=(
+            Lookup('supplier_category_id', SupplierCategoryManagement, ('category_code', 'category_name')),
+            Lookup('tax_rate_id', TaxRate, ('tax_name',), label='税收', copy={'tax_rate': 'tax_rate'}),
+        )
+    ),
+    'material': ImportEntity(
+        Material, '材料', 'material_code', 'material',
+        lookups=(
+            Lookup('material_category_id', MaterialCategory, ('material_name',)),
+            _unit_lookup('unit_id'),
+            _unit_lookup('auxiliary_unit_id'),
+            _unit_lookup('sales_unit_id'),
+        )
+    ),
+    'product': ImportEntity(
+        Product, '产品', 'product_code', 'product',
+        lookups=(
+            Lookup('category_id', ProductCategory, ('category_name',), label='产品分类'),
+            _unit_lookup('unit_id'),
+            _unit_lookup('package_unit_id'),
+        )
+    ),
+}
+
+
+def _convert(column, label, value):
+    """
+    行内校验并转换单元格值
+    :return: (值, 错误信息)；空值返回 (None, None)
+    """
+    if value is None:
+        return None, None
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '':
+            return None, None
+
+    column_type = column.type
+    try:
+        if isinstance(column_type, sa.Boolean):
+            if isinstance(value, bool):
+                return value, None
+            normalized = str(value).strip().lower()
+            if normalized in _TRUE_VALUES:
+                return True, None
+            if normalized in _FALSE_VALUES:
+                return False, None
+            return None, f"{label}: 无法识别的是/否值 {value}"
+
+        if isinstance(column_type, sa.Integer):
+            number = Decimal(str(value))
+            if number != number.to_integral_value():
+                return None, f"{label}: 应为整数"
+            number = int(number)
+            if not -2 ** 31 <= number < 2 ** 31:
+                return None, f"{label}: 数值超出范围"
+            return number, None
+
+        if isinstance(column_type, sa.Numeric):
+            number = Decimal(str(value).replace(',', ''))
+            if not number.is_finite():
+                return None, f"{label}: 数值格式错误"
+            precision, scale = column_type.precision, column_type.scale
+            if precision is not None and abs(round(number, scale or 0)) >= Decimal(10) ** (precision - (scale or 0)):
+                return None, f"{label}: 数值超出范围"
+            return number, None
+
+        if isinstance(column_type, sa.DateTime):
+            if isinstance(value, datetime):
+                return value, None
+            return datetime.fromisoformat(str(value).replace('/', '-')), None
+
+        if isinstance(column_type, sa.Date):
+            if isinstance(value, datetime):
+                return value.date(), None
+            if isinstance(value, date):
+                return value, None
+            return date.fromisoformat(str(value).replace('/', '-')[:10]), None
+    except (InvalidOperation, ValueError, TypeError):
+        return None, f"{label}: 格式错误 {value}"
+
+    value = str(value)
+    length = getattr(column_type, 'length', None)
+    if length and len(value) > length:
+        return None, f"{label}: 超过最大长度{length}"
+    return value, None
+
+
+class BulkImportService(TenantAwareService):
+    """主数据批量导入服务"""
+
+    def get_entities(self):
+        """获取可导入的主数据及其字段"""
+        return [
+            {'entity_type': entity_type, 'label': entity.label, 'fields': entity.fields()}
+            for entity_type, entity in IMPORT_ENTITIES.items()
+        ]
+
+    def create_job(self, entity_type, file_storage, created_by, validate_only=False):
+        """
+        创建导入任务并提交后台执行
+        :param entity_type: customer / supplier / material / product
+        :param file_storage: 上传文件（werkzeug FileStorage）
+        :param created_by: 当前用户ID
+        :param validate_only: 仅校验，不写入目标表
+        :return: 任务字典
+        """
+        if entity_type not in IMPORT_ENTITIES:
+            raise ValueError(f"不支持的导入对象: {entity_type}，可选 {', '.join(IMPORT_ENTITIES)}")
+        file_format = import_format(file_storage.filename)
+
+        fd, path = tempfile.mkstemp(suffix=f'.{file_format}', dir=current_app.config.get('BULK_IMPORT_FOLDER'))
+        os.close(fd)
+        file_storage.save(path)
+
+        try:
+            job = ImportJob(
+                entity_type=entity_type,
+                file_name=file_storage.filename,
+                validate_only=validate_only,
+                status=ImportJob.STATUS_PENDING,
+                created_by=uuid.UUID(created_by) if isinstance(created_by, str) else created_by,
+            )
+            self.session.add(job)
+            self.commit()
+        except Exception:
+            os.unlink(path)
+            raise
+
+        submit_job(
+            'bulk-import', current_app.config.get('BULK_IMPORT_WORKERS', 2), ImportJob, job.id,
+            _run_job, self.tenant_id, self.schema_name, str(job.id), path, file_format,
+            tenant_id=self.tenant_id, schema_name=self.schema_name, shard_name=self.shard_name
+        )
+        return job.to_dict()
+
+    def get_job(self, job_id, include_errors=False):
+        """
+        获取导入任务
+        :param job_id: 任务ID
+        :param include_errors: 是否包含逐行错误报告
+        :return: 任务字典
+        """
+        fail_stale_jobs(self.session, ImportJob)
+        job = self.session.get(ImportJob, uuid.UUID(job_id))
+        if not job:
+            raise ValueError("导入任务不存在")
+        return job.to_dict(include_errors=include_errors)
+
+    def get_jobs(self, page=1, per_page=20, entity_type=None):
+        """获取导入任务列表"""
+        fail_stale_jobs(self.session, ImportJob)
+        query = self.session.query(ImportJob)
+        if entity_type:
+            query = query.filter(ImportJob.entity_type == entity_type)
+        total = query.count()
+        jobs = query.order_by(ImportJob.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        return {
+            'jobs': [job.to_dict() for job in jobs],
+            'total': total,
+            'current_page': page,
+            'per_page': per_page,
+        }
+
+    def run_job(self, job_id, path, file_format):
+        """
+        执行导入任务（后台线程中调用）
+        :param job_id: 任务ID
+        :param path: 上传文件路径
+        :param file_format: csv 或 xlsx
+        """
+        job = self.session.get(ImportJob, uuid.UUID(job_id))
+        entity = IMPORT_ENTITIES[job.entity_type]
+        job.status = ImportJob.STATUS_RUNNING
+        job.phase = ImportJob.PHASE_STAGING
+        job.started_at = datetime.now()
+        job.total_rows = count_rows(path, file_format)
+        self.commit()
+
+        try:
+            self._import(job, entity, path, file_format)
+            job.status = ImportJob.STATUS_COMPLETED
+        except Exception as e:
+            self.rollback()
+            logger.exception("Bulk import job %s failed", job_id)
+            job.status = ImportJob.STATUS_FAILED
+            job.message = str(e)
+        job.finished_at = datetime.now()
+        self.commit()
+
+    def _import(self, job, entity, path, file_format):
+        # 暂存表是临时表，需在专用连接上完成整个导入，进度更新经 self.session 另行提交
+        engine = self.session.get_bind(mapper=sa.inspect(entity.model))
+        with engine.connect() as connection, connection.begin():
+            set_search_path(connection, self.schema_name)
+
+            staging = self._staging_table(entity)
+            staging.create(connection)
+
+            rows = read_rows(path, file_format)
+            header = [str(value).strip() if value is not None else '' for value in next(rows, [])]
+            header_map = entity.header_map()
+            fields = [header_map.get(name) for name in header]
+            if not any(fields):
+                raise ValueError("文件表头与导入字段不匹配，请使用导入模板")
+            ignored = [name for name, field in zip(header, fields) if name and not field]
+            if ignored:
+                job.message = f"已忽略的列: {', '.join(ignored)}"
+
+            copy_rows(connection, _STAGING_TABLE, [column.name for column in staging.columns],
+                      self._staged_rows(job, entity, staging, fields, rows))
+
+            job.phase = ImportJob.PHASE_VALIDATING
+            self.commit()
+            if not job.validate_only:
+                # 校验已有编号和分配新编号期间阻止其他写入，提交时释放
+                table_name = connection.dialect.identifier_preparer.format_table(entity.table)
+                connection.execute(text(f'LOCK TABLE {table_name} IN SHARE ROW EXCLUSIVE MODE'))
+            self._validate(connection, entity, staging)
+
+            valid = func.cardinality(staging.c.errors) == 0
+            job.error_rows = connection.execute(select(func.count()).select_from(staging).where(~valid)).scalar()
+            report = connection.execute(
+                select(staging.c.row_no, staging.c.errors).where(~valid).order_by(staging.c.row_no)
+                .limit(current_app.config.get('BULK_IMPORT_MAX_ERROR_REPORT', 10000))
+            ).all()
+            job.error_report = [{'row': row_no, 'errors': errors} for row_no, errors in report]
+
+            if not job.validate_only:
+                job.phase = ImportJob.PHASE_LOADING
+                self.commit()
+                self._assign_codes(connection, entity, staging, valid)
+                job.imported_rows = self._load(connection, entity, staging, valid, job.created_by)
+
+        if job.imported_rows:
+            # 专用连接上的写入不经过ORM会话事件，提交后显式使缓存失效
+            reference_cache.invalidate(entity.table.name, schema_name=self.schema_name)
+
+    def _staging_table(self, entity):
+        columns = [
+            sa.Column('row_no', sa.Integer, primary_key=True),
+            sa.Column('id', UUID(as_uuid=True)),
+            sa.Column('errors', ARRAY(sa.Text)),
+        ]
+        columns.extend(sa.Column(column.name, column.type) for column in entity.columns())
+        for lookup in entity.lookups:
+            columns.append(sa.Column(lookup.field, sa.Text))
+            columns.append(sa.Column(lookup.column, UUID(as_uuid=True)))
+            columns.extend(sa.Column(name, entity.table.c[name].type) for name in lookup.copy)
+        return sa.Table(_STAGING_TABLE, sa.MetaData(), *columns, prefixes=['TEMPORARY'], postgresql_on_commit='DROP')
+
+    def _staged_rows(self, job, entity, staging, fields, rows):
+        """行内校验并生成暂存表行，每 BULK_IMPORT_PROGRESS_INTERVAL 行更新一次任务进度"""
+        columns = {column.name: column for column in entity.columns()}
+        labels = {field['field']: field['label'] for field in entity.fields()}
+        required = [name for name, column in columns.items() if entity.is_required(column)]
+        lookup_fields = {lookup.field for lookup in entity.lookups}
+        staging_columns = [column.name for column in staging.columns]
+        interval = current_app.config.get('BULK_IMPORT_PROGRESS_INTERVAL', 5000)
+
+        processed = 0
+        # 行号为文件中的行号（表头为第1行），便于在错误报告中定位
+        for row_no, row in enumerate(rows, start=2):
+            if not any(value not in (None, '') for value in row):
+                continue
+            values = {'row_no': row_no, 'id': uuid.uuid4(), 'errors': []}
+            for field, value in zip(fields, row):
+                if field in columns:
+                    values[field], error = _convert(columns[field], labels[field], value)
+                    if error:
+                        values['errors'].append(error)
+                elif field in lookup_fields and value not in (None, ''):
+                    values[field] = str(value).strip() or None
+            for field in required:
+                if values.get(field) is None and not any(error.startswith(f"{labels[field]}:") for error in values['errors']):
+                    values['errors'].append(f"{labels[field]}: 不能为空")
+            yield [values.get(name) for name in staging_columns]
+
+            processed += 1
+            if processed % interval == 0:
+                job.processed_rows = processed
+                self.commit()
+        job.processed_rows = processed
+        job.total_rows = processed
+
+    def _validate(self, connection, entity, staging):
+        """集合校验：解析外键，检查编号重复"""
+        for lookup in entity.lookups:
+            target = lookup.model.__table__
+            for key in lookup.keys:
+                key_column = target.c[key]
+                candidates = select(
+                    key_column.label('lookup_key'),
+                    target.c.id.label('lookup_id'),
+                    *[target.c[source].label(f'copy_{name}') for name, source in lookup.copy.items()]
+                ).where(key_column.isnot(None)).distinct(key_column).order_by(key_column, target.c.id)
+                for flag in ('is_enabled', 'is_active'):
+                    if flag in target.c:
+                        candidates = candidates.where(target.c[flag].is_(True))
+                candidates = candidates.subquery()
+                connection.execute(
+                    staging.update()
+                    .where(staging.c[lookup.column].is_(None), staging.c[lookup.field] == candidates.c.lookup_key)
+                    .values({
+                        lookup.column: candidates.c.lookup_id,
+                        **{name: candidates.c[f'copy_{name}'] for name in lookup.copy},
+                    })
+                )
+            label = entity.lookup_label(lookup)
+            connection.execute(
+                staging.update()
+                .where(staging.c[lookup.field].isnot(None), staging.c[lookup.column].is_(None))
+                .values(errors=func.array_append(staging.c.errors, sa.literal(f"{label}: 不存在 ") + staging.c[lookup.field]))
+            )
+
+        code = staging.c[entity.code_column]
+        code_label = entity.table.c[entity.code_column].comment or entity.code_column
+        duplicated = select(code).where(code.isnot(None)).group_by(code).having(func.count() > 1)
+        connection.execute(
+            staging.update().where(code.in_(duplicated))
+            .values(errors=func.array_append(staging.c.errors, sa.literal(f"{code_label}: 文件内重复 ") + code))
+        )
+        target_code = entity.table.c[entity.code_column]
+        connection.execute(
+            staging.update().where(select(target_code).where(target_code == code).exists())
+            .values(errors=func.array_append(staging.c.errors, sa.literal(f"{code_label}: 已存在 ") + code))
+        )
+
+    def _assign_codes(self, connection, entity, staging, valid):
+        """为未填编号的有效行批量预留编号，与逐条创建时的编号规则一致"""
+        code = staging.c[entity.code_column]
+        count = connection.execute(
+            select(func.count()).select_from(staging).where(code.is_(None), valid)
+        ).scalar()
+        codes = reserve_numbers(entity.code_rule, count, schema_name=self.schema_name)
+        # 跳过文件中已填写的编号
+        while codes:
+            taken = set(connection.execute(select(code).where(code.in_(codes))).scalars())
+            if not taken:
+                break
+            codes = [value for value in codes if value not in taken]
+            codes.extend(reserve_numbers(entity.code_rule, len(taken), schema_name=self.schema_name))
+        if not codes:
+            return
+
+        numbered = select(
+            staging.c.row_no,
+            func.row_number().over(order_by=staging.c.row_no).label('seq')
+        ).where(code.is_(None), valid).subquery()
+        connection.execute(
+            staging.update().where(staging.c.row_no == numbered.c.row_no)
+            .values({entity.code_column: sa.Grouping(sa.literal(codes, ARRAY(sa.Text)))[numbered.c.seq]})
+        )
+
+    def _load(self, connection, entity, staging, valid, created_by):
+        """INSERT ... SELECT 写入全部有效行，未导入的列使用模型默认值"""
+        names, expressions = [], []
+        for column in entity.table.columns:
+            default = column.default
+            default_value = None
+            if default is not None and default.is_scalar:
+                default_value = sa.literal(default.arg, type_=column.type)
+            elif default is not None and default.is_clause_element:
+                default_value = default.arg
+
+            if column.name in staging.c:
+                expression = staging.c[column.name]
+                if default_value is not None:
+                    expression = func.coalesce(expression, default_value)
+            elif column.name == 'created_by':
+                expression = sa.literal(created_by, type_=column.type)
+            elif default_value is not None:
+                expression = default_value
+            else:
+                continue
+            names.append(column.name)
+            expressions.append(expression)
+
+        result = connection.execute(
+            entity.table.insert().from_select(names, select(*expressions).where(valid).order_by(staging.c.row_no))
+        )
+        return result.rowcount
+
+
+def _run_job(tenant_id, schema_name, job_id, path, file_format):
+    """后台执行导入任务，结束后删除上传文件"""
+    try:
+        BulkImportService(tenant_id=tenant_id, schema_name=schema_name).run_job(job_id, path, file_format)
+    finally:
+        os.unlink(path)
+
+
+def get_bulk_import_service(tenant_id: str = None, schema_name: str = None) -> BulkImportService:
+    """获取批量导入服务实例"""
+    return BulkImportService(tenant_id=tenant_id, schema_name=schema_name)
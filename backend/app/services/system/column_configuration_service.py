@@ -7,6 +7,12 @@ import uuid
 class ColumnConfigurationService(TenantAwareService):
     """列配置服务"""
     
+    # 保存列配置的页面名称：前端列表页面，以及库存、库存流水、产品出入库单导出使用的页面
+    PAGE_NAMES = frozenset((
+        'salesOrder', 'customerCategory', 'materialCategory', 'processCategory', 'productCategory',
+        'supplierCategory', 'inventory', 'inventoryTransaction', 'productInbound', 'productOutbound'
+    ))
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.logger = logging.getLogger(__name__)
@@ -20,6 +26,27 @@ class ColumnConfigurationService(TenantAwareService):
             self.logger.error(f"获取列配置失败: {str(e)}")
             raise ValueError(f"获取列配置失败: {str(e)}")
     
+    def get_export_columns(self, page_name):
+        """
+        按页面列配置获取导出列，规则与前端列表一致：
+        column_config 中值为 false 的列隐藏，其余列按 column_order 排序
+        :param page_name: 页面名称，须为 PAGE_NAMES 之一
+        :return: 列名列表，页面没有列配置时返回None（导出全部列）
+        """
+        if page_name not in self.PAGE_NAMES:
+            raise ValueError(f"页面 {page_name} 没有列配置")
+        config = self.get_column_config(page_name, 'column_config')
+        order = self.get_column_config(page_name, 'column_order')
+        visibility = (config or {}).get('config_data') or {}
+        column_order = (order or {}).get('config_data') or []
+
+        if column_order:
+            columns = [key for key in column_order if visibility.get(key) is not False]
+            columns.extend(key for key, visible in visibility.items() if visible and key not in columns)
+        else:
+            columns = [key for key, visible in visibility.items() if visible]
+        return columns or None
+
     def save_column_config(self, page_name, config_type, config_data, user_id):
         """保存列配置"""
         try:
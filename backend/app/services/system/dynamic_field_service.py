@@ -189,7 +189,8 @@ class DynamicFieldService(TenantAwareService):
             
             # 设置正确的 schema 搜索路径
             if schema_name != 'public':
-                self.session.execute(text(f'SET search_path TO {schema_name}, public'))
+                from app.utils.tenant_context import set_search_path
+                set_search_path(self.session.connection(), schema_name)
                 logger.info(f"已设置搜索路径到: {schema_name}")
             
             # 查找所有相关的列配置 - 清理所有类型的配置
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+后台导出任务服务
+
+XLSX无法边生成边发送，超过 XLSX_EXPORT_SYNC_ROWS 行的导出（约每万行4秒）在请求内生成会超过
+gunicorn 请求超时，改为导出任务：请求返回任务，工作簿在后台线程（租约见 app.utils.background_jobs）
+中按游标逐行写入 EXPORT_FOLDER，完成后通过下载接口获取，进度保存在 export_jobs 表。
+
+导出查询由请求内的服务方法构造（已应用过滤条件、排序和列配置），后台线程通过 Query.with_session
+在本线程的会话上执行同一语句。读取游标期间会话不能提交，进度经单独的连接写入。
+"""
+
+import os
+import uuid
+import tempfile
+import logging
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+from sqlalchemy import func
+from flask import current_app
+
+from app.extensions import db
+from app.services.base_service import TenantAwareService
+from app.models.export_job import ExportJob
+from app.utils.background_jobs import submit_job, fail_stale_jobs
+from app.utils.read_replica import read_only_scope
+from app.utils.tenant_context import set_search_path
+from app.utils.xlsx_export import select_columns, xlsx_header, write_xlsx
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobService(TenantAwareService):
+    """后台导出任务服务"""
+
+    def create_job(self, query, filename, columns=None, batch_size=None):
+        """
+        创建XLSX导出任务并提交后台执行
+        :param query: 已应用过滤条件和排序的列投影查询（返回Row）
+        :param filename: 下载文件名（不含扩展名）
+        :param columns: 导出列名列表（页面列配置），为空时导出全部列
+        :param batch_size: 每批从游标读取的行数，默认 EXPORT_BATCH_SIZE
+        :return: 任务字典
+        """
+        created_by = self.get_current_user_id()
+        if not created_by:
+            raise ValueError("未登录用户不能创建导出任务")
+
+        self._purge_expired_files()
+        job = ExportJob(
+            file_name=f'{filename}.xlsx',
+            status=ExportJob.STATUS_PENDING,
+            created_by=uuid.UUID(created_by) if isinstance(created_by, str) else created_by,
+        )
+        self.session.add(job)
+        self.commit()
+
+        submit_job(
+            'export', current_app.config.get('EXPORT_WORKERS', 2), ExportJob, job.id,
+            _run_job, self.tenant_id, self.schema_name, str(job.id), query, filename, columns, batch_size,
+            tenant_id=self.tenant_id, schema_name=self.schema_name, shard_name=self.shard_name
+        )
+        return job.to_dict()
+
+    def get_job(self, job_id):
+        """
+        获取当前用户的导出任务
+        :param job_id: 任务ID
+        :return: 任务字典
+        """
+        fail_stale_jobs(self.session, ExportJob)
+        return self._get_own_job(job_id).to_dict()
+
+    def get_jobs(self, page=1, per_page=20):
+        """获取当前用户的导出任务列表"""
+        fail_stale_jobs(self.session, ExportJob)
+        query = self.session.query(ExportJob).filter(ExportJob.created_by == self._current_user_uuid())
+        total = query.count()
+        jobs = query.order_by(ExportJob.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        return {
+            'jobs': [job.to_dict() for job in jobs],
+            'total': total,
+            'current_page': page,
+            'per_page': per_page,
+        }
+
+    def get_file(self, job_id):
+        """
+        获取已完成导出任务的结果文件
+        :param job_id: 任务ID
+        :return: (文件路径, 下载文件名)
+        """
+        job = self._get_own_job(job_id)
+        if job.status != ExportJob.STATUS_COMPLETED:
+            raise ValueError("导出任务尚未完成")
+        if not job.file_path or not os.path.exists(job.file_path):
+            raise ValueError("导出文件已过期或不存在，请重新导出")
+        return job.file_path, job.file_name
+
+    def run_job(self, job_id, query, sheet_title, columns=None, batch_size=None):
+        """
+        执行导出任务（后台线程中调用）
+        :param job_id: 任务ID
+        :param query: 请求内构造的导出查询
+        :param sheet_title: 工作表名称
+        :param columns: 导出列名列表
+        :param batch_size: 每批从游标读取的行数
+        """
+        job = self.session.get(ExportJob, uuid.UUID(job_id))
+        job.status = ExportJob.STATUS_RUNNING
+        job.started_at = datetime.now()
+        self.commit()
+
+        folder = current_app.config.get('EXPORT_FOLDER') or tempfile.gettempdir()
+        path = os.path.join(folder, f'export_{job_id}.xlsx')
+        batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+        try:
+            query = select_columns(query.with_session(self.session()), columns)
+            with read_only_scope():
+                total_rows = query.order_by(None).count()
+            self._update_job(job_id, total_rows=total_rows)
+
+            with read_only_scope():
+                count = write_xlsx(
+                    query.yield_per(batch_size), xlsx_header(query), path, sheet_title=sheet_title,
+                    progress=lambda processed: self._update_job(job_id, processed_rows=processed),
+                    progress_interval=current_app.config.get('EXPORT_PROGRESS_INTERVAL', 10000)
+                )
+            self.rollback()
+            job.status = ExportJob.STATUS_COMPLETED
+            job.processed_rows = count
+            job.file_path = path
+            job.file_size = os.path.getsize(path)
+        except Exception as e:
+            self.rollback()
+            logger.exception("Export job %s failed", job_id)
+            if os.path.exists(path):
+                os.unlink(path)
+            job.status = ExportJob.STATUS_FAILED
+            job.message = str(e)
+        job.finished_at = datetime.now()
+        self.commit()
+
+    def _update_job(self, job_id, **values):
+        """经单独的连接更新任务进度（会话上的导出游标未读完前不能提交）"""
+        table = ExportJob.__table__
+        statement = table.update().where(table.c.id == uuid.UUID(job_id)).values(updated_at=func.now(), **values)
+        engine = self.session.get_bind(mapper=sa.inspect(ExportJob), clause=statement)
+        with engine.connect() as connection, connection.begin():
+            set_search_path(connection, self.schema_name)
+            connection.execute(statement)
+
+    def _purge_expired_files(self):
+        """删除超过 EXPORT_FILE_RETENTION_HOURS 的导出结果文件"""
+        retention = current_app.config.get('EXPORT_FILE_RETENTION_HOURS', 24)
+        expired = self.session.query(ExportJob).filter(
+            ExportJob.file_path.isnot(None),
+            ExportJob.finished_at < datetime.now() - timedelta(hours=retention)
+        ).all()
+        for job in expired:
+            try:
+                os.unlink(job.file_path)
+            except FileNotFoundError:
+                pass
+            job.file_path = None
+        if expired:
+            self.commit()
+
+    def _current_user_uuid(self):
+        user_id = self.get_current_user_id()
+        return uuid.UUID(user_id) if isinstance(user_id, str) else user_id
+
+    def _get_own_job(self, job_id):
+        try:
+            job = self.session.get(ExportJob, uuid.UUID(job_id))
+        except ValueError:
+            job = None
+        # 导出文件包含业务数据，只有创建人可以查看和下载
+        if not job or job.created_by != self._current_user_uuid():
+            raise ValueError("导出任务不存在")
+        return job
+
+
+def _run_job(tenant_id, schema_name, job_id, query, sheet_title, columns, batch_size):
+    """后台执行导出任务"""
+    ExportJobService(tenant_id=tenant_id, schema_name=schema_name).run_job(
+        job_id, query, sheet_title, columns=columns, batch_size=batch_size
+    )
+
+
+def get_export_job_service(tenant_id: str = None, schema_name: str = None) -> ExportJobService:
+    """获取导出任务服务实例"""
+    return ExportJobService(tenant_id=tenant_id, schema_name=schema_name)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+后台任务执行和租约
+
+批量导入、大数据量导出等耗时任务在进程内线程池中执行，任务记录保存在租户schema的任务表中
+（模型需有 id、status、message、finished_at、updated_at 列和 STATUS_* 常量）。
+gunicorn回收worker（max_requests）、重新部署或进程崩溃时执行线程随之终止，任务记录会一直停在
+pending/running，因此：
+- 提交任务的进程持有任务租约：租约线程每 BACKGROUND_JOB_HEARTBEAT_INTERVAL 秒更新本进程
+  全部未结束任务（包括线程池中排队的任务）的 updated_at
+- 读取任务时调用 fail_stale_jobs，updated_at 超过 BACKGROUND_JOB_LEASE 秒未更新的
+  pending/running 任务标记为失败
+"""
+
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app, g
+from sqlalchemy import func
+
+from app.extensions import db
+from app.utils.tenant_context import TenantContext
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_leases = {}
+_lock = threading.Lock()
+_keeper = None
+
+
+def _get_executor(name, max_workers):
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        return executor
+
+
+def _ensure_keeper(app):
+    global _keeper
+    with _lock:
+        if _keeper is None or not _keeper.is_alive():
+            interval = app.config.get('BACKGROUND_JOB_HEARTBEAT_INTERVAL', 30)
+            _keeper = threading.Thread(target=_keep_leases, args=(interval,), name='job-lease', daemon=True)
+            _keeper.start()
+
+
+def _keep_leases(interval):
+    """定期更新本进程持有的任务的 updated_at"""
+    while True:
+        time.sleep(interval)
+        with _lock:
+            leases = list(_leases.items())
+        groups = {}
+        for job_id, route in leases:
+            groups.setdefault(route, []).append(job_id)
+        for (app, model, schema_name, shard_name), job_ids in groups.items():
+            with app.app_context():
+                tenant_context = TenantContext()
+                tenant_context.set_schema(schema_name)
+                tenant_context.set_shard(shard_name)
+                try:
+                    db.session.query(model).filter(model.id.in_(job_ids)).update(
+                        {model.updated_at: func.now()}, synchronize_session=False
+                    )
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    logger.exception("Failed to renew lease of %s jobs in %s", model.__tablename__, schema_name)
+                finally:
+                    db.session.remove()
+
+
+def submit_job(name, max_workers, model, job_id, target, *args, tenant_id=None, schema_name=None, shard_name=None):
+    """
+    提交后台任务，任务在线程池中恢复应用和租户上下文后执行，执行结束前本进程持有其租约
+    :param name: 线程池名称，同名任务共用一个线程池
+    :param max_workers: 线程池线程数
+    :param model: 任务模型类
+    :param job_id: 任务ID
+    :param target: 执行函数，参数为 args
+    :param tenant_id: 租户ID
+    :param schema_name: 租户schema
+    :param shard_name: 租户所在分片
+    """
+    app = current_app._get_current_object()
+    with _lock:
+        _leases[str(job_id)] = (app, model, schema_name, shard_name)
+    _ensure_keeper(app)
+    _get_executor(name, max_workers).submit(
+        _run_in_context, app, model, str(job_id), target, args, tenant_id, schema_name, shard_name
+    )
+
+
+def _run_in_context(app, model, job_id, target, args, tenant_id, schema_name, shard_name):
+    with app.app_context():
+        g.tenant_id = tenant_id
+        g.schema_name = schema_name
+        g.shard_name = shard_name
+        tenant_context = TenantContext()
+        tenant_context.set_schema(schema_name)
+        tenant_context.set_shard(shard_name)
+        try:
+            target(*args)
+        except Exception:
+            logger.exception("Background job %s %s could not be run", model.__tablename__, job_id)
+        finally:
+            with _lock:
+                _leases.pop(job_id, None)
+            db.session.remove()
+
+
+def fail_stale_jobs(session, model):
+    """
+    将租约过期（执行进程已退出）的 pending/running 任务标记为失败
+    :param session: 数据库会话
+    :param model: 任务模型类
+    :return: 标记的任务数
+    """
+    lease = current_app.config.get('BACKGROUND_JOB_LEASE', 120)
+    count = session.query(model).filter(
+        model.status.in_((model.STATUS_PENDING, model.STATUS_RUNNING)),
+        model.updated_at < func.now() - timedelta(seconds=lease)
+    ).update({
+        model.status: model.STATUS_FAILED,
+        model.message: '任务执行进程已退出（重启或崩溃），请重新提交',
+        model.finished_at: datetime.now(),
+    }, synchronize_session=False)
+    if count:
+        session.commit()
+        logger.warning("Marked %s stale %s jobs as failed", count, model.__tablename__)
+    return count
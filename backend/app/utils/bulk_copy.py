@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+批量导入：读取上传文件并通过 COPY 写入数据库
+
+- read_rows / count_rows: 逐行读取CSV或XLSX（openpyxl只读模式），不把整个文件载入内存
+- copy_rows: 将行迭代器包装为类文件对象交给 psycopg2 copy_expert，
+  COPY ... FROM STDIN 边读边写，内存占用与行数无关
+"""
+
+import io
+import csv
+import uuid
+import decimal
+from datetime import date, datetime
+from importlib.util import find_spec
+
+# openpyxl 导入较慢，在读取XLSX时才导入，不计入应用启动时间
+OPENPYXL_AVAILABLE = find_spec('openpyxl') is not None
+
+FORMAT_CSV = 'csv'
+FORMAT_XLSX = 'xlsx'
+IMPORT_FORMATS = (FORMAT_CSV, FORMAT_XLSX)
+
+
+class UnsupportedImportFileError(ValueError):
+    """不支持的导入文件格式"""
+
+
+def import_format(filename):
+    """
+    按文件扩展名判断导入格式
+    :param filename: 文件名
+    :return: 'csv' 或 'xlsx'
+    """
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension not in IMPORT_FORMATS:
+        raise UnsupportedImportFileError(f"不支持的文件格式: {extension}，可选 {', '.join(IMPORT_FORMATS)}")
+    if extension == FORMAT_XLSX and not OPENPYXL_AVAILABLE:
+        raise UnsupportedImportFileError("未安装 openpyxl，无法导入Excel")
+    return extension
+
+
+def read_rows(path, file_format):
+    """
+    逐行读取文件
+    :param path: 文件路径
+    :param file_format: csv 或 xlsx
+    :return: 行迭代器，第一行为表头，每行为值列表（CSV为字符串，XLSX为单元格值）
+    """
+    if file_format == FORMAT_XLSX:
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield list(row)
+        finally:
+            workbook.close()
+    else:
+        # utf-8-sig 兼容Excel另存及导出接口写入的BOM
+        with open(path, newline='', encoding='utf-8-sig') as file:
+            yield from csv.reader(file)
+
+
+def count_rows(path, file_format):
+    """
+    统计数据行数（不含表头和空行），用于显示进度
+    :param path: 文件路径
+    :param file_format: csv 或 xlsx
+    :return: 行数；XLSX使用工作表记录的区域大小（含空行），不完整解析文件，
+             未记录区域大小（如只写模式生成的文件）时返回None
+    """
+    if file_format == FORMAT_XLSX:
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True)
+        try:
+            max_row = workbook.worksheets[0].max_row
+        finally:
+            workbook.close()
+        return max(max_row - 1, 0) if max_row else None
+
+    rows = read_rows(path, file_format)
+    next(rows, None)
+    return sum(1 for row in rows if any(value not in (None, '') for value in row))
+
+
+def _pg_array(values):
+    items = []
+    for value in values:
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        items.append(f'"{escaped}"')
+    return '{' + ','.join(items) + '}'
+
+
+def _copy_value(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        return _pg_array(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+class _CopyReader(io.RawIOBase):
+    """把行迭代器转换为 COPY FROM STDIN 读取的类文件对象（CSV格式）"""
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator='\n')
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def _next_chunk(self):
+        for row in self._rows:
+            self._writer.writerow([_copy_value(value) for value in row])
+            if self._buffer.tell() >= 64 * 1024:
+                break
+        data = self._buffer.getvalue().encode('utf-8')
+        self._buffer.seek(0)
+        self._buffer.truncate(0)
+        return data
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            chunk = self._next_chunk()
+            if not chunk:
+                break
+            self._pending += chunk
+        if size < 0:
+            data, self._pending = self._pending, b''
+        else:
+            data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+def copy_rows(connection, table_name, columns, rows):
+    """
+    通过 COPY FROM STDIN 写入行
+    :param connection: SQLAlchemy Connection（PostgreSQL / psycopg2）
+    :param table_name: 表名（已加引号或无需引号）
+    :param columns: 列名列表
+    :param rows: 值列表迭代器，None 写为NULL，list/tuple 写为数组
+    """
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f'COPY {table_name} ({column_list}) FROM STDIN WITH (FORMAT csv)', _CopyReader(rows))
+    finally:
+        cursor.close()
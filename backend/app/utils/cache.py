@@ -0,0 +1,625 @@
+# -*- coding: utf-8 -*-
+"""
+租户参考数据缓存（进程内LRU + Redis 两级缓存）
+
+单位、税率、币别、仓库、付款方式、计算参数等参考数据读多写少，几乎每个表单和单据列表都会读取。
+- 键按租户schema隔离: {前缀}:d:{schema}:{键}:{依赖表版本号}
+- 每个 (schema, 表) 有一个存放在共享后端的版本号，写入提交后递增版本号，
+  旧版本号的键不再被读取，等待TTL自然过期，无需逐个删除
+- 进程内LRU保存序列化后的值和计算时的版本号，版本号在本进程最多缓存 CACHE_LOCAL_TTL 秒，
+  本进程的写入立即生效，其他worker的写入在 CACHE_LOCAL_TTL 秒内可见
+- 防击穿: 同一进程内同一个键只有一个线程执行加载函数；跨进程通过共享后端的 SET NX 锁，
+  未获得锁的进程轮询等待结果，超时后自行加载
+- ORM写入（flush、Query.update/delete）在提交后自动使依赖表失效；
+  原生SQL或独立连接写入后需调用 reference_cache.invalidate
+
+后端（CACHE_BACKEND）:
+- redis: 共享缓存，Redis不可用时记录日志并降级为仅进程内缓存，CACHE_REDIS_RETRY_INTERVAL 秒后重试
+- memory: 进程内字典模拟共享后端，用于单进程开发和测试
+- null: 不缓存，每次都执行加载函数
+
+值使用pickle序列化，缓存中只存放本系统写入的数据，Redis不应对不受信任的客户端开放。
+"""
+
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from functools import wraps
+from contextlib import contextmanager
+from collections import OrderedDict
+from flask import has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.utils.tenant_context import TenantContext
+from app.utils.metrics import record_cache_access
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - 未安装时只能使用 memory/null 后端
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_REDIS = 'redis'
+BACKEND_MEMORY = 'memory'
+BACKEND_NULL = 'null'
+
+# 指标中的缓存名称
+_METRIC_NAME = 'reference_data'
+
+# 会话info中暂存待失效表名的键
+_PENDING_TABLES_KEY = 'reference_cache_pending_tables'
+
+_MISS = object()
+
+
+class NullCacheBackend:
+    """不缓存的后端"""
+
+    enabled = False
+
+    def get_many(self, keys):
+        return [None] * len(keys)
+
+    def set(self, key, value, ttl):
+        pass
+
+    def add(self, key, value, ttl):
+        return True
+
+    def incr(self, key):
+        return None
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryCacheBackend:
+    """
+    进程内共享后端，行为与Redis后端一致（TTL、SET NX、INCR），用于单进程开发和测试
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= now:
+            del self._entries[key]
+            return None
+        return value
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            return [self._get(key, now) for key in keys]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+
+    def add(self, key, value, ttl):
+        with self._lock:
+            if self._get(key, time.monotonic()) is not None:
+                return False
+            self._entries[key] = (value, time.monotonic() + ttl if ttl else None)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value = int(self._get(key, time.monotonic()) or _initial_version()) + 1
+            self._entries[key] = (value, None)
+            return value
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """
+    Redis共享后端，任何Redis错误都按未命中处理，并在重试间隔内不再访问Redis
+    """
+
+    enabled = True
+
+    def __init__(self, url, socket_timeout=0.5, retry_interval=30):
+        """
+        :param url: Redis连接URL
+        :param socket_timeout: 连接和读写超时（秒），Redis异常时不拖慢请求
+        :param retry_interval: 出错后暂停访问Redis的秒数
+        """
+        if redis is None:
+            raise RuntimeError('未安装 redis，无法使用Redis缓存后端')
+        self._client = redis.Redis.from_url(
+            url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout
+        )
+        self._retry_interval = retry_interval
+        self._unavailable_until = 0.0
+
+    def _available(self):
+        return time.monotonic() >= self._unavailable_until
+
+    def _failed(self, error):
+        self._unavailable_until = time.monotonic() + self._retry_interval
+        logger.warning("Redis cache unavailable, retrying in %ss: %s", self._retry_interval, error)
+
+    def get_many(self, keys):
+        if not keys or not self._available():
+            return [None] * len(keys)
+        try:
+            return self._client.mget(keys)
+        except redis.RedisError as e:
+            self._failed(e)
+            return [None] * len(keys)
+
+    def set(self, key, value, ttl):
+        if not self._available():
+            return
+        try:
+            self._client.set(key, value, ex=ttl or None)
+        except redis.RedisError as e:
+            self._failed(e)
+
+    def add(self, key, value, ttl):
+        if not self._available():
+            return True
+        try:
+            return bool(self._client.set(key, value, ex=ttl or None, nx=True))
+        except redis.RedisError as e:
+            self._failed(e)
+            return True
+
+    def incr(self, key):
+        if not self._available():
+            return None
+        try:
+            # 版本号不存在（首次写入或被淘汰）时从当前时间开始，避免与被淘汰前的版本号重复
+            pipeline = self._client.pipeline()
+            pipeline.set(key, _initial_version(), nx=True)
+            pipeline.incr(key)
+            return pipeline.execute()[-1]
+        except redis.RedisError as e:
+            self._failed(e)
+            return None
+
+    def delete(self, *keys):
+        if not keys or not self._available():
+            return
+        try:
+            self._client.delete(*keys)
+        except redis.RedisError as e:
+            self._failed(e)
+
+    def clear(self):
+        # 共享后端的数据通过版本号和TTL失效，不整体清空
+        pass
+
+
+def _initial_version():
+    return int(time.time() * 1000)
+
+
+def _current_schema():
+    return TenantContext().get_schema() if has_app_context() else None
+
+
+class TwoLevelCache:
+    """
+    进程内LRU + 共享后端的两级缓存，按 (schema, 依赖表) 版本号失效
+    """
+
+    def __init__(self, backend=None, prefix='cache', default_ttl=300, local_ttl=5,
+                 local_max_size=2048, lock_timeout=10):
+        """
+        :param backend: 共享后端，为空时不缓存
+        :param prefix: 键前缀，多个系统共用Redis时区分
+        :param default_ttl: 缓存秒数
+        :param local_ttl: 进程内版本号的缓存秒数，即其他worker写入后本进程最长的陈旧时间
+        :param local_max_size: 进程内LRU的最大条目数
+        :param lock_timeout: 跨进程加载锁的秒数，也是等待其他进程加载结果的最长时间
+        """
+        self.backend = backend or NullCacheBackend()
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.local_ttl = local_ttl
+        self.local_max_size = local_max_size
+        self.lock_timeout = lock_timeout
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._watched_tables = set()
+        self._lock = threading.Lock()
+        # 按键的加载锁 {键: [锁, 等待线程数]}，同一进程内同一个键只加载一次；
+        # 不同键各自加锁，加载函数中可以读取其他缓存键
+        self._load_locks = {}
+        self.hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    def configure(self, backend=None, prefix=None, default_ttl=None, local_ttl=None,
+                  local_max_size=None, lock_timeout=None):
+        """根据应用配置调整缓存参数"""
+        with self._lock:
+            if backend is not None:
+                self.backend = backend
+            if prefix is not None:
+                self.prefix = prefix
+            if default_ttl is not None:
+                self.default_ttl = default_ttl
+            if local_ttl is not None:
+                self.local_ttl = local_ttl
+            if local_max_size is not None:
+                self.local_max_size = local_max_size
+            if lock_timeout is not None:
+                self.lock_timeout = lock_timeout
+            self._entries.clear()
+            self._versions.clear()
+
+    @property
+    def enabled(self):
+        return self.backend.enabled
+
+    def watch(self, *tables):
+        """
+        登记缓存依赖的表，只有登记过的表在ORM写入提交后才会自动失效
+        :param tables: 表名，system等固定schema中的表写为 schema.表名
+        """
+        with self._lock:
+            self._watched_tables.update(table.rsplit('.', 1)[-1] for table in tables)
+
+    @staticmethod
+    def _qualify(schema_name, tables):
+        """
+        :return: (schema, 表名) 元组；未写schema的表属于当前租户schema
+        """
+        return tuple(tuple(table.split('.', 1)) if '.' in table else (schema_name, table) for table in tables)
+
+    def _version_key(self, qualified_table):
+        return f'{self.prefix}:v:{qualified_table[0]}:{qualified_table[1]}'
+
+    def _table_versions(self, qualified_tables):
+        """
+        获取依赖表的版本号，本进程缓存 local_ttl 秒
+        :param qualified_tables: (schema, 表名) 元组
+        :return: 与参数顺序一致的版本号元组
+        """
+        now = time.monotonic()
+        versions = {}
+        stale = []
+        with self._lock:
+            for table in qualified_tables:
+                entry = self._versions.get(table)
+                if entry is not None and entry[1] > now:
+                    versions[table] = entry[0]
+                else:
+                    stale.append(table)
+
+        if stale:
+            keys = [self._version_key(table) for table in stale]
+            for key, table, value in zip(keys, stale, self.backend.get_many(keys)):
+                if value is None:
+                    # 从未失效过的表：写入初始版本号，并发写入时以先写入的为准
+                    initial = _initial_version()
+                    if not self.backend.add(key, initial, 0):
+                        value = self.backend.get_many([key])[0]
+                    value = initial if value is None else value
+                versions[table] = int(value)
+            with self._lock:
+                for table in stale:
+                    self._versions[table] = (versions[table], now + self.local_ttl)
+
+        return tuple(versions[table] for table in qualified_tables)
+
+    def _data_key(self, schema_name, key, versions):
+        version_part = '.'.join(str(version) for version in versions) or '0'
+        return f'{self.prefix}:d:{schema_name}:{key}:{version_part}'
+
+    def _local_get(self, data_key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(data_key)
+            if entry is None:
+                return _MISS
+            payload, expires_at, _ = entry
+            if expires_at <= now:
+                del self._entries[data_key]
+                return _MISS
+            self._entries.move_to_end(data_key)
+        return pickle.loads(payload)
+
+    def _local_set(self, data_key, payload, ttl, tables):
+        with self._lock:
+            self._entries[data_key] = (payload, time.monotonic() + ttl, tables)
+            self._entries.move_to_end(data_key)
+            while len(self._entries) > self.local_max_size:
+                self._entries.popitem(last=False)
+
+    def _record(self, result):
+        with self._lock:
+            if result == 'hit':
+                self.hits += 1
+            elif result == 'remote_hit':
+                self.remote_hits += 1
+            else:
+                self.misses += 1
+        record_cache_access(_METRIC_NAME, result)
+
+    def get_or_set(self, key, loader, tables=(), ttl=None, schema_name=None):
+        """
+        读取缓存，未命中时执行加载函数并写入缓存
+        :param key: 缓存键（不含租户和版本号），如 units:enabled
+        :param loader: 无参数的加载函数
+        :param tables: 依赖的表名，这些表的写入提交后缓存失效；system等固定schema中的表写为 schema.表名
+        :param ttl: 缓存秒数，为空时使用默认值
+        :param schema_name: 租户schema，为空时使用当前线程的schema
+        :return: 缓存值（每次返回独立的副本，调用方修改不影响缓存）
+        """
+        if not self.enabled:
+            return loader()
+
+        ttl = ttl or self.default_ttl
+        schema_name = schema_name or _current_schema()
+        qualified_tables = self._qualify(schema_name, tables)
+        data_key = self._data_key(schema_name, key, self._table_versions(qualified_tables))
+
+        value = self._local_get(data_key)
+        if value is not _MISS:
+            self._record('hit')
+            return value
+
+        with self._single_flight(data_key):
+            # 等待期间其他线程可能已经加载完成
+            value = self._local_get(data_key)
+            if value is not _MISS:
+                self._record('hit')
+                return value
+
+            payload = self.backend.get_many([data_key])[0]
+            if payload is None:
+                payload = self._load_shared(data_key, loader, ttl)
+                if payload is None:
+                    # 等待其他进程加载超时，自行加载（只写入本进程缓存）
+                    payload = pickle.dumps(loader(), protocol=pickle.HIGHEST_PROTOCOL)
+                self._record('miss')
+            else:
+                self._record('remote_hit')
+
+            self._local_set(data_key, payload, ttl, frozenset(qualified_tables))
+        return pickle.loads(payload)
+
+    @contextmanager
+    def _single_flight(self, data_key):
+        with self._lock:
+            entry = self._load_locks.get(data_key)
+            if entry is None:
+                entry = self._load_locks[data_key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._load_locks[data_key]
+
+    def _load_shared(self, data_key, loader, ttl):
+        """
+        获得跨进程加载锁后加载并写入共享后端；未获得锁时等待持锁进程的结果
+        :return: 序列化后的值，等待超时返回None
+        """
+        lock_key = f'{data_key}:lock'
+        if self.backend.add(lock_key, 1, self.lock_timeout):
+            try:
+                payload = pickle.dumps(loader(), protocol=pickle.HIGHEST_PROTOCOL)
+                self.backend.set(data_key, payload, ttl)
+                return payload
+            finally:
+                self.backend.delete(lock_key)
+
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            payload, locked = self.backend.get_many([data_key, lock_key])
+            if payload is not None:
+                return payload
+            if locked is None:
+                # 持锁进程加载失败或已超时
+                break
+            delay = min(delay * 2, 0.2)
+        return None
+
+    def invalidate(self, *tables, schema_name=None):
+        """
+        使依赖指定表的缓存失效（递增共享版本号并清除本进程的条目）
+        :param tables: 表名，system等固定schema中的表写为 schema.表名
+        :param schema_name: 租户schema，为空时使用当前线程的schema
+        """
+        if not self.enabled or not tables:
+            return
+        qualified_tables = self._qualify(schema_name or _current_schema(), tables)
+        now = time.monotonic()
+        for table in qualified_tables:
+            version = self.backend.incr(self._version_key(table))
+            with self._lock:
+                if version is None:
+                    self._versions.pop(table, None)
+                else:
+                    self._versions[table] = (version, now + self.local_ttl)
+
+        qualified_tables = set(qualified_tables)
+        with self._lock:
+            for data_key in [data_key for data_key, (_, _, entry_tables) in self._entries.items()
+                             if entry_tables & qualified_tables]:
+                del self._entries[data_key]
+
+    def version(self, *tables, schema_name=None):
+        """
+        获取依赖表的版本标识，可用作ETag
+        :param tables: 表名，system等固定schema中的表写为 schema.表名
+        :param schema_name: 租户schema，为空时使用当前线程的schema
+        :return: 版本号拼接的字符串；缓存未启用时返回None
+        """
+        if not self.enabled:
+            return None
+        qualified_tables = self._qualify(schema_name or _current_schema(), tables)
+        return '.'.join(str(version) for version in self._table_versions(qualified_tables))
+
+    def clear(self):
+        """清空本进程缓存并重置统计"""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self.hits = 0
+            self.remote_hits = 0
+            self.misses = 0
+        self.backend.clear()
+
+    def stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.remote_hits + self.misses
+            return {
+                'backend': type(self.backend).__name__,
+                'size': len(self._entries),
+                'max_size': self.local_max_size,
+                'ttl': self.default_ttl,
+                'local_ttl': self.local_ttl,
+                'hits': self.hits,
+                'remote_hits': self.remote_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.remote_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+# 进程级单例
+reference_cache = TwoLevelCache()
+
+
+def _args_key(args, kwargs):
+    if not args and not kwargs:
+        return ''
+    raw = repr((args, sorted(kwargs.items())))
+    return ':' + hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def cached(*tables, key=None, ttl=None):
+    """
+    缓存租户服务方法的返回值
+    方法参数（self除外）作为键的一部分，按服务实例的 schema_name 隔离租户
+    :param tables: 依赖的表名
+    :param key: 缓存键，为空时使用 模块.类.方法 名称
+    :param ttl: 缓存秒数，为空时使用默认值
+    """
+    reference_cache.watch(*tables)
+
+    def decorator(fn):
+        name = key or f'{fn.__module__}.{fn.__qualname__}'
+
+        @wraps(fn)
+        def cached_wrapper(self, *args, **kwargs):
+            return reference_cache.get_or_set(
+                name + _args_key(args, kwargs),
+                lambda: fn(self, *args, **kwargs),
+                tables=tables,
+                ttl=ttl,
+                schema_name=getattr(self, 'schema_name', None)
+            )
+
+        cached_wrapper.uncached = fn
+        return cached_wrapper
+
+    return decorator
+
+
+def create_backend(app):
+    """
+    按配置创建共享后端
+    :param app: Flask实例
+    """
+    backend = app.config.get('CACHE_BACKEND', BACKEND_REDIS)
+    if backend == BACKEND_NULL:
+        return NullCacheBackend()
+    if backend == BACKEND_MEMORY:
+        return MemoryCacheBackend()
+    if backend == BACKEND_REDIS:
+        if redis is None:
+            logger.warning("redis is not installed, falling back to in-memory cache backend")
+            return MemoryCacheBackend()
+        return RedisCacheBackend(
+            app.config.get('CACHE_REDIS_URL') or app.config['REDIS_URL'],
+            socket_timeout=app.config.get('CACHE_REDIS_SOCKET_TIMEOUT', 0.5),
+            retry_interval=app.config.get('CACHE_REDIS_RETRY_INTERVAL', 30)
+        )
+    raise ValueError(f"不支持的缓存后端: {backend}")
+
+
+def init_cache(app):
+    """
+    按应用配置初始化参考数据缓存
+    :param app: Flask实例
+    """
+    reference_cache.configure(
+        backend=create_backend(app),
+        prefix=app.config.get('CACHE_KEY_PREFIX'),
+        default_ttl=app.config.get('CACHE_DEFAULT_TTL'),
+        local_ttl=app.config.get('CACHE_LOCAL_TTL'),
+        local_max_size=app.config.get('CACHE_LOCAL_MAX_SIZE'),
+        lock_timeout=app.config.get('CACHE_LOCK_TIMEOUT')
+    )
+
+
+def _add_pending_table(session, table):
+    if table is not None and table.name in reference_cache._watched_tables:
+        session.info.setdefault(_PENDING_TABLES_KEY, set()).add((table.schema, table.name))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_written_tables(session, flush_context):
+    """flush时记录被写入的缓存依赖表，提交后使对应缓存失效"""
+    if not reference_cache.enabled:
+        return
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        _add_pending_table(session, getattr(obj, '__table__', None))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_written_tables(orm_execute_state):
+    """Query.update / Query.delete 及ORM批量写入不经过flush，在执行时记录"""
+    if not reference_cache.enabled:
+        return
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        _add_pending_table(orm_execute_state.session, getattr(orm_execute_state.statement, 'table', None))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_written_tables(session):
+    tables = session.info.pop(_PENDING_TABLES_KEY, None)
+    if not tables or not has_app_context():
+        return
+    schema_name = TenantContext().get_schema()
+    for table_schema, table_name in tables:
+        reference_cache.invalidate(table_name, schema_name=table_schema or schema_name)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_written_tables(session):
+    session.info.pop(_PENDING_TABLES_KEY, None)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+HTTP条件请求（ETag / If-None-Match）
+
+表单选项等响应只随依赖表的写入变化。ETag 由 租户schema + 请求路径 + 依赖表版本号 计算，
+If-None-Match 与之一致时直接返回304，不执行查询也不序列化响应体。
+参考数据缓存未启用（null后端）时退化为按响应体计算ETag，只节省传输。
+
+响应设置 Cache-Control: private, no-cache，浏览器每次都带 If-None-Match 重新验证。
+"""
+
+import hashlib
+from flask import request, jsonify, current_app
+
+from app.utils.cache import reference_cache
+from app.utils.tenant_context import TenantContext
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _version_etag(tables):
+    version = reference_cache.version(*tables)
+    if version is None:
+        return None
+    raw = f'{TenantContext().get_schema()}|{request.full_path}|{version}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def etag_json_response(build, *tables):
+    """
+    生成带ETag的JSON响应
+    :param build: 无参数函数，返回响应数据；If-None-Match 命中时不调用
+    :param tables: 响应依赖的表名
+    :return: Response，客户端缓存仍有效时为304
+    """
+    etag = _version_etag(tables)
+    if etag is not None and request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        return response
+
+    response = jsonify(build())
+    if etag is None:
+        response.add_etag()
+    else:
+        response.set_etag(etag)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response.make_conditional(request)
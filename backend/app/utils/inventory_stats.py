@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+仓库库存汇总
+
+仓库库存汇总和库存统计接口读取汇总表，不再每次聚合库存表和流水表：
+- warehouse_inventory_stats: 每个仓库一行，启用库存的条目数、数量、金额、低于安全库存的条目数
+- warehouse_inventory_daily_stats: 每个仓库每天一行，入库、出库流水条数
+
+汇总在库存变动的同一事务中增量维护：
+- ORM 写入的库存（新建、修改、删除）在 flush 前按修改前后的值计算增量，修改前的值未加载时从数据库读取
+- 过账引擎的集合写入不经过 flush，由引擎调用 record_inventory_changes 提交增量
+- 新增流水（ORM 对象或批量插入）按仓库和交易日期累计入库、出库条数
+增量暂存在会话中，提交前用一条 INSERT ... ON CONFLICT DO UPDATE 累加到汇总行，
+汇总行的行锁只在提交前的最后一刻获取；回滚时丢弃。
+
+原始SQL直接修改库存表不会更新汇总，可用 rebuild_inventory_stats（命令 inventory-stats-rebuild）重新计算。
+配置 INVENTORY_STATS_ENABLED=false 时不维护汇总，统计接口回退到聚合查询。
+"""
+
+import uuid
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import event, func, select, text, inspect as sa_inspect
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ClauseElement
+
+logger = logging.getLogger(__name__)
+
+# 计入入库/出库条数的流水类型
+IN_TRANSACTION_TYPES = ('in', 'purchase_in', 'production_in')
+OUT_TRANSACTION_TYPES = ('out', 'sales_out', 'production_out')
+
+# 计算汇总需要的库存列
+TRACKED_COLUMNS = ('warehouse_id', 'is_active', 'current_quantity', 'total_cost', 'safety_stock')
+
+# 会话info中暂存增量的键
+_PENDING_KEY = 'inventory_stats_pending'
+
+_installed = False
+
+
+def stats_enabled():
+    """是否在维护汇总表"""
+    return _installed
+
+
+def _decimal(value):
+    if value is None:
+        return Decimal('0')
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _contribution(values):
+    """
+    一条库存对仓库汇总的贡献
+    :param values: TRACKED_COLUMNS 的值字典，None 表示库存不存在
+    :return: (仓库ID, [条目数, 数量, 金额, 低于安全库存条目数])，未启用的库存返回None
+    """
+    if not values or not values.get('is_active') or values.get('warehouse_id') is None:
+        return None
+    quantity = _decimal(values.get('current_quantity'))
+    safety_stock = values.get('safety_stock')
+    below = 1 if safety_stock is not None and quantity <= _decimal(safety_stock) else 0
+    return values['warehouse_id'], [1, quantity, _decimal(values.get('total_cost')), below]
+
+
+def _pending(session):
+    return session.info.setdefault(_PENDING_KEY, {'levels': {}, 'movements': {}})
+
+
+def record_inventory_changes(session, changes):
+    """
+    暂存库存变动产生的汇总增量，提交前写入汇总表
+    :param session: 数据库会话
+    :param changes: [(变动前的值, 变动后的值)]，值为 TRACKED_COLUMNS 字典，新建时变动前为None、删除时变动后为None
+    """
+    if not _installed:
+        return
+    levels = _pending(session)['levels']
+    for before, after in changes:
+        for values, sign in ((before, -1), (after, 1)):
+            contribution = _contribution(values)
+            if contribution is None:
+                continue
+            warehouse_id, deltas = contribution
+            totals = levels.setdefault(uuid.UUID(str(warehouse_id)), [0, Decimal('0'), Decimal('0'), 0])
+            for index, delta in enumerate(deltas):
+                totals[index] += sign * delta
+
+
+def _record_movement(session, warehouse_id, transaction_type, transaction_date):
+    if transaction_type in IN_TRANSACTION_TYPES:
+        index = 0
+    elif transaction_type in OUT_TRANSACTION_TYPES:
+        index = 1
+    else:
+        return
+    if warehouse_id is None:
+        return
+    # 未指定交易时间（数据库默认 now()）时按提交当天计
+    day = transaction_date.date() if isinstance(transaction_date, datetime) else None
+    movements = _pending(session)['movements']
+    counts = movements.setdefault((uuid.UUID(str(warehouse_id)), day), [0, 0])
+    counts[index] += 1
+
+
+def _previous_values(obj):
+    """
+    库存对象跟踪列修改前的值
+    :return: (值字典, 是否有未加载的列)
+    """
+    state = sa_inspect(obj)
+    values, unknown = {}, False
+    for column in TRACKED_COLUMNS:
+        history = state.attrs[column].history
+        if history.deleted:
+            values[column] = history.deleted[0]
+        elif history.unchanged:
+            values[column] = history.unchanged[0]
+        else:
+            unknown = True
+    return values, unknown
+
+
+def _database_values(session, ids):
+    from app.models.business.inventory import Inventory
+
+    table = Inventory.__table__
+    rows = session.execute(
+        select(table.c.id, *(table.c[column] for column in TRACKED_COLUMNS)).where(table.c.id.in_(ids))
+    )
+    return {row.id: {column: row._mapping[column] for column in TRACKED_COLUMNS} for row in rows}
+
+
+def _new_values(obj):
+    """
+    新建库存对象的跟踪列值
+    flush前列默认值（is_active=True、safety_stock=0 等）尚未应用，未赋值的列取模型的标量默认值
+    """
+    state = sa_inspect(obj)
+    table = type(obj).__table__
+    values = {}
+    for column in TRACKED_COLUMNS:
+        value = getattr(obj, column)
+        if value is None and not state.attrs[column].history.added:
+            default = table.c[column].default
+            if default is not None and default.is_scalar:
+                value = default.arg
+        values[column] = value
+    return values
+
+
+def _collect_flush_changes(session, flush_context, instances):
+    """flush前按ORM对象修改前后的值计算增量"""
+    from app.models.business.inventory import Inventory, InventoryTransaction
+
+    changes, unresolved = [], []
+    for obj in session.new:
+        if isinstance(obj, Inventory):
+            changes.append((None, _new_values(obj)))
+        elif isinstance(obj, InventoryTransaction):
+            _record_movement(session, obj.warehouse_id, obj.transaction_type, obj.transaction_date)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Inventory):
+            continue
+        state = sa_inspect(obj)
+        if not any(state.attrs[column].history.has_changes() for column in TRACKED_COLUMNS):
+            continue
+        before, unknown = _previous_values(obj)
+        after = {column: getattr(obj, column) for column in TRACKED_COLUMNS}
+        if unknown:
+            unresolved.append((obj.id, after))
+        else:
+            changes.append((before, after))
+
+    for obj in session.deleted:
+        if isinstance(obj, Inventory):
+            before, unknown = _previous_values(obj)
+            if unknown:
+                unresolved.append((obj.id, None))
+            else:
+                changes.append((before, None))
+
+    if unresolved:
+        stored = _database_values(session, [inventory_id for inventory_id, _ in unresolved])
+        changes.extend((stored.get(inventory_id), after) for inventory_id, after in unresolved)
+
+    # 赋值为SQL表达式（如 Inventory.current_quantity + 1）时flush前无法得到结果
+    computable = [
+        (before, after) for before, after in changes
+        if not any(isinstance(value, ClauseElement) for values in (before, after) if values for value in values.values())
+    ]
+    if len(computable) < len(changes):
+        logger.warning("库存汇总跳过了SQL表达式赋值的库存变动，请执行 inventory-stats-rebuild 重新计算")
+    record_inventory_changes(session, computable)
+
+
+def _collect_bulk_transactions(orm_execute_state):
+    """批量插入的流水不经过flush，在执行时累计"""
+    if not orm_execute_state.is_insert:
+        return
+    if getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None) != 'inventory_transactions':
+        return
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters or {}]
+    for row in rows:
+        _record_movement(orm_execute_state.session, row.get('warehouse_id'), row.get('transaction_type'),
+                         row.get('transaction_date'))
+
+
+def _apply_pending(session):
+    """提交前把暂存的增量累加到汇总表"""
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+
+    from app.models.business.inventory import WarehouseInventoryStats, WarehouseInventoryDailyStats
+
+    # 按仓库ID顺序加锁，多仓库的并发提交不会互相等待成环
+    levels = [
+        {
+            'id': uuid.uuid4(), 'warehouse_id': warehouse_id, 'total_items': totals[0],
+            'total_quantity': totals[1], 'total_value': totals[2], 'below_safety_stock_items': totals[3]
+        }
+        for warehouse_id, totals in sorted(pending['levels'].items(), key=lambda item: str(item[0]))
+        if any(totals)
+    ]
+    if levels:
+        table = WarehouseInventoryStats.__table__
+        statement = insert(table).values(levels)
+        session.execute(statement.on_conflict_do_update(
+            index_elements=['warehouse_id'],
+            set_={
+                **{column: table.c[column] + statement.excluded[column]
+                   for column in ('total_items', 'total_quantity', 'total_value', 'below_safety_stock_items')},
+                'updated_at': func.now()
+            }
+        ))
+
+    movements = [
+        {
+            'id': uuid.uuid4(), 'warehouse_id': warehouse_id, 'stat_date': day or func.current_date(),
+            'in_transactions': counts[0], 'out_transactions': counts[1]
+        }
+        for (warehouse_id, day), counts in sorted(
+            pending['movements'].items(), key=lambda item: (str(item[0][0]), item[0][1] or date.max)
+        )
+    ]
+    if movements:
+        table = WarehouseInventoryDailyStats.__table__
+        statement = insert(table).values(movements)
+        session.execute(statement.on_conflict_do_update(
+            constraint='uq_warehouse_inventory_daily_stats_date',
+            set_={
+                'in_transactions': table.c.in_transactions + statement.excluded.in_transactions,
+                'out_transactions': table.c.out_transactions + statement.excluded.out_transactions,
+                'updated_at': func.now()
+            }
+        ))
+
+
+def _discard_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def rebuild_inventory_stats(session):
+    """
+    按库存表和流水表重新计算当前租户的汇总表（不提交）
+    重算期间锁定汇总表，并发提交的库存变动在重算提交后再累加
+    :return: (仓库汇总行数, 每日统计行数)
+    """
+    from app.models.business.inventory import (
+        Inventory, InventoryTransaction, WarehouseInventoryStats, WarehouseInventoryDailyStats
+    )
+
+    _discard_pending(session)
+    inventories = Inventory.__table__
+    transactions = InventoryTransaction.__table__
+    stats = WarehouseInventoryStats.__table__
+    daily = WarehouseInventoryDailyStats.__table__
+
+    session.execute(text(f"LOCK TABLE {stats.name}, {daily.name} IN EXCLUSIVE MODE"))
+    session.execute(stats.delete())
+    session.execute(daily.delete())
+
+    levels = session.execute(stats.insert().from_select(
+        ['id', 'warehouse_id', 'total_items', 'total_quantity', 'total_value', 'below_safety_stock_items',
+         'created_at', 'updated_at'],
+        select(
+            func.gen_random_uuid(),
+            inventories.c.warehouse_id,
+            func.count(),
+            func.coalesce(func.sum(inventories.c.current_quantity), 0),
+            func.coalesce(func.sum(inventories.c.total_cost), 0),
+            func.count().filter(inventories.c.current_quantity <= inventories.c.safety_stock),
+            func.now(), func.now()
+        ).where(inventories.c.is_active == True).group_by(inventories.c.warehouse_id)
+    )).rowcount
+
+    stat_date = func.date(transactions.c.transaction_date)
+    movements = session.execute(daily.insert().from_select(
+        ['id', 'warehouse_id', 'stat_date', 'in_transactions', 'out_transactions', 'created_at', 'updated_at'],
+        select(
+            func.gen_random_uuid(),
+            transactions.c.warehouse_id,
+            stat_date,
+            func.count().filter(transactions.c.transaction_type.in_(IN_TRANSACTION_TYPES)),
+            func.count().filter(transactions.c.transaction_type.in_(OUT_TRANSACTION_TYPES)),
+            func.now(), func.now()
+        ).where(
+            transactions.c.transaction_type.in_(IN_TRANSACTION_TYPES + OUT_TRANSACTION_TYPES)
+        ).group_by(transactions.c.warehouse_id, stat_date)
+    )).rowcount
+    return levels, movements
+
+
+def init_inventory_stats(app):
+    """
+    注册维护汇总表的会话钩子
+    :param app: Flask实例
+    """
+    global _installed
+    if not app.config.get('INVENTORY_STATS_ENABLED', True) or _installed:
+        return
+    event.listen(Session, 'before_flush', _collect_flush_changes)
+    event.listen(Session, 'do_orm_execute', _collect_bulk_transactions)
+    event.listen(Session, 'before_commit', _apply_pending)
+    event.listen(Session, 'after_rollback', _discard_pending)
+    _installed = True
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+API响应JSON序列化
+
+FastJSONProvider 使用 orjson 序列化响应，原生支持 UUID，
+并处理 Decimal、datetime、date、SQLAlchemy Row/RowMapping 以及带 to_dict() 的模型对象。
+Decimal、datetime、date 的输出格式与Flask默认实现一致（Decimal为字符串以保留精度，
+datetime/date为RFC 822格式的HTTP日期），切换提供者不改变接口返回的数据。
+列表接口可以直接返回查询得到的Row（如 session.execute(select(...)).all()），
+无需逐行调用 to_dict()。
+
+未安装 orjson 时回退到标准库 json，序列化规则相同。通过 JSON_PROVIDER 配置选择
+fast（默认）或 default（Flask默认实现）。
+"""
+
+import json
+import uuid
+import decimal
+from datetime import date, time
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+from sqlalchemy.engine import Row, RowMapping
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+
+def _default(obj):
+    """orjson/json 无法直接序列化的类型"""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, Row):
+        return dict(obj._mapping)
+    if isinstance(obj, RowMapping):
+        return dict(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    to_dict = getattr(obj, 'to_dict', None)
+    if callable(to_dict):
+        return to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_default(obj):
+    """标准库json回退时额外处理orjson原生支持的类型"""
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, time):
+        return obj.isoformat()
+    return _default(obj)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    基于 orjson 的Flask JSON提供者
+    """
+
+    def _encode(self, obj, sort_keys=False, indent=False):
+        """序列化为bytes（orjson）或str（标准库回退）"""
+        if orjson is None:
+            return json.dumps(
+                obj, default=_stdlib_default, ensure_ascii=False,
+                sort_keys=sort_keys, indent=2 if indent else None
+            )
+
+        # datetime/date 交给 _default 按Flask默认格式输出
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        encoded = self._encode(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys), indent=kwargs.get('indent'))
+        return encoded.decode('utf-8') if isinstance(encoded, bytes) else encoded
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # 与Flask默认实现一致：调试模式下缩进输出
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._encode(obj, sort_keys=self.sort_keys, indent=indent)
+        newline = b'\n' if isinstance(encoded, bytes) else '\n'
+        return self._app.response_class(encoded + newline, mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """
+    按配置安装JSON提供者
+    :param app: Flask实例
+    """
+    if app.config.get('JSON_PROVIDER', 'fast') == 'fast':
+        app.json = FastJSONProvider(app)
@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+分页列表总数统计策略
+
+列表接口的 query.count() 需要完整扫描过滤后的结果集，大租户上往往比取一页数据更慢。
+按列表名称（LIST_COUNT_STRATEGIES）选择统计策略：
+- exact: 精确统计（默认）
+- estimate: 无过滤条件时读取 pg_class.reltuples，有过滤条件时读取 EXPLAIN 的估算行数
+- auto: 无过滤条件时读取 pg_class.reltuples，估算值小于 LIST_COUNT_EXACT_THRESHOLD 时改为精确统计；
+  有过滤条件时精确统计（EXPLAIN 对过滤结果的估算误差可能有数量级）
+- cached: 精确统计并按 (schema, 表, 规范化过滤条件) 缓存 LIST_COUNT_CACHE_TTL 秒，
+  本进程内对该表的写入提交后立即失效，其他worker的写入在TTL内可能不可见
+
+非PostgreSQL数据库或估算失败时回退到精确统计。
+"""
+
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.utils.tenant_context import TenantContext
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_EXACT = 'exact'
+STRATEGY_ESTIMATE = 'estimate'
+STRATEGY_AUTO = 'auto'
+STRATEGY_CACHED = 'cached'
+
+# 会话info中暂存待失效表名的键
+_PENDING_TABLES_KEY = 'list_count_pending_tables'
+
+
+class CountCache:
+    """
+    精确总数缓存，按 (schema, 表) 分组以便写入时整表失效
+    """
+
+    def __init__(self, max_size=2048):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        :param key: (schema, 表, 过滤条件摘要)
+        :return: 缓存的总数，未命中或已过期时返回None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return total
+
+    def set(self, key, total, ttl):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (total, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_table(self, schema_name, table_name):
+        """使某个租户某张表的全部缓存总数失效"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == schema_name and key[1] == table_name]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 进程级单例
+count_cache = CountCache()
+
+
+def get_count_strategy(name):
+    """
+    获取列表的总数统计策略
+    :param name: 列表名称，如 inventory_transactions
+    :return: 策略名称
+    """
+    strategies = current_app.config.get('LIST_COUNT_STRATEGIES') or {}
+    return strategies.get(name, current_app.config.get('LIST_COUNT_STRATEGY', STRATEGY_EXACT))
+
+
+def _primary_table(query):
+    entity = query.column_descriptions[0].get('entity')
+    table = getattr(entity, '__table__', None)
+    return table
+
+
+def _filter_key(query):
+    statement = query.order_by(None).statement
+    compiled = statement.compile()
+    params = sorted((key, str(value)) for key, value in compiled.params.items())
+    digest = hashlib.sha1(f'{compiled}|{params}'.encode('utf-8')).hexdigest()
+    return digest
+
+
+def _bind_for(query):
+    return query.session.get_bind(mapper=query.column_descriptions[0].get('entity'))
+
+
+def _estimate(query, table):
+    """
+    估算行数
+    :return: 估算行数，无法估算时返回None
+    """
+    session = query.session
+    try:
+        if query.whereclause is None:
+            schema_name = table.schema or TenantContext().get_schema()
+            reltuples = session.execute(text("""
+                SELECT c.reltuples FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = :schema_name AND c.relname = :table_name
+            """), {'schema_name': schema_name, 'table_name': table.name}).scalar()
+            # 从未ANALYZE过的表 reltuples 为 -1（PostgreSQL 14+）或 0
+            if reltuples is not None and reltuples > 0:
+                return int(reltuples)
+            return None
+
+        bind = _bind_for(query)
+        sql = str(query.order_by(None).statement.compile(
+            dialect=bind.dialect, compile_kwargs={'literal_binds': True}
+        ))
+        connection = session.connection(
+            bind_arguments={'mapper': query.column_descriptions[0].get('entity')}
+        ).execution_options(no_parameters=True)
+        plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}').scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+    except Exception as e:
+        logger.debug("Row estimate failed, using exact count: %s", e)
+        return None
+
+
+def count_total(query, name, strategy=None):
+    """
+    按策略统计列表总数
+    :param query: 已应用过滤条件的查询
+    :param name: 列表名称，用于选择策略（LIST_COUNT_STRATEGIES）
+    :param strategy: 指定策略，为空时按配置选择
+    :return: (总数, 是否为估算值)
+    """
+    strategy = strategy or get_count_strategy(name)
+    query = query.order_by(None)
+    table = _primary_table(query)
+
+    if strategy == STRATEGY_AUTO and query.whereclause is not None:
+        return query.count(), False
+
+    if strategy in (STRATEGY_ESTIMATE, STRATEGY_AUTO) and table is not None and _bind_for(query).dialect.name == 'postgresql':
+        estimated = _estimate(query, table)
+        if estimated is not None:
+            threshold = current_app.config.get('LIST_COUNT_EXACT_THRESHOLD', 10000)
+            if strategy == STRATEGY_ESTIMATE or estimated >= threshold:
+                return estimated, True
+        return query.count(), False
+
+    if strategy == STRATEGY_CACHED and table is not None:
+        key = (table.schema or TenantContext().get_schema(), table.name, _filter_key(query))
+        total = count_cache.get(key)
+        if total is None:
+            total = query.count()
+            count_cache.set(key, total, current_app.config.get('LIST_COUNT_CACHE_TTL', 30))
+        return total, False
+
+    return query.count(), False
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_written_tables(session, flush_context):
+    """flush时记录被写入的表，提交后使对应的缓存总数失效"""
+    tables = session.info.setdefault(_PENDING_TABLES_KEY, set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            tables.add((table.schema, table.name))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_written_tables(orm_execute_state):
+    """Query.update / Query.delete 及批量写入不经过flush，在执行时记录"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table is not None:
+            orm_execute_state.session.info.setdefault(_PENDING_TABLES_KEY, set()).add((table.schema, table.name))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_written_tables(session):
+    tables = session.info.pop(_PENDING_TABLES_KEY, None)
+    if not tables or not has_app_context():
+        return
+    schema_name = TenantContext().get_schema()
+    for table_schema, table_name in tables:
+        count_cache.invalidate_table(table_schema or schema_name, table_name)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_written_tables(session):
+    session.info.pop(_PENDING_TABLES_KEY, None)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Prometheus指标
+
+提供 /metrics 端点，包含：
+- 按蓝图/端点统计的请求耗时直方图（不按租户区分，租户数不受限会使时间序列无限增长）
+- 数据库连接池已借出/溢出连接数
+- 缓存命中/未命中计数
+- 库存过账吞吐量（执行的单据数、写入的库存流水数）
+
+gunicorn多worker部署时需设置环境变量 PROMETHEUS_MULTIPROC_DIR（gunicorn.conf.py 已默认设置），
+各worker将指标写入该目录下的mmap文件，/metrics 汇总所有worker的数据。
+"""
+
+import os
+import time
+from functools import wraps
+from flask import g, request, Response, abort
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from prometheus_client import (
+    Counter, Gauge, Histogram, CollectorRegistry, REGISTRY,
+    generate_latest, CONTENT_TYPE_LATEST
+)
+from prometheus_client import multiprocess
+
+
+# 会话info中暂存待提交库存流水数的键
+_PENDING_TRANSACTIONS_KEY = 'metrics_pending_inventory_transactions'
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    '请求处理耗时',
+    ['method', 'blueprint', 'endpoint', 'status'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    'db_pool_checked_out_connections',
+    '连接池已借出的连接数',
+    ['engine'],
+    multiprocess_mode='livesum'
+)
+
+DB_POOL_OVERFLOW = Gauge(
+    'db_pool_overflow_connections',
+    '连接池溢出连接数（超出pool_size的部分）',
+    ['engine'],
+    multiprocess_mode='livesum'
+)
+
+CACHE_REQUESTS = Counter(
+    'cache_requests_total',
+    '缓存访问次数',
+    ['cache', 'result']
+)
+
+INVENTORY_ORDERS_EXECUTED = Counter(
+    'inventory_orders_executed_total',
+    '执行（过账）的库存单据数',
+    ['order_type', 'status']
+)
+
+INVENTORY_POSTING_DURATION = Histogram(
+    'inventory_posting_duration_seconds',
+    '库存单据执行耗时',
+    ['order_type'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+INVENTORY_TRANSACTIONS_WRITTEN = Counter(
+    'inventory_transactions_written_total',
+    '已提交的库存流水数',
+    ['transaction_type']
+)
+
+
+def record_cache_access(cache, result):
+    """
+    记录一次缓存访问
+    :param cache: 缓存名称
+    :param result: hit / miss / negative_hit
+    """
+    CACHE_REQUESTS.labels(cache=cache, result=result).inc()
+
+
+def track_posting(order_type):
+    """
+    装饰器，统计库存单据执行次数（成功/失败）和耗时
+    :param order_type: 单据类型，如 material_inbound
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def posting_wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                INVENTORY_ORDERS_EXECUTED.labels(order_type=order_type, status='error').inc()
+                raise
+            INVENTORY_POSTING_DURATION.labels(order_type=order_type).observe(time.perf_counter() - started)
+            INVENTORY_ORDERS_EXECUTED.labels(order_type=order_type, status='success').inc()
+            return result
+
+        return posting_wrapper
+
+    return decorator
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_inventory_transactions(session, flush_context):
+    """flush时暂存新增的库存流水，提交后再计数"""
+    pending = session.info.get(_PENDING_TRANSACTIONS_KEY)
+    for obj in session.new:
+        if getattr(obj, '__tablename__', None) == 'inventory_transactions':
+            if pending is None:
+                pending = session.info[_PENDING_TRANSACTIONS_KEY] = {}
+            transaction_type = getattr(obj, 'transaction_type', None) or 'unknown'
+            pending[transaction_type] = pending.get(transaction_type, 0) + 1
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_inventory_transactions(orm_execute_state):
+    """批量插入的库存流水不经过flush，在执行时暂存"""
+    if not orm_execute_state.is_insert:
+        return
+    if getattr(getattr(orm_execute_state.statement, 'table', None), 'name', None) != 'inventory_transactions':
+        return
+    parameters = orm_execute_state.parameters
+    rows = parameters if isinstance(parameters, list) else [parameters or {}]
+    pending = orm_execute_state.session.info.setdefault(_PENDING_TRANSACTIONS_KEY, {})
+    for row in rows:
+        transaction_type = row.get('transaction_type') or 'unknown'
+        pending[transaction_type] = pending.get(transaction_type, 0) + 1
+
+
+@event.listens_for(Session, 'after_commit')
+def _count_inventory_transactions(session):
+    pending = session.info.pop(_PENDING_TRANSACTIONS_KEY, None)
+    if pending:
+        for transaction_type, count in pending.items():
+            INVENTORY_TRANSACTIONS_WRITTEN.labels(transaction_type=transaction_type).inc(count)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_inventory_transactions(session):
+    session.info.pop(_PENDING_TRANSACTIONS_KEY, None)
+
+
+def _update_pool_gauges(pool, engine_name):
+    checked_out = getattr(pool, 'checkedout', None)
+    overflow = getattr(pool, 'overflow', None)
+    if checked_out is not None:
+        DB_POOL_CHECKED_OUT.labels(engine=engine_name).set(checked_out())
+    if overflow is not None:
+        # QueuePool 初始 overflow 为 -pool_size，只统计实际溢出的连接
+        DB_POOL_OVERFLOW.labels(engine=engine_name).set(max(overflow(), 0))
+
+
+def instrument_engine(engine, engine_name):
+    """
+    在连接借出/归还时更新连接池指标
+    :param engine: SQLAlchemy引擎
+    :param engine_name: 指标中的引擎名称，如 primary、shard_b、replica:default
+    """
+    pool = engine.pool
+
+    @event.listens_for(pool, 'checkout')
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _update_pool_gauges(pool, engine_name)
+
+    @event.listens_for(pool, 'checkin')
+    def _on_checkin(dbapi_connection, connection_record):
+        _update_pool_gauges(pool, engine_name)
+
+    _update_pool_gauges(pool, engine_name)
+
+
+def _render_metrics():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+def init_metrics(app):
+    """
+    注册请求耗时统计钩子和 /metrics 端点
+    :param app: Flask实例
+    """
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    metrics_path = app.config.get('METRICS_PATH', '/metrics')
+    auth_token = app.config.get('METRICS_AUTH_TOKEN')
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_started_at = time.perf_counter()
+
+    @app.after_request
+    def _observe_request_latency(response):
+        started = g.pop('metrics_started_at', None)
+        if started is None or request.path == metrics_path:
+            return response
+
+        # 未匹配路由（404）统一记为unmatched，避免按URL产生大量标签
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            blueprint=request.blueprint or '',
+            endpoint=request.endpoint or 'unmatched',
+            status=str(response.status_code)
+        ).observe(time.perf_counter() - started)
+        return response
+
+    def metrics():
+        if auth_token and request.headers.get('Authorization') != f'Bearer {auth_token}':
+            abort(401)
+        return Response(_render_metrics(), content_type=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule(metrics_path, 'metrics', metrics, methods=['GET'])
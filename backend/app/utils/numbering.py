@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+单据编号分配
+
+单据号、主数据编码由 前缀 + 日期 + 定长序号 组成，序号保存在租户schema的 document_sequences 表中，
+每个 (编号规则:前缀, 周期) 一行：
+- 分配时执行一条 UPDATE ... SET next_value = next_value + N RETURNING，行锁只在该语句所在的
+  短事务中持有，并发分配不会得到相同序号，也不需要扫描单据表
+- 计数器行不存在（新的一天/新前缀）时，按单据表中该周期已有的最大序号初始化，
+  并发初始化由 INSERT ... ON CONFLICT DO UPDATE 保证只生效一次
+- 分配使用独立连接并立即提交，调用方事务回滚时已分配的序号不会回收（编号可能不连续）
+- 分配后检查编号是否已被占用（如手工填写的编号），被占用的编号跳过并重新分配
+
+编号格式可通过配置 DOCUMENT_NUMBER_FORMATS 按规则覆盖 prefix / date_format / width。
+"""
+
+import re
+import uuid
+from datetime import datetime
+from collections import namedtuple
+
+import sqlalchemy as sa
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from flask import current_app, has_app_context
+
+from app.extensions import db
+from app.utils.tenant_context import TenantContext, set_search_path
+
+# prefix: 默认前缀；period_format: 计数器按周期重置的日期格式，为空时不重置；
+# date_format: 编号中的日期格式，为空时同 period_format，需以 period_format 的输出开头；
+# width: 序号位数（不足补0，超过时按实际位数）；table/column: 编号所在的表和列，用于初始化和占用检查
+NumberFormat = namedtuple('NumberFormat', ['prefix', 'period_format', 'date_format', 'width', 'table', 'column'])
+
+NUMBER_FORMATS = {
+    'inventory_transaction': NumberFormat('TXN', '%Y%m%d', '%Y%m%d%H%M%S', 4, 'inventory_transactions', 'transaction_number'),
+    'inventory_count_plan': NumberFormat('CNT', '%Y%m%d', None, 3, 'inventory_count_plans', 'plan_number'),
+    'inbound_order': NumberFormat('INB', '%Y%m%d', None, 4, 'inbound_orders', 'order_number'),
+    'outbound_order': NumberFormat('OUT', '%Y%m%d', None, 4, 'outbound_orders', 'order_number'),
+    'material_inbound_order': NumberFormat('MIN', '%Y%m%d', None, 4, 'material_inbound_orders', 'order_number'),
+    'material_outbound_order': NumberFormat('MOUT', '%Y%m%d', None, 4, 'material_outbound_orders', 'order_number'),
+    'material_count_plan': NumberFormat('PD', '%Y%m%d', None, 4, 'material_count_plans', 'count_number'),
+    'material_transfer_order': NumberFormat('DB', '%Y%m%d', None, 4, 'material_transfer_orders', 'transfer_number'),
+    'product_count_plan': NumberFormat('PD', '%Y%m%d', None, 3, 'product_count_plans', 'count_number'),
+    'product_transfer_order': NumberFormat('PT', '%Y%m%d', None, 4, 'product_transfer_orders', 'transfer_number'),
+    'sales_order': NumberFormat('SO', '%y%m%d', None, 4, 'sales_orders', 'order_number'),
+    'delivery_notice': NumberFormat('DN', '%Y%m%d', None, 4, 'delivery_notices', 'notice_number'),
+    'customer': NumberFormat('C', None, None, 6, 'customer_management', 'customer_code'),
+    'supplier': NumberFormat('S', None, None, 6, 'supplier_management', 'supplier_code'),
+    'material': NumberFormat('MT', None, None, 8, 'materials', 'material_code'),
+    'product': NumberFormat('P', None, None, 8, 'products', 'product_code'),
+}
+
+# 跳过已占用编号时最多重新分配的次数
+_MAX_RETRIES = 10
+
+
+def get_number_format(rule_name):
+    """
+    获取编号规则（含配置覆盖）
+    :param rule_name: 规则名称，见 NUMBER_FORMATS
+    :return: NumberFormat
+    """
+    if rule_name not in NUMBER_FORMATS:
+        raise ValueError(f"不支持的编号规则: {rule_name}")
+    number_format = NUMBER_FORMATS[rule_name]
+    overrides = current_app.config.get('DOCUMENT_NUMBER_FORMATS', {}).get(rule_name) if has_app_context() else None
+    if overrides:
+        number_format = number_format._replace(**{
+            key: value for key, value in overrides.items() if key in ('prefix', 'date_format', 'width')
+        })
+    return number_format
+
+
+def _render(number_format, prefix, now, sequence):
+    date_format = number_format.date_format or number_format.period_format
+    date_part = now.strftime(date_format) if date_format else ''
+    return f'{prefix}{date_part}{sequence:0{number_format.width}d}'
+
+
+def _number_table(number_format):
+    return sa.table(number_format.table, sa.column(number_format.column, sa.String))
+
+
+def _seed(connection, number_format, prefix, now):
+    """计数器初始化：单据表中本周期已有的最大序号"""
+    number_column = _number_table(number_format).c[number_format.column]
+    lead = prefix + (now.strftime(number_format.period_format) if number_format.period_format else '')
+    if number_format.date_format and number_format.date_format != number_format.period_format:
+        # 编号中的日期比周期更细（如带时分秒），序号取末尾定长部分
+        sequence = func.right(number_column, number_format.width)
+    else:
+        sequence = func.substring(number_column, len(lead) + 1)
+    return connection.execute(
+        select(func.max(sequence.cast(sa.BigInteger))).where(
+            number_column.op('~')(f'^{re.escape(lead)}[0-9]+$')
+        )
+    ).scalar() or 0
+
+
+def _allocate(connection, sequence_key, period, count, seed):
+    """
+    分配 count 个连续序号
+    :return: 第一个序号
+    """
+    from app.models.document_sequence import DocumentSequence
+
+    sequences = DocumentSequence.__table__
+    first = connection.execute(
+        sequences.update()
+        .where(sequences.c.sequence_key == sequence_key, sequences.c.period == period)
+        .values(next_value=sequences.c.next_value + count, updated_at=func.now())
+        .returning(sequences.c.next_value - count)
+    ).scalar()
+    if first is not None:
+        return first
+
+    start = seed() + 1
+    statement = insert(sequences).values(
+        id=uuid.uuid4(), sequence_key=sequence_key, period=period, next_value=start + count
+    )
+    return connection.execute(
+        statement.on_conflict_do_update(
+            constraint='uq_document_sequences_key_period',
+            set_={'next_value': sequences.c.next_value + count, 'updated_at': func.now()}
+        ).returning(sequences.c.next_value - count)
+    ).scalar()
+
+
+def reserve_numbers(rule_name, count, prefix=None, schema_name=None):
+    """
+    批量预留编号
+    :param rule_name: 编号规则名称，见 NUMBER_FORMATS
+    :param count: 数量
+    :param prefix: 前缀，为空时使用规则的前缀（如按入库类型区分的 FIN/RAW）
+    :param schema_name: 租户schema，为空时使用当前线程的schema
+    :return: 编号列表，同一批次内递增
+    """
+    if count <= 0:
+        return []
+    number_format = get_number_format(rule_name)
+    prefix = number_format.prefix if prefix is None else prefix
+    schema_name = schema_name or TenantContext().get_schema()
+    now = datetime.now()
+    sequence_key = f'{rule_name}:{prefix}'
+    period = now.strftime(number_format.period_format) if number_format.period_format else ''
+    number_column = _number_table(number_format).c[number_format.column]
+
+    from app.models.document_sequence import DocumentSequence
+    engine = db.session.get_bind(
+        mapper=sa.inspect(DocumentSequence), clause=DocumentSequence.__table__.update()
+    )
+    numbers = []
+    with engine.connect() as connection:
+        set_search_path(connection, schema_name)
+        connection.commit()
+
+        for _ in range(_MAX_RETRIES):
+            with connection.begin():
+                first = _allocate(
+                    connection, sequence_key, period, count - len(numbers),
+                    lambda: _seed(connection, number_format, prefix, now)
+                )
+                candidates = [_render(number_format, prefix, now, first + offset)
+                              for offset in range(count - len(numbers))]
+                taken = set(connection.execute(
+                    select(number_column).where(number_column.in_(candidates))
+                ).scalars())
+            numbers.extend(number for number in candidates if number not in taken)
+            if len(numbers) == count:
+                return numbers
+    raise ValueError(f"编号分配失败，请检查编号规则 {rule_name} 的计数器")
+
+
+def next_number(rule_name, prefix=None, schema_name=None):
+    """
+    分配一个编号
+    :param rule_name: 编号规则名称，见 NUMBER_FORMATS
+    :param prefix: 前缀，为空时使用规则的前缀
+    :param schema_name: 租户schema，为空时使用当前线程的schema
+    :return: 编号字符串
+    """
+    return reserve_numbers(rule_name, 1, prefix=prefix, schema_name=schema_name)[0]
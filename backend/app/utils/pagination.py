@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+键集（游标）分页
+
+OFFSET分页在深页时需要扫描并丢弃前面所有行，键集分页使用上一页最后一行的排序键
+作为条件（WHERE (created_at, id) < (:created_at, :id)），每页耗时与页码无关。
+
+游标是排序键值的不透明编码（base64url JSON），由上一页响应中的 next_cursor 提供。
+排序键必须非空且最后一列唯一（通常为主键id）。
+"""
+
+import json
+import base64
+import binascii
+from uuid import UUID
+from decimal import Decimal
+from datetime import datetime, date
+from sqlalchemy import tuple_
+from sqlalchemy.engine import Row
+
+from app.utils.list_count import count_total
+
+
+class InvalidCursorError(ValueError):
+    """游标格式错误或与当前排序不匹配"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, date):
+        return ['d', value.isoformat()]
+    if isinstance(value, UUID):
+        return ['u', str(value)]
+    if isinstance(value, Decimal):
+        return ['n', str(value)]
+    return ['v', value]
+
+
+def _decode_value(item):
+    tag, value = item
+    if tag == 'dt':
+        return datetime.fromisoformat(value)
+    if tag == 'd':
+        return date.fromisoformat(value)
+    if tag == 'u':
+        return UUID(value)
+    if tag == 'n':
+        return Decimal(value)
+    if tag == 'v':
+        return value
+    raise InvalidCursorError(f"未知的游标值类型: {tag}")
+
+
+def encode_cursor(values):
+    """
+    编码游标
+    :param values: 排序键值列表
+    :return: 游标字符串
+    """
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    解码游标
+    :param cursor: 游标字符串
+    :param size: 排序键列数
+    :return: 排序键值列表
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        items = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        values = [_decode_value(item) for item in items]
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise InvalidCursorError("无效的分页游标")
+
+    if len(values) != size:
+        raise InvalidCursorError("分页游标与当前排序不匹配")
+    return values
+
+
+def cursor_args(args):
+    """
+    从请求参数中解析游标分页参数
+    :param args: request.args
+    :return: (cursor, with_total)；未传cursor参数时cursor为None（使用页码分页），
+             传空值（?cursor=）表示从第一页开始使用游标分页
+    """
+    cursor = args.get('cursor')
+    with_total = args.get('with_total', 'false').lower() == 'true'
+    return cursor, with_total
+
+
+def _sort_key(row, sort_columns):
+    # 列投影查询（见 app.utils.projection）时排序键取自同名列，
+    # 多实体查询（如 query(Model, Other.name)）时排序键取自第一个实体
+    if isinstance(row, Row):
+        mapping = row._mapping
+        if all(column.key in mapping for column in sort_columns):
+            return [mapping[column.key] for column in sort_columns]
+        row = row[0]
+    return [getattr(row, column.key) for column in sort_columns]
+
+
+def keyset_paginate(query, sort_columns, cursor=None, page_size=10, descending=True, with_total=False,
+                    count_name=None):
+    """
+    键集分页
+    :param query: 已应用过滤条件、未排序的查询
+    :param sort_columns: 排序列（模型属性），最后一列须唯一，如 (Model.created_at, Model.id)
+    :param cursor: 上一页返回的 next_cursor，为空时返回第一页
+    :param page_size: 每页条数
+    :param descending: 是否降序
+    :param with_total: 是否统计总数（额外执行一次count）
+    :param count_name: 列表名称，指定时按该列表的总数统计策略统计（见 app.utils.list_count）
+    :return: {'items': 行列表, 'next_cursor': 下一页游标, 'has_more': 是否还有下一页,
+              'total'/'total_estimated': 总数及是否为估算值（with_total时）}
+    """
+    total, total_estimated = None, False
+    if with_total:
+        if count_name:
+            total, total_estimated = count_total(query, count_name)
+        else:
+            total = query.order_by(None).count()
+
+    if cursor:
+        values = decode_cursor(cursor, len(sort_columns))
+        key = tuple_(*sort_columns)
+        bound = tuple_(*values)
+        query = query.filter(key < bound if descending else key > bound)
+
+    ordering = [column.desc() if descending else column.asc() for column in sort_columns]
+    # 多取一行用于判断是否还有下一页
+    rows = query.order_by(None).order_by(*ordering).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    result = {
+        'items': rows,
+        'next_cursor': encode_cursor(_sort_key(rows[-1], sort_columns)) if has_more else None,
+        'has_more': has_more,
+    }
+    if with_total:
+        result['total'] = total
+        result['total_estimated'] = total_estimated
+    return result
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+列表摘要视图（列投影）
+
+列表接口默认（view=full）逐行构造ORM对象并调用 to_dict()，会触发明细和人员、部门等
+关联对象的懒加载。摘要视图（view=summary）只查询模型声明的列表列，并通过外连接一次
+取出关联名称，返回普通字典：不进入ORM标识映射，也不加载任何关联。
+
+模型通过类属性声明摘要视图：
+    SUMMARY_COLUMNS = ('id', 'order_number', ...)                 # 本表列
+    SUMMARY_RELATED = {'department': ('department', 'dept_name')}  # 输出键: (关联属性, 关联表列)
+
+稀疏字段（?fields=a,b,c）：只查询并返回指定的模型列，主键总是包含在内。
+
+返回的字典按 to_dict() 的规则转换取值（UUID为字符串、Decimal为浮点数、日期时间为ISO格式），
+声明了 warehouse_id、warehouse_name 列的模型与完整视图一样填充仓库名称。
+"""
+
+import uuid
+from datetime import date, time
+from decimal import Decimal
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import aliased
+
+from app.utils.reference_resolver import fill_warehouse_names
+
+
+class InvalidFieldsError(ValueError):
+    """fields参数包含模型中不存在的列"""
+
+
+VIEW_FULL = 'full'
+VIEW_SUMMARY = 'summary'
+
+
+def view_arg(args):
+    """
+    从请求参数中解析列表视图
+    :param args: request.args
+    :return: 'summary' 或 'full'（默认）
+    """
+    return VIEW_SUMMARY if (args.get('view') or '').lower() == VIEW_SUMMARY else VIEW_FULL
+
+
+def summary_query(query, model):
+    """
+    将实体查询转换为摘要列查询，保留已有的过滤条件
+    :param query: 模型的ORM查询（不能包含针对实体的加载选项，如 joinedload）
+    :param model: 声明了 SUMMARY_COLUMNS 的模型类
+    :return: 返回Row的查询
+    """
+    query, related = _related_columns(query, model)
+    return query.with_entities(*[getattr(model, name) for name in model.SUMMARY_COLUMNS], *related)
+
+
+def export_query(query, model):
+    """
+    将实体查询转换为导出用的列查询：模型的全部列，加上 SUMMARY_RELATED 声明的关联名称
+    :param query: 模型的ORM查询（不能包含针对实体的加载选项）
+    :param model: 模型类
+    :return: 返回Row的查询
+    """
+    query, related = _related_columns(query, model)
+    return query.with_entities(*[getattr(model, attr.key) for attr in inspect(model).column_attrs], *related)
+
+
+def _related_columns(query, model):
+    """按 SUMMARY_RELATED 外连接关联表，返回 (查询, 关联名称列)"""
+    columns = []
+    for key, (relationship_name, attribute) in getattr(model, 'SUMMARY_RELATED', {}).items():
+        relationship_attr = getattr(model, relationship_name)
+        target = aliased(relationship_attr.property.mapper.class_)
+        query = query.outerjoin(relationship_attr.of_type(target))
+        columns.append(getattr(target, attribute).label(key))
+    return query, columns
+
+
+def _plain_value(value):
+    """按 to_dict() 的规则转换为可直接JSON序列化的值"""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def summary_rows(rows, model=None):
+    """
+    将摘要查询结果转换为字典列表
+    :param rows: Row列表
+    :param model: 模型类，SUMMARY_COLUMNS 含仓库ID和名称时填充仓库名称
+    :return: [dict]
+    """
+    items = [{key: _plain_value(value) for key, value in row._mapping.items()} for row in rows]
+    columns = getattr(model, 'SUMMARY_COLUMNS', ())
+    if items and 'warehouse_id' in columns and 'warehouse_name' in columns:
+        fill_warehouse_names(items, with_code='warehouse_code' in columns)
+    return items
+
+
+def summary_page(query, model, order_by, page, page_size):
+    """
+    按页码查询摘要视图
+    :param query: 已应用过滤条件的模型查询
+    :param model: 模型类
+    :param order_by: 排序表达式
+    :param page: 页码
+    :param page_size: 每页条数
+    :return: [dict]
+    """
+    rows = summary_query(query, model).order_by(order_by).offset((page - 1) * page_size).limit(page_size).all()
+    return summary_rows(rows, model)
+
+
+def fields_arg(args, name='fields'):
+    """
+    从请求参数中解析稀疏字段列表
+    :param args: request.args
+    :param name: 参数名
+    :return: 字段名列表，未传或为空时返回None（返回完整数据）
+    """
+    value = args.get(name)
+    if not value:
+        return None
+    fields = []
+    for field in value.split(','):
+        field = field.strip()
+        if field and field not in fields:
+            fields.append(field)
+    return fields or None
+
+
+def field_columns(model, fields):
+    """
+    校验字段名并返回对应的模型列，主键列排在最前
+    :param model: 模型类
+    :param fields: 字段名列表
+    :return: 模型列属性列表
+    """
+    mapper = inspect(model)
+    column_keys = {attr.key for attr in mapper.column_attrs}
+    unknown = [field for field in fields if field not in column_keys]
+    if unknown:
+        raise InvalidFieldsError(f"不支持的字段: {', '.join(unknown)}")
+
+    names = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+    for field in fields:
+        if field not in names:
+            names.append(field)
+    return [getattr(model, name) for name in names]
+
+
+def fields_query(query, model, fields):
+    """
+    将实体查询转换为只查询指定列的查询，保留已有的过滤条件和排序
+    :param query: 模型的ORM查询（不能包含针对实体的加载选项，如 joinedload）
+    :param model: 模型类
+    :param fields: 字段名列表
+    :return: 返回Row的查询
+    """
+    return query.with_entities(*field_columns(model, fields))
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+请求级SQL统计
+
+通过SQLAlchemy引擎事件统计每个请求执行的语句数、数据库总耗时、最慢语句，
+并按语句指纹（去除参数和字面量后的SQL）计数，用于发现循环查询（N+1）。
+调试模式下以响应头返回，生产环境输出结构化日志。
+"""
+
+import re
+import json
+import time
+import logging
+from collections import Counter
+from flask import g, request, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.query_stats')
+
+_PARAM_RE = re.compile(r'%\(\w+\)s|\$\d+|:\w+|\?')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*\?\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(statement):
+    """
+    生成语句指纹：参数、字面量、IN列表统一替换，用于识别重复执行的同类语句
+    :param statement: SQL语句
+    :return: 指纹字符串
+    """
+    normalized = _STRING_RE.sub('?', statement)
+    normalized = _PARAM_RE.sub('?', normalized)
+    normalized = _NUMBER_RE.sub('?', normalized)
+    normalized = _IN_LIST_RE.sub('IN (?)', normalized)
+    return _SPACE_RE.sub(' ', normalized).strip()
+
+
+class RequestQueryStats:
+    """单个请求的SQL统计"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+        self.fingerprints = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.total_time += elapsed
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """
+        获取重复执行次数达到阈值的语句指纹
+        :param threshold: 重复次数阈值
+        :return: [(指纹, 次数)]，按次数降序
+        """
+        return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+
+def _current_stats():
+    if not has_app_context():
+        return None
+    return g.get('query_stats')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start_time')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    stats = _current_stats()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+
+def init_query_stats(app):
+    """
+    注册请求级SQL统计钩子
+    :param app: Flask实例
+    """
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return
+
+    threshold = app.config.get('QUERY_STATS_N_PLUS_ONE_THRESHOLD', 5)
+    emit_headers = app.config.get('QUERY_STATS_HEADERS')
+    if emit_headers is None:
+        emit_headers = app.debug
+    slow_ms = app.config.get('QUERY_STATS_LOG_MIN_MS', 0)
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = RequestQueryStats()
+        g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def _finish_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+
+        duration_ms = (time.perf_counter() - g.get('request_started_at', time.perf_counter())) * 1000
+        db_time_ms = stats.total_time * 1000
+        repeated = stats.repeated(threshold)
+
+        if emit_headers:
+            response.headers['X-DB-Query-Count'] = str(stats.count)
+            response.headers['X-DB-Time-Ms'] = f'{db_time_ms:.2f}'
+            response.headers['X-DB-Slowest-Ms'] = f'{stats.slowest_time * 1000:.2f}'
+            response.headers['X-DB-Repeated-Queries'] = str(len(repeated))
+
+        if stats.count and duration_ms >= slow_ms:
+            record = {
+                'event': 'request_query_stats',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'tenant_id': g.get('tenant_id'),
+                'schema': g.get('schema_name'),
+                'duration_ms': round(duration_ms, 2),
+                'query_count': stats.count,
+                'db_time_ms': round(db_time_ms, 2),
+                'slowest_ms': round(stats.slowest_time * 1000, 2),
+                'slowest_statement': (stats.slowest_statement or '')[:500],
+                'n_plus_one': [{'fingerprint': fp[:300], 'count': n} for fp, n in repeated[:5]],
+            }
+            if repeated:
+                logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+            else:
+                logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+        return response
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+只读副本路由
+
+被 @read_only 装饰的服务方法（或通过 read_only_blueprint 标记的蓝图）在执行期间
+将查询路由到当前分片的只读副本。以下情况回退到主库：
+- 当前分片未配置副本
+- 副本复制延迟超过 REPLICA_MAX_LAG_SECONDS 或延迟检查失败
+- 当前会话已有写入（读己之写）
+- flush 以及 INSERT/UPDATE/DELETE 语句
+"""
+
+import threading
+import time
+import logging
+from functools import wraps
+from contextlib import contextmanager
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 线程本地存储，记录当前是否处于只读路由范围内（支持嵌套）
+_thread_local = threading.local()
+
+# 会话info中标记"本会话已写入"的键
+SESSION_WRITE_KEY = 'tenant_has_writes'
+
+
+def in_read_only_scope():
+    """当前线程是否处于只读路由范围内"""
+    return getattr(_thread_local, 'read_only_depth', 0) > 0
+
+
+def _enter_read_only():
+    _thread_local.read_only_depth = getattr(_thread_local, 'read_only_depth', 0) + 1
+
+
+def _exit_read_only():
+    _thread_local.read_only_depth = max(getattr(_thread_local, 'read_only_depth', 0) - 1, 0)
+
+
+def read_only(fn):
+    """
+    装饰器，将方法内的查询路由到只读副本
+    """
+    @wraps(fn)
+    def read_only_wrapper(*args, **kwargs):
+        _enter_read_only()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _exit_read_only()
+
+    return read_only_wrapper
+
+
+@contextmanager
+def read_only_scope():
+    """
+    上下文管理器，将范围内的查询路由到只读副本
+    用于在 @read_only 方法返回后才迭代的查询（如流式导出）
+    """
+    _enter_read_only()
+    try:
+        yield
+    finally:
+        _exit_read_only()
+
+
+def read_only_blueprint(bp):
+    """
+    将整个蓝图标记为只读：GET请求内的查询路由到只读副本
+    :param bp: Flask蓝图
+    :return: 蓝图
+    """
+    from flask import g, request
+
+    @bp.before_request
+    def _enter_read_only_request():
+        if request.method == 'GET':
+            g.read_only_request = True
+            _enter_read_only()
+
+    @bp.teardown_request
+    def _exit_read_only_request(exc):
+        if g.pop('read_only_request', False):
+            _exit_read_only()
+
+    return bp
+
+
+def session_has_writes(session):
+    """会话是否已执行过写入"""
+    return session.info.get(SESSION_WRITE_KEY, False)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_session_writes(session, flush_context):
+    """记录会话已写入，后续只读查询继续使用主库"""
+    session.info[SESSION_WRITE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_session_bulk_writes(orm_execute_state):
+    """批量写入不经过flush，在执行时记录"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info[SESSION_WRITE_KEY] = True
+
+
+class ReplicaLagMonitor:
+    """
+    副本复制延迟检测，结果在进程内缓存 REPLICA_LAG_CHECK_INTERVAL 秒
+    """
+
+    def __init__(self, max_lag_seconds=None, check_interval=5):
+        self.max_lag_seconds = max_lag_seconds
+        self.check_interval = check_interval
+        self._status = {}
+        self._lock = threading.Lock()
+
+    def is_usable(self, engine):
+        """
+        副本是否可用（延迟未超限）
+        :param engine: 副本引擎
+        :return: bool
+        """
+        if self.max_lag_seconds is None:
+            return True
+
+        now = time.monotonic()
+        key = id(engine)
+        status = self._status.get(key)
+        if status and status[1] > now:
+            return status[0]
+
+        with self._lock:
+            status = self._status.get(key)
+            if status and status[1] > now:
+                return status[0]
+            usable = self._check(engine)
+            self._status[key] = (usable, now + self.check_interval)
+            return usable
+
+    def _check(self, engine):
+        try:
+            with engine.connect() as conn:
+                # 非备库（未处于恢复状态）时 pg_last_xact_replay_timestamp() 为 NULL，视为无延迟
+                lag = conn.execute(text(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )).scalar()
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, falling back to primary: {e}")
+            return False
+
+        if lag > self.max_lag_seconds:
+            logger.warning(f"Replica lag {lag:.1f}s exceeds {self.max_lag_seconds}s, falling back to primary")
+            return False
+        return True
+
+
+def get_lag_monitor():
+    """获取当前应用的副本延迟检测器"""
+    monitor = current_app.extensions.get('replica_lag_monitor')
+    if monitor is None:
+        monitor = ReplicaLagMonitor(
+            max_lag_seconds=current_app.config.get('REPLICA_MAX_LAG_SECONDS'),
+            check_interval=current_app.config.get('REPLICA_LAG_CHECK_INTERVAL', 5)
+        )
+        current_app.extensions['replica_lag_monitor'] = monitor
+    return monitor
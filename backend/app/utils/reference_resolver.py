@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+关联名称批量解析
+
+单据列表需要显示仓库、员工、单位、客户、供应商、税率、用户等关联对象的名称。
+逐行查询关联表会产生 N+1 查询，这里先收集整页结果引用的ID，每种关联对象执行一次 IN 查询。
+- 同一请求内已解析的ID保存在 flask.g 中，重复引用不再查询
+- 仓库、员工、单位、税率等小表整表缓存在租户参考数据缓存中（reference_cache），
+  表写入提交后自动失效；客户、供应商、联系人、用户等大表只做 IN 查询
+- 无效ID（非UUID字符串等）直接跳过，按未找到处理
+"""
+
+import uuid
+import logging
+from collections import namedtuple
+from flask import g, has_app_context
+
+from app.extensions import db
+from app.utils.cache import reference_cache
+from app.utils.tenant_context import TenantContext
+
+logger = logging.getLogger(__name__)
+
+# 单次 IN 查询的最大ID数
+IN_CHUNK_SIZE = 1000
+
+# g 中保存请求内解析结果的属性名
+_MEMO_ATTR = '_reference_memo'
+
+# model: 模型类；fields: 解析的字段；cache_all: 是否整表缓存
+ReferenceEntity = namedtuple('ReferenceEntity', ['model', 'fields', 'cache_all'])
+
+_ENTITIES = None
+
+
+def _entities():
+    global _ENTITIES
+    if _ENTITIES is None:
+        from app.models.basic_data import (
+            Warehouse, Employee, Unit, TaxRate, CustomerManagement, CustomerContact, SupplierManagement
+        )
+        from app.models.user import User
+        _ENTITIES = {
+            'warehouse': ReferenceEntity(Warehouse, ('warehouse_name', 'warehouse_code'), True),
+            'employee': ReferenceEntity(Employee, ('employee_name', 'employee_id'), True),
+            'unit': ReferenceEntity(Unit, ('unit_name',), True),
+            'tax_rate': ReferenceEntity(TaxRate, ('tax_name', 'tax_rate'), True),
+            'customer': ReferenceEntity(CustomerManagement, ('customer_name', 'customer_code'), False),
+            'customer_contact': ReferenceEntity(CustomerContact, ('contact_name', 'mobile'), False),
+            'supplier': ReferenceEntity(SupplierManagement, ('supplier_name', 'supplier_code'), False),
+            'user': ReferenceEntity(User, ('email', 'first_name', 'last_name'), False),
+        }
+        reference_cache.watch(*(
+            entity.model.__tablename__ for entity in _ENTITIES.values() if entity.cache_all
+        ))
+    return _ENTITIES
+
+
+def _to_uuid(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+
+def _memo(schema_name, entity_name):
+    """请求内的解析结果 {ID字符串: 字段字典}；没有应用上下文时不保存"""
+    if not has_app_context():
+        return {}
+    memo = g.get(_MEMO_ATTR)
+    if memo is None:
+        memo = {}
+        setattr(g, _MEMO_ATTR, memo)
+    return memo.setdefault((schema_name, entity_name), {})
+
+
+def _query_rows(session, entity, ids=None):
+    model = entity.model
+    columns = [model.id] + [getattr(model, field) for field in entity.fields]
+    if ids is None:
+        rows = session.query(*columns).all()
+    else:
+        rows = []
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            rows.extend(session.query(*columns).filter(model.id.in_(ids[start:start + IN_CHUNK_SIZE])).all())
+    return {str(row[0]): dict(zip(entity.fields, row[1:])) for row in rows}
+
+
+def resolve_references(entity_name, ids, session=None, schema_name=None):
+    """
+    批量解析关联对象
+    :param entity_name: 关联对象类型，warehouse/employee/unit/tax_rate/customer/customer_contact/supplier/user
+    :param ids: ID可迭代对象，可包含None和无效值
+    :param session: 数据库会话，为空时使用 db.session
+    :param schema_name: 租户schema，为空时使用当前线程的schema
+    :return: {ID字符串: {字段: 值}}，只包含找到的对象
+    """
+    entities = _entities()
+    if entity_name not in entities:
+        raise ValueError(f"不支持的关联对象类型: {entity_name}")
+    entity = entities[entity_name]
+
+    keys = {key for key in (_to_uuid(value) for value in ids) if key is not None}
+    if not keys:
+        return {}
+
+    session = session or db.session
+    schema_name = schema_name or TenantContext().get_schema()
+    memo = _memo(schema_name, entity_name)
+
+    missing = [key for key in keys if str(key) not in memo]
+    if missing:
+        if entity.cache_all and reference_cache.enabled:
+            rows = reference_cache.get_or_set(
+                f'references:{entity_name}',
+                lambda: _query_rows(session, entity),
+                tables=(entity.model.__tablename__,),
+                schema_name=schema_name
+            )
+        else:
+            rows = _query_rows(session, entity, missing)
+        # 未找到的ID不记入，同一请求内新建的对象仍可解析
+        memo.update((str(key), rows[str(key)]) for key in missing if str(key) in rows)
+
+    return {str(key): memo[str(key)] for key in keys if str(key) in memo}
+
+
+def _get_value(item, attr):
+    if isinstance(item, dict):
+        return item.get(attr)
+    return getattr(item, attr, None)
+
+
+def _set_value(item, attr, value):
+    if isinstance(item, dict):
+        item[attr] = value
+    else:
+        setattr(item, attr, value)
+
+
+def fill_references(items, entity_name, id_attr, fields, default=None, session=None):
+    """
+    按ID字段批量填充关联对象的字段
+    :param items: 模型对象或字典列表
+    :param entity_name: 关联对象类型，见 resolve_references
+    :param id_attr: 保存关联ID的属性名
+    :param fields: {目标属性名: 关联对象字段名}
+    :param default: 关联对象未找到或查询失败、且目标属性为空时填充的值，为None时不填充
+    :param session: 数据库会话，为空时使用 db.session
+    """
+    items = [item for item in items or [] if _get_value(item, id_attr)]
+    if not items:
+        return
+
+    try:
+        resolved = resolve_references(entity_name, (_get_value(item, id_attr) for item in items), session=session)
+    except Exception as e:
+        logger.warning(f"批量解析关联对象失败({entity_name}): {e}")
+        resolved = {}
+
+    for item in items:
+        key = _to_uuid(_get_value(item, id_attr))
+        reference = resolved.get(str(key)) if key else None
+        for target, field in fields.items():
+            if reference is not None:
+                if _get_value(item, target) != reference[field]:
+                    _set_value(item, target, reference[field])
+            elif default is not None and not _get_value(item, target):
+                _set_value(item, target, default)
+
+
+def fill_warehouse_names(items, with_code=False, session=None):
+    """
+    批量填充单据的仓库名称，仓库不存在时填充“未知仓库”
+    :param items: 含 warehouse_id、warehouse_name 的模型对象或字典列表
+    :param with_code: 是否同时填充 warehouse_code
+    :param session: 数据库会话，为空时使用 db.session
+    """
+    fill_references(items, 'warehouse', 'warehouse_id', {'warehouse_name': 'warehouse_name'},
+                    default='未知仓库', session=session)
+    if with_code:
+        fill_references(items, 'warehouse', 'warehouse_id', {'warehouse_code': 'warehouse_code'}, session=session)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+租户数据库分片路由
+
+system.tenants.shard_name 记录租户所在的分片，分片名称到数据库URL的映射由
+配置项 TENANT_SHARDS 提供（数据库凭据不落库）。shard_name 为空或为
+DEFAULT_SHARD 的租户使用 SQLALCHEMY_DATABASE_URI 对应的主库。
+
+system schema 中的表（租户、用户、角色等）始终位于主库，租户schema中的表
+按当前线程的分片路由到对应引擎。配置了 TENANT_READ_REPLICAS 的分片在只读范围
+（见 app.utils.read_replica）内将查询路由到该分片的只读副本。
+"""
+
+import threading
+import sqlalchemy as sa
+from sqlalchemy.sql import util as sql_util
+from sqlalchemy.sql.elements import TextClause
+from flask import current_app
+from flask_sqlalchemy.session import Session
+
+from app.utils.tenant_context import TenantContext, install_schema_routing
+from app.utils.read_replica import in_read_only_scope, session_has_writes, get_lag_monitor
+from app.utils.metrics import instrument_engine
+
+
+DEFAULT_SHARD = 'default'
+
+
+class ShardRegistry:
+    """
+    分片引擎注册表，每个分片一个引擎（连接池），首次使用时创建
+    """
+
+    def __init__(self, app, primary_engine):
+        self.app = app
+        self.primary_engine = primary_engine
+        self.shard_urls = dict(app.config.get('TENANT_SHARDS') or {})
+        self.replica_urls = dict(app.config.get('TENANT_READ_REPLICAS') or {})
+        self.system_schema = app.config['SYSTEM_SCHEMA']
+        self._engines = {}
+        self._replica_engines = {}
+        self._lock = threading.Lock()
+
+    @property
+    def has_replicas(self):
+        """是否配置了只读副本"""
+        return bool(self.replica_urls)
+
+    def is_default(self, shard_name):
+        """是否为默认分片（主库）"""
+        return not shard_name or shard_name == DEFAULT_SHARD
+
+    def get_engine(self, shard_name):
+        """
+        获取分片对应的引擎
+        :param shard_name: 分片名称
+        :return: SQLAlchemy引擎
+        """
+        if self.is_default(shard_name):
+            return self.primary_engine
+
+        engine = self._engines.get(shard_name)
+        if engine is not None:
+            return engine
+
+        with self._lock:
+            engine = self._engines.get(shard_name)
+            if engine is None:
+                url = self.shard_urls.get(shard_name)
+                if not url:
+                    raise ValueError(f"Unknown tenant shard: {shard_name}")
+                engine = self._create_engine(url, shard_name)
+                self._engines[shard_name] = engine
+        return engine
+
+    def get_replica_engine(self, shard_name):
+        """
+        获取分片对应的只读副本引擎
+        :param shard_name: 分片名称
+        :return: SQLAlchemy引擎，未配置副本时返回None
+        """
+        shard_key = DEFAULT_SHARD if self.is_default(shard_name) else shard_name
+        engine = self._replica_engines.get(shard_key)
+        if engine is not None:
+            return engine
+
+        url = self.replica_urls.get(shard_key)
+        if not url:
+            return None
+
+        with self._lock:
+            engine = self._replica_engines.get(shard_key)
+            if engine is None:
+                engine = self._create_engine(url, f'replica:{shard_key}')
+                self._replica_engines[shard_key] = engine
+        return engine
+
+    def _create_engine(self, url, engine_name):
+        options = dict(self.app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        engine = sa.create_engine(url, **options)
+        install_schema_routing(engine, self.app.config.get('TENANT_ROUTING_MODE', 'session'))
+        if self.app.config.get('METRICS_ENABLED', True):
+            instrument_engine(engine, engine_name)
+        return engine
+
+    def shard_names(self):
+        """获取所有已配置的分片名称"""
+        return [DEFAULT_SHARD] + sorted(self.shard_urls)
+
+    def dispose(self):
+        """释放所有分片连接池"""
+        with self._lock:
+            for engine in list(self._engines.values()) + list(self._replica_engines.values()):
+                engine.dispose()
+            self._engines.clear()
+            self._replica_engines.clear()
+
+
+def init_shard_registry(app, primary_engine):
+    """
+    初始化分片注册表并挂载到 app.extensions
+    :param app: Flask实例
+    :param primary_engine: 主库引擎
+    :return: ShardRegistry
+    """
+    registry = ShardRegistry(app, primary_engine)
+    app.extensions['tenant_shards'] = registry
+    return registry
+
+
+def get_shard_registry():
+    """获取当前应用的分片注册表"""
+    return current_app.extensions.get('tenant_shards')
+
+
+def _references_system_schema(clause, system_schema):
+    """判断语句是否访问system schema中的表"""
+    if isinstance(clause, TextClause):
+        return f'{system_schema}.' in clause.text
+    for table in sql_util.find_tables(clause, include_crud=True):
+        if getattr(table, 'schema', None) == system_schema:
+            return True
+    return False
+
+
+class TenantShardSession(Session):
+    """
+    按租户分片（及只读副本）选择引擎的会话
+
+    未配置分片/副本或当前租户位于主库时，行为与Flask-SQLAlchemy默认会话一致。
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        registry = current_app.extensions.get('tenant_shards')
+        shard_name = TenantContext().get_shard()
+        read_only = registry is not None and registry.has_replicas and in_read_only_scope()
+        if registry is None or (registry.is_default(shard_name) and not read_only):
+            return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+        # system模型的schema在映射配置完成后才设置（SystemModel.__declare_last__）
+        sa.orm.configure_mappers()
+
+        if mapper is not None:
+            table = sa.inspect(mapper).local_table
+            if getattr(table, 'schema', None) == registry.system_schema:
+                return registry.primary_engine
+        elif clause is not None and _references_system_schema(clause, registry.system_schema):
+            return registry.primary_engine
+
+        if read_only and self._can_use_replica(clause):
+            replica = registry.get_replica_engine(shard_name)
+            if replica is not None and get_lag_monitor().is_usable(replica):
+                return replica
+
+        return registry.get_engine(shard_name)
+
+    def _can_use_replica(self, clause):
+        """flush、写语句、加锁查询以及已写入的会话（读己之写）使用主库"""
+        if self._flushing or session_has_writes(self):
+            return False
+        if getattr(clause, '_for_update_arg', None) is not None:
+            return False
+        return not getattr(clause, 'is_dml', False)
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+流式导出（NDJSON / CSV / XLSX）
+
+导出查询使用服务端游标（yield_per 隐含 stream_results）按批读取列投影行，
+逐行写出到流式响应，内存占用与导出总行数无关。
+
+响应体在视图函数返回后才被迭代，此时请求上下文、租户上下文和只读路由范围都已退出，
+因此生成器内：
+- 通过 stream_with_context 保持请求上下文（会话在迭代结束后才被清理）
+- 重新设置视图执行时的租户schema和分片
+- 在只读路由范围内执行查询
+
+XLSX格式无法边生成边发送，见 app.utils.xlsx_export。不超过 XLSX_EXPORT_SYNC_ROWS 行时工作簿在请求内
+同步生成，更多行转为后台导出任务（app.services.system.export_job_service），响应返回任务（202），
+避免超过 gunicorn 请求超时。
+"""
+
+import io
+import csv
+import json
+import uuid
+import decimal
+from datetime import date, datetime, time
+from flask import Response, current_app, jsonify, stream_with_context
+
+from app.utils.read_replica import read_only_scope
+from app.utils.tenant_context import TenantContext
+from app.utils.xlsx_export import XLSX_MIMETYPE, xlsx_export
+
+FORMAT_NDJSON = 'ndjson'
+FORMAT_CSV = 'csv'
+FORMAT_XLSX = 'xlsx'
+
+EXPORT_MIMETYPES = {
+    FORMAT_NDJSON: 'application/x-ndjson',
+    FORMAT_CSV: 'text/csv; charset=utf-8',
+    FORMAT_XLSX: XLSX_MIMETYPE,
+}
+
+# 单次写出的块大小，避免每行一次WSGI写入
+_CHUNK_SIZE = 64 * 1024
+
+
+class InvalidExportFormatError(ValueError):
+    """不支持的导出格式"""
+
+
+def export_format_arg(args):
+    """
+    从请求参数中解析导出格式
+    :param args: request.args
+    :return: 'ndjson'（默认）、'csv' 或 'xlsx'
+    """
+    export_format = (args.get('format') or FORMAT_NDJSON).lower()
+    if export_format not in EXPORT_MIMETYPES:
+        raise InvalidExportFormatError(f"不支持的导出格式: {export_format}，可选 {', '.join(EXPORT_MIMETYPES)}")
+    return export_format
+
+
+# 以这些字符开头的单元格会被Excel等表格软件当作公式执行（CSV注入）
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        # 加单引号前缀使其按文本显示；数值列不受影响，负数仍按数值导出
+        return "'" + value if value.startswith(_FORMULA_PREFIXES) else value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _ndjson_chunks(rows):
+    dumps = current_app.json.dumps
+    lines, size = [], 0
+    for row in rows:
+        line = dumps(row._asdict()) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= _CHUNK_SIZE:
+            yield ''.join(lines)
+            lines, size = [], 0
+    if lines:
+        yield ''.join(lines)
+
+
+def _csv_chunks(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM使Excel按UTF-8识别中文列
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        if buffer.tell() >= _CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def stream_export(query, export_format, filename, batch_size=None, columns=None):
+    """
+    构造流式导出响应
+    :param query: 已应用过滤条件和排序的列投影查询（返回Row）
+    :param export_format: ndjson、csv 或 xlsx
+    :param filename: 下载文件名（不含扩展名）
+    :param batch_size: 每批从游标读取的行数，默认 EXPORT_BATCH_SIZE
+    :param columns: XLSX导出列名列表（页面列配置），为空时导出全部列；ndjson/csv 总是导出全部列
+    :return: Flask Response；XLSX超过 XLSX_EXPORT_SYNC_ROWS 行时为导出任务响应（202）
+    """
+    if export_format == FORMAT_XLSX:
+        sync_rows = current_app.config.get('XLSX_EXPORT_SYNC_ROWS', 50000)
+        with read_only_scope():
+            total = query.order_by(None).limit(sync_rows + 1).count()
+        if total > sync_rows:
+            from app.services.system.export_job_service import ExportJobService
+            job = ExportJobService().create_job(query, filename, columns=columns, batch_size=batch_size)
+            return jsonify({
+                'success': True,
+                'data': job,
+                'message': '导出数据较多，已转为后台导出任务，完成后下载'
+            }), 202
+        return xlsx_export(query, filename, columns=columns, batch_size=batch_size)
+
+    batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    columns = [description['name'] for description in query.column_descriptions]
+    tenant_context = TenantContext()
+    schema_name, shard_name = tenant_context.get_schema(), tenant_context.get_shard()
+
+    def generate():
+        tenant_context.set_schema(schema_name)
+        tenant_context.set_shard(shard_name)
+        with read_only_scope():
+            rows = query.yield_per(batch_size)
+            if export_format == FORMAT_CSV:
+                yield from _csv_chunks(rows, columns)
+            else:
+                yield from _ndjson_chunks(rows)
+
+    extension = 'csv' if export_format == FORMAT_CSV else 'ndjson'
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={
+            'Content-Disposition': f'attachment; filename="{filename}.{extension}"',
+            # 关闭反向代理缓冲，使数据边生成边发送
+            'X-Accel-Buffering': 'no',
+        }
+    )
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+结构化异步日志
+
+- 业务线程只把日志记录放入队列（QueueHandler），由后台线程（QueueListener）格式化并写出
+- 日志输出为JSON，自动携带请求ID、租户ID和schema
+- 按日志器配置采样率（LOG_SAMPLING）和每秒条数上限（LOG_RATE_LIMITS），
+  采样和限流只作用于WARNING以下级别，不丢弃告警和错误
+
+gunicorn preload 模式下后台线程不会随fork复制，worker需在 post_fork 中调用
+start_log_listener() 重新启动。
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import queue
+import random
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request, has_request_context
+
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# LogRecord 内置属性，格式化时其余属性视为 extra 字段输出
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# 附加到记录上的上下文字段
+_CONTEXT_ATTRS = ('request_id', 'tenant_id', 'schema')
+
+_state = {
+    'listener': None,
+    'queue': None,
+    'handlers': None,
+    'queue_handlers': None,
+    'pid': None,
+    'atexit_registered': False,
+}
+_state_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """将日志记录格式化为单行JSON"""
+
+    def format(self, record):
+        payload = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for attr in _CONTEXT_ATTRS:
+            value = getattr(record, attr, None)
+            if value is not None:
+                payload[attr] = value
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and key not in _CONTEXT_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            payload['exc_info'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """
+    在产生日志的线程中记录请求上下文（后台写出线程无法访问flask.g）
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.tenant_id = g.get('tenant_id')
+            record.schema = g.get('schema_name')
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按日志器采样和限流，仅作用于WARNING以下级别
+
+    日志器名称按前缀匹配，最长前缀优先，如 app.services 的配置同样作用于 app.services.base_service。
+    """
+
+    def __init__(self, sample_rates=None, rate_limits=None):
+        """
+        :param sample_rates: {日志器名称: 采样率(0~1)}
+        :param rate_limits: {日志器名称: 每秒最多记录条数}
+        """
+        super().__init__()
+        self.sample_rates = dict(sample_rates or {})
+        self.rate_limits = dict(rate_limits or {})
+        self._buckets = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _lookup(self, table, name):
+        name_parts = name.split('.')
+        while name_parts:
+            value = table.get('.'.join(name_parts))
+            if value is not None:
+                return value
+            name_parts.pop()
+        return None
+
+    def _rules(self, name):
+        rules = self._resolved.get(name)
+        if rules is None:
+            rules = (self._lookup(self.sample_rates, name), self._lookup(self.rate_limits, name))
+            self._resolved[name] = rules
+        return rules
+
+    def _take_token(self, name, per_second):
+        # 令牌桶：容量为每秒条数，按时间线性补充
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(name, (per_second, now))
+            tokens = min(per_second, tokens + (now - updated_at) * per_second)
+            if tokens < 1:
+                self._buckets[name] = (tokens, now)
+                return False
+            self._buckets[name] = (tokens - 1, now)
+            return True
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        sample_rate, per_second = self._rules(record.name)
+        if sample_rate is not None and sample_rate < 1 and random.random() >= sample_rate:
+            self.dropped += 1
+            return False
+        if per_second is not None and not self._take_token(record.name, per_second):
+            self.dropped += 1
+            return False
+        return True
+
+
+def start_log_listener():
+    """
+    启动（或在fork后重新启动）后台日志写出线程
+    """
+    with _state_lock:
+        if _state['queue'] is None:
+            return
+        if _state['listener'] is not None and _state['pid'] == os.getpid():
+            return
+
+        # fork后继承的队列可能残留父进程未写出的记录，使用新队列
+        log_queue = queue.SimpleQueue()
+        for queue_handler in _state['queue_handlers']:
+            queue_handler.queue = log_queue
+        listener = QueueListener(log_queue, *_state['handlers'], respect_handler_level=True)
+        listener.start()
+        _state.update(listener=listener, queue=log_queue, pid=os.getpid())
+
+
+def stop_log_listener():
+    """停止后台写出线程并写出队列中剩余的记录"""
+    with _state_lock:
+        listener = _state['listener']
+        if listener is not None and _state['pid'] == os.getpid():
+            listener.stop()
+        _state['listener'] = None
+
+
+def _build_output_handler(app):
+    handler = logging.StreamHandler(sys.stdout)
+    if app.config.get('LOG_FORMAT', 'json') == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            '%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] [%(tenant_id)s] %(message)s',
+            defaults={'request_id': '-', 'tenant_id': '-'}
+        ))
+    return handler
+
+
+def init_logging(app):
+    """
+    配置应用日志：根日志器和 app.logger 经队列异步写出
+    :param app: Flask实例
+    """
+    level = getattr(logging, str(app.config.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO)
+    output_handler = _build_output_handler(app)
+    sampling_filter = SamplingFilter(app.config.get('LOG_SAMPLING'), app.config.get('LOG_RATE_LIMITS'))
+    app.extensions['log_sampling'] = sampling_filter
+
+    if app.config.get('LOG_ASYNC', True):
+        stop_log_listener()
+        handler = QueueHandler(queue.SimpleQueue())
+        _state.update(handlers=[output_handler], queue_handlers=[handler], queue=handler.queue, pid=None)
+    else:
+        handler = output_handler
+    # 先采样再附加上下文，被丢弃的记录不再做额外处理
+    handler.addFilter(sampling_filter)
+    handler.addFilter(RequestContextFilter())
+
+    root_logger = logging.getLogger()
+    for existing in list(root_logger.handlers):
+        if getattr(existing, '_structured_logging', False):
+            root_logger.removeHandler(existing)
+    handler._structured_logging = True
+    root_logger.addHandler(handler)
+    root_logger.setLevel(level)
+
+    # app.logger 的日志交给根日志器处理，避免Flask默认处理器重复同步输出
+    from flask.logging import default_handler
+    app.logger.removeHandler(default_handler)
+    app.logger.setLevel(level)
+
+    for name, logger_level in (app.config.get('LOG_LEVELS') or {}).items():
+        logging.getLogger(name).setLevel(getattr(logging, str(logger_level).upper(), logging.INFO))
+
+    if app.config.get('LOG_ASYNC', True):
+        start_log_listener()
+        if not _state['atexit_registered']:
+            atexit.register(stop_log_listener)
+            _state['atexit_registered'] = True
+
+    @app.before_request
+    def _assign_request_id():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+    @app.after_request
+    def _return_request_id(response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[REQUEST_ID_HEADER] = request_id
+        return response
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+租户解析缓存
+
+缓存 租户slug -> (schema名称, 数据库分片) 的解析结果，避免每个请求都查询 system.tenants。
+缓存为进程内缓存（每个gunicorn worker一份），通过TTL控制最长陈旧时间，
+租户信息变更时通过 invalidate 显式失效。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.metrics import record_cache_access
+
+
+# 负缓存占位符，用于区分"未缓存"和"已缓存但租户不存在"
+_MISSING = object()
+
+
+class TenantSchemaCache:
+    """
+    带TTL的LRU缓存，支持负缓存和命中统计
+    """
+
+    def __init__(self, ttl=300, negative_ttl=30, max_size=1024):
+        """
+        :param ttl: 正向结果的缓存秒数
+        :param negative_ttl: 未知slug（负缓存）的缓存秒数
+        :param max_size: 最大缓存条目数，超出后淘汰最久未使用的条目
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, ttl=None, negative_ttl=None, max_size=None):
+        """根据应用配置调整缓存参数"""
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+            if negative_ttl is not None:
+                self.negative_ttl = negative_ttl
+            if max_size is not None:
+                self.max_size = max_size
+
+    def get(self, slug):
+        """
+        获取缓存的租户路由
+        :param slug: 租户slug
+        :return: (是否命中, 路由信息)；负缓存命中时路由信息为None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is None:
+                self.misses += 1
+                record_cache_access('tenant_schema', 'miss')
+                return False, None
+
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[slug]
+                self.misses += 1
+                record_cache_access('tenant_schema', 'miss')
+                return False, None
+
+            self._entries.move_to_end(slug)
+            if value is _MISSING:
+                self.negative_hits += 1
+                record_cache_access('tenant_schema', 'negative_hit')
+                return True, None
+
+            self.hits += 1
+            record_cache_access('tenant_schema', 'hit')
+            return True, value
+
+    def set(self, slug, value):
+        """
+        写入缓存
+        :param slug: 租户slug
+        :param value: 路由信息，为None时写入负缓存
+        """
+        if value is None:
+            value, ttl = _MISSING, self.negative_ttl
+        else:
+            ttl = self.ttl
+
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[slug] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(slug)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *slugs):
+        """
+        使指定slug的缓存失效
+        :param slugs: 租户slug列表，为空时清空全部缓存
+        """
+        with self._lock:
+            if not slugs:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+
+            for slug in slugs:
+                if slug and self._entries.pop(slug, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        """清空缓存并重置统计"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.negative_hits = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self):
+        """获取缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'negative_ttl': self.negative_ttl,
+                'hits': self.hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+# 进程级单例
+tenant_schema_cache = TenantSchemaCache()
+
+
+def invalidate_tenant(*slugs):
+    """
+    租户信息变更后调用，使对应slug的解析缓存失效
+    :param slugs: 变更前后的租户slug
+    """
+    tenant_schema_cache.invalidate(*slugs)
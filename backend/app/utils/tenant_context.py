@@ -2,11 +2,29 @@ from flask import g, current_app
 from sqlalchemy import event, text
 from sqlalchemy.orm import Session
 from functools import wraps
+import re
+import logging
 import threading
 
+logger = logging.getLogger(__name__)
+
 # 线程本地存储，用于存储当前租户上下文
 _thread_local = threading.local()
 
+# 租户schema路由模式
+# - session: 每次事务开始/flush/服务构造时执行 SET search_path（旧模式）
+# - connection: 在连接池检出时按连接跟踪当前search_path，仅在不一致时执行SET
+ROUTING_MODE_SESSION = 'session'
+ROUTING_MODE_CONNECTION = 'connection'
+_routing = {'mode': ROUTING_MODE_SESSION, 'checkout_sets': 0}
+
+# 连接记录中保存当前search_path的键
+_SEARCH_PATH_KEY = 'tenant_search_path'
+# 连接记录中保存事务内已设置、尚未提交的search_path的键
+_PENDING_SEARCH_PATH_KEY = 'tenant_search_path_pending'
+
+_SCHEMA_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
 
 class TenantContext:
     """
@@ -26,6 +44,141 @@ class TenantContext:
         :return: schema名称
         """
         return getattr(_thread_local, 'schema_name', current_app.config['DEFAULT_SCHEMA'])
+    
+    def set_shard(self, shard_name):
+        """
+        设置当前线程的数据库分片
+        :param shard_name: 分片名称，None表示默认（主库）
+        """
+        _thread_local.shard_name = shard_name
+    
+    def get_shard(self):
+        """
+        获取当前线程的数据库分片
+        :return: 分片名称，None表示默认（主库）
+        """
+        return getattr(_thread_local, 'shard_name', None)
+
+
+def get_routing_mode():
+    """
+    获取当前租户schema路由模式
+    :return: session 或 connection
+    """
+    return _routing['mode']
+
+
+def set_routing_mode(mode):
+    """
+    设置租户schema路由模式
+    :param mode: session 或 connection
+    """
+    if mode not in (ROUTING_MODE_SESSION, ROUTING_MODE_CONNECTION):
+        raise ValueError(f"Unknown tenant routing mode: {mode}")
+    _routing['mode'] = mode
+
+
+def get_checkout_set_count():
+    """获取connection模式下在连接检出时执行的SET search_path次数（当前进程）"""
+    return _routing['checkout_sets']
+
+
+def uses_session_routing():
+    """是否使用旧的按会话设置search_path模式"""
+    return _routing['mode'] == ROUTING_MODE_SESSION
+
+
+def build_search_path_sql(schema_name):
+    """
+    构造设置search_path的SQL
+    :param schema_name: schema名称
+    :return: SQL字符串
+    """
+    if not _SCHEMA_NAME_RE.match(schema_name):
+        raise ValueError(f"Invalid schema name: {schema_name}")
+    if schema_name == 'public':
+        return 'SET search_path TO public'
+    return f'SET search_path TO {schema_name}, public'
+
+
+def set_search_path(connection, schema_name):
+    """
+    在连接的当前事务中设置search_path，并同步连接记录中跟踪的值
+
+    代码中需要切换schema的地方都应通过此函数执行SET，直接执行SQL会使连接记录与实际
+    search_path不一致，连接归还后下一个租户检出时不会重新设置。
+    SET随事务提交生效、回滚撤销，因此提交前只记为待定值，提交时才更新跟踪的search_path。
+    connection模式下连接已处于该schema时不执行SET。
+    :param connection: SQLAlchemy连接
+    :param schema_name: schema名称
+    """
+    schema_name = schema_name or 'public'
+    info = connection.connection.info
+    current = info.get(_PENDING_SEARCH_PATH_KEY, info.get(_SEARCH_PATH_KEY))
+    if not uses_session_routing() and current == schema_name:
+        return
+    
+    connection.execute(text(build_search_path_sql(schema_name)))
+    info.pop(_SEARCH_PATH_KEY, None)
+    info[_PENDING_SEARCH_PATH_KEY] = schema_name
+
+
+def install_schema_routing(engine, mode=ROUTING_MODE_SESSION):
+    """
+    为引擎安装租户schema路由
+    
+    connection模式下，在连接检出时比较连接上记录的search_path与当前租户schema，
+    仅在不一致时执行SET并立即提交（使其不受后续事务回滚/连接归还时reset的影响），
+    因此同一租户的常规请求不再产生任何search_path语句。
+    :param engine: SQLAlchemy引擎
+    :param mode: 路由模式
+    """
+    set_routing_mode(mode)
+    
+    if getattr(engine, '_tenant_routing_installed', False):
+        return
+    engine._tenant_routing_installed = True
+    
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        if uses_session_routing():
+            return
+        
+        schema_name = getattr(_thread_local, 'schema_name', None) or 'public'
+        # 上一次使用时事务内设置的search_path未提交，连接实际的search_path未知
+        connection_record.info.pop(_PENDING_SEARCH_PATH_KEY, None)
+        if connection_record.info.get(_SEARCH_PATH_KEY) == schema_name:
+            return
+        
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(build_search_path_sql(schema_name))
+        finally:
+            cursor.close()
+        dbapi_connection.commit()
+        connection_record.info[_SEARCH_PATH_KEY] = schema_name
+        _routing['checkout_sets'] += 1
+    
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info.pop(_SEARCH_PATH_KEY, None)
+        connection_record.info.pop(_PENDING_SEARCH_PATH_KEY, None)
+    
+    @event.listens_for(engine, "commit")
+    def on_commit(connection):
+        info = connection.connection.info
+        if _PENDING_SEARCH_PATH_KEY in info:
+            info[_SEARCH_PATH_KEY] = info.pop(_PENDING_SEARCH_PATH_KEY)
+    
+    @event.listens_for(engine, "rollback")
+    def on_rollback(connection):
+        # 事务内的SET已撤销，连接恢复到事务开始前的search_path，该值此前已从记录中移除
+        connection.connection.info.pop(_PENDING_SEARCH_PATH_KEY, None)
+    
+    @event.listens_for(engine, "rollback_savepoint")
+    def on_rollback_savepoint(connection, name, context):
+        # 无法区分SET在保存点之前还是之后执行，按未知处理
+        connection.connection.info.pop(_PENDING_SEARCH_PATH_KEY, None)
 
 
 # SQLAlchemy事件监听器，用于在执行SQL前设置schema
@@ -37,12 +190,15 @@ def before_flush(session, flush_context, instances):
     :param flush_context: 刷新上下文
     :param instances: 实例列表
     """
+    if not uses_session_routing():
+        return
+    
     schema_name = getattr(_thread_local, 'schema_name', current_app.config['DEFAULT_SCHEMA'])
     
     # 设置当前会话的schema搜索路径
     # 只有当schema不是默认的public时才需要设置
     if schema_name != 'public':
-        current_app.logger.info(f"Setting search_path to {schema_name} in before_flush")
+        logger.debug("Setting search_path to %s in before_flush", schema_name)
         session.execute(text(f'SET search_path TO {schema_name}, public'))
 
 
@@ -51,10 +207,13 @@ def after_begin(session, transaction, connection):
     """
     在事务开始后设置schema搜索路径
     """
+    if not uses_session_routing():
+        return
+    
     schema_name = getattr(_thread_local, 'schema_name', current_app.config['DEFAULT_SCHEMA'])
     
     if schema_name != 'public':
-        current_app.logger.info(f"Setting search_path to {schema_name} in after_begin")
+        logger.debug("Setting search_path to %s in after_begin", schema_name)
         connection.execute(text(f'SET search_path TO {schema_name}, public'))
 
 
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+常量内存XLSX导出
+
+openpyxl 只写模式（write_only）逐行写出工作表XML，不在内存中保留单元格；行由服务端游标
+（yield_per）按批读取。XLSX是zip包，中央目录在全部写完后才能生成，因此工作簿先写入临时
+文件，完成后按块发送文件内容（打开后即删除路径，文件随响应关闭释放）。
+内存占用与导出行数无关。
+
+不超过 XLSX_EXPORT_SYNC_ROWS 行时在请求内同步生成，更多行由导出任务在后台生成后下载
+（app.services.system.export_job_service），避免超过 gunicorn 请求超时。
+
+导出列按页面的列配置（ColumnConfiguration，见 ColumnConfigurationService.get_export_columns）
+过滤和排序，表头使用模型列的注释（comment）。以“=”开头的文本按字符串写入，不作为公式。
+"""
+
+import os
+import json
+import uuid
+import tempfile
+from importlib.util import find_spec
+from datetime import datetime, time
+from flask import current_app, send_file
+
+from app.utils.read_replica import read_only_scope
+
+# openpyxl 导入较慢，在生成工作簿时才导入，不计入应用启动时间
+OPENPYXL_AVAILABLE = find_spec('openpyxl') is not None
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Excel工作表名称最长31个字符
+_SHEET_TITLE_LENGTH = 31
+
+
+def _column_label(expression):
+    """列表头：模型列注释，关联名称列（label）取被标注列的注释，均无注释时为None"""
+    column = getattr(expression, 'element', expression)
+    # 别名（aliased）表的列是代理列，注释在原表列上
+    for base_column in getattr(column, 'base_columns', ()):
+        if getattr(base_column, 'comment', None):
+            return base_column.comment
+    return getattr(column, 'comment', None)
+
+
+def _xlsx_value(value):
+    if isinstance(value, (datetime, time)) and value.tzinfo is not None:
+        # Excel不支持带时区的时间
+        return value.replace(tzinfo=None)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _xlsx_cell(sheet, value, cell_class):
+    value = _xlsx_value(value)
+    if isinstance(value, str) and value.startswith('='):
+        # openpyxl 把以“=”开头的字符串写成公式，显式标记为文本
+        cell = cell_class(sheet, value=value)
+        cell.data_type = 's'
+        return cell
+    return value
+
+
+def select_columns(query, columns=None):
+    """
+    按列名选择并排序导出列
+    :param query: 列投影查询
+    :param columns: 导出列名列表，为空时导出全部列
+    :return: 只包含指定列的查询；指定列与查询列均不匹配时返回原查询
+    """
+    if not columns:
+        return query
+    expressions = {description['name']: description['expr'] for description in query.column_descriptions}
+    selected = [expressions[name] for name in columns if name in expressions]
+    return query.with_entities(*selected) if selected else query
+
+
+def xlsx_header(query):
+    """
+    导出表头
+    :param query: 列投影查询
+    :return: [(列名, 表头)]
+    """
+    return [(description['name'], _column_label(description['expr'])) for description in query.column_descriptions]
+
+
+def write_xlsx(rows, columns, file, sheet_title='Sheet1', progress=None, progress_interval=5000):
+    """
+    以只写模式将行写入XLSX
+    :param rows: Row迭代器
+    :param columns: [(列名, 表头)]
+    :param file: 目标文件路径或文件对象
+    :param sheet_title: 工作表名称
+    :param progress: 进度回调，参数为已写入行数，每 progress_interval 行调用一次
+    :param progress_interval: 进度回调间隔行数
+    :return: 写入的数据行数
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=sheet_title[:_SHEET_TITLE_LENGTH])
+    sheet.freeze_panes = 'A2'
+
+    header_font = Font(bold=True)
+    header = []
+    for name, label in columns:
+        cell = WriteOnlyCell(sheet, value=label or name)
+        cell.font = header_font
+        header.append(cell)
+    sheet.append(header)
+
+    count = 0
+    for row in rows:
+        sheet.append([_xlsx_cell(sheet, value, WriteOnlyCell) for value in row])
+        count += 1
+        if progress and count % progress_interval == 0:
+            progress(count)
+
+    workbook.save(file)
+    return count
+
+
+def xlsx_export(query, filename, columns=None, batch_size=None):
+    """
+    构造XLSX导出响应
+    :param query: 已应用过滤条件和排序的列投影查询（返回Row）
+    :param filename: 下载文件名（不含扩展名）
+    :param columns: 导出列名列表（通常来自页面列配置），为空时导出全部列
+    :param batch_size: 每批从游标读取的行数，默认 EXPORT_BATCH_SIZE
+    :return: Flask Response
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("未安装 openpyxl，无法导出Excel")
+
+    batch_size = batch_size or current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    query = select_columns(query, columns)
+    header = xlsx_header(query)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        with os.fdopen(fd, 'wb') as file, read_only_scope():
+            write_xlsx(query.yield_per(batch_size), header, file, sheet_title=filename)
+        file = open(path, 'rb')
+    finally:
+        os.unlink(path)
+
+    return send_file(file, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=f'{filename}.xlsx')
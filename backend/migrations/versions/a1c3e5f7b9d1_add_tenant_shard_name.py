@@ -0,0 +1,24 @@
+"""租户表添加数据库分片字段
+
+Revision ID: a1c3e5f7b9d1
+Revises: 76f18c953fa6
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b9d1'
+down_revision = '76f18c953fa6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('tenants', sa.Column('shard_name', sa.String(length=50), nullable=True), schema='system')
+
+
+def downgrade():
+    op.drop_column('tenants', 'shard_name', schema='system')
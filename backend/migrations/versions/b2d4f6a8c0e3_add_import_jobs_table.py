@@ -0,0 +1,64 @@
+"""添加批量导入任务表到所有租户schema
+
+Revision ID: b2d4f6a8c0e3
+Revises: a1c3e5f7b9d1
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c0e3'
+down_revision = 'a1c3e5f7b9d1'
+branch_labels = None
+depends_on = None
+
+
+def _tenant_schemas(connection):
+    result = connection.execute(sa.text("""
+        SELECT schema_name 
+        FROM system.tenants 
+        WHERE schema_name != 'public'
+    """))
+    return [row[0] for row in result]
+
+
+def upgrade():
+    """添加批量导入任务表到所有租户schema"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.create_table('import_jobs',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('entity_type', sa.String(length=50), nullable=False, comment='导入对象(customer/supplier/material/product)'),
+            sa.Column('file_name', sa.String(length=255), nullable=True, comment='上传文件名'),
+            sa.Column('validate_only', sa.Boolean(), nullable=True, comment='仅校验不写入'),
+            sa.Column('status', sa.String(length=20), nullable=False, comment='状态'),
+            sa.Column('phase', sa.String(length=20), nullable=True, comment='运行阶段'),
+            sa.Column('total_rows', sa.Integer(), nullable=True, comment='文件数据行数（暂存完成前可能为空或为估算值）'),
+            sa.Column('processed_rows', sa.Integer(), nullable=True, comment='已写入暂存表行数'),
+            sa.Column('imported_rows', sa.Integer(), nullable=True, comment='成功导入行数'),
+            sa.Column('error_rows', sa.Integer(), nullable=True, comment='错误行数'),
+            sa.Column('error_report', postgresql.JSONB(astext_type=sa.Text()), nullable=True, comment='逐行错误报告[{row, errors}]'),
+            sa.Column('message', sa.Text(), nullable=True, comment='任务说明（失败原因、忽略的列）'),
+            sa.Column('started_at', sa.DateTime(), nullable=True, comment='开始时间'),
+            sa.Column('finished_at', sa.DateTime(), nullable=True, comment='结束时间'),
+            sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=False, comment='创建人'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            schema=schema
+        )
+        op.create_index('idx_import_jobs_created_at', 'import_jobs', ['created_at'], unique=False, schema=schema)
+
+
+def downgrade():
+    """删除批量导入任务表"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.drop_index('idx_import_jobs_created_at', table_name='import_jobs', schema=schema)
+        op.drop_table('import_jobs', schema=schema)
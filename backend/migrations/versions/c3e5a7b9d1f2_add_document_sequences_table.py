@@ -0,0 +1,52 @@
+"""添加单据编号计数器表到所有租户schema
+
+Revision ID: c3e5a7b9d1f2
+Revises: b2d4f6a8c0e3
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d1f2'
+down_revision = 'b2d4f6a8c0e3'
+branch_labels = None
+depends_on = None
+
+
+def _tenant_schemas(connection):
+    result = connection.execute(sa.text("""
+        SELECT schema_name 
+        FROM system.tenants 
+        WHERE schema_name != 'public'
+    """))
+    return [row[0] for row in result]
+
+
+def upgrade():
+    """添加单据编号计数器表到所有租户schema，计数器在首次分配时按已有单据的最大编号初始化"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.create_table('document_sequences',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('sequence_key', sa.String(length=100), nullable=False, comment='编号规则:前缀'),
+            sa.Column('period', sa.String(length=20), nullable=False, comment='周期（如20261017），不按周期重置时为空'),
+            sa.Column('next_value', sa.BigInteger(), nullable=False, comment='下一个可分配的序号'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('sequence_key', 'period', name='uq_document_sequences_key_period'),
+            schema=schema
+        )
+
+
+def downgrade():
+    """删除单据编号计数器表"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.drop_table('document_sequences', schema=schema)
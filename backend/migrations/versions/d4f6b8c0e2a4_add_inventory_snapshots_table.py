@@ -0,0 +1,62 @@
+"""添加库存期末快照表到所有租户schema
+
+Revision ID: d4f6b8c0e2a4
+Revises: c3e5a7b9d1f2
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6b8c0e2a4'
+down_revision = 'c3e5a7b9d1f2'
+branch_labels = None
+depends_on = None
+
+
+def _tenant_schemas(connection):
+    result = connection.execute(sa.text("""
+        SELECT schema_name
+        FROM system.tenants
+        WHERE schema_name != 'public'
+    """))
+    return [row[0] for row in result]
+
+
+def upgrade():
+    """添加库存期末快照表，以及按交易时间取流水区间使用的索引"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.create_table('inventory_snapshots',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('inventory_id', postgresql.UUID(as_uuid=True), nullable=False, comment='库存ID'),
+            sa.Column('warehouse_id', postgresql.UUID(as_uuid=True), nullable=False, comment='仓库ID'),
+            sa.Column('product_id', postgresql.UUID(as_uuid=True), nullable=True, comment='产品ID'),
+            sa.Column('material_id', postgresql.UUID(as_uuid=True), nullable=True, comment='材料ID'),
+            sa.Column('period_type', sa.String(length=20), nullable=False, comment='周期类型'),
+            sa.Column('period_end', sa.Date(), nullable=False, comment='周期最后一天，数量为当天结束时的结存'),
+            sa.Column('quantity', sa.Numeric(precision=15, scale=3), nullable=False, comment='期末数量'),
+            sa.Column('transaction_count', sa.Integer(), nullable=False, comment='本期流水条数'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('inventory_id', 'period_type', 'period_end', name='uq_inventory_snapshots_period'),
+            schema=schema
+        )
+        op.create_index('ix_inventory_snapshot_period_warehouse', 'inventory_snapshots',
+                        ['period_type', 'period_end', 'warehouse_id'], schema=schema)
+        op.create_index('ix_inventory_transaction_date', 'inventory_transactions',
+                        ['transaction_date'], schema=schema)
+
+
+def downgrade():
+    """删除库存期末快照表"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.drop_index('ix_inventory_transaction_date', table_name='inventory_transactions', schema=schema)
+        op.drop_table('inventory_snapshots', schema=schema)
@@ -0,0 +1,90 @@
+"""添加仓库库存汇总表到所有租户schema
+
+Revision ID: e5a7c9d1f3b5
+Revises: d4f6b8c0e2a4
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d1f3b5'
+down_revision = 'd4f6b8c0e2a4'
+branch_labels = None
+depends_on = None
+
+
+def _tenant_schemas(connection):
+    result = connection.execute(sa.text("""
+        SELECT schema_name
+        FROM system.tenants
+        WHERE schema_name != 'public'
+    """))
+    return [row[0] for row in result]
+
+
+def upgrade():
+    """添加仓库库存汇总表和每日出入库统计表，并按现有库存和流水初始化"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.create_table('warehouse_inventory_stats',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('warehouse_id', postgresql.UUID(as_uuid=True), nullable=False, comment='仓库ID'),
+            sa.Column('total_items', sa.Integer(), nullable=False, comment='库存条目数'),
+            sa.Column('total_quantity', sa.Numeric(precision=18, scale=3), nullable=False, comment='库存总数量'),
+            sa.Column('total_value', sa.Numeric(precision=18, scale=4), nullable=False, comment='库存总金额'),
+            sa.Column('below_safety_stock_items', sa.Integer(), nullable=False, comment='低于安全库存的条目数'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('warehouse_id'),
+            schema=schema
+        )
+        op.create_table('warehouse_inventory_daily_stats',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('warehouse_id', postgresql.UUID(as_uuid=True), nullable=False, comment='仓库ID'),
+            sa.Column('stat_date', sa.Date(), nullable=False, comment='统计日期'),
+            sa.Column('in_transactions', sa.Integer(), nullable=False, comment='入库流水条数'),
+            sa.Column('out_transactions', sa.Integer(), nullable=False, comment='出库流水条数'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('warehouse_id', 'stat_date', name='uq_warehouse_inventory_daily_stats_date'),
+            schema=schema
+        )
+        op.create_index('ix_warehouse_inventory_daily_stats_date', 'warehouse_inventory_daily_stats',
+                        ['stat_date'], schema=schema)
+
+        op.execute(f"""
+            INSERT INTO {schema}.warehouse_inventory_stats
+                (id, warehouse_id, total_items, total_quantity, total_value, below_safety_stock_items)
+            SELECT gen_random_uuid(), warehouse_id, count(*),
+                   coalesce(sum(current_quantity), 0), coalesce(sum(total_cost), 0),
+                   count(*) FILTER (WHERE current_quantity <= safety_stock)
+            FROM {schema}.inventories
+            WHERE is_active = TRUE
+            GROUP BY warehouse_id
+        """)
+        op.execute(f"""
+            INSERT INTO {schema}.warehouse_inventory_daily_stats
+                (id, warehouse_id, stat_date, in_transactions, out_transactions)
+            SELECT gen_random_uuid(), warehouse_id, date(transaction_date),
+                   count(*) FILTER (WHERE transaction_type IN ('in', 'purchase_in', 'production_in')),
+                   count(*) FILTER (WHERE transaction_type IN ('out', 'sales_out', 'production_out'))
+            FROM {schema}.inventory_transactions
+            WHERE transaction_type IN ('in', 'purchase_in', 'production_in', 'out', 'sales_out', 'production_out')
+            GROUP BY warehouse_id, date(transaction_date)
+        """)
+
+
+def downgrade():
+    """删除仓库库存汇总表"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.drop_table('warehouse_inventory_daily_stats', schema=schema)
+        op.drop_table('warehouse_inventory_stats', schema=schema)
@@ -0,0 +1,60 @@
+"""添加导出任务表到所有租户schema
+
+Revision ID: f6b8d0e2a4c6
+Revises: e5a7c9d1f3b5
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d0e2a4c6'
+down_revision = 'e5a7c9d1f3b5'
+branch_labels = None
+depends_on = None
+
+
+def _tenant_schemas(connection):
+    result = connection.execute(sa.text("""
+        SELECT schema_name
+        FROM system.tenants
+        WHERE schema_name != 'public'
+    """))
+    return [row[0] for row in result]
+
+
+def upgrade():
+    """添加导出任务表到所有租户schema"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.create_table('export_jobs',
+            sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+            sa.Column('file_name', sa.String(length=255), nullable=False, comment='下载文件名'),
+            sa.Column('status', sa.String(length=20), nullable=False, comment='状态'),
+            sa.Column('total_rows', sa.Integer(), nullable=True, comment='导出行数（开始执行后统计）'),
+            sa.Column('processed_rows', sa.Integer(), nullable=True, comment='已写入行数'),
+            sa.Column('file_path', sa.String(length=500), nullable=True, comment='结果文件路径（过期清理后为空）'),
+            sa.Column('file_size', sa.BigInteger(), nullable=True, comment='结果文件大小（字节）'),
+            sa.Column('message', sa.Text(), nullable=True, comment='任务说明（失败原因）'),
+            sa.Column('started_at', sa.DateTime(), nullable=True, comment='开始时间'),
+            sa.Column('finished_at', sa.DateTime(), nullable=True, comment='结束时间'),
+            sa.Column('created_by', postgresql.UUID(as_uuid=True), nullable=False, comment='创建人'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            schema=schema
+        )
+        op.create_index('idx_export_jobs_created_by', 'export_jobs', ['created_by', 'created_at'], unique=False, schema=schema)
+
+
+def downgrade():
+    """删除导出任务表"""
+    connection = op.get_bind()
+
+    for schema in _tenant_schemas(connection):
+        op.drop_index('idx_export_jobs_created_by', table_name='export_jobs', schema=schema)
+        op.drop_table('export_jobs', schema=schema)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+库存过账基准测试
+对比逐行过账（每行查询库存、按需新建并flush、写入流水）与过账引擎的集合过账
+在大单据上的SQL语句数和耗时。单据一半明细对应已有库存，一半需要新建库存。
+
+流水号在两种方式中都按批次预留（逐行过账在计时前预留）。
+测试数据使用随机的仓库/产品ID，结束后删除。
+
+用法:
+    python scripts/benchmark_inventory_posting.py --schema tenant1 --lines 1000
+"""
+
+import os
+import sys
+import uuid
+import time
+import argparse
+import logging
+from decimal import Decimal
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.extensions import db
+from app.utils.tenant_context import TenantContext
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class StatementCounter:
+    """统计执行的SQL语句数（executemany按驱动调用次数计）"""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+
+
+def build_order(unit_id, lines):
+    """
+    生成测试单据
+    :return: (仓库ID, 已有库存行, 明细列表)
+    """
+    from app.models.business.inventory import Inventory
+
+    warehouse_id = uuid.uuid4()
+    details, existing = [], []
+    for index in range(lines):
+        product_id = uuid.uuid4()
+        if index % 2 == 0:
+            existing.append(Inventory(
+                warehouse_id=warehouse_id, product_id=product_id, unit_id=unit_id, created_by=uuid.uuid4(),
+                current_quantity=Decimal('100'), available_quantity=Decimal('100'), reserved_quantity=Decimal('0'),
+                unit_cost=Decimal('2'), total_cost=Decimal('200'), is_active=True
+            ))
+        details.append({
+            'product_id': product_id,
+            'unit_id': unit_id,
+            'quantity': Decimal(index % 7 + 1),
+            'unit_cost': Decimal('3')
+        })
+    return warehouse_id, existing, details
+
+
+def post_row_by_row(warehouse_id, details, posted_by, numbers):
+    """逐行过账：每行一次库存查询，新建库存时flush，流水随提交写入"""
+    from app.models.business.inventory import Inventory, InventoryTransaction
+
+    session = db.session
+    for detail, number in zip(details, numbers):
+        inventory = session.query(Inventory).filter(
+            Inventory.warehouse_id == warehouse_id,
+            Inventory.product_id == detail['product_id'],
+            Inventory.is_active == True
+        ).with_for_update().first()
+        if not inventory:
+            inventory = Inventory(
+                warehouse_id=warehouse_id, product_id=detail['product_id'], unit_id=detail['unit_id'],
+                created_by=posted_by, current_quantity=Decimal('0'), available_quantity=Decimal('0'),
+                reserved_quantity=Decimal('0'), unit_cost=detail['unit_cost'], total_cost=Decimal('0'),
+                is_active=True
+            )
+            session.add(inventory)
+            session.flush()
+        quantity_before = inventory.current_quantity
+        inventory.current_quantity += detail['quantity']
+        inventory.available_quantity += detail['quantity']
+        inventory.total_cost = (inventory.total_cost or Decimal('0')) + detail['unit_cost'] * detail['quantity']
+        inventory.unit_cost = inventory.total_cost / inventory.current_quantity
+        inventory.calculate_total_cost()
+        session.add(InventoryTransaction(
+            inventory_id=inventory.id, warehouse_id=warehouse_id, product_id=detail['product_id'],
+            transaction_type='in', quantity_change=detail['quantity'], quantity_before=quantity_before,
+            quantity_after=inventory.current_quantity, unit_id=detail['unit_id'], unit_price=detail['unit_cost'],
+            source_document_type='benchmark', created_by=posted_by, transaction_number=number
+        ))
+
+
+def post_with_engine(warehouse_id, details, posted_by, numbers):
+    """集合过账（引擎内部批量预留流水号）"""
+    from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+
+    InventoryPostingEngine(db.session).post([
+        PostingLine(
+            detail['quantity'], 'in',
+            warehouse_id=warehouse_id, product_id=detail['product_id'],
+            create={'unit_id': detail['unit_id'], 'unit_cost': detail['unit_cost']},
+            unit_cost=detail['unit_cost'],
+            transaction={'unit_price': detail['unit_cost'], 'source_document_type': 'benchmark'}
+        )
+        for detail in details
+    ], posted_by)
+
+
+def run_mode(name, post, unit_id, lines, counter):
+    """准备数据并执行一次过账，返回统计结果"""
+    from app.models.business.inventory import Inventory, InventoryTransaction
+    from app.utils.numbering import reserve_numbers
+
+    warehouse_id, existing, details = build_order(unit_id, lines)
+    db.session.add_all(existing)
+    db.session.commit()
+
+    try:
+        numbers = reserve_numbers('inventory_transaction', len(details))
+        counter.total = 0
+        started = time.perf_counter()
+        post(warehouse_id, details, uuid.uuid4(), numbers)
+        db.session.commit()
+        elapsed = time.perf_counter() - started
+        statements = counter.total
+
+        inventories = db.session.query(Inventory).filter(Inventory.warehouse_id == warehouse_id).count()
+        transactions = db.session.query(InventoryTransaction).filter(
+            InventoryTransaction.warehouse_id == warehouse_id
+        ).count()
+        return {
+            'mode': name,
+            'statements': statements,
+            'ms': elapsed * 1000,
+            'inventories': inventories,
+            'transactions': transactions
+        }
+    finally:
+        db.session.rollback()
+        db.session.execute(text("DELETE FROM inventory_transactions WHERE warehouse_id = :warehouse_id"),
+                           {'warehouse_id': warehouse_id})
+        db.session.execute(text("DELETE FROM inventories WHERE warehouse_id = :warehouse_id"),
+                           {'warehouse_id': warehouse_id})
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='库存过账基准测试')
+    parser.add_argument('--schema', required=True, help='租户schema')
+    parser.add_argument('--lines', type=int, default=1000, help='单据明细行数')
+    parser.add_argument('--config', default='production', help='应用配置名称')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    counter = StatementCounter()
+    event.listen(Engine, 'before_cursor_execute', counter)
+
+    with app.test_request_context():
+        from flask import g
+        from app.models.basic_data import Unit
+        g.schema_name = args.schema
+        g.tenant_id = args.schema
+        TenantContext().set_schema(args.schema)
+
+        unit_id = db.session.query(Unit.id).limit(1).scalar()
+        if unit_id is None:
+            raise SystemExit(f"租户 {args.schema} 下没有单位数据，无法创建测试库存")
+
+        results = [
+            run_mode('逐行过账', post_row_by_row, unit_id, args.lines, counter),
+            run_mode('集合过账', post_with_engine, unit_id, args.lines, counter),
+        ]
+
+    print(f"\n{args.lines} 行入库单（{(args.lines + 1) // 2} 行已有库存，{args.lines // 2} 行新建库存）")
+    print(f"{'方式':<10}{'SQL语句':>10}{'耗时(ms)':>12}{'库存行':>10}{'流水':>10}")
+    print("-" * 54)
+    for result in results:
+        print(f"{result['mode']:<10}{result['statements']:>10}{result['ms']:>12.1f}"
+              f"{result['inventories']:>10}{result['transactions']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+JSON序列化基准测试
+对比入库单列表在以下方式下的序列化耗时（不访问数据库，使用内存中构造的对象）：
+- to_dict() + Flask默认JSON提供者（标准库json）
+- to_dict() + FastJSONProvider（orjson）
+- Row直接序列化 + FastJSONProvider（不调用to_dict，由提供者处理UUID/Decimal/datetime）
+
+用法:
+    python scripts/benchmark_json_serialization.py --orders 100 --details 5 --rounds 50
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import argparse
+from decimal import Decimal
+from datetime import datetime, timedelta
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import inspect
+from sqlalchemy.engine.result import result_tuple
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.models.business.inventory import InboundOrder, InboundOrderDetail
+from app.utils.json_provider import FastJSONProvider, orjson
+
+
+def build_orders(order_count, detail_count):
+    """构造带明细的入库单"""
+    now = datetime.now()
+    orders = []
+    for i in range(order_count):
+        order = InboundOrder(
+            order_number=f'IN{now:%Y%m%d}{i:05d}',
+            warehouse_id=uuid.uuid4(),
+            created_by=uuid.uuid4(),
+            order_type='finished_goods',
+        )
+        order.id = uuid.uuid4()
+        order.order_date = now - timedelta(days=i)
+        order.warehouse_name = '成品仓'
+        order.status = 'confirmed'
+        order.approval_status = 'approved'
+        order.notes = '基准测试数据'
+        order.custom_fields = {}
+        order.created_at = now
+        order.updated_at = now
+        for j in range(detail_count):
+            detail = InboundOrderDetail(
+                inbound_order_id=order.id,
+                inbound_quantity=Decimal(random.randint(1, 1000)),
+                unit_id=uuid.uuid4(),
+                created_by=order.created_by,
+                product_id=uuid.uuid4(),
+                product_name=f'产品{j}',
+                product_code=f'P{j:05d}',
+                batch_number=f'B{i:05d}{j:02d}',
+                unit_cost=Decimal('12.3456'),
+                total_cost=Decimal('1234.56'),
+                production_date=now,
+            )
+            detail.id = uuid.uuid4()
+            detail.created_at = now
+            order.details.append(detail)
+        orders.append(order)
+    return orders
+
+
+def build_rows(orders):
+    """按入库单表的列构造Row，模拟 session.execute(select(InboundOrder.__table__)).all() 的结果"""
+    columns = [column.key for column in inspect(InboundOrder).columns]
+    make_row = result_tuple(columns)
+    return [make_row([getattr(order, column) for column in columns]) for order in orders]
+
+
+def measure(label, fn, rounds):
+    fn()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    elapsed = (time.perf_counter() - started) / rounds * 1000
+    size = f"{len(result) / 1024:>8.1f} KB" if isinstance(result, (str, bytes)) else ''
+    print(f"  {label:<40}{elapsed:>10.2f} ms/次   {size}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='JSON序列化基准测试')
+    parser.add_argument('--orders', type=int, default=100, help='入库单数量')
+    parser.add_argument('--details', type=int, default=5, help='每张入库单的明细数')
+    parser.add_argument('--rounds', type=int, default=50, help='重复次数')
+    parser.add_argument('--config', default='development', help='应用配置名称')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+
+    with app.app_context():
+        orders = build_orders(args.orders, args.details)
+        rows = build_rows(orders)
+
+        print(f"\n{args.orders} 张入库单 × {args.details} 条明细，{args.rounds} 次平均"
+              f"（orjson: {'已安装' if orjson else '未安装，使用标准库回退'}）")
+        to_dict_ms = measure('to_dict() 耗时', lambda: [order.to_dict() for order in orders], args.rounds)
+        baseline = measure(
+            'to_dict() + 默认JSON提供者',
+            lambda: default_provider.dumps({'items': [order.to_dict() for order in orders]}),
+            args.rounds
+        )
+        fast = measure(
+            'to_dict() + FastJSONProvider',
+            lambda: fast_provider.dumps({'items': [order.to_dict() for order in orders]}),
+            args.rounds
+        )
+        rows_ms = measure(
+            'Row（不含明细）+ FastJSONProvider',
+            lambda: fast_provider.dumps({'items': rows}),
+            args.rounds
+        )
+
+        print(f"\n  to_dict() 占默认方式耗时: {to_dict_ms / baseline:.0%}")
+        print(f"  FastJSONProvider 加速: {baseline / fast:.2f}x")
+        print(f"  Row直接序列化（无明细）耗时为默认方式的 {rows_ms / baseline:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+租户schema路由基准测试
+对比 session 模式（每次事务/服务构造执行SET search_path）与
+connection 模式（按连接跟踪search_path）下库存列表接口的每请求SQL语句数
+
+用法:
+    python scripts/benchmark_tenant_routing.py --tenant yiboshuo --requests 50
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from sqlalchemy import event, text
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.extensions import db
+from app.utils import tenant_context
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ENDPOINT = '/api/tenant/business/inventory/inventories'
+
+
+class StatementCounter:
+    """统计引擎执行的SQL语句数"""
+
+    def __init__(self):
+        self.total = 0
+        self.search_path = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.total += 1
+        if statement.lstrip().upper().startswith('SET SEARCH_PATH'):
+            self.search_path += 1
+
+    def reset(self):
+        self.total = 0
+        self.search_path = 0
+
+
+def get_tenant_user(app, tenant_slug):
+    """获取租户下的一个有效用户，用于生成访问令牌"""
+    with app.app_context():
+        row = db.session.execute(text(f"""
+            SELECT u.id, t.id
+            FROM {app.config['SYSTEM_SCHEMA']}.users u
+            JOIN {app.config['SYSTEM_SCHEMA']}.tenants t ON t.id = u.tenant_id
+            WHERE t.slug = :slug AND u.is_active = TRUE
+            LIMIT 1
+        """), {'slug': tenant_slug}).first()
+        if not row:
+            raise SystemExit(f"租户 {tenant_slug} 下没有可用用户")
+        return str(row[0]), str(row[1])
+
+
+def run_mode(app, mode, headers, requests, counter):
+    """在指定路由模式下执行请求并返回统计结果"""
+    tenant_context.set_routing_mode(mode)
+    client = app.test_client()
+
+    # 预热，确保租户缓存与连接状态就绪
+    client.get(ENDPOINT, headers=headers)
+
+    counter.reset()
+    checkout_sets_before = tenant_context.get_checkout_set_count()
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(ENDPOINT, headers=headers)
+        if response.status_code != 200:
+            raise SystemExit(f"请求失败 ({response.status_code}): {response.get_data(as_text=True)[:200]}")
+    elapsed = time.perf_counter() - started
+    checkout_sets = tenant_context.get_checkout_set_count() - checkout_sets_before
+
+    return {
+        'mode': mode,
+        'statements_per_request': (counter.total + checkout_sets) / requests,
+        'search_path_per_request': (counter.search_path + checkout_sets) / requests,
+        'avg_ms': elapsed * 1000 / requests
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='租户schema路由基准测试')
+    parser.add_argument('--tenant', required=True, help='租户slug')
+    parser.add_argument('--requests', type=int, default=50, help='每种模式的请求次数')
+    parser.add_argument('--config', default='production', help='应用配置名称')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    user_id, tenant_id = get_tenant_user(app, args.tenant)
+
+    counter = StatementCounter()
+    with app.app_context():
+        from flask_jwt_extended import create_access_token
+        token = create_access_token(identity=user_id, additional_claims={'tenant_id': tenant_id})
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+    headers = {
+        'Authorization': f'Bearer {token}',
+        app.config['TENANT_HEADER']: args.tenant
+    }
+
+    results = [
+        run_mode(app, tenant_context.ROUTING_MODE_SESSION, headers, args.requests, counter),
+        run_mode(app, tenant_context.ROUTING_MODE_CONNECTION, headers, args.requests, counter),
+    ]
+
+    print(f"\nGET {ENDPOINT}  ({args.requests} 次请求/模式)")
+    print(f"{'模式':<12}{'语句/请求':>12}{'SET/请求':>12}{'平均耗时(ms)':>16}")
+    print("-" * 52)
+    for result in results:
+        print(f"{result['mode']:<12}{result['statements_per_request']:>12.2f}"
+              f"{result['search_path_per_request']:>12.2f}{result['avg_ms']:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
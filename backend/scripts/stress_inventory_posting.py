@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+库存过账并发压力测试
+多个线程同时对同一库存行过账（入库/出库交替），以及同时向不存在的库存行入库，验证：
+- 最终数量 = 初始数量 + 所有已提交过账的数量变动之和（没有丢失更新）
+- 每次过账恰好一条流水，且流水的 变动前 + 变动 = 变动后
+- 并发新建只产生一条库存记录
+加 --compare-unlocked 时同时运行不加锁的 读取-修改-写回 对照组，展示丢失更新。
+
+测试数据使用随机的仓库/产品ID，结束后删除（--keep 保留）。
+
+用法:
+    python scripts/stress_inventory_posting.py --schema tenant1 --threads 8 --iterations 50
+"""
+
+import os
+import sys
+import uuid
+import time
+import argparse
+import logging
+import threading
+from decimal import Decimal
+from sqlalchemy import text, func
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.extensions import db
+from app.utils.tenant_context import TenantContext
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def tenant_scope(app, schema):
+    """线程内的租户请求上下文"""
+    context = app.test_request_context()
+    context.push()
+    from flask import g
+    g.schema_name = schema
+    g.tenant_id = schema
+    TenantContext().set_schema(schema)
+    return context
+
+
+def create_fixture(app, schema, initial_quantity):
+    """创建测试库存行，返回 (仓库ID, 产品ID, 单位ID, 库存ID)"""
+    from app.models.basic_data import Unit
+    from app.models.business.inventory import Inventory
+
+    context = tenant_scope(app, schema)
+    try:
+        unit_id = db.session.query(Unit.id).limit(1).scalar()
+        if unit_id is None:
+            raise SystemExit(f"租户 {schema} 下没有单位数据，无法创建测试库存")
+        warehouse_id, product_id = uuid.uuid4(), uuid.uuid4()
+        inventory = Inventory(
+            warehouse_id=warehouse_id, product_id=product_id, unit_id=unit_id, created_by=uuid.uuid4(),
+            current_quantity=Decimal(initial_quantity), available_quantity=Decimal(initial_quantity),
+            reserved_quantity=Decimal('0'), is_active=True
+        )
+        db.session.add(inventory)
+        db.session.commit()
+        return warehouse_id, product_id, unit_id, inventory.id
+    finally:
+        db.session.remove()
+        context.pop()
+
+
+def quantity_of(index, iteration):
+    """过账数量：偶数次入库2，奇数次出库1"""
+    return Decimal('2') if (index + iteration) % 2 == 0 else Decimal('-1')
+
+
+def run_threads(threads, target):
+    workers = [threading.Thread(target=target, args=(index,)) for index in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def run_engine(app, schema, fixture, threads, iterations):
+    """通过过账引擎并发过账，返回 (已提交的数量变动之和, 失败次数, 耗时)"""
+    from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+
+    warehouse_id, product_id, unit_id, _ = fixture
+    committed, errors, lock = [], [], threading.Lock()
+
+    def worker(index):
+        context = tenant_scope(app, schema)
+        try:
+            for iteration in range(iterations):
+                quantity = quantity_of(index, iteration)
+                try:
+                    InventoryPostingEngine(db.session, schema).post([
+                        PostingLine(
+                            quantity, 'stress_in' if quantity > 0 else 'stress_out',
+                            warehouse_id=warehouse_id, product_id=product_id,
+                            transaction={'source_document_type': 'stress_test', 'reason': '过账压力测试'}
+                        )
+                    ], uuid.uuid4())
+                    db.session.commit()
+                    with lock:
+                        committed.append(quantity)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(str(e))
+        finally:
+            db.session.remove()
+            context.pop()
+
+    elapsed = run_threads(threads, worker)
+    return sum(committed, Decimal('0')), len(committed), errors, elapsed
+
+
+def run_create(app, schema, fixture, threads):
+    """并发向同一个不存在的库存行入库，返回新建的库存行数"""
+    from app.models.business.inventory import Inventory
+    from app.services.business.inventory.inventory_posting import InventoryPostingEngine, PostingLine
+
+    warehouse_id, _, unit_id, _ = fixture
+    product_id = uuid.uuid4()
+    barrier = threading.Barrier(threads)
+    errors = []
+
+    def worker(index):
+        context = tenant_scope(app, schema)
+        try:
+            barrier.wait()
+            InventoryPostingEngine(db.session, schema).post([
+                PostingLine(
+                    1, 'stress_in', warehouse_id=warehouse_id, product_id=product_id,
+                    create={'unit_id': unit_id},
+                    transaction={'source_document_type': 'stress_test', 'reason': '过账压力测试'}
+                )
+            ], uuid.uuid4())
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            errors.append(str(e))
+        finally:
+            db.session.remove()
+            context.pop()
+
+    run_threads(threads, worker)
+    context = tenant_scope(app, schema)
+    try:
+        rows = db.session.query(Inventory.current_quantity).filter(
+            Inventory.warehouse_id == warehouse_id, Inventory.product_id == product_id
+        ).all()
+        return len(rows), sum((row[0] for row in rows), Decimal('0')), errors
+    finally:
+        db.session.remove()
+        context.pop()
+
+
+def run_unlocked(app, schema, fixture, threads, iterations):
+    """对照组：不加锁的 读取-修改-写回，返回已提交的数量变动之和"""
+    from app.models.business.inventory import Inventory
+
+    warehouse_id, product_id, _, _ = fixture
+    committed, lock = [], threading.Lock()
+
+    def worker(index):
+        context = tenant_scope(app, schema)
+        try:
+            for iteration in range(iterations):
+                quantity = quantity_of(index, iteration)
+                inventory = db.session.query(Inventory).filter(
+                    Inventory.warehouse_id == warehouse_id, Inventory.product_id == product_id
+                ).populate_existing().first()
+                inventory.current_quantity += quantity
+                inventory.available_quantity += quantity
+                db.session.commit()
+                with lock:
+                    committed.append(quantity)
+        finally:
+            db.session.remove()
+            context.pop()
+
+    run_threads(threads, worker)
+    return sum(committed, Decimal('0'))
+
+
+def read_state(app, schema, fixture):
+    """读取测试库存的数量和流水统计"""
+    from app.models.business.inventory import Inventory, InventoryTransaction
+
+    warehouse_id, product_id, _, inventory_id = fixture
+    context = tenant_scope(app, schema)
+    try:
+        quantity = db.session.query(Inventory.current_quantity).filter(Inventory.id == inventory_id).scalar()
+        transactions = db.session.query(
+            func.count(InventoryTransaction.id),
+            func.count(InventoryTransaction.id).filter(
+                InventoryTransaction.quantity_before + InventoryTransaction.quantity_change
+                != InventoryTransaction.quantity_after
+            )
+        ).filter(InventoryTransaction.inventory_id == inventory_id).one()
+        return quantity, transactions[0], transactions[1]
+    finally:
+        db.session.remove()
+        context.pop()
+
+
+def cleanup(app, schema, fixture):
+    """删除测试数据"""
+    warehouse_id = fixture[0]
+    context = tenant_scope(app, schema)
+    try:
+        db.session.execute(text("DELETE FROM inventory_transactions WHERE warehouse_id = :warehouse_id"),
+                           {'warehouse_id': warehouse_id})
+        db.session.execute(text("DELETE FROM inventories WHERE warehouse_id = :warehouse_id"),
+                           {'warehouse_id': warehouse_id})
+        db.session.commit()
+    finally:
+        db.session.remove()
+        context.pop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='库存过账并发压力测试')
+    parser.add_argument('--schema', required=True, help='租户schema')
+    parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+    parser.add_argument('--iterations', type=int, default=50, help='每个线程的过账次数')
+    parser.add_argument('--config', default='production', help='应用配置名称')
+    parser.add_argument('--compare-unlocked', action='store_true', help='同时运行不加锁的对照组')
+    parser.add_argument('--keep', action='store_true', help='保留测试数据')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    initial = Decimal(args.threads * args.iterations)
+    fixture = create_fixture(app, args.schema, initial)
+    failed = False
+
+    try:
+        delta, posted, errors, elapsed = run_engine(app, args.schema, fixture, args.threads, args.iterations)
+        quantity, transactions, broken = read_state(app, args.schema, fixture)
+        expected = initial + delta
+        print(f"\n过账引擎: {args.threads} 线程 x {args.iterations} 次, 耗时 {elapsed:.2f}s")
+        print(f"  初始数量 {initial}, 已提交 {posted} 次 (失败 {len(errors)}), 数量变动合计 {delta}")
+        print(f"  期望数量 {expected}, 实际数量 {quantity}, 流水 {transactions} 条, 前后数量不一致 {broken} 条")
+        for error in sorted(set(errors))[:5]:
+            print(f"  错误: {error}")
+        if quantity != expected or transactions != posted or broken:
+            print("  结果: 失败")
+            failed = True
+        else:
+            print("  结果: 通过，没有丢失更新")
+
+        rows, created_quantity, create_errors = run_create(app, args.schema, fixture, args.threads)
+        print(f"\n并发新建: {args.threads} 线程同时入库不存在的库存行")
+        print(f"  库存行 {rows} 条, 数量 {created_quantity} (失败 {len(create_errors)})")
+        if rows != 1 or created_quantity != args.threads - len(create_errors):
+            print("  结果: 失败")
+            failed = True
+        else:
+            print("  结果: 通过，只新建一条库存记录")
+
+        if args.compare_unlocked:
+            before, _, _ = read_state(app, args.schema, fixture)
+            unlocked_delta = run_unlocked(app, args.schema, fixture, args.threads, args.iterations)
+            after, _, _ = read_state(app, args.schema, fixture)
+            print(f"\n对照组（不加锁）: 期望数量 {before + unlocked_delta}, 实际数量 {after}, "
+                  f"丢失 {before + unlocked_delta - after}")
+    finally:
+        if not args.keep:
+            cleanup(app, args.schema, fixture)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+租户分片迁移工具
+将租户schema从当前分片复制到目标分片，校验各表行数后切换 system.tenants.shard_name
+
+用法:
+    # 查看租户所在分片
+    python scripts/tenant_shard_move.py list
+
+    # 迁移租户到分片 shard_b（分片URL在 TENANT_SHARDS 中配置）
+    python scripts/tenant_shard_move.py move --tenant yiboshuo --to shard_b
+
+    # 仅校验两个分片上的数据是否一致
+    python scripts/tenant_shard_move.py verify --tenant yiboshuo --to shard_b
+
+迁移期间租户会被临时停用以阻止写入。租户解析缓存是各worker进程内的缓存，本工具无法使其失效，
+因此停用后先等待 TENANT_CACHE_TTL 加请求超时（GUNICORN_TIMEOUT）秒，确保所有worker都已不再路由
+到该租户、进行中的请求都已结束，再开始复制；切换分片后同样等待，旧路由全部过期后才删除源schema，
+删除前再次核对源schema各表行数与复制时一致。可用 --wait 指定等待秒数。
+依赖 pg_dump / psql 命令行工具。
+"""
+
+import os
+import sys
+import argparse
+import logging
+import subprocess
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.shard_registry import DEFAULT_SHARD
+from app.utils.tenant_cache import invalidate_tenant
+
+# 配置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class TenantShardMover:
+    """租户分片迁移器"""
+
+    def __init__(self, app):
+        self.app = app
+        self.system_schema = app.config['SYSTEM_SCHEMA']
+        self.primary_url = app.config['SQLALCHEMY_DATABASE_URI']
+        self.shard_urls = dict(app.config.get('TENANT_SHARDS') or {})
+        self.primary_engine = create_engine(self.primary_url)
+        self.route_wait = app.config.get('TENANT_CACHE_TTL', 300) + int(os.getenv('GUNICORN_TIMEOUT', '120'))
+
+    def shard_url(self, shard_name):
+        """获取分片的数据库URL"""
+        if not shard_name or shard_name == DEFAULT_SHARD:
+            return self.primary_url
+        if shard_name not in self.shard_urls:
+            raise ValueError(f"未配置的分片: {shard_name}")
+        return self.shard_urls[shard_name]
+
+    def get_tenant(self, slug):
+        """获取租户信息"""
+        with self.primary_engine.connect() as conn:
+            row = conn.execute(text(f"""
+                SELECT id, slug, schema_name, shard_name, is_active
+                FROM {self.system_schema}.tenants WHERE slug = :slug
+            """), {'slug': slug}).mappings().first()
+        if not row:
+            raise ValueError(f"租户不存在: {slug}")
+        return dict(row)
+
+    def list_tenants(self):
+        """列出所有租户及所在分片"""
+        with self.primary_engine.connect() as conn:
+            return conn.execute(text(f"""
+                SELECT slug, schema_name, COALESCE(shard_name, :default_shard) AS shard_name, is_active
+                FROM {self.system_schema}.tenants ORDER BY slug
+            """), {'default_shard': DEFAULT_SHARD}).fetchall()
+
+    def table_row_counts(self, url, schema_name):
+        """统计schema下各表的行数"""
+        engine = create_engine(url)
+        try:
+            with engine.connect() as conn:
+                tables = conn.execute(text("""
+                    SELECT tablename FROM pg_tables WHERE schemaname = :schema ORDER BY tablename
+                """), {'schema': schema_name}).scalars().all()
+                return {
+                    table: conn.execute(text(f'SELECT COUNT(*) FROM {schema_name}."{table}"')).scalar()
+                    for table in tables
+                }
+        finally:
+            engine.dispose()
+
+    def schema_exists(self, url, schema_name):
+        """检查schema是否存在"""
+        engine = create_engine(url)
+        try:
+            with engine.connect() as conn:
+                return conn.execute(text("""
+                    SELECT 1 FROM information_schema.schemata WHERE schema_name = :schema
+                """), {'schema': schema_name}).scalar() is not None
+        finally:
+            engine.dispose()
+
+    def set_tenant_state(self, slug, is_active=None, shard_name=None, update_shard=False):
+        """更新租户状态或分片指针"""
+        assignments = []
+        params = {'slug': slug}
+        if is_active is not None:
+            assignments.append('is_active = :is_active')
+            params['is_active'] = is_active
+        if update_shard:
+            assignments.append('shard_name = :shard_name')
+            params['shard_name'] = None if shard_name == DEFAULT_SHARD else shard_name
+        if not assignments:
+            return
+        with self.primary_engine.begin() as conn:
+            conn.execute(text(f"""
+                UPDATE {self.system_schema}.tenants SET {', '.join(assignments)}, updated_at = NOW()
+                WHERE slug = :slug
+            """), params)
+        invalidate_tenant(slug)
+
+    @staticmethod
+    def _libpq_url(url):
+        """将SQLAlchemy URL转换为pg_dump/psql可用的URL"""
+        return make_url(url).set(drivername='postgresql').render_as_string(hide_password=False)
+
+    def copy_schema(self, source_url, target_url, schema_name):
+        """使用 pg_dump | psql 复制schema结构和数据"""
+        dump = subprocess.Popen(
+            ['pg_dump', '--schema', schema_name, '--no-owner', '--no-privileges', self._libpq_url(source_url)],
+            stdout=subprocess.PIPE
+        )
+        restore = subprocess.run(
+            ['psql', '--quiet', '--set', 'ON_ERROR_STOP=1', self._libpq_url(target_url)],
+            stdin=dump.stdout, stdout=subprocess.DEVNULL
+        )
+        dump.stdout.close()
+        dump_code = dump.wait()
+        if dump_code != 0 or restore.returncode != 0:
+            raise RuntimeError(f"复制schema失败: pg_dump={dump_code}, psql={restore.returncode}")
+
+    def drop_schema(self, url, schema_name):
+        """删除schema"""
+        engine = create_engine(url)
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f'DROP SCHEMA IF EXISTS {schema_name} CASCADE'))
+        finally:
+            engine.dispose()
+
+    def wait_for_routes(self, reason):
+        """等待各worker进程缓存的租户路由过期、进行中的请求结束"""
+        if self.route_wait <= 0:
+            return
+        logger.info(f"{reason}，等待 {self.route_wait} 秒使所有worker的租户路由缓存过期")
+        time.sleep(self.route_wait)
+
+    def verify(self, slug, target_shard):
+        """校验源分片与目标分片上租户数据是否一致"""
+        tenant = self.get_tenant(slug)
+        schema_name = tenant['schema_name']
+        source = self.table_row_counts(self.shard_url(tenant['shard_name']), schema_name)
+        return self.compare_row_counts(schema_name, source, self.shard_url(target_shard))
+
+    def compare_row_counts(self, schema_name, source, target_url):
+        """
+        比较各表行数
+        :param schema_name: schema名称
+        :param source: 源schema各表行数
+        :param target_url: 目标分片URL
+        :return: 是否一致
+        """
+        target = self.table_row_counts(target_url, schema_name)
+
+        mismatches = []
+        for table in sorted(set(source) | set(target)):
+            if source.get(table) != target.get(table):
+                mismatches.append((table, source.get(table), target.get(table)))
+
+        for table, source_count, target_count in mismatches:
+            logger.error(f"表 {schema_name}.{table} 行数不一致: 源={source_count}, 目标={target_count}")
+        if not mismatches:
+            logger.info(f"校验通过: {len(source)} 张表行数一致")
+        return not mismatches
+
+    def move(self, slug, target_shard, drop_source=False, force=False):
+        """迁移租户到目标分片"""
+        tenant = self.get_tenant(slug)
+        schema_name = tenant['schema_name']
+        source_shard = tenant['shard_name'] or DEFAULT_SHARD
+        if source_shard == target_shard:
+            logger.info(f"租户 {slug} 已位于分片 {target_shard}")
+            return True
+
+        source_url = self.shard_url(source_shard)
+        target_url = self.shard_url(target_shard)
+
+        if self.schema_exists(target_url, schema_name):
+            if not force:
+                raise RuntimeError(f"目标分片已存在schema {schema_name}，使用 --force 覆盖")
+            logger.warning(f"删除目标分片上已存在的schema: {schema_name}")
+            self.drop_schema(target_url, schema_name)
+
+        was_active = tenant['is_active']
+        logger.info(f"停用租户 {slug}，准备从 {source_shard} 迁移到 {target_shard}")
+        self.set_tenant_state(slug, is_active=False)
+        try:
+            # 其他worker在缓存过期前仍会把请求路由到源分片，复制必须在此之后开始
+            self.wait_for_routes("租户已停用")
+            copied = self.table_row_counts(source_url, schema_name)
+            self.copy_schema(source_url, target_url, schema_name)
+            if not self.compare_row_counts(schema_name, copied, target_url):
+                raise RuntimeError("数据校验失败，分片指针未切换")
+            self.set_tenant_state(slug, is_active=was_active, shard_name=target_shard, update_shard=True)
+        except Exception:
+            self.set_tenant_state(slug, is_active=was_active)
+            raise
+
+        logger.info(f"租户 {slug} 已切换到分片 {target_shard}")
+        if drop_source:
+            self.wait_for_routes("分片已切换")
+            # 源schema在复制后仍有写入说明有请求未按新路由执行，保留源schema以便人工核对
+            if not self.compare_row_counts(schema_name, copied, source_url):
+                raise RuntimeError(f"源分片 {source_shard} 上的schema在复制后发生了变化，未删除源schema")
+            logger.info(f"删除源分片 {source_shard} 上的schema: {schema_name}")
+            self.drop_schema(source_url, schema_name)
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='租户分片迁移工具')
+    parser.add_argument('action', choices=['list', 'move', 'verify'], help='操作类型')
+    parser.add_argument('--tenant', help='租户slug')
+    parser.add_argument('--to', help='目标分片名称')
+    parser.add_argument('--drop-source', action='store_true', help='迁移成功后删除源分片上的schema')
+    parser.add_argument('--force', action='store_true', help='目标分片已存在schema时先删除')
+    parser.add_argument('--wait', type=int, help='停用和切换分片后等待租户路由缓存过期的秒数，'
+                                                   '默认 TENANT_CACHE_TTL + GUNICORN_TIMEOUT')
+    parser.add_argument('--config', default='development', help='应用配置名称')
+    args = parser.parse_args()
+
+    app = create_app(args.config)
+    mover = TenantShardMover(app)
+    if args.wait is not None:
+        mover.route_wait = args.wait
+
+    if args.action == 'list':
+        print(f"\n{'租户':<20}{'Schema':<20}{'分片':<15}状态")
+        print("-" * 60)
+        for slug, schema_name, shard_name, is_active in mover.list_tenants():
+            print(f"{slug:<20}{schema_name:<20}{shard_name:<15}{'启用' if is_active else '停用'}")
+        return
+
+    if not args.tenant or not args.to:
+        logger.error("需要指定 --tenant 和 --to 参数")
+        sys.exit(1)
+
+    if args.action == 'verify':
+        sys.exit(0 if mover.verify(args.tenant, args.to) else 1)
+
+    try:
+        mover.move(args.tenant, args.to, drop_source=args.drop_source, force=args.force)
+    except Exception as e:
+        logger.error(f"迁移失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -161,6 +161,7 @@ const MaterialOutbound = ({ onBack }) => {
     approved: { color: 'success', text: '已审核' },
     rejected: { color: 'error', text: '已拒绝' },
     executed: { color: 'purple', text: '已执行' },
+    completed: { color: 'purple', text: '已执行' },
     cancelled: { color: 'warning', text: '已取消' }
   };
 